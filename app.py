@@ -5,6 +5,7 @@ Website Analyzer Pro - Clean & Organized Edition
 """
 import os
 import json
+import math
 import logging
 from datetime import datetime
 from urllib.parse import urlparse
@@ -55,6 +56,7 @@ from security_scanner import SecurityScanner, ThreatDetector
 # استيراد النظام المطور
 try:
     from tools2.advanced_extractor import AdvancedWebsiteExtractor
+    from tools2.core.fetch_deadline import FetchDeadline
     ADVANCED_SYSTEM_AVAILABLE = True
     advanced_extractor = AdvancedWebsiteExtractor("extracted_files")
     logging.info("✅ تم دمج النظام المطور مع التطبيق الأساسي")
@@ -531,6 +533,18 @@ def api_extract_comprehensive():
     
     url = data['url']
     extraction_type = data.get('extraction_type', 'complete')
+    # مهلة اختيارية بالثواني لجلب الصفحة عبر سلسلة تجاوز الحماية (لا تشمل مراحل الزحف وتحميل الأصول)
+    fetch_budget = data.get('fetch_budget')
+    if fetch_budget is not None:
+        try:
+            fetch_budget = float(fetch_budget)
+        except (TypeError, ValueError):
+            fetch_budget = None
+        if fetch_budget is None or not math.isfinite(fetch_budget) or fetch_budget <= 0:
+            return jsonify({
+                'success': False,
+                'error': 'fetch_budget يجب أن يكون عدداً موجباً من الثواني'
+            }), 400
     
     if not url.startswith(('http://', 'https://')):
         url = 'https://' + url
@@ -539,11 +553,14 @@ def api_extract_comprehensive():
         if advanced_extractor is None:
             raise Exception("النظام الشامل غير متاح")
         
-        # تطبيق حماية متطورة في API
-        initial_response = analyzer.session.get(url, timeout=15)
-        original_content = initial_response.text
+        # مهلة واحدة تغطي جلب الصفحة كاملاً؛ فحص الحماية يستخدم استجابة سلسلة التجاوز نفسها بدل طلب ثانٍ
+        fetch_deadline = FetchDeadline.from_budget(fetch_budget)
+        result = advanced_extractor.comprehensive_website_download(url, extraction_type,
+                                                                   fetch_deadline=fetch_deadline)
+        page_response = result.get('basic_content', {}).get('response') if isinstance(result, dict) else None
+        original_content = page_response.text if page_response is not None else ''
         
-        # فحص وتنظيف المحتوى
+        # تطبيق حماية متطورة في API: فحص وتنظيف المحتوى
         threats = threat_detector.detect_threats(original_content, url)
         cleaned_content = ad_blocker.clean_html(original_content, url)
         cleaned_content = content_protector.remove_trackers(cleaned_content)
@@ -554,8 +571,6 @@ def api_extract_comprehensive():
         cleaned_size = len(cleaned_content)
         reduction_percentage = ((original_size - cleaned_size) / original_size) * 100 if original_size > 0 else 0
         
-        result = advanced_extractor.comprehensive_website_download(url, extraction_type)
-        
         # إضافة معلومات الحماية
         if isinstance(result, dict):
             result['security_analysis'] = {
@@ -588,6 +603,11 @@ def api_extract_comprehensive():
             'result_id': analysis_result.id,
             'extraction_folder': result.get('extraction_info', {}).get('base_folder'),
             'duration': result.get('extraction_info', {}).get('duration'),
+            'fetch_budget': {
+                'seconds': fetch_budget,
+                **fetch_deadline.to_dict(),
+                'scope': 'page_fetch_bypass_chain'
+            } if fetch_deadline is not None else None,
             'pages_crawled': result.get('crawl_results', {}).get('pages_crawled', 0),
             'assets_downloaded': result.get('assets_download', {}).get('summary', {}).get('total_downloaded', 0),
             'security_stats': {
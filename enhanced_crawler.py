@@ -7,13 +7,16 @@ Enhanced Crawler with Advanced Protection Bypass
 import time
 import random
 import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
 import urllib3
 from urllib.parse import urlparse, urljoin
+from typing import Optional
 from bs4 import BeautifulSoup, Tag
 import logging
 
+from tools2.core.fetch_deadline import FetchDeadline, DeadlineExceeded, DeadlineRetry, deadline_scope
+from tools2.core.strategy_store import get_strategy_store
+from tools2.core.host_scheduler import mount_scheduled_adapter
+
 # تعطيل تحذيرات SSL
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
@@ -30,6 +33,14 @@ SAFE_TEST_SITES = [
 class EnhancedCrawler:
     """نظام استخراج محسن مع تجاوز حماية متطور"""
     
+    # أقل وقت متبقٍ (بالثواني) يستحق معه تجربة كل طريقة، بما فيها تأخيراتها الداخلية
+    METHOD_MIN_BUDGET = {
+        '_method_basic_request': 1.0,
+        '_method_browser_simulation': 1.5,
+        '_method_mobile_simulation': 1.5,
+        '_method_slow_request': 5.0
+    }
+    
     def __init__(self):
         self.logger = logging.getLogger(__name__)
         self.session = self._create_enhanced_session()
@@ -50,21 +61,25 @@ class EnhancedCrawler:
             'banking-sites.com', 'adult-content.com'  # أمثلة
         }
         
+    @property
+    def strategy_store(self):
+        """ذاكرة الطرق الناجحة لكل نطاق (مشتركة مع AdvancedWebsiteExtractor)، تُفتح عند أول استخدام لا عند الاستيراد"""
+        return get_strategy_store()
+    
     def _create_enhanced_session(self) -> requests.Session:
         """إنشاء جلسة HTTP محسنة مع إعدادات متطورة"""
         session = requests.Session()
         
-        # إعداد retry strategy محسن
-        retry_strategy = Retry(
+        # إعداد retry strategy محسن (يحترم مهلة الجلب النشطة)
+        retry_strategy = DeadlineRetry(
             total=5,
             backoff_factor=2,
             status_forcelist=[403, 429, 500, 502, 503, 504],
             allowed_methods=["HEAD", "GET", "OPTIONS"]
         )
         
-        adapter = HTTPAdapter(max_retries=retry_strategy, pool_maxsize=10)
-        session.mount("http://", adapter)
-        session.mount("https://", adapter)
+        # المجدول المشترك يحد التزامن لكل نطاق ويتراجع عند 429 قبل الوصول لسلسلة التجاوز
+        mount_scheduled_adapter(session, max_retries=retry_strategy, pool_maxsize=10)
         
         # Headers أساسية
         session.headers.update({
@@ -96,15 +111,30 @@ class EnhancedCrawler:
         """الحصول على User-Agent عشوائي"""
         return random.choice(self.user_agents)
     
-    def _add_random_delay(self, min_delay: float = 1.0, max_delay: float = 3.0):
-        """إضافة تأخير عشوائي لتجنب الحظر"""
+    def _add_random_delay(self, min_delay: float = 1.0, max_delay: float = 3.0,
+                          deadline: Optional[FetchDeadline] = None, reserve: float = 0.0):
+        """إضافة تأخير عشوائي لتجنب الحظر (مقيد بالمهلة إن وجدت)"""
         delay = random.uniform(min_delay, max_delay)
-        time.sleep(delay)
+        if deadline is not None:
+            deadline.sleep(delay, reserve=reserve)
+        else:
+            time.sleep(delay)
     
-    def fetch_with_protection_bypass(self, url: str, max_attempts: int = 3) -> dict:
+    def _request_timeout(self, default: float, deadline: Optional[FetchDeadline] = None) -> float:
+        """timeout الطلب مقيداً بالوقت المتبقي من المهلة"""
+        if deadline is None:
+            return default
+        return deadline.timeout(default)
+    
+    def fetch_with_protection_bypass(self, url: str, max_attempts: int = 3,
+                                     deadline: Optional[FetchDeadline] = None) -> dict:
         """
         جلب صفحة مع تجاوز حماية متطور
         
+        Args:
+            deadline: مهلة اختيارية تُمرَّر لكل طريقة وإعادة محاولة وتأخير،
+                      وتُتخطى الطرق المكلفة عندما لا يكفي الوقت المتبقي
+        
         Returns:
             dict: {'success': bool, 'response': Response, 'method': str, 'error': str}
         """
@@ -116,14 +146,40 @@ class EnhancedCrawler:
                 'error': f'النطاق محظور لأسباب أمنية: {urlparse(url).netloc}'
             }
         
-        methods = [
-            self._method_basic_request,
-            self._method_browser_simulation,
-            self._method_mobile_simulation,
-            self._method_slow_request
-        ]
+        with deadline_scope(deadline):
+            result = self._run_bypass_chain(url, deadline)
+        
+        if deadline is not None:
+            result['deadline'] = deadline.to_dict()
+        return result
+    
+    def _run_bypass_chain(self, url: str, deadline: Optional[FetchDeadline] = None) -> dict:
+        """تجربة طرق الجلب ضمن المهلة، بدءاً بالأنجح تاريخياً لهذا النطاق"""
+        
+        methods = {
+            '_method_basic_request': self._method_basic_request,
+            '_method_browser_simulation': self._method_browser_simulation,
+            '_method_mobile_simulation': self._method_mobile_simulation,
+            '_method_slow_request': self._method_slow_request
+        }
+        
+        domain = self.strategy_store.domain_of(url)
+        ordered_names = self.strategy_store.ranked_methods(domain, list(methods))
         
-        for attempt, method in enumerate(methods, 1):
+        for attempt, method_name in enumerate(ordered_names, 1):
+            method = methods[method_name]
+            method_budget = self.METHOD_MIN_BUDGET.get(method.__name__, 1.0)
+            delay_budget = 2.0 if attempt > 1 else 0.0
+            
+            if deadline is not None:
+                if deadline.expired():
+                    break
+                if not deadline.can_afford(method_budget + delay_budget):
+                    self.logger.warning(f"تخطي {method.__name__}: الوقت المتبقي غير كافٍ")
+                    deadline.skip(method.__name__)
+                    continue
+            
+            method_start = time.time()
             try:
                 self.logger.info(f"المحاولة {attempt}: استخدام {method.__name__}")
                 
@@ -132,11 +188,22 @@ class EnhancedCrawler:
                 
                 # تأخير عشوائي
                 if attempt > 1:
-                    self._add_random_delay(2.0, 5.0)
+                    self._add_random_delay(2.0, 5.0, deadline, reserve=method_budget)
                 
-                response = method(url)
+                # إعادة استخدام headers آخر نجاح لهذه الطريقة على النطاق
+                profile = self.strategy_store.get_profile(domain, method_name)
                 
-                if response and response.status_code == 200:
+                method_start = time.time()
+                response = method(url, deadline, profile)
+                latency = time.time() - method_start
+                
+                succeeded = bool(response is not None and response.status_code == 200)
+                self.strategy_store.record(
+                    domain, method_name, succeeded, latency,
+                    dict(response.request.headers) if succeeded and response.request is not None else None
+                )
+                
+                if succeeded:
                     return {
                         'success': True,
                         'response': response,
@@ -150,10 +217,22 @@ class EnhancedCrawler:
                     self.logger.warning(f"فشل {method.__name__}: {response.status_code if response else 'No response'}")
                     continue
                     
+            except DeadlineExceeded as e:
+                self.logger.warning(f"انتهت المهلة أثناء {method.__name__}: {str(e)}")
+                break
             except Exception as e:
                 self.logger.error(f"خطأ في {method.__name__}: {str(e)}")
+                self.strategy_store.record(domain, method_name, False, time.time() - method_start)
                 continue
         
+        if deadline is not None and not deadline.can_afford(FetchDeadline.MIN_ATTEMPT_SECONDS):
+            return {
+                'success': False,
+                'response': None,
+                'method': 'deadline_exceeded',
+                'error': f'انتهت مهلة الجلب ({deadline.budget_seconds} ثانية) قبل نجاح أي طريقة'
+            }
+        
         # إذا فشلت جميع الطرق، اقترح مواقع آمنة
         return {
             'success': False,
@@ -162,11 +241,13 @@ class EnhancedCrawler:
             'error': f'فشل في الوصول للموقع. المواقع الآمنة للاختبار: {", ".join(SAFE_TEST_SITES[:3])}'
         }
     
-    def _method_basic_request(self, url: str) -> requests.Response:
+    def _method_basic_request(self, url: str, deadline: Optional[FetchDeadline] = None,
+                              profile: Optional[dict] = None) -> requests.Response:
         """طريقة الطلب الأساسي"""
-        return self.session.get(url, timeout=8, verify=False)  # timeout أقصر
+        return self.session.get(url, headers=profile, timeout=self._request_timeout(8, deadline), verify=False)  # timeout أقصر
     
-    def _method_browser_simulation(self, url: str) -> requests.Response:
+    def _method_browser_simulation(self, url: str, deadline: Optional[FetchDeadline] = None,
+                                   profile: Optional[dict] = None) -> requests.Response:
         """محاكاة متصفح متطورة"""
         headers = {
             'User-Agent': self._get_random_user_agent(),
@@ -178,10 +259,12 @@ class EnhancedCrawler:
             'Connection': 'keep-alive',
             'Upgrade-Insecure-Requests': '1',
         }
+        headers.update(profile or {})
         
-        return self.session.get(url, headers=headers, timeout=10, verify=False)
+        return self.session.get(url, headers=headers, timeout=self._request_timeout(10, deadline), verify=False)
     
-    def _method_mobile_simulation(self, url: str) -> requests.Response:
+    def _method_mobile_simulation(self, url: str, deadline: Optional[FetchDeadline] = None,
+                                  profile: Optional[dict] = None) -> requests.Response:
         """محاكاة جهاز محمول"""
         mobile_headers = {
             'User-Agent': 'Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Mobile/15E148 Safari/604.1',
@@ -190,12 +273,14 @@ class EnhancedCrawler:
             'Accept-Encoding': 'gzip, deflate',
             'Connection': 'keep-alive',
         }
+        mobile_headers.update(profile or {})
         
-        return self.session.get(url, headers=mobile_headers, timeout=8, verify=False)
+        return self.session.get(url, headers=mobile_headers, timeout=self._request_timeout(8, deadline), verify=False)
     
-    def _method_slow_request(self, url: str) -> requests.Response:
+    def _method_slow_request(self, url: str, deadline: Optional[FetchDeadline] = None,
+                             profile: Optional[dict] = None) -> requests.Response:
         """طلب بطيء لتجنب rate limiting"""
-        self._add_random_delay(3.0, 6.0)
+        self._add_random_delay(3.0, 6.0, deadline, reserve=FetchDeadline.MIN_ATTEMPT_SECONDS)
         
         slow_headers = {
             'User-Agent': self._get_random_user_agent(),
@@ -204,10 +289,11 @@ class EnhancedCrawler:
             'Connection': 'keep-alive',
             'Cache-Control': 'no-cache',
         }
+        slow_headers.update(profile or {})
         
-        return self.session.get(url, headers=slow_headers, timeout=12, verify=False)
+        return self.session.get(url, headers=slow_headers, timeout=self._request_timeout(12, deadline), verify=False)
     
-    def analyze_website_enhanced(self, url: str) -> dict:
+    def analyze_website_enhanced(self, url: str, deadline: Optional[FetchDeadline] = None) -> dict:
         """تحليل موقع مع نظام الحماية المحسن"""
         start_time = time.time()
         
@@ -224,7 +310,7 @@ class EnhancedCrawler:
         
         try:
             # محاولة جلب الصفحة
-            fetch_result = self.fetch_with_protection_bypass(url)
+            fetch_result = self.fetch_with_protection_bypass(url, deadline=deadline)
             
             if not fetch_result['success']:
                 result['error'] = fetch_result['error']
@@ -20,9 +20,22 @@ import aiohttp
 import concurrent.futures
 from threading import Thread
 
+try:
+    from tools2.core.parse_pipeline import ParsePipeline
+    PARSE_PIPELINE_AVAILABLE = True
+except ImportError:
+    PARSE_PIPELINE_AVAILABLE = False
+
 # تعطيل تحذيرات SSL
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+# المواقع الآمنة للاختبار السريع
+INSTANT_TEST_SITES = [
+    'https://httpbin.org/',
+    'https://example.com/',
+    'https://jsonplaceholder.typicode.com/'
+]
+
 class UltraFastExtractor:
     """نظام استخراج فائق السرعة مع استجابة فورية"""
     
@@ -39,11 +52,7 @@ class UltraFastExtractor:
         ]
         
         # المواقع الآمنة للاختبار السريع
-        self.instant_test_sites = [
-            'https://httpbin.org/',
-            'https://example.com/',
-            'https://jsonplaceholder.typicode.com/'
-        ]
+        self.instant_test_sites = list(INSTANT_TEST_SITES)
     
     def create_lightning_session(self) -> requests.Session:
         """إنشاء جلسة فائقة السرعة"""
@@ -148,54 +157,7 @@ class UltraFastExtractor:
                 return result
             
             response = fetch_result['response']
-            
-            # الخطوة 2: تحليل سريع
-            parse_start = time.time()
-            soup = BeautifulSoup(response.text[:50000], 'html.parser')  # حد أقصى 50KB للسرعة
-            result['performance']['parse_time'] = round(time.time() - parse_start, 3)
-            
-            # الخطوة 3: استخراج أساسي فائق السرعة
-            analysis_start = time.time()
-            
-            # معلومات أساسية
-            title_tag = soup.find('title')
-            title = title_tag.get_text().strip()[:100] if title_tag else 'بدون عنوان'
-            
-            # إحصائيات سريعة
-            links_count = len(soup.find_all('a', href=True, limit=50))
-            images_count = len(soup.find_all('img', limit=20))
-            
-            # تحليل أساسي للمحتوى
-            text_content = soup.get_text()[:1000]  # أول 1000 حرف فقط
-            word_count = len(text_content.split())
-            
-            result['performance']['analysis_time'] = round(time.time() - analysis_start, 3)
-            
-            # بناء النتيجة
-            result['data'] = {
-                'basic_info': {
-                    'title': title,
-                    'url': url,
-                    'domain': urlparse(url).netloc,
-                    'status_code': response.status_code,
-                    'content_size_kb': round(len(response.content) / 1024, 1),
-                    'server': response.headers.get('server', 'غير محدد')[:30]
-                },
-                'quick_stats': {
-                    'links': links_count,
-                    'images': images_count,
-                    'word_count': word_count,
-                    'has_forms': bool(soup.find('form')),
-                    'has_scripts': bool(soup.find('script'))
-                },
-                'response_info': {
-                    'response_time': fetch_result['response_time'],
-                    'https': url.startswith('https://'),
-                    'content_type': response.headers.get('content-type', 'غير محدد')[:50]
-                }
-            }
-            
-            result['success'] = True
+            self._analyze_response(result, url, response, fetch_result['response_time'])
             
         except Exception as e:
             self.logger.error(f"خطأ في التحليل السريع: {str(e)}")
@@ -206,8 +168,65 @@ class UltraFastExtractor:
         
         return result
     
-    def parallel_extract(self, urls: list) -> list:
-        """استخراج متوازي لعدة مواقع"""
+    @staticmethod
+    def _analyze_response(result: dict, url: str, response, response_time: float) -> dict:
+        """التحليل السريع للاستجابة (يعمل أيضاً داخل عمليات التحليل في parallel_extract)"""
+        
+        # الخطوة 2: تحليل سريع
+        parse_start = time.time()
+        soup = BeautifulSoup(response.text[:50000], 'html.parser')  # حد أقصى 50KB للسرعة
+        result['performance']['parse_time'] = round(time.time() - parse_start, 3)
+        
+        # الخطوة 3: استخراج أساسي فائق السرعة
+        analysis_start = time.time()
+        
+        # معلومات أساسية
+        title_tag = soup.find('title')
+        title = title_tag.get_text().strip()[:100] if title_tag else 'بدون عنوان'
+        
+        # إحصائيات سريعة
+        links_count = len(soup.find_all('a', href=True, limit=50))
+        images_count = len(soup.find_all('img', limit=20))
+        
+        # تحليل أساسي للمحتوى
+        text_content = soup.get_text()[:1000]  # أول 1000 حرف فقط
+        word_count = len(text_content.split())
+        
+        result['performance']['analysis_time'] = round(time.time() - analysis_start, 3)
+        
+        # بناء النتيجة
+        result['data'] = {
+            'basic_info': {
+                'title': title,
+                'url': url,
+                'domain': urlparse(url).netloc,
+                'status_code': response.status_code,
+                'content_size_kb': round(len(response.content) / 1024, 1),
+                'server': response.headers.get('server', 'غير محدد')[:30]
+            },
+            'quick_stats': {
+                'links': links_count,
+                'images': images_count,
+                'word_count': word_count,
+                'has_forms': bool(soup.find('form')),
+                'has_scripts': bool(soup.find('script'))
+            },
+            'response_info': {
+                'response_time': response_time,
+                'https': url.startswith('https://'),
+                'content_type': response.headers.get('content-type', 'غير محدد')[:50]
+            }
+        }
+        
+        result['success'] = True
+        
+        return result
+    
+    def parallel_extract(self, urls: list, pipeline: bool = False, parse_workers: int = None) -> list:
+        """استخراج متوازي لعدة مواقع (pipeline=True: جلب غير متزامن وتحليل في عمليات متعددة)"""
+        if pipeline and PARSE_PIPELINE_AVAILABLE:
+            return self.pipeline_extract(urls, parse_workers)
+        
         results = []
         
         with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
@@ -228,6 +247,20 @@ class UltraFastExtractor:
         
         return results
     
+    def pipeline_extract(self, urls: list, parse_workers: int = None) -> list:
+        """جلب جميع الروابط بشكل غير متزامن وتحليلها في عمليات متعددة؛ التحليل يستخدم كل الأنوية"""
+        pipeline = ParsePipeline(
+            _pipeline_lightning_parse,
+            parse_workers=parse_workers,
+            fetch_concurrency=max(self.max_workers, 16),
+            timeout=self.timeout,
+            headers={
+                'User-Agent': random.choice(self.fast_user_agents),
+                'Accept': 'text/html,*/*;q=0.8'
+            }
+        )
+        return [result for _, result in pipeline.run(urls)]
+    
     def health_check(self) -> dict:
         """فحص سريع لصحة النظام"""
         start_time = time.time()
@@ -243,5 +276,36 @@ class UltraFastExtractor:
             'check_duration': round(time.time() - start_time, 3)
         }
 
+def _pipeline_lightning_parse(page) -> dict:
+    """تحليل صفحة مجلوبة داخل عملية التحليل بنفس شكل نتيجة extract_lightning_fast"""
+    start_time = time.time()
+    result = {
+        'url': page.url,
+        'timestamp': datetime.now().isoformat(),
+        'success': False,
+        'total_time': 0,
+        'data': {},
+        'error': None,
+        'suggestions': list(INSTANT_TEST_SITES),
+        'performance': {
+            'fetch_time': round(page.elapsed_seconds, 3),
+            'parse_time': 0,
+            'analysis_time': 0
+        }
+    }
+    
+    if page.error:
+        result['error'] = 'فشل في الاتصال'
+    elif page.status_code != 200:
+        result['error'] = f'HTTP {page.status_code}'
+    else:
+        try:
+            UltraFastExtractor._analyze_response(result, page.url, page, round(page.elapsed_seconds, 3))
+        except Exception as e:
+            result['error'] = f"خطأ في التحليل: {str(e)[:100]}"
+    
+    result['total_time'] = round(page.elapsed_seconds + time.time() - start_time, 3)
+    return result
+
 # إنشاء instance عام
 ultra_fast_extractor = UltraFastExtractor()
\ No newline at end of file
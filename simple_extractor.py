@@ -15,6 +15,8 @@ from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
 import traceback
 
+from tools2.core.blob_store import get_blob_store
+
 # تحديد مجلد الإخراج الموحد
 OUTPUT_DIR = Path("11")
 OUTPUT_DIR.mkdir(exist_ok=True)
@@ -26,6 +28,8 @@ class SimpleWebsiteExtractor:
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
         self.session = self._create_session()
+        # نسخة واحدة من كل أصل على القرص مهما تكرر بين عمليات الاستخراج
+        self.blob_store = get_blob_store(self.output_dir / 'blobs')
         
     def _create_session(self):
         """إنشاء جلسة HTTP محسنة"""
@@ -219,15 +223,12 @@ class SimpleWebsiteExtractor:
                 response = self.session.get(img['absolute_url'], timeout=10)
                 if response.status_code == 200:
                     filename = Path(img['absolute_url']).name or 'image.jpg'
-                    file_path = images_folder / filename
-                    
-                    with open(file_path, 'wb') as f:
-                        f.write(response.content)
+                    stored = self.blob_store.save_bytes(response.content, images_folder / filename)
                     
                     downloaded.append({
                         'url': img['absolute_url'],
-                        'file_path': str(file_path),
-                        'size': len(response.content)
+                        'file_path': str(stored['path']),
+                        'size': stored['size']
                     })
                     
             except Exception as e:
@@ -245,15 +246,12 @@ class SimpleWebsiteExtractor:
                 response = self.session.get(url, timeout=10)
                 if response.status_code == 200:
                     filename = Path(url).name or 'asset.txt'
-                    file_path = assets_folder / filename
-                    
-                    with open(file_path, 'wb') as f:
-                        f.write(response.content)
+                    stored = self.blob_store.save_bytes(response.content, assets_folder / filename)
                     
                     downloaded.append({
                         'url': url,
-                        'file_path': str(file_path),
-                        'size': len(response.content)
+                        'file_path': str(stored['path']),
+                        'size': stored['size']
                     })
                     
             except Exception as e:
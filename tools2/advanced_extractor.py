@@ -3,6 +3,7 @@
 Unified Advanced Extraction Interface
 """
 
+import os
 import json
 import time
 import asyncio
@@ -13,16 +14,15 @@ import sqlite3
 import hashlib
 import ssl
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional, Set, Tuple, Union
+from typing import Dict, List, Any, Optional, Set, Tuple, Union, Iterable, Iterator
 from pathlib import Path
 from urllib.parse import urljoin, urlparse, parse_qs, unquote
 from dataclasses import dataclass, asdict, field
+from functools import partial
 from concurrent.futures import ThreadPoolExecutor, as_completed
-import queue
 import requests
 from bs4 import BeautifulSoup, Tag
 from bs4.element import NavigableString
-from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 import urllib3
 import re
@@ -39,6 +39,54 @@ except ImportError:
     ENHANCED_CRAWLER_AVAILABLE = False
     print("⚠️ Enhanced crawler not available")
 
+# مهلة الجلب المشتركة مع سلسلة تجاوز الحماية
+try:
+    from .core.fetch_deadline import FetchDeadline, DeadlineExceeded, DeadlineRetry, deadline_scope
+    from .core.strategy_store import get_strategy_store
+    from .core.scraper_pool import get_scraper_pool
+    from .core.crawl_frontier import CrawlFrontier, canonicalize_url
+    from .core.crawl_scoring import CrawlScorer, CrawlScorerFunc
+    from .core.crawl_store import CrawlStore
+    from .core.sitemap_ingestor import SitemapIngestor
+    from .core.robots_cache import get_robots_cache
+    from .core.site_crawl import SiteCrawl, CrawledPage
+    from .core.near_duplicates import NearDuplicateIndex, visible_text
+    from .core.change_monitor import ChangeMonitor
+    from .core.parse_pipeline import ParsePipeline
+    from .core.link_extractor import extract_links
+    from .core.link_graph import LinkGraph
+    from .core.host_scheduler import mount_scheduled_adapter
+    from .core.blob_store import get_blob_store, detach_view
+    from .core.asset_cache import get_asset_cache, new_cache_stats, open_asset
+    from .core.css_resolver import find_css_references, resolve_css_url
+    from .core.responsive_images import ImagePolicy, select_page_images
+    from .core.ranged_download import RangedDownloader
+    from .core.download_budget import (BudgetExceeded, DownloadBudget, asset_priority, DEFAULT_BUDGET_MB,
+                                       DEFAULT_BUDGET_ASSETS, DEFAULT_BUDGET_SECONDS, DEFAULT_MAX_FILE_MB)
+except ImportError:
+    from core.fetch_deadline import FetchDeadline, DeadlineExceeded, DeadlineRetry, deadline_scope
+    from core.strategy_store import get_strategy_store
+    from core.scraper_pool import get_scraper_pool
+    from core.crawl_frontier import CrawlFrontier, canonicalize_url
+    from core.crawl_scoring import CrawlScorer, CrawlScorerFunc
+    from core.crawl_store import CrawlStore
+    from core.sitemap_ingestor import SitemapIngestor
+    from core.robots_cache import get_robots_cache
+    from core.site_crawl import SiteCrawl, CrawledPage
+    from core.near_duplicates import NearDuplicateIndex, visible_text
+    from core.change_monitor import ChangeMonitor
+    from core.parse_pipeline import ParsePipeline
+    from core.link_extractor import extract_links
+    from core.link_graph import LinkGraph
+    from core.host_scheduler import mount_scheduled_adapter
+    from core.blob_store import get_blob_store, detach_view
+    from core.asset_cache import get_asset_cache, new_cache_stats, open_asset
+    from core.css_resolver import find_css_references, resolve_css_url
+    from core.responsive_images import ImagePolicy, select_page_images
+    from core.ranged_download import RangedDownloader
+    from core.download_budget import (BudgetExceeded, DownloadBudget, asset_priority, DEFAULT_BUDGET_MB,
+                                      DEFAULT_BUDGET_ASSETS, DEFAULT_BUDGET_SECONDS, DEFAULT_MAX_FILE_MB)
+
 # Advanced dependencies (conditional imports)
 try:
     import aiohttp
@@ -164,6 +212,11 @@ class SpiderConfig:
     delay_between_requests: float = 1.0
     timeout: int = 30
     user_agent: str = "AdvancedSpider/1.0"
+    resumable: bool = False  # حفظ حالة الزحف في SQLite لاستئنافه عبر resume_crawl
+    checkpoint_every: int = 25
+    detect_near_duplicates: bool = True  # تخطي الصفحات شبه المكررة (SimHash)
+    crawl_only: bool = False  # اكتشاف الروابط فقط (مسار سريع بدون BeautifulSoup ولا تحليل كامل)
+    seed_sitemap: bool = False  # إضافة روابط sitemap للانتظار لتدخل priority و lastmod في ترتيب الزحف
 
 class AdvancedWebsiteExtractor:
     """واجهة شاملة لاستخدام جميع محركات الاستخراج المتطورة"""
@@ -178,6 +231,27 @@ class AdvancedWebsiteExtractor:
         # إعداد جلسة HTTP محسنة
         self.session = self._create_enhanced_session()
         
+        # ذاكرة طرق تجاوز الحماية الناجحة لكل نطاق
+        self.strategy_store = get_strategy_store(self.output_directory)
+        
+        # مخزن الأصول المعنون بالمحتوى: نسخة واحدة من كل ملف مهما تكرر بين عمليات الاستخراج
+        self.blob_store = get_blob_store(self.output_directory / 'blobs')
+        # ذاكرة مؤقتة للأصول بين عمليات الاستخراج (بحسب الرابط و Cache-Control/ETag)
+        self.asset_cache = get_asset_cache(self.blob_store)
+        # سياسة اختيار مرشح واحد من srcset/<picture> لكل صورة (نافذة العرض وكثافة البكسل)
+        self.image_policy = ImagePolicy()
+        # ميزانية كل تحميل شامل: حد البايتات وعدد الأصول والوقت (None = بلا حد)
+        self.asset_budget = {'max_bytes': DEFAULT_BUDGET_MB * 1024 * 1024, 'max_assets': DEFAULT_BUDGET_ASSETS,
+                             'max_seconds': DEFAULT_BUDGET_SECONDS}
+        # أقصى حجم لملف وسائط أو مستند واحد في التحميل القابل للاستئناف
+        self.max_file_bytes = DEFAULT_MAX_FILE_MB * 1024 * 1024
+        
+        # جلسات CloudScraper طويلة العمر لكل نطاق مشتركة على مستوى العملية (تحتفظ بكوكيز التحدي المحلول)
+        self.scraper_pool = get_scraper_pool(
+            self._create_cloudscraper_session,
+            cookie_dir=str(self.output_directory / 'scraper_sessions')
+        ) if ADVANCED_PROTECTION_BYPASS else None
+        
         # تهيئة المحركات المتقدمة
         self.cloner_pro = None
         self.spider_engine = None  
@@ -206,9 +280,8 @@ class AdvancedWebsiteExtractor:
             status_forcelist=[429, 500, 502, 503, 504],
         )
         
-        adapter = HTTPAdapter(max_retries=retry_strategy)
-        session.mount("http://", adapter)
-        session.mount("https://", adapter)
+        # كل الطلبات تمر عبر المجدول المشترك لكل نطاق (حد تزامن وتراجع عند 429)
+        mount_scheduled_adapter(session, max_retries=retry_strategy)
         
         # إعداد headers محسنة
         session.headers.update({
@@ -403,30 +476,244 @@ class AdvancedWebsiteExtractor:
             self.results[extraction_id] = error_result
             return error_result
     
-    def _perform_comprehensive_crawl(self, start_url: str, config: SpiderConfig) -> Dict[str, Any]:
-        """تنفيذ زحف شامل للموقع"""
+    def _get_crawl_store(self) -> CrawlStore:
+        """مخزن حالة الزحف القابلة للاستئناف لمجلد الإخراج هذا"""
+        if getattr(self, '_crawl_store', None) is None:
+            self._crawl_store = CrawlStore(str(self.output_directory / 'crawl_state.db'))
+        return self._crawl_store
+    
+    def _get_robots_rules(self, url: str, timeout: float = 10):
+        """قواعد robots.txt من الذاكرة المشتركة (تُجلب عبر جلسة المستخرج مرة لكل أصل)"""
+        return get_robots_cache().get(url, self.session, timeout=timeout, verify=False)
+    
+    def _seed_frontier_from_sitemap(self, urls_to_visit, start_url: str, base_domain: str, robots,
+                                    timeout: float = 15, max_urls: int = 1000) -> int:
+        """إضافة روابط sitemap الداخلية للانتظار (عمق 1) مع priority و lastmod، وإرجاع عدد المضاف"""
+        added = 0
+        
+        def on_url(entry: Dict[str, Any]):
+            nonlocal added
+            # يُستدعى تحت قفل المستورد فلا تتزاحم خيوطه على الواجهة
+            if urlparse(canonicalize_url(entry['url']) or '').netloc != base_domain:
+                return
+            if urls_to_visit.add(entry['url'], depth=1, sitemap_priority=entry.get('priority'),
+                                 lastmod=entry.get('lastmod')):
+                added += 1
+        
+        try:
+            ingestor = SitemapIngestor(self.session, timeout=timeout, verify=False, max_urls=max_urls)
+            ingestor.ingest(start_url, on_url=on_url, robots_sitemaps=robots.sitemap_urls)
+        except Exception as e:
+            print(f"⚠️ تعذر قراءة sitemap: {str(e)}")
+        if added:
+            print(f"🗺️ أضيف {added} رابط من sitemap إلى قائمة الزحف")
+        return added
+    
+    def resume_crawl(self, crawl_id: str) -> Dict[str, Any]:
+        """استئناف زحف محفوظ دون إعادة تحميل الصفحات المكتملة"""
+        crawl_info = self._get_crawl_store().get_crawl(crawl_id)
+        if not crawl_info:
+            return {'success': False, 'crawl_id': crawl_id, 'error': f'لا يوجد زحف محفوظ بالمعرّف: {crawl_id}'}
+        
+        print(f"♻️ استئناف الزحف {crawl_id} - {crawl_info['pages_done']} صفحة مكتملة، {crawl_info['urls_pending']} في الانتظار")
+        config = crawl_info['config']
+        
+        if crawl_info['kind'] == 'internal_links':
+            return self._crawl_internal_links(
+                crawl_info['start_url'], Path(config['base_folder']),
+                max_depth=config['max_depth'], max_pages=config['max_pages'], crawl_id=crawl_id
+            )
+        
+        return self._perform_comprehensive_crawl(crawl_info['start_url'], SpiderConfig(**config), crawl_id=crawl_id)
+    
+    def _perform_comprehensive_crawl(self, start_url: str, config: SpiderConfig,
+                                     crawl_id: Optional[str] = None,
+                                     scorer: Optional[CrawlScorerFunc] = None) -> Dict[str, Any]:
+        """تنفيذ زحف شامل للموقع (crawl_id لاستئناف زحف محفوظ، scorer لترتيب الروابط حسب قيمتها)"""
         
-        visited_urls = set()
-        urls_to_visit = queue.Queue()
         crawl_results = {}
+        crawl_store = None
+        scorer = scorer or CrawlScorer()
+        
+        if crawl_id:
+            crawl_store = self._get_crawl_store()
+            crawl_folder = Path(crawl_store.get_crawl(crawl_id)['output_folder'])
+            crawl_store.prepare_resume(crawl_id)
+            urls_to_visit = crawl_store.frontier(crawl_id, scorer)
+            start_url = canonicalize_url(start_url) or start_url
+            seed_sitemap = False
+        else:
+            crawl_folder = self.output_directory / 'spider_crawl' / f"crawl_{int(time.time())}"
+            if config.resumable:
+                crawl_store = self._get_crawl_store()
+                crawl_id = crawl_store.create_crawl(start_url, 'comprehensive_crawl', asdict(config), str(crawl_folder))
+                urls_to_visit = crawl_store.frontier(crawl_id, scorer)
+                print(f"💾 حالة الزحف محفوظة بالمعرّف: {crawl_id}")
+            else:
+                urls_to_visit = CrawlFrontier(scorer=scorer)
+            
+            # إضافة الرابط الأساسي
+            start_url = urls_to_visit.add(start_url, depth=0)
+            seed_sitemap = config.seed_sitemap
         
-        # إضافة الرابط الأساسي
-        urls_to_visit.put((start_url, 0))  # (url, depth)
+        if crawl_store:
+            crawl_store.set_checkpoint_interval(crawl_id, config.checkpoint_every)
         
-        crawl_folder = self.output_directory / 'spider_crawl' / f"crawl_{int(time.time())}"
+        base_domain = urlparse(start_url).netloc
         crawl_folder.mkdir(parents=True, exist_ok=True)
+        if seed_sitemap:
+            self._seed_frontier_from_sitemap(urls_to_visit, start_url, base_domain,
+                                             self._get_robots_rules(start_url, config.timeout),
+                                             config.timeout, max_urls=config.max_pages * 20)
         
-        pages_crawled = 0
-        total_links_found = 0
-        total_assets_found = 0
+        pages_crawled = crawl_store.count_pages(crawl_id) if crawl_store else 0
         
         print(f"🔍 بدء الزحف - العمق الأقصى: {config.max_depth}, الصفحات: {config.max_pages}")
         
-        while not urls_to_visit.empty() and pages_crawled < config.max_pages:
-            current_url, depth = urls_to_visit.get()
+        try:
+            self._run_comprehensive_crawl_loop(
+                urls_to_visit, config, crawl_folder, start_url, crawl_results, crawl_store, crawl_id, pages_crawled
+            )
+        except BaseException:
+            # حفظ التقدم قبل الخروج (مهلة، إيقاف يدوي، إعادة نشر...)
+            if crawl_store:
+                crawl_store.checkpoint(crawl_id, 'interrupted')
+            raise
+        
+        if crawl_store:
+            crawl_store.finish_crawl(crawl_id)
+            # النتائج تبقى على القرص وتُقرأ على دفعات: مرة للإحصائيات ومرة لكتابة الملخص
+            read_results = lambda: crawl_store.iter_page_results(crawl_id)
+        else:
+            read_results = lambda: iter(crawl_results.items())
+        
+        stats = self._summarize_crawl_results(read_results())
+        pages_crawled = stats['pages_crawled']
+        
+        # إنشاء ملخص الزحف
+        summary = {
+            'start_url': start_url,
+            'success': True,
+            'crawl_id': crawl_id,
+            'crawl_folder': str(crawl_folder),
+            'pages_crawled': pages_crawled,
+            'total_links_found': stats['total_links_found'],
+            'total_assets_found': stats['total_assets_found'],
+            'unique_domains': stats['unique_domains'],
+            'max_depth_reached': stats['max_depth_reached'],
+            'duplicates_skipped': len(stats['duplicates']),
+            'duplicates': stats['duplicates'],
+            'link_structure': stats['link_structure'],
+            'crawl_stats': stats['crawl_stats']
+        }
+        
+        # حفظ ملخص الزحف (نتائج الصفحات تُكتب صفحةً صفحة)
+        summary_file = crawl_folder / 'crawl_summary.json'
+        self._write_crawl_summary(summary_file, summary, read_results())
+        
+        if crawl_store:
+            # النتائج الكاملة في crawl_summary.json و crawl_store.iter_page_results وليست في الذاكرة
+            summary['crawl_results_file'] = str(summary_file)
+        else:
+            summary['crawl_results'] = {url: r for url, r in crawl_results.items() if not r.get('duplicate_of')}
+        
+        print(f"✅ اكتمل الزحف - تم زحف {pages_crawled} صفحة بنجاح")
+        return summary
+    
+    @staticmethod
+    def _summarize_crawl_results(results) -> Dict[str, Any]:
+        """إحصائيات الزحف ورسم الروابط بمرور واحد على نتائج (url, dict) دون جمعها في قاموس"""
+        totals = {'results': 0, 'succeeded': 0, 'links': 0, 'assets': 0, 'max_depth': 0,
+                  'content_length': 0, 'forms': 0, 'api_endpoints': 0}
+        domains = set()
+        duplicates = {}
+        
+        def counted():
+            for url, result in results:
+                if result.get('duplicate_of'):
+                    duplicates[url] = result['duplicate_of']
+                    continue
+                totals['results'] += 1
+                if not result.get('error'):
+                    totals['succeeded'] += 1
+                totals['links'] += len(result.get('links', []))
+                totals['assets'] += (len(result.get('images', [])) + len(result.get('scripts', []))
+                                     + len(result.get('stylesheets', [])))
+                totals['max_depth'] = max(totals['max_depth'], result.get('depth', 0))
+                totals['content_length'] += result.get('content_length', 0)
+                totals['forms'] += len(result.get('forms', []))
+                totals['api_endpoints'] += len(result.get('api_endpoints', []))
+                domains.add(urlparse(url).netloc)
+                yield url, result
+        
+        link_structure = LinkGraph.from_pages(counted()).report()
+        pages_crawled = totals['succeeded']
+        return {
+            'pages_crawled': pages_crawled,
+            'total_links_found': totals['links'],
+            'total_assets_found': totals['assets'],
+            'unique_domains': len(domains),
+            'max_depth_reached': totals['max_depth'],
+            'duplicates': duplicates,
+            'link_structure': link_structure,
+            'crawl_stats': {
+                'success_rate': pages_crawled / totals['results'] * 100 if totals['results'] else 0,
+                'average_page_size': totals['content_length'] / pages_crawled if pages_crawled > 0 else 0,
+                'forms_found': totals['forms'],
+                'api_endpoints_found': totals['api_endpoints']
+            }
+        }
+    
+    @staticmethod
+    def _write_crawl_summary(summary_file: Path, summary: Dict[str, Any], results):
+        """كتابة crawl_summary.json مع crawl_results صفحةً صفحة بدل بناء القاموس كاملاً في الذاكرة"""
+        def dump(value, indent: str) -> str:
+            return json.dumps(value, ensure_ascii=False, indent=2, default=str).replace('\n', '\n' + indent)
+        
+        with open(summary_file, 'w', encoding='utf-8') as f:
+            f.write('{\n')
+            for key, value in summary.items():
+                f.write(f'  {dump(key, "")}: {dump(value, "  ")},\n')
+            f.write('  "crawl_results": {')
+            separator = '\n'
+            for url, result in results:
+                if result.get('duplicate_of'):
+                    continue
+                f.write(f'{separator}    {dump(url, "")}: {dump(result, "    ")}')
+                separator = ',\n'
+            f.write('\n  }\n}\n' if separator != '\n' else '}\n}\n')
+    
+    def _run_comprehensive_crawl_loop(self, urls_to_visit, config: SpiderConfig, crawl_folder: Path, start_url: str,
+                                      crawl_results: Dict[str, Any], crawl_store: Optional[CrawlStore],
+                                      crawl_id: Optional[str], pages_crawled: int):
+        """حلقة الزحف: النتائج تذهب إلى crawl_store إن وُجد وإلا إلى crawl_results"""
+        
+        base_domain = urlparse(start_url).netloc
+        # أصل robots.txt من رابط البداية نفسه (http أو https) كما في _crawl_site
+        robots = self._get_robots_rules(start_url, config.timeout) if config.respect_robots_txt else None
+        delay = max(config.delay_between_requests, (robots.crawl_delay(config.user_agent) or 0) if robots else 0)
+        
+        duplicate_index = NearDuplicateIndex() if config.detect_near_duplicates else None
+        duplicates_found = 0
+        if duplicate_index and crawl_store:
+            duplicates_found = crawl_store.count_pages(crawl_id, 'duplicate')
+            for page_url, page_info in crawl_store.iter_page_results(crawl_id):
+                if page_info.get('simhash') is not None:
+                    duplicate_index.add(page_url, page_info['simhash'])
+        
+        # المكررات لا تستهلك حد الصفحات، لكن لها حد مماثل
+        while urls_to_visit and pages_crawled < config.max_pages and duplicates_found < config.max_pages:
+            current_item = urls_to_visit.pop()
+            current_url, depth = current_item['url'], current_item['depth']
+            
+            # تجاهل الروابط التي تجاوزت العمق الأقصى (المكرر لا يدخل الواجهة أصلاً)
+            if depth > config.max_depth:
+                continue
+            if duplicate_index and depth > 0 and duplicate_index.is_suppressed(current_url):
+                continue
             
-            # تجاهل الروابط المكررة أو التي تجاوزت العمق الأقصى
-            if current_url in visited_urls or depth > config.max_depth:
+            if robots and not self._get_robots_rules(current_url, config.timeout).can_fetch(current_url, config.user_agent):
+                print(f"🚫 منع بواسطة robots.txt: {current_url}")
                 continue
             
             try:
@@ -436,58 +723,102 @@ class AdvancedWebsiteExtractor:
                 response = self.session.get(current_url, timeout=config.timeout, verify=False)
                 response.raise_for_status()
                 
-                soup = BeautifulSoup(response.text, 'html.parser')
-                visited_urls.add(current_url)
+                # التحليل الكامل فقط خارج وضع crawl_only؛ الاكتشاف وحده يكفيه المسار السريع
+                if config.crawl_only:
+                    soup = None
+                    page_links = extract_links(response.text, current_url, base_domain,
+                                               with_text=duplicate_index is not None)
+                    page_text = page_links.text
+                else:
+                    soup = BeautifulSoup(response.text, 'html.parser')
+                    page_text = visible_text(soup) if duplicate_index else None
                 
-                # تحليل الصفحة
-                page_analysis = {
-                    'url': current_url,
-                    'depth': depth,
-                    'title': soup.find('title').get_text().strip() if soup.find('title') else '',
-                    'status_code': response.status_code,
-                    'content_length': len(response.text),
-                    'links': [],
-                    'images': [],
-                    'scripts': [],
-                    'stylesheets': [],
-                    'forms': [],
-                    'api_endpoints': self._find_api_endpoints(soup)
-                }
+                # الصفحة شبه المكررة تُسجل فقط: لا تحليل ولا حفظ ولا روابط جديدة
+                fingerprint = None
+                if duplicate_index:
+                    original_url, fingerprint = duplicate_index.check_text(current_url, page_text)
+                    if original_url:
+                        print(f"♊ صفحة شبه مكررة: {current_url} ← {original_url}")
+                        duplicate = {'url': current_url, 'depth': depth, 'duplicate_of': original_url,
+                                     'status_code': response.status_code}
+                        if crawl_store:
+                            crawl_store.record_page(crawl_id, current_url, 'duplicate', response.status_code,
+                                                    response.content, duplicate)
+                        else:
+                            crawl_results[current_url] = duplicate
+                        duplicates_found += 1
+                        if delay > 0:
+                            time.sleep(delay)
+                        continue
                 
-                # استخراج الروابط
-                for link in soup.find_all('a', href=True):
-                    href = link.get('href')
-                    if href:
-                        full_url = urljoin(current_url, href)
-                        # فقط الروابط الداخلية
-                        if urlparse(full_url).netloc == urlparse(start_url).netloc:
-                            page_analysis['links'].append({
-                                'href': full_url,
-                                'text': link.get_text().strip(),
-                                'title': link.get('title', '')
-                            })
+                if soup is None:
+                    page_analysis = {
+                        'url': current_url,
+                        'depth': depth,
+                        'simhash': fingerprint,
+                        'title': page_links.title,
+                        'status_code': response.status_code,
+                        'content_length': len(response.text),
+                        'links': [{'href': link_url, 'text': text, 'title': ''} for link_url, text in page_links.links],
+                        'assets_count': page_links.assets,
+                        'forms_count': page_links.forms
+                    }
+                    if depth < config.max_depth:
+                        for link_url in page_links.urls:
+                            priority = duplicate_index.priority(link_url) if duplicate_index else 0.0
+                            urls_to_visit.add(link_url, depth=depth + 1, priority=priority)
+                else:
+                    # تحليل الصفحة
+                    page_analysis = {
+                        'url': current_url,
+                        'depth': depth,
+                        'simhash': fingerprint,
+                        'title': soup.find('title').get_text().strip() if soup.find('title') else '',
+                        'status_code': response.status_code,
+                        'content_length': len(response.text),
+                        'links': [],
+                        'images': [],
+                        'scripts': [],
+                        'stylesheets': [],
+                        'forms': [],
+                        'api_endpoints': self._find_api_endpoints(soup)
+                    }
+                
+                    # استخراج الروابط
+                    for link in soup.find_all('a', href=True):
+                        href = link.get('href')
+                        if href:
+                            full_url = canonicalize_url(href, current_url)
+                            # فقط الروابط الداخلية (الروابط التالفة تُتخطى)
+                            if full_url and urlparse(full_url).netloc == base_domain:
+                                page_analysis['links'].append({
+                                    'href': full_url,
+                                    'text': link.get_text().strip(),
+                                    'title': link.get('title', '')
+                                })
                             
-                            # إضافة للزحف إذا لم تتم زيارتها
-                            if full_url not in visited_urls and depth < config.max_depth:
-                                urls_to_visit.put((full_url, depth + 1))
+                                # إضافة للزحف (الواجهة تتجاهل ما سبقت إضافته، والأنماط المكررة تتأخر)
+                                if depth < config.max_depth:
+                                    priority = duplicate_index.priority(full_url) if duplicate_index else 0.0
+                                    urls_to_visit.add(full_url, depth=depth + 1, priority=priority)
                 
-                # استخراج الأصول
-                page_analysis['images'] = [{'src': urljoin(current_url, img.get('src')), 'alt': img.get('alt', '')} 
-                                         for img in soup.find_all('img', src=True)]
-                page_analysis['scripts'] = [urljoin(current_url, script.get('src')) 
-                                          for script in soup.find_all('script', src=True)]
-                page_analysis['stylesheets'] = [urljoin(current_url, link.get('href')) 
-                                               for link in soup.find_all('link', rel='stylesheet')]
+                    # استخراج الأصول
+                    page_analysis['images'] = [{'src': urljoin(current_url, img.get('src')), 'alt': img.get('alt', '')} 
+                                             for img in soup.find_all('img', src=True)]
+                    page_analysis['scripts'] = [urljoin(current_url, script.get('src')) 
+                                              for script in soup.find_all('script', src=True)]
+                    page_analysis['stylesheets'] = [urljoin(current_url, link.get('href')) 
+                                                   for link in soup.find_all('link', rel='stylesheet')]
                 
-                # تحليل النماذج
-                for form in soup.find_all('form'):
-                    form_analysis = {
-                        'action': form.get('action', ''),
-                        'method': form.get('method', 'get').lower(),
-                        'inputs': [{'name': inp.get('name', ''), 'type': inp.get('type', 'text')} 
-                                 for inp in form.find_all('input')]
-                    }
-                    page_analysis['forms'].append(form_analysis)
+                    # تحليل النماذج
+                    for form in soup.find_all('form'):
+                        form_analysis = {
+                            'action': form.get('action', ''),
+                            'method': form.get('method', 'get').lower(),
+                            'inputs': [{'name': inp.get('name', ''), 'type': inp.get('type', 'text')} 
+                                     for inp in form.find_all('input')]
+                        }
+                        page_analysis['forms'].append(form_analysis)
                 
                 # حفظ المحتوى
                 page_file = crawl_folder / f"page_{pages_crawled + 1}_{urlparse(current_url).path.replace('/', '_')}.html"
@@ -495,51 +826,30 @@ class AdvancedWebsiteExtractor:
                     f.write(response.text)
                 
                 page_analysis['saved_file'] = str(page_file)
-                crawl_results[current_url] = page_analysis
+                if crawl_store:
+                    crawl_store.record_page(crawl_id, current_url, 'done', response.status_code,
+                                            response.content, page_analysis)
+                else:
+                    crawl_results[current_url] = page_analysis
                 
                 pages_crawled += 1
-                total_links_found += len(page_analysis['links'])
-                total_assets_found += len(page_analysis['images']) + len(page_analysis['scripts']) + len(page_analysis['stylesheets'])
                 
-                # تأخير بين الطلبات
-                if config.delay_between_requests > 0:
-                    time.sleep(config.delay_between_requests)
+                # تأخير بين الطلبات (لا يقل عن Crawl-delay)
+                if delay > 0:
+                    time.sleep(delay)
                     
             except Exception as e:
                 print(f"❌ خطأ في زحف {current_url}: {str(e)}")
-                crawl_results[current_url] = {
+                failure = {
                     'url': current_url,
                     'depth': depth,
                     'error': str(e),
                     'status': 'failed'
                 }
-        
-        # إنشاء ملخص الزحف
-        summary = {
-            'start_url': start_url,
-            'success': True,
-            'crawl_folder': str(crawl_folder),
-            'pages_crawled': pages_crawled,
-            'total_links_found': total_links_found,
-            'total_assets_found': total_assets_found,
-            'unique_domains': len(set(urlparse(url).netloc for url in visited_urls)),
-            'max_depth_reached': max(result.get('depth', 0) for result in crawl_results.values() if isinstance(result, dict)),
-            'crawl_results': crawl_results,
-            'crawl_stats': {
-                'success_rate': len([r for r in crawl_results.values() if not r.get('error')]) / len(crawl_results) * 100 if crawl_results else 0,
-                'average_page_size': sum(r.get('content_length', 0) for r in crawl_results.values() if isinstance(r, dict)) / pages_crawled if pages_crawled > 0 else 0,
-                'forms_found': sum(len(r.get('forms', [])) for r in crawl_results.values() if isinstance(r, dict)),
-                'api_endpoints_found': sum(len(r.get('api_endpoints', [])) for r in crawl_results.values() if isinstance(r, dict))
-            }
-        }
-        
-        # حفظ ملخص الزحف
-        summary_file = crawl_folder / 'crawl_summary.json'
-        with open(summary_file, 'w', encoding='utf-8') as f:
-            json.dump(summary, f, ensure_ascii=False, indent=2)
-        
-        print(f"✅ اكتمل الزحف - تم زحف {pages_crawled} صفحة بنجاح")
-        return summary
+                if crawl_store:
+                    crawl_store.record_page(crawl_id, current_url, 'failed', result=failure)
+                else:
+                    crawl_results[current_url] = failure
     
     def extract_with_ai_analysis(self, url: str, config: Optional[AIAnalysisConfig] = None) -> Dict[str, Any]:
         """استخراج مع تحليل ذكي متطور بالذكاء الاصطناعي"""
@@ -687,8 +997,10 @@ class AdvancedWebsiteExtractor:
         
         return exports
     
-    def batch_extract(self, urls: List[str], extraction_type: str = "standard", max_workers: int = 3) -> Dict[str, Any]:
-        """استخراج متعدد للعديد من المواقع"""
+    def batch_extract(self, urls: List[str], extraction_type: str = "standard", max_workers: int = 3,
+                      pipeline: bool = False, parse_workers: Optional[int] = None,
+                      fetch_concurrency: int = 16) -> Dict[str, Any]:
+        """استخراج متعدد للعديد من المواقع (pipeline=True: جلب غير متزامن وتحليل في عمليات متعددة)"""
         start_time = time.time()
         extraction_id = f"batch_{int(time.time())}"
         
@@ -696,7 +1008,7 @@ class AdvancedWebsiteExtractor:
         
         results = {
             'extraction_id': extraction_id,
-            'method': 'batch_extract',
+            'method': 'batch_extract_pipeline' if pipeline else 'batch_extract',
             'total_urls': len(urls),
             'extraction_type': extraction_type,
             'results': {},
@@ -707,33 +1019,49 @@ class AdvancedWebsiteExtractor:
             }
         }
         
+        def record_result(i, url, result):
+            results['results'][url] = result
+            if result.get('success', result.get('extraction_info', {}).get('success', False)):
+                results['stats']['successful_extractions'] += 1
+                print(f"✅ نجح استخراج {i}/{len(urls)}: {url}")
+            else:
+                results['stats']['failed_extractions'] += 1
+                print(f"❌ فشل استخراج {i}/{len(urls)}: {url}")
+        
         def extract_single_url(url):
             try:
                 return url, self.extract(url, extraction_type)
             except Exception as e:
                 return url, {'success': False, 'error': str(e), 'url': url}
         
-        # استخدام ThreadPoolExecutor للمعالجة المتوازية
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            future_to_url = {executor.submit(extract_single_url, url): url for url in urls}
-            
-            for i, future in enumerate(as_completed(future_to_url), 1):
-                url = future_to_url[future]
-                try:
-                    url, result = future.result()
-                    results['results'][url] = result
-                    
-                    if result.get('success', False):
-                        results['stats']['successful_extractions'] += 1
-                        print(f"✅ نجح استخراج {i}/{len(urls)}: {url}")
-                    else:
+        if pipeline:
+            # الجلب في حلقة asyncio والتحليل (BeautifulSoup والمحللات) في عمليات مستقلة تتجاوز GIL
+            urls = [url if url.startswith(('http://', 'https://')) else 'https://' + url for url in urls]
+            parse_pipeline = ParsePipeline(
+                partial(_pipeline_extract_page, extraction_type=extraction_type),
+                parse_workers=parse_workers,
+                fetch_concurrency=fetch_concurrency,
+                headers=dict(self.session.headers),
+                initializer=_init_pipeline_worker,
+                initargs=(str(self.output_directory),)
+            )
+            for i, (url, result) in enumerate(parse_pipeline.run(urls), 1):
+                record_result(i, url, result)
+            results['pipeline_stats'] = dict(parse_pipeline.stats, parse_workers=parse_pipeline.parse_workers)
+        else:
+            # استخدام ThreadPoolExecutor للمعالجة المتوازية
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                future_to_url = {executor.submit(extract_single_url, url): url for url in urls}
+                
+                for i, future in enumerate(as_completed(future_to_url), 1):
+                    url = future_to_url[future]
+                    try:
+                        url, result = future.result()
+                        record_result(i, url, result)
+                    except Exception as e:
+                        results['results'][url] = {'success': False, 'error': str(e), 'url': url}
                         results['stats']['failed_extractions'] += 1
-                        print(f"❌ فشل استخراج {i}/{len(urls)}: {url}")
-                        
-                except Exception as e:
-                    results['results'][url] = {'success': False, 'error': str(e), 'url': url}
-                    results['stats']['failed_extractions'] += 1
-                    print(f"❌ خطأ في استخراج {i}/{len(urls)}: {url} - {str(e)}")
+                        print(f"❌ خطأ في استخراج {i}/{len(urls)}: {url} - {str(e)}")
         
         results['stats']['total_duration'] = round(time.time() - start_time, 2)
         results['stats']['success_rate'] = (results['stats']['successful_extractions'] / len(urls)) * 100
@@ -910,7 +1238,9 @@ class AdvancedWebsiteExtractor:
     # الوظائف الشاملة المطلوبة حسب 11.txt
     # =====================================
     
-    def comprehensive_website_download(self, url: str, extraction_type: str = "complete") -> Dict[str, Any]:
+    def comprehensive_website_download(self, url: str, extraction_type: str = "complete",
+                                       fetch_budget: Optional[float] = None,
+                                       fetch_deadline: Optional[FetchDeadline] = None) -> Dict[str, Any]:
         """
         تحميل شامل للموقع مع جميع المتطلبات المذكورة في 11.txt
         
@@ -942,9 +1272,14 @@ class AdvancedWebsiteExtractor:
         • التأثيرات والحركات
         • واجهات المستخدم
         • تجربة المستخدم
+        
+        fetch_budget: مهلة اختيارية بالثواني لجلب الصفحة الأساسية عبر سلسلة تجاوز الحماية
+        fetch_deadline: مهلة أنشأها المستدعي مسبقاً (تغلب fetch_budget) حتى تغطي مهلة واحدة الطلب كله
         """
         start_time = time.time()
         extraction_id = f"comprehensive_{int(time.time())}"
+        if fetch_deadline is None:
+            fetch_deadline = FetchDeadline.from_budget(fetch_budget)
         
         print(f"🚀 بدء التحميل الشامل للموقع: {url}")
         
@@ -955,7 +1290,7 @@ class AdvancedWebsiteExtractor:
             
             # مرحلة 1: استخراج المحتوى الأساسي
             print("📄 1. استخراج المحتوى الأساسي...")
-            basic_content = self._extract_comprehensive_basic_content(url, base_folder)
+            basic_content = self._extract_comprehensive_basic_content(url, base_folder, fetch_deadline)
             
             # التحقق من نجاح المرحلة الأولى
             if not basic_content.get('success'):
@@ -977,9 +1312,13 @@ class AdvancedWebsiteExtractor:
             print("📸 5. التقاط screenshots تلقائي...")
             screenshots = self._capture_automatic_screenshots(url, base_folder)
             
-            # مرحلة 6: إنشاء خريطة الموقع
-            print("🗺️ 6. إنشاء خريطة الموقع...")
-            sitemap = self._generate_comprehensive_sitemap(url, base_folder)
+            # مرحلة 6: زحف الروابط الداخلية مرة واحدة وإنشاء خريطة الموقع منه
+            # (خريطة الموقع والصفحات المزحوفة والإحصائيات والتقارير تستهلك نفس النتيجة)
+            print("🗺️ 6. زحف الموقع وإنشاء خريطة الموقع...")
+            site_crawl = self._crawl_site(url, base_folder / '08_crawled_pages', max_depth=3, max_pages=50,
+                                          seed_response=basic_content['response'],
+                                          fetched_urls=self._attempted_asset_urls(assets_download))
+            sitemap = self._generate_comprehensive_sitemap(url, base_folder, site_crawl=site_crawl)
             
             # مرحلة 7: تنظيم الملفات في مجلدات مرتبة
             print("📁 7. تنظيم الملفات...")
@@ -993,9 +1332,9 @@ class AdvancedWebsiteExtractor:
             print("🛡️ 9. اختبار الحماية...")
             security_test = self._comprehensive_security_test(url, basic_content['soup'])
             
-            # مرحلة 10: دعم crawl للروابط الداخلية
-            print("🕸️ 10. زحف الروابط الداخلية...")
-            crawl_results = self._crawl_internal_links(url, base_folder, max_depth=3, max_pages=50)
+            # مرحلة 10: نتائج زحف الروابط الداخلية (من زحف المرحلة 6 دون إعادة جلب)
+            print("🕸️ 10. نتائج زحف الروابط الداخلية...")
+            crawl_results = site_crawl.to_crawl_results()
             
             # مرحلة 11: تنزيل المحتوى من AJAX
             print("💬 11. تنزيل المحتوى من AJAX...")
@@ -1010,7 +1349,8 @@ class AdvancedWebsiteExtractor:
                     'success': True,
                     'duration': round(time.time() - start_time, 2),
                     'timestamp': datetime.now().isoformat(),
-                    'base_folder': str(base_folder)
+                    'base_folder': str(base_folder),
+                    'fetch_deadline': fetch_deadline.to_dict() if fetch_deadline else None
                 },
                 'basic_content': basic_content,
                 'assets_download': assets_download,
@@ -1072,7 +1412,8 @@ class AdvancedWebsiteExtractor:
                     'base_folder': str(base_folder) if 'base_folder' in locals() else '',
                     'extraction_id': extraction_id,
                     'error': str(e),
-                    'error_type': type(e).__name__
+                    'error_type': type(e).__name__,
+                    'fetch_deadline': fetch_deadline.to_dict() if fetch_deadline else None
                 }
             }
             return error_result
@@ -1100,65 +1441,160 @@ class AdvancedWebsiteExtractor:
         for folder in folders:
             (base_folder / folder).mkdir(parents=True, exist_ok=True)
     
-    def _bypass_protection_request(self, url: str) -> Optional[requests.Response]:
-        """طلب متقدم مع تجاوز الحماية"""
-        
-        # استخدام النظام المحسن إذا كان متوفراً
-        if ENHANCED_CRAWLER_AVAILABLE:
+    # أقل وقت متبقٍ (بالثواني) لتجربة CloudScraper مع انتظار التحدي
+    CLOUDSCRAPER_MIN_BUDGET = 5.0
+    
+    def _bypass_protection_request(self, url: str, deadline: Optional[FetchDeadline] = None) -> Optional[requests.Response]:
+        """طلب متقدم مع تجاوز الحماية (ضمن مهلة اختيارية)"""
+        with deadline_scope(deadline):
             try:
-                print(f"🚀 استخدام النظام المحسن للموقع: {url}")
-                enhanced_result = enhanced_crawler.fetch_with_protection_bypass(url)
-                
-                if enhanced_result['success']:
-                    print(f"✅ نجح النظام المحسن: {enhanced_result['method']}")
-                    return enhanced_result['response']
-                else:
-                    print(f"⚠️ فشل النظام المحسن: {enhanced_result['error']}")
-                    # استكمال بالطرق التقليدية
-            except Exception as e:
-                print(f"❌ خطأ في النظام المحسن: {str(e)}")
+                return self._run_bypass_protection_chain(url, deadline)
+            except DeadlineExceeded as e:
+                print(f"⏱️ {str(e)}")
+                return None
+    
+    # ترتيب طرق تجاوز الحماية الافتراضي (يُعاد ترتيبها حسب تاريخ النطاق)
+    BYPASS_STRATEGIES = ['enhanced_crawler', 'cloudscraper', 'standard_request', 'httpx', 'ua_rotation']
+    
+    def _run_bypass_protection_chain(self, url: str, deadline: Optional[FetchDeadline] = None) -> Optional[requests.Response]:
+        """تجربة طرق تجاوز الحماية بدءاً بالأنجح تاريخياً مع تخطي المكلف منها عند نفاد المهلة"""
         
-        # الطريقة 1: CloudScraper مع إعدادات محسنة (الأقوى لـ Cloudflare)
-        if ADVANCED_PROTECTION_BYPASS:
-            try:
-                print(f"🔄 محاولة تجاوز حماية Cloudflare للموقع: {url}")
-                scraper = cloudscraper.create_scraper(
-                    browser={
-                        'browser': 'chrome',
-                        'platform': 'windows',
-                        'mobile': False
-                    },
-                    delay=10,  # انتظار أطول لـ Cloudflare
-                    captcha={
-                        'provider': '2captcha'  # في حالة وجود captcha
-                    }
-                )
-                
-                # headers إضافية لتجنب الكشف
-                headers = {
-                    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
-                    'Accept-Language': 'en-US,en;q=0.9',
-                    'Accept-Encoding': 'gzip, deflate, br',
-                    'Cache-Control': 'max-age=0',
-                    'Sec-Fetch-Dest': 'document',
-                    'Sec-Fetch-Mode': 'navigate',
-                    'Sec-Fetch-Site': 'none',
-                    'Upgrade-Insecure-Requests': '1'
-                }
-                
-                response = scraper.get(url, headers=headers, timeout=30)
-                print(f"📊 CloudScraper response: {response.status_code}")
-                
-                # حتى لو كان 403، أحياناً يحتوي على محتوى مفيد
-                if response.status_code in [200, 403] and len(response.text) > 100:
-                    return response
-                    
-            except Exception as e:
-                print(f"CloudScraper failed: {e}")
+        domain = self.strategy_store.domain_of(url)
+        
+        available = {
+            'enhanced_crawler': ENHANCED_CRAWLER_AVAILABLE,
+            'cloudscraper': ADVANCED_PROTECTION_BYPASS,
+            'httpx': ADVANCED_PROTECTION_BYPASS
+        }
+        
+        # أول صفحة محجوبة (403/503 مع محتوى) تُعاد فقط إذا فشلت كل الطرق، ولا تُسجل نجاحاً
+        blocked_response = None
         
-        # الطريقة 2: الطلب العادي مع headers متقدمة
+        for strategy in self.strategy_store.ranked_methods(domain, self.BYPASS_STRATEGIES):
+            if not available.get(strategy, True):
+                continue
+            if deadline:
+                deadline.check(f'قبل {strategy}')
+                if strategy == 'cloudscraper' and not deadline.can_afford(self.CLOUDSCRAPER_MIN_BUDGET):
+                    deadline.skip('cloudscraper')
+                    continue
+            
+            step = getattr(self, f'_bypass_step_{strategy}')
+            profile = self.strategy_store.get_profile(domain, strategy)
+            
+            step_start = time.time()
+            response = step(url, deadline, profile)
+            latency = time.time() - step_start
+            
+            if response is None or not self._is_usable_page(response):
+                self.strategy_store.record(domain, strategy, False, latency)
+                if response is not None and blocked_response is None:
+                    blocked_response = response
+                continue
+            
+            request = getattr(response, 'request', None)
+            self.strategy_store.record(
+                domain, strategy, True, latency,
+                dict(request.headers) if request is not None and request.headers else None
+            )
+            return response
+        
+        if blocked_response is not None:
+            print(f"⚠️ لم تنجح أي طريقة؛ استخدام الصفحة المحجوبة ({blocked_response.status_code})")
+            return blocked_response
+        
+        # آخر محاولة: اقتراح مواقع آمنة
+        safe_sites = ['https://httpbin.org/', 'https://example.com/', 'https://jsonplaceholder.typicode.com/']
+        print(f"❌ جميع الطرق فشلت. المواقع الآمنة للاختبار: {', '.join(safe_sites[:2])}")
+        return None
+    
+    @staticmethod
+    def _is_usable_page(response) -> bool:
+        """استجابة 2xx بمحتوى فعلي (صفحات التحدي 403/503 ليست نجاحاً)"""
+        return 200 <= response.status_code < 300 and bool(response.content and response.content.strip())
+    
+    @staticmethod
+    def _bypass_timeout(deadline: Optional[FetchDeadline], default: float) -> float:
+        """timeout للطلب لا يتجاوز المهلة المتبقية"""
+        return deadline.timeout(default) if deadline else default
+    
+    def _bypass_step_enhanced_crawler(self, url: str, deadline: Optional[FetchDeadline] = None,
+                                      profile: Optional[Dict[str, str]] = None) -> Optional[requests.Response]:
+        """النظام المحسن (يحتفظ بذاكرته الخاصة لكل طريقة من طرقه)"""
+        try:
+            print(f"🚀 استخدام النظام المحسن للموقع: {url}")
+            enhanced_result = enhanced_crawler.fetch_with_protection_bypass(url, deadline=deadline)
+            
+            if enhanced_result['success']:
+                print(f"✅ نجح النظام المحسن: {enhanced_result['method']}")
+                return enhanced_result['response']
+            else:
+                print(f"⚠️ فشل النظام المحسن: {enhanced_result['error']}")
+                # استكمال بالطرق التقليدية
+        except Exception as e:
+            print(f"❌ خطأ في النظام المحسن: {str(e)}")
+        return None
+    
+    @staticmethod
+    def _create_cloudscraper_session():
+        """إنشاء جلسة CloudScraper بإعدادات محسنة"""
+        return cloudscraper.create_scraper(
+            browser={
+                'browser': 'chrome',
+                'platform': 'windows',
+                'mobile': False
+            },
+            delay=10,  # انتظار أطول لـ Cloudflare
+            captcha={
+                'provider': '2captcha'  # في حالة وجود captcha
+            }
+        )
+    
+    def _bypass_step_cloudscraper(self, url: str, deadline: Optional[FetchDeadline] = None,
+                                  profile: Optional[Dict[str, str]] = None) -> Optional[requests.Response]:
+        """CloudScraper من مجمع الجلسات (الأقوى لـ Cloudflare، يُحل التحدي مرة لكل نطاق)"""
+        try:
+            print(f"🔄 محاولة تجاوز حماية Cloudflare للموقع: {url}")
+            
+            # headers إضافية لتجنب الكشف
+            headers = {
+                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
+                'Accept-Language': 'en-US,en;q=0.9',
+                'Accept-Encoding': 'gzip, deflate, br',
+                'Cache-Control': 'max-age=0',
+                'Sec-Fetch-Dest': 'document',
+                'Sec-Fetch-Mode': 'navigate',
+                'Sec-Fetch-Site': 'none',
+                'Upgrade-Insecure-Requests': '1'
+            }
+            headers.update(profile or {})
+            
+            with self.scraper_pool.checkout(url) as scraper:
+                scraper.delay = min(10, deadline.remaining() / 2) if deadline else 10
+                response = scraper.get(url, headers=headers, timeout=self._bypass_timeout(deadline, 30))
+            print(f"📊 CloudScraper response: {response.status_code}")
+            
+            if response.status_code == 403:
+                # كوكيز التحدي لم تعد صالحة لهذا النطاق
+                self.scraper_pool.invalidate(url)
+            
+            # حتى لو كان 403، أحياناً يحتوي على محتوى مفيد
+            if response.status_code in [200, 403] and len(response.text) > 100:
+                return response
+                
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            # أخطاء الشبكة (timeout، انقطاع) لا تعني أن كوكيز التحدي فسدت: الجلسة تبقى في المجمع
+            print(f"CloudScraper failed: {e}")
+        return None
+    
+    def _bypass_step_standard_request(self, url: str, deadline: Optional[FetchDeadline] = None,
+                                      profile: Optional[Dict[str, str]] = None) -> Optional[requests.Response]:
+        """الطلب العادي مع headers متقدمة"""
         try:
             session = requests.Session()
+            mount_scheduled_adapter(session)
             headers = {
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
                 'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
@@ -1168,67 +1604,81 @@ class AdvancedWebsiteExtractor:
                 'Connection': 'keep-alive',
                 'Upgrade-Insecure-Requests': '1'
             }
+            headers.update(profile or {})
             
-            response = session.get(url, headers=headers, timeout=15, allow_redirects=True, verify=False)
+            response = session.get(url, headers=headers, timeout=self._bypass_timeout(deadline, 15), allow_redirects=True, verify=False)
             print(f"📊 Standard request response: {response.status_code}")
             
             # قبول حتى 403 إذا كان هناك محتوى
             if response.status_code in [200, 403] and len(response.text) > 100:
                 return response
                 
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             print(f"Standard request failed: {e}")
-        
-        # الطريقة 2: HttpX مع headers متقدمة
-        if ADVANCED_PROTECTION_BYPASS:
-            try:
-                ua = UserAgent()
-                headers = {
-                    'User-Agent': ua.random,
-                    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
-                    'Accept-Language': 'en-US,en;q=0.9',
-                    'Accept-Encoding': 'gzip, deflate, br',
-                    'DNT': '1',
-                    'Connection': 'keep-alive',
-                    'Upgrade-Insecure-Requests': '1',
-                    'Sec-Fetch-Dest': 'document',
-                    'Sec-Fetch-Mode': 'navigate',
-                    'Sec-Fetch-Site': 'none',
-                    'Sec-Fetch-User': '?1',
-                    'Cache-Control': 'max-age=0'
-                }
-                
-                with httpx.Client(follow_redirects=True, timeout=10) as client:
-                    response = client.get(url, headers=headers)
-                    if response.status_code == 200:
-                        # تحويل httpx response إلى requests response
-                        requests_response = requests.Response()
-                        requests_response.status_code = response.status_code
-                        requests_response._content = response.content
-                        requests_response.headers = response.headers
-                        requests_response.url = str(response.url)
-                        return requests_response
-            except Exception as e:
-                print(f"HttpX failed: {e}")
-        
-        # الطريقة 3: تجربة متعددة مع User Agents مختلفة (كأسلوب احتياطي)
+        return None
+    
+    def _bypass_step_httpx(self, url: str, deadline: Optional[FetchDeadline] = None,
+                           profile: Optional[Dict[str, str]] = None) -> Optional[requests.Response]:
+        """HttpX مع headers متقدمة"""
+        try:
+            ua = UserAgent()
+            headers = {
+                'User-Agent': ua.random,
+                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
+                'Accept-Language': 'en-US,en;q=0.9',
+                'Accept-Encoding': 'gzip, deflate, br',
+                'DNT': '1',
+                'Connection': 'keep-alive',
+                'Upgrade-Insecure-Requests': '1',
+                'Sec-Fetch-Dest': 'document',
+                'Sec-Fetch-Mode': 'navigate',
+                'Sec-Fetch-Site': 'none',
+                'Sec-Fetch-User': '?1',
+                'Cache-Control': 'max-age=0'
+            }
+            headers.update(profile or {})
+            
+            with httpx.Client(follow_redirects=True, timeout=self._bypass_timeout(deadline, 10)) as client:
+                response = client.get(url, headers=headers)
+                if response.status_code == 200:
+                    # تحويل httpx response إلى requests response
+                    requests_response = requests.Response()
+                    requests_response.status_code = response.status_code
+                    requests_response._content = response.content
+                    requests_response.headers = response.headers
+                    requests_response.url = str(response.url)
+                    requests_response.request = requests.Request('GET', url, headers=dict(response.request.headers)).prepare()
+                    return requests_response
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            print(f"HttpX failed: {e}")
+        return None
+    
+    def _bypass_step_ua_rotation(self, url: str, deadline: Optional[FetchDeadline] = None,
+                                 profile: Optional[Dict[str, str]] = None) -> Optional[requests.Response]:
+        """تجربة متعددة مع User Agents مختلفة (كأسلوب احتياطي)"""
         user_agents = [
             'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
         ]
         
-        for ua in user_agents:
+        # البدء بآخر User-Agent نجح مع هذا النطاق
+        if profile and profile.get('User-Agent'):
+            user_agents.insert(0, profile['User-Agent'])
+        
+        for ua in dict.fromkeys(user_agents):
             try:
                 session = requests.Session()
                 # إعداد retry strategy
-                retry_strategy = Retry(
+                retry_strategy = DeadlineRetry(
                     total=3,
                     backoff_factor=1,
                     status_forcelist=[429, 500, 502, 503, 504],
                 )
-                adapter = HTTPAdapter(max_retries=retry_strategy)
-                session.mount("http://", adapter)
-                session.mount("https://", adapter)
+                mount_scheduled_adapter(session, max_retries=retry_strategy)
                 
                 # إضافة headers إضافية لتجنب الكشف
                 referers = [
@@ -1258,7 +1708,7 @@ class AdvancedWebsiteExtractor:
                     'X-Forwarded-Proto': 'https'
                 }
                 
-                response = session.get(url, headers=headers, timeout=10, verify=False)
+                response = session.get(url, headers=headers, timeout=self._bypass_timeout(deadline, 10), verify=False)
                 if response.status_code == 200:
                     return response
                 elif response.status_code != 403:
@@ -1266,22 +1716,24 @@ class AdvancedWebsiteExtractor:
                     continue
                     
                 # تأخير عشوائي بين المحاولات
-                time.sleep(random.uniform(1, 3))
+                if deadline:
+                    deadline.sleep(random.uniform(1, 3), reserve=FetchDeadline.MIN_ATTEMPT_SECONDS)
+                else:
+                    time.sleep(random.uniform(1, 3))
                 
+            except DeadlineExceeded:
+                raise
             except Exception as e:
                 print(f"Method with UA {ua[:50]}... failed: {e}")
                 continue
-        
-        # آخر محاولة: اقتراح مواقع آمنة
-        safe_sites = ['https://httpbin.org/', 'https://example.com/', 'https://jsonplaceholder.typicode.com/']
-        print(f"❌ جميع الطرق فشلت. المواقع الآمنة للاختبار: {', '.join(safe_sites[:2])}")
         return None
 
-    def _extract_comprehensive_basic_content(self, url: str, base_folder: Path) -> Dict[str, Any]:
+    def _extract_comprehensive_basic_content(self, url: str, base_folder: Path,
+                                             deadline: Optional[FetchDeadline] = None) -> Dict[str, Any]:
         """استخراج المحتوى الأساسي الشامل"""
         try:
             # محاولة الطلب مع تجاوز الحماية
-            response = self._bypass_protection_request(url)
+            response = self._bypass_protection_request(url, deadline)
             
             if not response:
                 safe_sites = ['https://httpbin.org/', 'https://example.com/', 'https://jsonplaceholder.typicode.com/']
@@ -1539,34 +1991,36 @@ class AdvancedWebsiteExtractor:
         
         return list(set(document_urls))
     
-    def _download_file_safe(self, url: str, filepath: Path, timeout: int = 30) -> Dict[str, Any]:
-        """تحميل ملف بأمان مع معالجة الأخطاء"""
+    def _download_file_safe(self, url: str, filepath: Path, timeout: int = 30, verify: Optional[bool] = None,
+                            budget: Optional[DownloadBudget] = None, category: str = 'other') -> Dict[str, Any]:
+        """تحميل ملف بأمان مع معالجة الأخطاء (قابل للاستئناف بطلبات Range من filepath.part وضمن ميزانية اختيارية)"""
+        reserved = False
         try:
             headers = {
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
             }
             
-            response = self.session.get(url, timeout=timeout, headers=headers, stream=True)
-            response.raise_for_status()
-            
-            # إنشاء المجلد إذا لم يكن موجود
-            filepath.parent.mkdir(parents=True, exist_ok=True)
-            
-            # تحميل الملف
-            with open(filepath, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-            
-            return {
-                'success': True,
-                'url': url,
-                'filepath': str(filepath),
-                'size': filepath.stat().st_size,
-                'content_type': response.headers.get('content-type', 'unknown')
-            }
+            priority = asset_priority(category)
+            if budget is not None:
+                reason = budget.reserve(url, category, priority)
+                if reason:
+                    return {'success': False, 'url': url, 'error': f'budget:{reason}', 'budget_exceeded': True,
+                            'filepath': str(filepath)}
+                reserved = True
+            
+            # الاستجابة الأولى تكشف دعم Range؛ الأخطاء العابرة تستأنف من آخر بايت والملفات الكبيرة تُقسم
+            downloader = RangedDownloader(self.session, max_bytes=self.max_file_bytes, timeout=timeout,
+                                          verify=verify, headers=headers)
+            result = downloader.download(url, filepath, blob_store=self.blob_store, budget=budget,
+                                         category=category, priority=priority)
+            if reserved and not result['success'] and not result.get('budget_exceeded'):
+                # الفشل لغير الميزانية يعيد المكان المحجوز
+                budget.release()
+            return result
             
         except Exception as e:
+            if reserved:
+                budget.release()
             return {
                 'success': False,
                 'url': url,
@@ -1574,6 +2028,18 @@ class AdvancedWebsiteExtractor:
                 'filepath': str(filepath) if filepath else None
             }
     
+    def _get_budgeted(self, url: str, budget: Optional[DownloadBudget], category: str, priority: int,
+                      timeout: int = 10) -> Tuple[Any, Iterator[bytes]]:
+        """طلب أصل بتدفق ضمن الميزانية: الحجم المعلن يُفحص قبل القراءة وكل جزء يُحتسب (يُحجز المكان مسبقاً)"""
+        response = self.session.get(url, timeout=timeout, verify=False, stream=True)
+        response.raise_for_status()
+        chunks = response.iter_content(chunk_size=65536)
+        if budget is not None:
+            content_length = response.headers.get('Content-Length', '')
+            budget.expect(int(content_length) if content_length.isdigit() else None, url, category, priority)
+            chunks = budget.track(chunks, url, category, priority)
+        return response, chunks
+    
     def _download_all_website_assets(self, soup: BeautifulSoup, base_url: str, base_folder: Path) -> Dict[str, Any]:
         """تحميل جميع أصول الموقع بشكل شامل"""
         assets_result = {
@@ -1583,24 +2049,35 @@ class AdvancedWebsiteExtractor:
             'fonts': {'downloaded': [], 'failed': [], 'total': 0},
             'media': {'downloaded': [], 'failed': [], 'total': 0},
             'documents': {'downloaded': [], 'failed': [], 'total': 0},
+            'skipped': [],
             'summary': {'total_downloaded': 0, 'total_failed': 0, 'total_size_mb': 0}
         }
-        
-        # تحميل الصور (جميع الأنواع)
-        image_selectors = [
-            'img[src]',
-            'img[data-src]',
-            'img[data-lazy-src]',
-            'source[srcset]',
-            '[style*="background-image"]'
-        ]
-        
-        for selector in image_selectors:
-            elements = soup.select(selector)
-            for element in elements[:50]:  # حد أقصى 50 صورة
-                image_urls = self._extract_image_urls(element, base_url)
-                for img_url in image_urls:
-                    self._download_asset_comprehensive(img_url, base_folder / '02_assets/images', assets_result['images'])
+        # إحصائيات الذاكرة المؤقتة للأصول في هذه العملية
+        cache_stats = new_cache_stats()
+        budget = DownloadBudget(**self.asset_budget)
+        
+        # الأصول تُجمع أولاً ثم تُحمل حسب الأولوية: CSS والصور الأولى، ثم JS والخطوط، ثم الوسائط والمستندات
+        downloads, queued, image_count = [], set(), [0]
+        
+        def enqueue(asset_url: str, category: str):
+            if asset_url in queued:
+                return
+            queued.add(asset_url)
+            index = None
+            if category == 'images':
+                index, image_count[0] = image_count[0], image_count[0] + 1
+            downloads.append((asset_priority(category, index), len(downloads), asset_url, category))
+        
+        # تحميل الصور: مرشح واحد لكل صورة من src/srcset/<picture>/التحميل الكسول
+        for choice in select_page_images(soup, base_url, self.image_policy):
+            enqueue(choice.url, 'images')
+        
+        # صور الخلفية في style=""
+        for element in soup.select('[style*="background-image"]'):
+            for reference in find_css_references(element.get('style', '')):
+                img_url = resolve_css_url(reference.url, base_url)
+                if img_url:
+                    enqueue(img_url, 'images')
         
         # تحميل ملفات CSS
         css_elements = soup.find_all(['link', 'style'])
@@ -1609,7 +2086,7 @@ class AdvancedWebsiteExtractor:
                 href = element.get('href')
                 if href:
                     css_url = urljoin(base_url, href)
-                    self._download_asset_comprehensive(css_url, base_folder / '02_assets/css', assets_result['css'])
+                    enqueue(css_url, 'css')
             elif element.name == 'style':
                 # حفظ CSS المدمج
                 css_content = element.get_text()
@@ -1629,7 +2106,7 @@ class AdvancedWebsiteExtractor:
             src = element.get('src')
             if src:
                 js_url = urljoin(base_url, src)
-                self._download_asset_comprehensive(js_url, base_folder / '02_assets/js', assets_result['js'])
+                enqueue(js_url, 'js')
             else:
                 # حفظ JavaScript المدمج
                 js_content = element.get_text()
@@ -1646,7 +2123,7 @@ class AdvancedWebsiteExtractor:
         # تحميل الخطوط
         font_urls = self._extract_font_urls(soup, base_url)
         for font_url in font_urls:
-            self._download_asset_comprehensive(font_url, base_folder / '02_assets/fonts', assets_result['fonts'])
+            enqueue(font_url, 'fonts')
         
         # تحميل ملفات الوسائط (فيديو وصوت)
         media_elements = soup.find_all(['video', 'audio', 'source'])
@@ -1654,7 +2131,7 @@ class AdvancedWebsiteExtractor:
             src = element.get('src')
             if src:
                 media_url = urljoin(base_url, src)
-                self._download_asset_comprehensive(media_url, base_folder / '02_assets/media', assets_result['media'])
+                enqueue(media_url, 'media')
         
         # تحميل المستندات
         document_links = soup.find_all('a', href=True)
@@ -1662,20 +2139,41 @@ class AdvancedWebsiteExtractor:
             href = link.get('href')
             if href and any(ext in href.lower() for ext in ['.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx']):
                 doc_url = urljoin(base_url, href)
-                self._download_asset_comprehensive(doc_url, base_folder / '02_assets/documents', assets_result['documents'])
+                enqueue(doc_url, 'documents')
+        
+        for priority, _, asset_url, category in sorted(downloads):
+            reason = budget.reserve(asset_url, category, priority)
+            if reason:
+                assets_result['skipped'].append({'url': asset_url, 'category': category, 'reason': f'budget:{reason}'})
+                continue
+            self._download_asset_comprehensive(asset_url, base_folder / '02_assets' / category, assets_result[category],
+                                               cache_stats, budget, category, priority)
         
         # حساب الإحصائيات الإجمالية
         for category in assets_result:
-            if category != 'summary':
+            if category not in ('summary', 'skipped'):
                 assets_result['summary']['total_downloaded'] += len(assets_result[category]['downloaded'])
                 assets_result['summary']['total_failed'] += len(assets_result[category]['failed'])
                 assets_result['summary']['total_size_mb'] += sum(
                     item.get('size_mb', 0) for item in assets_result[category]['downloaded']
                 )
                 assets_result[category]['total'] = len(assets_result[category]['downloaded']) + len(assets_result[category]['failed'])
+        assets_result['summary']['cache'] = cache_stats
+        assets_result['summary']['total_skipped'] = len(assets_result['skipped'])
+        assets_result['summary']['budget'] = budget.summary()
         
         return assets_result
     
+    @staticmethod
+    def _attempted_asset_urls(assets_result: Dict[str, Any]) -> Iterator[str]:
+        """روابط الأصول التي طلبتها مرحلة التحميل (المحملة والفاشلة) من نتيجة _download_all_website_assets"""
+        for category, entries in assets_result.items():
+            if category in ('summary', 'skipped') or not isinstance(entries, dict):
+                continue
+            for item in entries.get('downloaded', []) + entries.get('failed', []):
+                if item.get('url'):
+                    yield item['url']
+    
     def _download_comprehensive_assets(self, soup: BeautifulSoup, base_url: str, output_folder: Path) -> Dict[str, Any]:
         """تحميل شامل للأصول"""
         assets_folder = output_folder / 'assets'
@@ -1689,6 +2187,7 @@ class AdvancedWebsiteExtractor:
             'documents': [],
             'media': [],
             'failed': [],
+            'cache': new_cache_stats(),
             'total_assets': 0,
             'total_size_mb': 0
         }
@@ -1739,30 +2238,27 @@ class AdvancedWebsiteExtractor:
         """تحميل أصل واحد"""
         try:
             folder.mkdir(exist_ok=True)
-            response = self.session.get(url, timeout=10, stream=True)
-            response.raise_for_status()
+            with open_asset(self.session, url, cache=self.asset_cache, stats=assets_dict.get('cache'), timeout=10) as response:
+                filename = Path(urlparse(url).path).name or f"{asset_type}_{int(time.time())}"
+                if not filename.split('.')[-1]:
+                    extensions = {'images': '.jpg', 'css': '.css', 'js': '.js', 'fonts': '.woff'}
+                    filename += extensions.get(asset_type, '.file')
             
-            filename = Path(urlparse(url).path).name or f"{asset_type}_{int(time.time())}"
-            if not filename.split('.')[-1]:
-                extensions = {'images': '.jpg', 'css': '.css', 'js': '.js', 'fonts': '.woff'}
-                filename += extensions.get(asset_type, '.file')
+                filepath = folder / filename
             
-            filepath = folder / filename
+                stored = self.blob_store.save_stream(response.iter_content(chunk_size=8192), filepath)
+                filepath = stored['path']
             
-            with open(filepath, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
-            
-            file_size = filepath.stat().st_size / (1024 * 1024)  # MB
-            assets_dict['total_size_mb'] += file_size
-            
-            assets_dict[asset_type].append({
-                'url': url,
-                'local_path': str(filepath),
-                'size_mb': round(file_size, 3),
-                'status': 'downloaded'
-            })
+                file_size = stored['size'] / (1024 * 1024)  # MB
+                assets_dict['total_size_mb'] += file_size
             
+                assets_dict[asset_type].append({
+                    'url': url,
+                    'local_path': str(filepath),
+                    'size_mb': round(file_size, 3),
+                    'status': 'downloaded'
+                })
+
         except Exception as e:
             assets_dict['failed'].append({'url': url, 'error': str(e), 'type': asset_type})
     
@@ -2904,9 +3400,10 @@ document.addEventListener('DOMContentLoaded', function() {
         
         return recommendations
     
-    def _save_extraction_files(self, result: Dict[str, Any], content: str, soup: BeautifulSoup) -> Path:
+    def _save_extraction_files(self, result: Dict[str, Any], content: str, soup: BeautifulSoup,
+                               extraction_id: Optional[str] = None) -> Path:
         """حفظ ملفات الاستخراج"""
-        extraction_id = result.get('extraction_id', f'extract_{int(time.time())}')
+        extraction_id = extraction_id or result.get('extraction_id', f'extract_{int(time.time())}')
         extraction_folder = self.output_directory / 'content' / extraction_id
         extraction_folder.mkdir(parents=True, exist_ok=True)
         
@@ -3065,71 +3562,9 @@ document.addEventListener('DOMContentLoaded', function() {
             response = self.session.get(url, timeout=10, verify=False)
             response.raise_for_status()
             
-            content = response.text
-            soup = BeautifulSoup(content, 'html.parser')
-            
-            # استخراج المعلومات الأساسية
-            basic_info = self._extract_basic_info_simple(soup, url, response)
-            
-            # اختيار نوع الاستخراج
-            if extraction_type == 'basic':
-                result = basic_info
-            elif extraction_type == 'standard':
-                result = self._extract_standard_info(soup, url, basic_info)
-            elif extraction_type in ['advanced', 'complete']:
-                result = self._extract_advanced_info(soup, url, basic_info)
-            else:
-                result = basic_info
-            
-            # إضافة معلومات الاستخراج
-            duration = round(time.time() - start_time, 2)
-            
-            # حفظ النتائج
-            extraction_folder = self._save_extraction_files(result, content, soup)
+            final_result = self._analyze_fetched_page(url, response, extraction_type, extraction_id, start_time)
             
-            # تجميع النتائج بالتنسيق المطلوب
-            final_result = {
-                'extraction_info': {
-                    'extraction_id': extraction_id,
-                    'url': url,
-                    'extraction_type': extraction_type,
-                    'success': True,
-                    'duration': duration,
-                    'timestamp': datetime.now().isoformat(),
-                    'extractor': 'AdvancedWebsiteExtractor'
-                },
-                'statistics': {
-                    'extraction_completeness': 85.0,
-                    'data_quality_score': 78.0,
-                    'security_score': result.get('security_analysis', {}).get('score', 75.0),
-                    'seo_score': self._calculate_seo_score(result.get('seo_analysis', {}))
-                },
-                'downloaded_assets': {
-                    'summary': {
-                        'total_images': result.get('images_count', 0),
-                        'total_css': result.get('stylesheets_count', 0),
-                        'total_js': result.get('scripts_count', 0),
-                        'total_media': 0,
-                        'total_documents': 0,
-                        'total_size_mb': 0.5
-                    }
-                },
-                'output_paths': {
-                    'extraction_folder': str(extraction_folder),
-                    'content_folder': str(extraction_folder / 'content'),
-                    'assets_folder': str(extraction_folder / 'assets'),
-                    'reports_folder': str(extraction_folder / 'reports')
-                },
-                'comprehensive_analysis': {
-                    'cms_detection': {'primary_cms': 'Unknown'},
-                    'technology_stack': {'server': result.get('server', 'Unknown')}
-                }
-            }
-            
-            # دمج البيانات الأساسية
-            final_result.update(result)
-            
-            print(f"✅ اكتمل الاستخراج في {duration:.2f} ثانية")
+            print(f"✅ اكتمل الاستخراج في {final_result['extraction_info']['duration']:.2f} ثانية")
             return final_result
             
         except Exception as e:
@@ -3145,6 +3580,75 @@ document.addEventListener('DOMContentLoaded', function() {
             }
             return error_result
     
+    def _analyze_fetched_page(self, url: str, response, extraction_type: str, extraction_id: str,
+                              start_time: float) -> Dict[str, Any]:
+        """تحليل صفحة مجلوبة وحفظ ملفاتها (يعمل أيضاً داخل عمليات التحليل في batch_extract)"""
+        content = response.text
+        soup = BeautifulSoup(content, 'html.parser')
+        
+        # استخراج المعلومات الأساسية
+        basic_info = self._extract_basic_info_simple(soup, url, response)
+        
+        # اختيار نوع الاستخراج
+        if extraction_type == 'basic':
+            result = basic_info
+        elif extraction_type == 'standard':
+            result = self._extract_standard_info(soup, url, basic_info)
+        elif extraction_type in ['advanced', 'complete']:
+            result = self._extract_advanced_info(soup, url, basic_info)
+        else:
+            result = basic_info
+        
+        # إضافة معلومات الاستخراج
+        duration = round(time.time() - start_time, 2)
+        
+        # حفظ النتائج
+        extraction_folder = self._save_extraction_files(result, content, soup, extraction_id)
+        
+        # تجميع النتائج بالتنسيق المطلوب
+        final_result = {
+            'extraction_info': {
+                'extraction_id': extraction_id,
+                'url': url,
+                'extraction_type': extraction_type,
+                'success': True,
+                'duration': duration,
+                'timestamp': datetime.now().isoformat(),
+                'extractor': 'AdvancedWebsiteExtractor'
+            },
+            'statistics': {
+                'extraction_completeness': 85.0,
+                'data_quality_score': 78.0,
+                'security_score': result.get('security_analysis', {}).get('score', 75.0),
+                'seo_score': self._calculate_seo_score(result.get('seo_analysis', {}))
+            },
+            'downloaded_assets': {
+                'summary': {
+                    'total_images': result.get('images_count', 0),
+                    'total_css': result.get('stylesheets_count', 0),
+                    'total_js': result.get('scripts_count', 0),
+                    'total_media': 0,
+                    'total_documents': 0,
+                    'total_size_mb': 0.5
+                }
+            },
+            'output_paths': {
+                'extraction_folder': str(extraction_folder),
+                'content_folder': str(extraction_folder / 'content'),
+                'assets_folder': str(extraction_folder / 'assets'),
+                'reports_folder': str(extraction_folder / 'reports')
+            },
+            'comprehensive_analysis': {
+                'cms_detection': {'primary_cms': 'Unknown'},
+                'technology_stack': {'server': result.get('server', 'Unknown')}
+            }
+        }
+        
+        # دمج البيانات الأساسية
+        final_result.update(result)
+        
+        return final_result
+    
     def _extract_basic_info_simple(self, soup: BeautifulSoup, url: str, response) -> Dict[str, Any]:
         """استخراج المعلومات الأساسية البسيطة"""
         domain = urlparse(url).netloc
@@ -3392,6 +3896,20 @@ def spider_crawl_website(url: str, output_dir: str = "spider_crawl", config: Opt
     
     return extractor.extract_with_spider_engine(url, spider_config)
 
+def resume_crawl(crawl_id: str, output_dir: str = "spider_crawl") -> Dict[str, Any]:
+    """
+    استئناف زحف محفوظ (بدأ مع resumable=True)
+    
+    Args:
+        crawl_id: معرّف الزحف
+        output_dir: مجلد الإخراج الذي بدأ فيه الزحف
+    
+    Returns:
+        Dict: نتائج الزحف الكاملة
+    """
+    extractor = AdvancedWebsiteExtractor(output_dir)
+    return extractor.resume_crawl(crawl_id)
+
 # =====================================
 # وظائف إضافية للتحليل المتقدم
 # =====================================
@@ -3549,7 +4067,7 @@ def _generate_insights(results: List[Dict[str, Any]]) -> List[str]:
 # =====================================
 
 def monitor_website_changes(url: str, check_interval: int = 3600, output_dir: str = "monitoring") -> Dict[str, Any]:
-    """مراقبة تغييرات الموقع"""
+    """مراقبة تغييرات الموقع: فحص أولي ثم تسجيل الرابط في خدمة المراقبة (run_monitoring_service)"""
     
     monitoring_folder = Path(output_dir) / f"monitor_{urlparse(url).netloc}"
     monitoring_folder.mkdir(parents=True, exist_ok=True)
@@ -3574,6 +4092,17 @@ def monitor_website_changes(url: str, check_interval: int = 3600, output_dir: st
         'baseline_status_code': initial_result.get('status_code', 0)
     }
     
+    # تسجيل الرابط في قاعدة المراقبة المشتركة وأخذ خط الأساس (ETag وبصمات الكتل)
+    monitor_db = Path(output_dir) / 'monitoring.db'
+    monitor = ChangeMonitor(str(monitor_db), default_interval=check_interval,
+                            min_interval=min(300, check_interval), verify=False)
+    try:
+        monitor.add_url(url, check_interval, check_now=False)
+        baseline = monitor.check_url(url)
+    finally:
+        monitor.close()
+    monitoring_config['monitor_db'] = str(monitor_db)
+    
     # حفظ إعدادات المراقبة
     config_file = monitoring_folder / 'monitoring_config.json'
     with open(config_file, 'w', encoding='utf-8') as f:
@@ -3584,8 +4113,10 @@ def monitor_website_changes(url: str, check_interval: int = 3600, output_dir: st
         'url': url,
         'monitoring_folder': str(monitoring_folder),
         'initial_analysis': initial_result,
-        'next_check': datetime.now() + timedelta(seconds=check_interval),
-        'config_file': str(config_file)
+        'baseline': baseline,
+        'next_check': datetime.fromtimestamp(baseline['next_check']),
+        'config_file': str(config_file),
+        'monitor_db': str(monitor_db)
     }
 
 def check_monitoring_status(monitoring_folder: str) -> Dict[str, Any]:
@@ -3604,13 +4135,94 @@ def check_monitoring_status(monitoring_folder: str) -> Dict[str, Any]:
     json_files = list(folder_path.glob('*.json'))
     json_files = [f for f in json_files if f.name != 'monitoring_config.json']
     
-    return {
+    status = {
         'monitoring_config': config,
         'total_checks': len(json_files),
         'latest_check': max([f.stat().st_mtime for f in json_files]) if json_files else None,
         'monitoring_folder': monitoring_folder,
         'is_active': True
     }
+    
+    # الحالة الفعلية وأحداث التغيير من قاعدة المراقبة
+    monitor_db = config.get('monitor_db')
+    if monitor_db and Path(monitor_db).exists():
+        monitor = ChangeMonitor(monitor_db)
+        try:
+            url_status = monitor.get_status(config['url'])
+        finally:
+            monitor.close()
+        url_state = url_status['url_state'] or {}
+        status.update({
+            'total_checks': url_state.get('checks', 0),
+            'latest_check': url_state.get('last_checked'),
+            'next_check': url_state.get('next_check'),
+            'current_interval': url_state.get('interval'),
+            'changes_detected': url_state.get('changes', 0),
+            'is_active': bool(url_state.get('active', 0)),
+            'change_events': url_status['events']
+        })
+    
+    return status
+
+def run_monitoring_service(output_dir: str = "monitoring", duration: Optional[float] = None,
+                           max_workers: int = 8, urls: Optional[List[str]] = None,
+                           check_interval: int = 3600) -> Dict[str, Any]:
+    """تشغيل خدمة المراقبة لجميع الروابط المسجلة (duration=None حتى الإيقاف)"""
+    
+    monitor = ChangeMonitor(str(Path(output_dir) / 'monitoring.db'), max_workers=max_workers,
+                            default_interval=check_interval, min_interval=min(300, check_interval), verify=False)
+    
+    def report_change(result: Dict[str, Any]):
+        if result['status'] == 'changed':
+            diff = result.get('diff') or {}
+            print(f"🔔 تغيير في {result['url']}: +{len(diff.get('added', []))} / -{len(diff.get('removed', []))} كتلة")
+        else:
+            print(f"⚠️ خطأ في فحص {result['url']}: {result.get('error', '')}")
+    
+    try:
+        if urls:
+            monitor.add_urls(urls, check_interval)
+        print(f"👁️ بدء خدمة المراقبة: {monitor.store.get_summary()['active_urls']} رابط")
+        run_result = monitor.run(duration=duration, on_event=report_change)
+        run_result['summary'] = monitor.get_status()
+    except KeyboardInterrupt:
+        run_result = {'interrupted': True, 'summary': monitor.get_status()}
+    finally:
+        monitor.close()
+    
+    return run_result
+
+# أداة الاستخراج الخاصة بكل عملية تحليل في batch_extract(pipeline=True)
+_pipeline_extractor: Optional['AdvancedWebsiteExtractor'] = None
+
+def _init_pipeline_worker(output_directory: str):
+    """تهيئة عملية التحليل مرة واحدة: أداة استخراج واحدة لكل عملية"""
+    global _pipeline_extractor
+    _pipeline_extractor = AdvancedWebsiteExtractor(output_directory)
+
+def _pipeline_extract_page(page, extraction_type: str = "standard") -> Dict[str, Any]:
+    """تحليل صفحة مجلوبة داخل عملية التحليل بنفس منطق extract"""
+    start_time = time.time()
+    extractor = _pipeline_extractor or AdvancedWebsiteExtractor()
+    extractor.extraction_id += 1
+    extraction_id = f"extract_{os.getpid()}_{extractor.extraction_id}_{int(start_time)}"
+    try:
+        page.raise_for_status()
+        result = extractor._analyze_fetched_page(page.url, page, extraction_type, extraction_id, start_time)
+        # زمن الجلب جزء من مدة الاستخراج كما في extract
+        result['extraction_info']['duration'] = round(result['extraction_info']['duration'] + page.elapsed_seconds, 2)
+        return result
+    except Exception as e:
+        return {
+            'extraction_id': extraction_id,
+            'url': page.url,
+            'extraction_type': extraction_type,
+            'success': False,
+            'error': str(e),
+            'duration': round(time.time() - start_time + page.elapsed_seconds, 2),
+            'timestamp': datetime.now().isoformat(),
+            'extractor': 'AdvancedWebsiteExtractor'
+        }
 
 # كلاس الاستخراج المطور الرئيسي 
 class AdvancedWebsiteExtractorV2(AdvancedWebsiteExtractor):
@@ -3664,17 +4276,21 @@ class AdvancedWebsiteExtractorV2(AdvancedWebsiteExtractor):
             
             # مرحلة 4: ميزات إضافية حسب نوع الاستخراج
             extra_features = {}
+            site_crawl = None
             
             if extraction_type in ['advanced', 'complete', 'ultra']:
                 print("📸 التقاط لقطات الشاشة...")
                 extra_features['screenshots'] = self._capture_comprehensive_screenshots(url, extraction_folder)
                 
+                # زحف واحد تستهلكه نتائج الزحف وخريطة الموقع
                 print("🕷️ زحف الصفحات المتعددة...")
-                extra_features['crawl_results'] = self._crawl_website_pages(url, extraction_folder)
+                site_crawl = self._crawl_site(url, extraction_folder / '06_crawled_pages', max_pages=10,
+                                              seed_response=basic_result.get('response'), timeout=10)
+                extra_features['crawl_results'] = site_crawl.to_pages_summary()
                 
             if extraction_type in ['complete', 'ultra']:
                 print("🗺️ إنشاء خريطة الموقع...")
-                extra_features['sitemap'] = self._generate_comprehensive_sitemap(url, extraction_folder)
+                extra_features['sitemap'] = self._generate_comprehensive_sitemap(url, extraction_folder, site_crawl)
                 
                 print("🛡️ فحص الأمان الشامل...")
                 extra_features['security_scan'] = self._perform_comprehensive_security_scan(url, basic_result['soup'])
@@ -3804,104 +4420,129 @@ class AdvancedWebsiteExtractorV2(AdvancedWebsiteExtractor):
             'failed_downloads': []
         }
         
+        # كل الأصول تمر بميزانية الاستخراج (البايتات والعدد والوقت) حسب أولوية نوعها
+        budget = DownloadBudget(**self.asset_budget)
+        
         # تحميل الصور
         print("  📷 تحميل الصور...")
-        images = self._download_images(soup, base_url, extraction_folder)
+        images = self._download_images(soup, base_url, extraction_folder, budget)
         assets_result['images'] = images
         
         # تحميل ملفات CSS
         print("  🎨 تحميل ملفات CSS...")
-        css_files = self._download_css_files(soup, base_url, extraction_folder)
+        css_files = self._download_css_files(soup, base_url, extraction_folder, budget)
         assets_result['css'] = css_files
         
         # تحميل ملفات JavaScript
         print("  ⚡ تحميل ملفات JavaScript...")
-        js_files = self._download_js_files(soup, base_url, extraction_folder)
+        js_files = self._download_js_files(soup, base_url, extraction_folder, budget)
         assets_result['js'] = js_files
         
         # تحميل الخطوط
         print("  🔤 تحميل الخطوط...")
-        fonts = self._download_fonts(soup, base_url, extraction_folder)
+        fonts = self._download_fonts(soup, base_url, extraction_folder, budget)
         assets_result['fonts'] = fonts
         
         # تحميل الفيديو والصوت
         print("  🎵 تحميل الفيديو والصوت...")
-        media = self._download_media_files(soup, base_url, extraction_folder)
+        media = self._download_media_files(soup, base_url, extraction_folder, budget)
         assets_result['media'] = media
         
         # تحميل المستندات
         print("  📄 تحميل المستندات...")
-        documents = self._download_documents(soup, base_url, extraction_folder)
+        documents = self._download_documents(soup, base_url, extraction_folder, budget)
         assets_result['documents'] = documents
         
         # حساب الإحصائيات
         all_assets = images + css_files + js_files + fonts + media + documents
         assets_result['total_downloaded'] = len([a for a in all_assets if a.get('success')])
         assets_result['total_size'] = sum([a.get('size', 0) for a in all_assets if a.get('success')])
+        assets_result['skipped'] = [a for a in all_assets if a.get('skipped')]
+        assets_result['budget'] = budget.summary()
         
         return assets_result
     
-    def _download_images(self, soup: BeautifulSoup, base_url: str, extraction_folder: Path) -> List[Dict]:
-        """تحميل جميع الصور"""
+    @staticmethod
+    def _budget_skip(url: str, budget: Optional[DownloadBudget], category: str, priority: int) -> Optional[Dict]:
+        """حجز مكان في الميزانية قبل الطلب؛ يعيد عنصر التخطي إذا رُفض الأصل"""
+        reason = budget.reserve(url, category, priority) if budget is not None else None
+        if reason:
+            return {'url': url, 'error': f'budget:{reason}', 'skipped': True, 'success': False}
+        return None
+    
+    @staticmethod
+    def _budget_failure(url: str, error: Exception, budget: Optional[DownloadBudget]) -> Dict:
+        """عنصر فشل أصل محجوز: الإلغاء للميزانية تخطٍّ، وغيره فشل يعيد المكان المحجوز"""
+        if isinstance(error, BudgetExceeded):
+            return {'url': url, 'error': str(error), 'skipped': True, 'success': False}
+        if budget is not None:
+            budget.release()
+        return {'url': url, 'error': str(error), 'success': False}
+    
+    def _download_images(self, soup: BeautifulSoup, base_url: str, extraction_folder: Path,
+                         budget: Optional[DownloadBudget] = None) -> List[Dict]:
+        """تحميل جميع الصور (مرشح واحد لكل صورة حسب سياسة الصور)"""
         images = []
         img_folder = extraction_folder / '02_assets' / 'images'
         
-        for img in soup.find_all('img'):
-            src = img.get('src')
-            if not src:
+        for index, choice in enumerate(select_page_images(soup, base_url, self.image_policy)):
+            img_url = choice.url
+            # الصور الأولى في الصفحة حرجة فلا تُلغى عند نفاد الميزانية
+            priority = asset_priority('images', index)
+            skipped = self._budget_skip(img_url, budget, 'images', priority)
+            if skipped:
+                images.append(skipped)
                 continue
-                
             try:
-                img_url = urljoin(base_url, src)
-                response = self.session.get(img_url, timeout=10, verify=False)
-                response.raise_for_status()
+                response, chunks = self._get_budgeted(img_url, budget, 'images', priority)
                 
                 # تحديد اسم الملف
                 filename = Path(urlparse(img_url).path).name
                 if not filename or '.' not in filename:
                     filename = f"image_{len(images)+1}.jpg"
                 
-                file_path = img_folder / filename
-                with open(file_path, 'wb') as f:
-                    f.write(response.content)
+                stored = self.blob_store.save_stream(chunks, img_folder / filename)
                 
                 images.append({
                     'url': img_url,
                     'filename': filename,
-                    'path': str(file_path),
-                    'size': len(response.content),
+                    'path': str(stored['path']),
+                    'size': stored['size'],
                     'success': True
                 })
                 
             except Exception as e:
-                images.append({
-                    'url': src,
-                    'error': str(e),
-                    'success': False
-                })
+                images.append(self._budget_failure(img_url, e, budget))
         
         return images
     
-    def _download_css_files(self, soup: BeautifulSoup, base_url: str, extraction_folder: Path) -> List[Dict]:
+    def _download_css_files(self, soup: BeautifulSoup, base_url: str, extraction_folder: Path,
+                            budget: Optional[DownloadBudget] = None) -> List[Dict]:
         """تحميل ملفات CSS"""
         css_files = []
         css_folder = extraction_folder / '02_assets' / 'css'
+        priority = asset_priority('css')
         
         for link in soup.find_all('link', rel='stylesheet'):
             href = link.get('href')
             if not href:
                 continue
-                
+            
+            css_url = urljoin(base_url, href)
+            skipped = self._budget_skip(css_url, budget, 'css', priority)
+            if skipped:
+                css_files.append(skipped)
+                continue
             try:
-                css_url = urljoin(base_url, href)
-                response = self.session.get(css_url, timeout=10, verify=False)
-                response.raise_for_status()
+                response, chunks = self._get_budgeted(css_url, budget, 'css', priority)
+                response._content = b''.join(chunks)
                 
                 filename = Path(urlparse(css_url).path).name
                 if not filename or not filename.endswith('.css'):
                     filename = f"style_{len(css_files)+1}.css"
                 
                 file_path = css_folder / filename
+                detach_view(file_path)
                 with open(file_path, 'w', encoding='utf-8') as f:
                     f.write(response.text)
                 
@@ -3914,34 +4555,37 @@ class AdvancedWebsiteExtractorV2(AdvancedWebsiteExtractor):
                 })
                 
             except Exception as e:
-                css_files.append({
-                    'url': href,
-                    'error': str(e),
-                    'success': False
-                })
+                css_files.append(self._budget_failure(href, e, budget))
         
         return css_files
     
-    def _download_js_files(self, soup: BeautifulSoup, base_url: str, extraction_folder: Path) -> List[Dict]:
+    def _download_js_files(self, soup: BeautifulSoup, base_url: str, extraction_folder: Path,
+                           budget: Optional[DownloadBudget] = None) -> List[Dict]:
         """تحميل ملفات JavaScript"""
         js_files = []
         js_folder = extraction_folder / '02_assets' / 'js'
+        priority = asset_priority('js')
         
         for script in soup.find_all('script', src=True):
             src = script.get('src')
             if not src:
                 continue
-                
+            
+            js_url = urljoin(base_url, src)
+            skipped = self._budget_skip(js_url, budget, 'js', priority)
+            if skipped:
+                js_files.append(skipped)
+                continue
             try:
-                js_url = urljoin(base_url, src)
-                response = self.session.get(js_url, timeout=10, verify=False)
-                response.raise_for_status()
+                response, chunks = self._get_budgeted(js_url, budget, 'js', priority)
+                response._content = b''.join(chunks)
                 
                 filename = Path(urlparse(js_url).path).name
                 if not filename or not filename.endswith('.js'):
                     filename = f"script_{len(js_files)+1}.js"
                 
                 file_path = js_folder / filename
+                detach_view(file_path)
                 with open(file_path, 'w', encoding='utf-8') as f:
                     f.write(response.text)
                 
@@ -3954,30 +4598,33 @@ class AdvancedWebsiteExtractorV2(AdvancedWebsiteExtractor):
                 })
                 
             except Exception as e:
-                js_files.append({
-                    'url': src,
-                    'error': str(e),
-                    'success': False
-                })
+                js_files.append(self._budget_failure(src, e, budget))
         
         return js_files
     
-    def _download_fonts(self, soup: BeautifulSoup, base_url: str, extraction_folder: Path) -> List[Dict]:
+    def _download_fonts(self, soup: BeautifulSoup, base_url: str, extraction_folder: Path,
+                        budget: Optional[DownloadBudget] = None) -> List[Dict]:
         """تحميل الخطوط"""
         fonts = []
         fonts_folder = extraction_folder / '02_assets' / 'fonts'
+        priority = asset_priority('fonts')
         
         # البحث عن خطوط Google Fonts
         for link in soup.find_all('link'):
             href = link.get('href', '')
             if 'fonts.googleapis.com' in href or 'fonts.gstatic.com' in href:
+                skipped = self._budget_skip(href, budget, 'fonts', priority)
+                if skipped:
+                    fonts.append(skipped)
+                    continue
                 try:
-                    response = self.session.get(href, timeout=10, verify=False)
-                    response.raise_for_status()
+                    response, chunks = self._get_budgeted(href, budget, 'fonts', priority)
+                    response._content = b''.join(chunks)
                     
                     filename = f"google_font_{len(fonts)+1}.css"
                     file_path = fonts_folder / filename
                     
+                    detach_view(file_path)
                     with open(file_path, 'w', encoding='utf-8') as f:
                         f.write(response.text)
                     
@@ -3990,15 +4637,12 @@ class AdvancedWebsiteExtractorV2(AdvancedWebsiteExtractor):
                     })
                     
                 except Exception as e:
-                    fonts.append({
-                        'url': href,
-                        'error': str(e),
-                        'success': False
-                    })
+                    fonts.append(self._budget_failure(href, e, budget))
         
         return fonts
     
-    def _download_media_files(self, soup: BeautifulSoup, base_url: str, extraction_folder: Path) -> List[Dict]:
+    def _download_media_files(self, soup: BeautifulSoup, base_url: str, extraction_folder: Path,
+                              budget: Optional[DownloadBudget] = None) -> List[Dict]:
         """تحميل ملفات الفيديو والصوت"""
         media_files = []
         media_folder = extraction_folder / '02_assets' / 'media'
@@ -4014,34 +4658,31 @@ class AdvancedWebsiteExtractorV2(AdvancedWebsiteExtractor):
                 if not src:
                     continue
                 
-                try:
-                    media_url = urljoin(base_url, src)
-                    response = self.session.get(media_url, timeout=30, verify=False, stream=True)
-                    response.raise_for_status()
-                    
-                    filename = Path(urlparse(media_url).path).name
-                    if not filename:
-                        filename = f"video_{len(media_files)+1}.mp4"
-                    
-                    file_path = media_folder / filename
-                    with open(file_path, 'wb') as f:
-                        for chunk in response.iter_content(chunk_size=8192):
-                            f.write(chunk)
-                    
+                media_url = urljoin(base_url, src)
+                filename = Path(urlparse(media_url).path).name
+                if not filename:
+                    filename = f"video_{len(media_files)+1}.mp4"
+                
+                # تحميل قابل للاستئناف: الانقطاع لا يعيد الملف الكبير من الصفر
+                download = self._download_file_safe(media_url, media_folder / filename, timeout=30, verify=False,
+                                                    budget=budget, category='media')
+                if download['success']:
                     media_files.append({
                         'url': media_url,
                         'filename': filename,
-                        'path': str(file_path),
+                        'path': download['filepath'],
                         'type': 'video',
-                        'size': file_path.stat().st_size,
+                        'size': download['size'],
+                        'resumed_bytes': download['resumed_bytes'],
                         'success': True
                     })
-                    
-                except Exception as e:
+                else:
                     media_files.append({
                         'url': src,
-                        'error': str(e),
+                        'error': download['error'],
                         'type': 'video',
+                        'resumable': download.get('resumable', False),
+                        'skipped': download.get('budget_exceeded', False),
                         'success': False
                     })
         
@@ -4056,40 +4697,38 @@ class AdvancedWebsiteExtractorV2(AdvancedWebsiteExtractor):
                 if not src:
                     continue
                 
-                try:
-                    media_url = urljoin(base_url, src)
-                    response = self.session.get(media_url, timeout=30, verify=False, stream=True)
-                    response.raise_for_status()
-                    
-                    filename = Path(urlparse(media_url).path).name
-                    if not filename:
-                        filename = f"audio_{len(media_files)+1}.mp3"
-                    
-                    file_path = media_folder / filename
-                    with open(file_path, 'wb') as f:
-                        for chunk in response.iter_content(chunk_size=8192):
-                            f.write(chunk)
-                    
+                media_url = urljoin(base_url, src)
+                filename = Path(urlparse(media_url).path).name
+                if not filename:
+                    filename = f"audio_{len(media_files)+1}.mp3"
+                
+                # تحميل قابل للاستئناف: الانقطاع لا يعيد الملف الكبير من الصفر
+                download = self._download_file_safe(media_url, media_folder / filename, timeout=30, verify=False,
+                                                    budget=budget, category='media')
+                if download['success']:
                     media_files.append({
                         'url': media_url,
                         'filename': filename,
-                        'path': str(file_path),
+                        'path': download['filepath'],
                         'type': 'audio',
-                        'size': file_path.stat().st_size,
+                        'size': download['size'],
+                        'resumed_bytes': download['resumed_bytes'],
                         'success': True
                     })
-                    
-                except Exception as e:
+                else:
                     media_files.append({
                         'url': src,
-                        'error': str(e),
+                        'error': download['error'],
                         'type': 'audio',
+                        'resumable': download.get('resumable', False),
+                        'skipped': download.get('budget_exceeded', False),
                         'success': False
                     })
         
         return media_files
     
-    def _download_documents(self, soup: BeautifulSoup, base_url: str, extraction_folder: Path) -> List[Dict]:
+    def _download_documents(self, soup: BeautifulSoup, base_url: str, extraction_folder: Path,
+                            budget: Optional[DownloadBudget] = None) -> List[Dict]:
         """تحميل المستندات"""
         documents = []
         docs_folder = extraction_folder / '02_assets' / 'documents'
@@ -4104,33 +4743,29 @@ class AdvancedWebsiteExtractorV2(AdvancedWebsiteExtractor):
             
             # التحقق من امتداد الملف
             if any(href.lower().endswith(ext) for ext in doc_extensions):
-                try:
-                    doc_url = urljoin(base_url, href)
-                    response = self.session.get(doc_url, timeout=30, verify=False, stream=True)
-                    response.raise_for_status()
-                    
-                    filename = Path(urlparse(doc_url).path).name
-                    if not filename:
-                        ext = next((ext for ext in doc_extensions if href.lower().endswith(ext)), '.pdf')
-                        filename = f"document_{len(documents)+1}{ext}"
-                    
-                    file_path = docs_folder / filename
-                    with open(file_path, 'wb') as f:
-                        for chunk in response.iter_content(chunk_size=8192):
-                            f.write(chunk)
-                    
+                doc_url = urljoin(base_url, href)
+                filename = Path(urlparse(doc_url).path).name
+                if not filename:
+                    ext = next((ext for ext in doc_extensions if href.lower().endswith(ext)), '.pdf')
+                    filename = f"document_{len(documents)+1}{ext}"
+                
+                download = self._download_file_safe(doc_url, docs_folder / filename, timeout=30, verify=False,
+                                                    budget=budget, category='documents')
+                if download['success']:
                     documents.append({
                         'url': doc_url,
                         'filename': filename,
-                        'path': str(file_path),
-                        'size': file_path.stat().st_size,
+                        'path': download['filepath'],
+                        'size': download['size'],
+                        'resumed_bytes': download['resumed_bytes'],
                         'success': True
                     })
-                    
-                except Exception as e:
+                else:
                     documents.append({
                         'url': href,
-                        'error': str(e),
+                        'error': download['error'],
+                        'resumable': download.get('resumable', False),
+                        'skipped': download.get('budget_exceeded', False),
                         'success': False
                     })
         
@@ -4535,82 +5170,23 @@ class AdvancedWebsiteExtractorV2(AdvancedWebsiteExtractor):
     
     def _crawl_website_pages(self, url: str, extraction_folder: Path) -> Dict[str, Any]:
         """زحف الصفحات المتعددة للموقع"""
-        crawl_result = {
-            'pages_found': [],
-            'pages_crawled': 0,
-            'total_links': 0,
-            'internal_links': 0,
-            'external_links': 0,
-            'success': True,
-            'errors': []
-        }
-        
         try:
-            visited_urls = set()
-            to_visit = [url]
-            max_pages = 10  # حد أقصى للصفحات
-            
-            base_domain = urlparse(url).netloc
-            
-            while to_visit and len(visited_urls) < max_pages:
-                current_url = to_visit.pop(0)
-                if current_url in visited_urls:
-                    continue
-                
-                try:
-                    response = self.session.get(current_url, timeout=10, verify=False)
-                    if response.status_code == 200:
-                        visited_urls.add(current_url)
-                        soup = BeautifulSoup(response.text, 'html.parser')
-                        
-                        # حفظ الصفحة
-                        page_name = urlparse(current_url).path.replace('/', '_') or 'index'
-                        if page_name.startswith('_'):
-                            page_name = page_name[1:]
-                        if not page_name:
-                            page_name = 'index'
-                        
-                        page_file = extraction_folder / '06_crawled_pages' / f"{page_name}.html"
-                        with open(page_file, 'w', encoding='utf-8') as f:
-                            f.write(response.text)
-                        
-                        # جمع الروابط الجديدة
-                        for link in soup.find_all('a', href=True):
-                            href = link.get('href')
-                            if href:
-                                full_url = urljoin(current_url, href)
-                                parsed = urlparse(full_url)
-                                
-                                if parsed.netloc == base_domain and full_url not in visited_urls:
-                                    if full_url not in to_visit:
-                                        to_visit.append(full_url)
-                                    crawl_result['internal_links'] += 1
-                                else:
-                                    crawl_result['external_links'] += 1
-                        
-                        crawl_result['pages_found'].append({
-                            'url': current_url,
-                            'title': soup.find('title').get_text() if soup.find('title') else 'بدون عنوان',
-                            'file_path': str(page_file),
-                            'status': 'success'
-                        })
-                        
-                        time.sleep(1)  # فترة انتظار بين الطلبات
-                        
-                except Exception as e:
-                    crawl_result['errors'].append(f"خطأ في زحف {current_url}: {str(e)}")
-            
-            crawl_result['pages_crawled'] = len(visited_urls)
-            crawl_result['total_links'] = crawl_result['internal_links'] + crawl_result['external_links']
-            
+            site_crawl = self._crawl_site(url, extraction_folder / '06_crawled_pages', max_pages=10, timeout=10)
+            return site_crawl.to_pages_summary()
         except Exception as e:
-            crawl_result['success'] = False
-            crawl_result['errors'].append(f"خطأ عام في الزحف: {str(e)}")
-        
-        return crawl_result
+            return {
+                'pages_found': [],
+                'pages_crawled': 0,
+                'total_links': 0,
+                'internal_links': 0,
+                'external_links': 0,
+                'success': False,
+                'errors': [f"خطأ عام في الزحف: {str(e)}"]
+            }
     
-    def _generate_comprehensive_sitemap(self, url: str, extraction_folder: Path) -> Dict[str, Any]:
-        """إنشاء خريطة موقع شاملة"""
+    def _generate_comprehensive_sitemap(self, url: str, extraction_folder: Path,
+                                        site_crawl: Optional[SiteCrawl] = None) -> Dict[str, Any]:
+        """إنشاء خريطة موقع شاملة (من نتيجة الزحف المشتركة، أو بزحف جديد إن لم تُمرر)"""
         sitemap_result = {
             'xml_sitemap': None,
             'html_sitemap': None,
@@ -4621,29 +5197,15 @@ class AdvancedWebsiteExtractorV2(AdvancedWebsiteExtractor):
         
         try:
             # جمع الروابط من الزحف
-            crawl_data = self._crawl_website_pages(url, extraction_folder)
+            if site_crawl is None:
+                site_crawl = self._crawl_site(url, extraction_folder / '06_crawled_pages', max_pages=10, timeout=10)
+            crawl_data = site_crawl.to_pages_summary()
             
             if crawl_data['success'] and crawl_data['pages_found']:
-                urls = [page['url'] for page in crawl_data['pages_found']]
+                urls = site_crawl.urls
                 
                 # إنشاء XML Sitemap
-                xml_content = ['<?xml version="1.0" encoding="UTF-8"?>']
-                xml_content.append('<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">')
-                
-                for page_url in urls:
-                    xml_content.append('  <url>')
-                    xml_content.append(f'    <loc>{page_url}</loc>')
-                    xml_content.append(f'    <lastmod>{datetime.now().strftime("%Y-%m-%d")}</lastmod>')
-                    xml_content.append('    <changefreq>monthly</changefreq>')
-                    xml_content.append('    <priority>0.8</priority>')
-                    xml_content.append('  </url>')
-                
-                xml_content.append('</urlset>')
-                
-                xml_file = extraction_folder / '07_exports' / 'sitemap.xml'
-                with open(xml_file, 'w', encoding='utf-8') as f:
-                    f.write('\n'.join(xml_content))
-                
+                xml_file = site_crawl.write_xml_sitemap(extraction_folder / '07_exports' / 'sitemap.xml')
                 sitemap_result['xml_sitemap'] = str(xml_file)
                 
                 # إنشاء HTML Sitemap
@@ -6301,6 +6863,7 @@ class AdvancedWebsiteExtractorV2(AdvancedWebsiteExtractor):
                                 filename = filename.split('?')[0]
                             
                             file_path = images_folder / filename
+                            detach_view(file_path)
                             with open(file_path, 'wb') as f:
                                 f.write(response.content)
                             downloaded_assets['images'].append(filename)
@@ -6325,6 +6888,7 @@ class AdvancedWebsiteExtractorV2(AdvancedWebsiteExtractor):
                                 filename = filename.split('?')[0]
                             
                             file_path = css_folder / filename
+                            detach_view(file_path)
                             with open(file_path, 'w', encoding='utf-8') as f:
                                 f.write(response.text)
                             downloaded_assets['css'].append(filename)
@@ -6349,6 +6913,7 @@ class AdvancedWebsiteExtractorV2(AdvancedWebsiteExtractor):
                                 filename = filename.split('?')[0]
                             
                             file_path = js_folder / filename
+                            detach_view(file_path)
                             with open(file_path, 'w', encoding='utf-8') as f:
                                 f.write(response.text)
                             downloaded_assets['js'].append(filename)
@@ -6584,69 +7149,83 @@ if __name__ == "__main__":
 # الوظائف المساعدة الشاملة المطلوبة
 # =====================================
 
-def _download_asset_comprehensive(self, url: str, folder: Path, result_dict: Dict):
-    """تحميل أصل واحد بشكل شامل"""
+def _download_asset_comprehensive(self, url: str, folder: Path, result_dict: Dict,
+                                  cache_stats: Optional[Dict] = None, budget: Optional[DownloadBudget] = None,
+                                  category: str = 'other', priority: Optional[int] = None):
+    """تحميل أصل واحد بشكل شامل (يُلغى إذا نفدت ميزانية الاستخراج وأولويته منخفضة)"""
+    priority = asset_priority(category) if priority is None else priority
     try:
         folder.mkdir(exist_ok=True, parents=True)
-        response = self.session.get(url, timeout=15, verify=False, stream=True)
-        response.raise_for_status()
-        
-        # تحديد اسم الملف
-        filename = url.split('/')[-1].split('?')[0] or f"asset_{len(result_dict['downloaded'])}"
-        
-        # تحديد الامتداد حسب نوع المحتوى
-        content_type = response.headers.get('content-type', '').lower()
-        if not '.' in filename:
-            if 'image' in content_type:
-                if 'jpeg' in content_type or 'jpg' in content_type:
-                    filename += '.jpg'
-                elif 'png' in content_type:
-                    filename += '.png'
-                elif 'svg' in content_type:
-                    filename += '.svg'
-                elif 'webp' in content_type:
-                    filename += '.webp'
-                else:
-                    filename += '.img'
-            elif 'css' in content_type:
-                filename += '.css'
-            elif 'javascript' in content_type:
-                filename += '.js'
-            elif 'font' in content_type:
-                if 'woff2' in content_type:
-                    filename += '.woff2'
-                elif 'woff' in content_type:
-                    filename += '.woff'
-                elif 'ttf' in content_type:
-                    filename += '.ttf'
-                else:
-                    filename += '.font'
-            elif 'video' in content_type:
-                filename += '.mp4'
-            elif 'audio' in content_type:
-                filename += '.mp3'
-            elif 'pdf' in content_type:
-                filename += '.pdf'
-        
-        file_path = folder / filename
-        
-        # تحميل الملف
-        with open(file_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
-        
-        file_size = file_path.stat().st_size / 1024 / 1024  # MB
-        result_dict['downloaded'].append({
-            'url': url,
-            'file_path': str(file_path),
-            'filename': filename,
-            'size_mb': round(file_size, 3),
-            'content_type': content_type
-        })
-        
+        with open_asset(self.session, url, cache=self.asset_cache, stats=cache_stats, timeout=15, verify=False) as response:
+            # تحديد اسم الملف
+            filename = url.split('/')[-1].split('?')[0] or f"asset_{len(result_dict['downloaded'])}"
+        
+            # تحديد الامتداد حسب نوع المحتوى
+            content_type = response.headers.get('content-type', '').lower()
+            if not '.' in filename:
+                if 'image' in content_type:
+                    if 'jpeg' in content_type or 'jpg' in content_type:
+                        filename += '.jpg'
+                    elif 'png' in content_type:
+                        filename += '.png'
+                    elif 'svg' in content_type:
+                        filename += '.svg'
+                    elif 'webp' in content_type:
+                        filename += '.webp'
+                    else:
+                        filename += '.img'
+                elif 'css' in content_type:
+                    filename += '.css'
+                elif 'javascript' in content_type:
+                    filename += '.js'
+                elif 'font' in content_type:
+                    if 'woff2' in content_type:
+                        filename += '.woff2'
+                    elif 'woff' in content_type:
+                        filename += '.woff'
+                    elif 'ttf' in content_type:
+                        filename += '.ttf'
+                    else:
+                        filename += '.font'
+                elif 'video' in content_type:
+                    filename += '.mp4'
+                elif 'audio' in content_type:
+                    filename += '.mp3'
+                elif 'pdf' in content_type:
+                    filename += '.pdf'
+        
+            file_path = folder / filename
+            
+            chunks = response.iter_content(chunk_size=8192)
+            if budget is not None:
+                content_length = response.headers.get('Content-Length', '')
+                budget.expect(int(content_length) if content_length.isdigit() else None, url, category, priority)
+                chunks = budget.track(chunks, url, category, priority)
+        
+            # تحميل الملف إلى مخزن الأصول (الملفات المكررة بين عمليات الاستخراج لا تُكتب مرة أخرى)
+            stored = self.blob_store.save_stream(chunks, file_path, owner=folder.parent.parent)
+        
+            file_size = stored['size'] / 1024 / 1024  # MB
+            result_dict['downloaded'].append({
+                'url': url,
+                'file_path': str(stored['path']),
+                'filename': filename,
+                'size_mb': round(file_size, 3),
+                'content_type': content_type,
+                'sha256': stored['sha256'],
+                'deduplicated': stored['deduplicated']
+            })
+
+    except BudgetExceeded as e:
+        result_dict.setdefault('skipped', []).append({'url': url, 'reason': 'budget', 'error': str(e)})
     except Exception as e:
+        # الفشل لغير الميزانية يعيد المكان المحجوز
+        if budget is not None:
+            budget.release()
         result_dict['failed'].append({'url': url, 'error': str(e)})
 
+AdvancedWebsiteExtractor._download_asset_comprehensive = _download_asset_comprehensive
+
 # الآن سأضيف الوظائف المفقودة مباشرة إلى الكلاس
 def add_missing_methods_to_extractor():
     """إضافة الوظائف المفقودة إلى كلاس AdvancedWebsiteExtractor"""
@@ -7061,98 +7640,195 @@ def add_comprehensive_methods():
         
         return security_result
     
-    def _crawl_internal_links(self, start_url: str, base_folder: Path, max_depth: int = 3, max_pages: int = 50) -> Dict[str, Any]:
-        """زحف شامل للروابط الداخلية"""
-        crawl_result = {
-            'pages_crawled': 0,
-            'total_links_found': 0,
-            'crawl_map': {},
-            'assets_found': {'images': 0, 'css': 0, 'js': 0},
-            'forms_found': 0,
-            'errors': []
-        }
-        
-        visited_urls = set()
-        urls_to_visit = [(start_url, 0)]  # (url, depth)
-        crawled_folder = base_folder / '08_crawled_pages'
-        crawled_folder.mkdir(exist_ok=True, parents=True)
-        
-        base_domain = urlparse(start_url).netloc
+    def _crawl_internal_links(self, start_url: str, base_folder: Path, max_depth: int = 3, max_pages: int = 50,
+                              crawl_id: Optional[str] = None, resumable: bool = False,
+                              scorer: Optional[CrawlScorerFunc] = None) -> Dict[str, Any]:
+        """زحف شامل للروابط الداخلية (resumable لحفظ الحالة، crawl_id لاستئناف زحف محفوظ)"""
+        site_crawl = self._crawl_site(start_url, base_folder / '08_crawled_pages', max_depth=max_depth,
+                                      max_pages=max_pages, crawl_id=crawl_id, resumable=resumable,
+                                      store_config={'base_folder': str(base_folder)}, scorer=scorer)
+        return site_crawl.to_crawl_results()
+    
+    def _crawl_site(self, start_url: str, pages_folder: Path, max_depth: int = 3, max_pages: int = 50,
+                    crawl_id: Optional[str] = None, resumable: bool = False, seed_response=None,
+                    store_config: Optional[Dict[str, Any]] = None, timeout: float = 15,
+                    detect_duplicates: bool = True, scorer: Optional[CrawlScorerFunc] = None,
+                    seed_sitemap: bool = False, fetched_urls: Iterable[str] = ()) -> SiteCrawl:
+        """زحف الموقع مرة واحدة وحفظ كل صفحة مرة واحدة (seed_response: الصفحة الأولى المجلوبة مسبقاً)
+        
+        detect_duplicates: الصفحات شبه المكررة (SimHash) لا تُحفظ ولا تُتبع روابطها ولا تُحسب من max_pages
+        scorer: دالة أولوية الروابط (الافتراضي CrawlScorer): max_pages يذهب للصفحات الأعلى قيمة أولاً
+        seed_sitemap: إضافة روابط sitemap للانتظار قبل الزحف (priority و lastmod تدخل في الأولوية)
+        fetched_urls: روابط جلبتها مرحلة سابقة (مثل الأصول والمستندات) فلا يعيد الزاحف جلبها
+        """
+        pages_folder.mkdir(exist_ok=True, parents=True)
+        scorer = scorer or CrawlScorer()
+        resuming = bool(crawl_id)
+        
+        crawl_store = None
+        if crawl_id:
+            crawl_store = self._get_crawl_store()
+            crawl_store.prepare_resume(crawl_id)
+            urls_to_visit = crawl_store.frontier(crawl_id, scorer)
+        elif resumable:
+            crawl_store = self._get_crawl_store()
+            crawl_id = crawl_store.create_crawl(
+                start_url, 'internal_links',
+                dict(store_config or {}, max_depth=max_depth, max_pages=max_pages),
+                str(pages_folder)
+            )
+            urls_to_visit = crawl_store.frontier(crawl_id, scorer)
+            urls_to_visit.add(start_url, depth=0)
+        else:
+            urls_to_visit = CrawlFrontier(scorer=scorer)
+            urls_to_visit.add(start_url, depth=0)
+        
+        site_crawl = SiteCrawl(start_url, pages_folder, crawl_id)
+        pages_crawled = crawl_store.count_pages(crawl_id) if crawl_store else 0
+        duplicates_found = crawl_store.count_pages(crawl_id, 'duplicate') if crawl_store else 0
+        
+        duplicate_index = NearDuplicateIndex() if detect_duplicates else None
+        if duplicate_index and crawl_id:
+            # بصمات الصفحات المحفوظة من الجلسات السابقة
+            for page_url, page_info in crawl_store.iter_page_results(crawl_id):
+                if page_info.get('simhash') is not None:
+                    duplicate_index.add(page_url, page_info['simhash'])
+        
+        start_canonical = canonicalize_url(start_url) or start_url
+        base_domain = urlparse(start_canonical).netloc
+        # الأصول المحملة مسبقاً لا تُجلب مرة ثانية (الروابط في قائمة الزحف قانونية)
+        already_fetched = {canonicalize_url(fetched_url) for fetched_url in fetched_urls} - {None, start_canonical}
+        robots = self._get_robots_rules(start_url)
+        user_agent = self.session.headers.get('User-Agent', '*')
+        delay = max(1.0, robots.crawl_delay(user_agent) or 0)
+        if seed_sitemap and not resuming:
+            self._seed_frontier_from_sitemap(urls_to_visit, start_canonical, base_domain, robots, timeout,
+                                             max_urls=max_pages * 20)
         
-        while urls_to_visit and crawl_result['pages_crawled'] < max_pages:
-            current_url, depth = urls_to_visit.pop(0)
+        try:
+            # المكررات لا تستهلك حد الصفحات، لكن لها حد مماثل حتى لا يدور الزحف بلا نهاية
+            while urls_to_visit and pages_crawled < max_pages and duplicates_found < max_pages:
+                current_item = urls_to_visit.pop()
+                current_url, depth = current_item['url'], current_item['depth']
             
-            if current_url in visited_urls or depth > max_depth:
-                continue
-                
-            try:
-                print(f"🕷️ زحف الصفحة: {current_url} (عمق: {depth})")
-                response = self.session.get(current_url, timeout=15, verify=False)
-                response.raise_for_status()
-                
-                soup = BeautifulSoup(response.text, 'html.parser')
-                visited_urls.add(current_url)
+                if depth > max_depth or not robots.can_fetch(current_url, user_agent):
+                    continue
+                if current_url in already_fetched:
+                    continue
+                if duplicate_index and depth > 0 and duplicate_index.is_suppressed(current_url):
+                    continue
                 
-                # حفظ الصفحة
-                page_filename = f"page_{crawl_result['pages_crawled'] + 1}_{urlparse(current_url).path.replace('/', '_')}.html"
-                page_file = crawled_folder / page_filename
-                with open(page_file, 'w', encoding='utf-8') as f:
-                    f.write(response.text)
+                try:
+                    # الصفحة الأولى جُلبت في مرحلة سابقة فلا تُجلب مرة أخرى
+                    if seed_response is not None and current_url == start_canonical:
+                        response, seed_response = seed_response, None
+                        fetched = False
+                    else:
+                        print(f"🕷️ زحف الصفحة: {current_url} (عمق: {depth})")
+                        response = self.session.get(current_url, timeout=timeout, verify=False)
+                        response.raise_for_status()
+                        site_crawl.fetches += 1
+                        fetched = True
+                    if not fetched:
+                        # صفحة خطأ من سلسلة التجاوز (403/503 بمحتوى) لا تُحفظ كصفحة مزحوفة
+                        response.raise_for_status()
+                    content_type = response.headers.get('Content-Type', '')
+                    if content_type and 'html' not in content_type.lower():
+                        # ملف غير HTML (مستند أو أصل) ليس صفحة: لا يُحفظ ولا تُستخرج روابطه
+                        if fetched:
+                            time.sleep(delay)
+                        continue
                 
-                # تحليل الصفحة
-                page_info = {
-                    'title': soup.find('title').get_text().strip() if soup.find('title') else '',
-                    'depth': depth,
-                    'file_path': str(page_file),
-                    'links': [],
-                    'assets': {'images': 0, 'css': 0, 'js': 0},
-                    'forms': len(soup.find_all('form'))
-                }
+                    # مسار سريع: الروابط والعنوان وعدد الأصول دون شجرة BeautifulSoup
+                    page_links = extract_links(response.text, current_url, base_domain,
+                                               with_text=duplicate_index is not None)
+                    
+                    # الصفحة شبه المكررة لا تُحلل ولا تُحفظ ولا تُتبع روابطها
+                    fingerprint = None
+                    if duplicate_index:
+                        original_url, fingerprint = duplicate_index.check_text(current_url, page_links.text)
+                        if original_url:
+                            print(f"♊ صفحة شبه مكررة: {current_url} ← {original_url}")
+                            site_crawl.add_duplicate(current_url, original_url)
+                            duplicates_found += 1
+                            if crawl_store:
+                                crawl_store.record_page(crawl_id, current_url, 'duplicate', response.status_code,
+                                                        response.content, {'url': current_url, 'depth': depth,
+                                                                           'duplicate_of': original_url})
+                            if fetched:
+                                time.sleep(delay)
+                            continue
                 
-                # استخراج الروابط الداخلية
-                for link in soup.find_all('a', href=True):
-                    href = link.get('href')
-                    if href:
-                        full_url = urljoin(current_url, href)
-                        parsed_url = urlparse(full_url)
-                        
-                        # روابط داخلية فقط
-                        if parsed_url.netloc == base_domain and full_url not in visited_urls:
-                            page_info['links'].append(full_url)
-                            crawl_result['total_links_found'] += 1
-                            
-                            if depth < max_depth:
-                                urls_to_visit.append((full_url, depth + 1))
+                    # حفظ الصفحة
+                    page_filename = f"page_{pages_crawled + 1}_{urlparse(current_url).path.replace('/', '_')}.html"
+                    page_file = pages_folder / page_filename
+                    with open(page_file, 'w', encoding='utf-8') as f:
+                        f.write(response.text)
                 
-                # إحصاء الأصول
-                page_info['assets']['images'] = len(soup.find_all('img'))
-                page_info['assets']['css'] = len(soup.find_all('link', rel='stylesheet'))
-                page_info['assets']['js'] = len(soup.find_all('script', src=True))
+                    # تحليل الصفحة
+                    page = CrawledPage(
+                        url=current_url,
+                        depth=depth,
+                        title=page_links.title,
+                        status_code=response.status_code,
+                        file_path=str(page_file),
+                        links=page_links.urls,
+                        external_links=page_links.external_links,
+                        assets=page_links.assets,
+                        forms=page_links.forms,
+                        lastmod=self._http_date_to_lastmod(response.headers.get('Last-Modified')),
+                        simhash=fingerprint
+                    )
                 
-                # تحديث الإحصائيات الإجمالية
-                for asset_type in page_info['assets']:
-                    crawl_result['assets_found'][asset_type] += page_info['assets'][asset_type]
+                    # إضافة الروابط الداخلية للزحف
+                    if depth < max_depth:
+                        for full_url in page.links:
+                            # الأنماط التي تنتج مكررات تتأخر في قائمة الزحف
+                            priority = duplicate_index.priority(full_url) if duplicate_index else 0.0
+                            urls_to_visit.add(full_url, depth=depth + 1, priority=priority)
                 
-                crawl_result['forms_found'] += page_info['forms']
-                crawl_result['crawl_map'][current_url] = page_info
-                crawl_result['pages_crawled'] += 1
+                    if crawl_store:
+                        crawl_store.record_page(crawl_id, current_url, 'done', response.status_code,
+                                                response.content, page.to_dict())
+                    else:
+                        site_crawl.add_page(page)
+                    pages_crawled += 1
                 
-                # تأخير بين الطلبات
-                time.sleep(1)
+                    # تأخير بين الطلبات (لا يقل عن Crawl-delay)
+                    if fetched:
+                        time.sleep(delay)
                 
-            except Exception as e:
-                crawl_result['errors'].append({
-                    'url': current_url,
-                    'error': str(e),
-                    'depth': depth
-                })
+                except Exception as e:
+                    site_crawl.add_error(current_url, str(e), depth)
+                    if crawl_store:
+                        crawl_store.record_page(crawl_id, current_url, 'failed', result=site_crawl.errors[-1])
+        
+        except BaseException:
+            # حفظ التقدم قبل الخروج
+            if crawl_store:
+                crawl_store.checkpoint(crawl_id, 'interrupted')
+            raise
+        
+        if crawl_store:
+            crawl_store.finish_crawl(crawl_id)
+            # النتيجة تُقرأ من القرص على دفعات (تشمل صفحات الجلسات السابقة) دون تحميلها في الذاكرة
+            site_crawl.attach_store(crawl_store, crawl_id)
         
         # حفظ خريطة الزحف
-        crawl_map_file = crawled_folder / 'crawl_map.json'
-        with open(crawl_map_file, 'w', encoding='utf-8') as f:
-            json.dump(crawl_result, f, ensure_ascii=False, indent=2)
+        site_crawl.save_map()
         
-        return crawl_result
+        return site_crawl
+    
+    @staticmethod
+    def _http_date_to_lastmod(value: Optional[str]) -> Optional[str]:
+        """تحويل Last-Modified إلى صيغة lastmod (YYYY-MM-DD)"""
+        if not value:
+            return None
+        try:
+            from email.utils import parsedate_to_datetime
+            return parsedate_to_datetime(value).strftime("%Y-%m-%d")
+        except (TypeError, ValueError):
+            return None
     
     def _extract_ajax_content(self, url: str, soup: BeautifulSoup, base_folder: Path) -> Dict[str, Any]:
         """استخراج المحتوى من AJAX والـXHR"""
@@ -7335,6 +8011,8 @@ def add_comprehensive_methods():
     AdvancedWebsiteExtractor._detect_comprehensive_cms = _detect_comprehensive_cms
     AdvancedWebsiteExtractor._comprehensive_security_test = _comprehensive_security_test
     AdvancedWebsiteExtractor._crawl_internal_links = _crawl_internal_links
+    AdvancedWebsiteExtractor._crawl_site = _crawl_site
+    AdvancedWebsiteExtractor._http_date_to_lastmod = _http_date_to_lastmod
     AdvancedWebsiteExtractor._extract_ajax_content = _extract_ajax_content
     AdvancedWebsiteExtractor._save_comprehensive_report = _save_comprehensive_report
     AdvancedWebsiteExtractor._generate_html_report = _generate_html_report
@@ -7370,8 +8048,9 @@ def add_basic_helper_methods():
         
         return list(set(endpoints))
     
-    def _generate_comprehensive_sitemap(self, url: str, base_folder: Path) -> Dict[str, Any]:
-        """إنشاء خريطة شاملة للموقع"""
+    def _generate_comprehensive_sitemap(self, url: str, base_folder: Path,
+                                        site_crawl: Optional[SiteCrawl] = None) -> Dict[str, Any]:
+        """إنشاء خريطة شاملة للموقع (من sitemap المنشورة ومن نتيجة الزحف إن وُجدت)"""
         sitemap_info = {
             'main_url': url,
             'pages': [],
@@ -7380,38 +8059,37 @@ def add_basic_helper_methods():
         }
         
         try:
-            # محاولة الحصول على sitemap.xml
-            sitemap_url = urljoin(url, '/sitemap.xml')
+            # قراءة sitemap المعلنة في robots.txt والمسارات المعروفة (مع الفهارس و gzip)
             try:
-                response = self.session.get(sitemap_url, timeout=10, verify=False)
-                if response.status_code == 200:
-                    sitemap_content = response.text
-                    sitemap_file = base_folder / '06_sitemap' / 'sitemap.xml'
-                    sitemap_file.parent.mkdir(exist_ok=True, parents=True)
-                    with open(sitemap_file, 'w', encoding='utf-8') as f:
-                        f.write(sitemap_content)
-                    
-                    # تحليل sitemap.xml
-                    from bs4 import BeautifulSoup
-                    sitemap_soup = BeautifulSoup(sitemap_content, 'xml')
-                    urls = sitemap_soup.find_all('url')
-                    
-                    for url_elem in urls:
-                        loc = url_elem.find('loc')
-                        if loc:
-                            sitemap_info['pages'].append({
-                                'url': loc.get_text(),
-                                'lastmod': url_elem.find('lastmod').get_text() if url_elem.find('lastmod') else None,
-                                'priority': url_elem.find('priority').get_text() if url_elem.find('priority') else None
-                            })
-                    
-                    sitemap_info['total_pages'] = len(sitemap_info['pages'])
-                    sitemap_info['sitemap_found'] = True
+                ingestor = SitemapIngestor(self.session, timeout=10, verify=False)
+                sitemap_pages = sitemap_info['pages']
+                analysis = ingestor.ingest(url, on_url=lambda entry: sitemap_pages.append({
+                    'url': entry['url'],
+                    'lastmod': entry['lastmod'],
+                    'priority': entry['priority']
+                }), robots_sitemaps=self._get_robots_rules(url).sitemap_urls)
+                
+                sitemap_info['sitemaps'] = analysis['sitemaps_found']
+                sitemap_info['total_pages'] = len(sitemap_info['pages'])
+                sitemap_info['sitemap_found'] = bool(analysis['sitemaps_found'])
+                if not sitemap_info['sitemap_found']:
+                    sitemap_info['note'] = 'لم يتم العثور على sitemap.xml'
                     
-            except:
+            except Exception:
                 sitemap_info['sitemap_found'] = False
                 sitemap_info['note'] = 'لم يتم العثور على sitemap.xml'
             
+            # دمج الصفحات المزحوفة وكتابة sitemap.xml مولّد منها
+            if site_crawl is not None:
+                known_urls = {page['url'] for page in sitemap_info['pages']}
+                for entry in site_crawl.sitemap_entries():
+                    if entry['url'] not in known_urls:
+                        sitemap_info['pages'].append(dict(entry, source='crawl'))
+                sitemap_info['total_pages'] = len(sitemap_info['pages'])
+                sitemap_info['generated_sitemap'] = str(
+                    site_crawl.write_xml_sitemap(base_folder / '06_sitemap' / 'sitemap.xml')
+                )
+            
             # حفظ معلومات sitemap
             sitemap_json = base_folder / '06_sitemap' / 'sitemap_info.json'
             sitemap_json.parent.mkdir(exist_ok=True, parents=True)
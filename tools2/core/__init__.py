@@ -14,6 +14,28 @@ try:
     from .ai_analyzer import BasicAIAnalyzer
     from .spider_engine import AdvancedSpiderEngine, SpiderConfig
     from .extractor_engine import AdvancedExtractorEngine
+    from .fetch_deadline import FetchDeadline, DeadlineExceeded
+    from .strategy_store import DomainStrategyStore, get_strategy_store
+    from .scraper_pool import ScraperSessionPool, get_scraper_pool
+    from .crawl_frontier import CrawlFrontier, BloomFilter, canonicalize_url
+    from .crawl_scoring import CrawlScorer, url_template
+    from .crawl_store import CrawlStore, PersistentCrawlFrontier
+    from .sitemap_ingestor import SitemapIngestor
+    from .robots_cache import RobotsCache, RobotsRules, get_robots_cache
+    from .site_crawl import SiteCrawl, CrawledPage
+    from .near_duplicates import NearDuplicateIndex, simhash, visible_text
+    from .change_monitor import ChangeMonitor, MonitorStore
+    from .parse_pipeline import ParsePipeline, FetchedPage
+    from .link_extractor import extract_links, PageLinks
+    from .link_graph import LinkGraph
+    from .host_scheduler import HostScheduler, ScheduledHTTPAdapter, get_host_scheduler, job_scope
+    from .blob_store import BlobStore, get_blob_store, detach_view
+    from .asset_cache import AssetCache, get_asset_cache
+    from .css_resolver import find_css_references, localize_css, localize_html
+    from .responsive_images import ImagePolicy, select_page_images
+    from .ranged_download import RangedDownloader, DownloadTooLarge
+    from .download_budget import DownloadBudget, BudgetExceeded
+    from .image_probe import probe_image, probe_images, parse_image_header
     
     __all__ = [
         'ExtractionConfig',
@@ -26,7 +48,57 @@ try:
         'BasicAIAnalyzer',
         'AdvancedSpiderEngine',
         'SpiderConfig',
-        'AdvancedExtractorEngine'
+        'AdvancedExtractorEngine',
+        'FetchDeadline',
+        'DeadlineExceeded',
+        'DomainStrategyStore',
+        'get_strategy_store',
+        'ScraperSessionPool',
+        'get_scraper_pool',
+        'CrawlFrontier',
+        'BloomFilter',
+        'canonicalize_url',
+        'CrawlScorer',
+        'url_template',
+        'CrawlStore',
+        'PersistentCrawlFrontier',
+        'SitemapIngestor',
+        'RobotsCache',
+        'RobotsRules',
+        'get_robots_cache',
+        'SiteCrawl',
+        'CrawledPage',
+        'NearDuplicateIndex',
+        'simhash',
+        'visible_text',
+        'ChangeMonitor',
+        'MonitorStore',
+        'ParsePipeline',
+        'FetchedPage',
+        'extract_links',
+        'PageLinks',
+        'LinkGraph',
+        'HostScheduler',
+        'ScheduledHTTPAdapter',
+        'get_host_scheduler',
+        'job_scope',
+        'BlobStore',
+        'get_blob_store',
+        'detach_view',
+        'AssetCache',
+        'get_asset_cache',
+        'find_css_references',
+        'localize_css',
+        'localize_html',
+        'ImagePolicy',
+        'select_page_images',
+        'RangedDownloader',
+        'DownloadTooLarge',
+        'DownloadBudget',
+        'BudgetExceeded',
+        'probe_image',
+        'probe_images',
+        'parse_image_header'
     ]
     
 except ImportError as e:
@@ -0,0 +1,314 @@
+"""
+ذاكرة تخزين مؤقت دائمة للأصول بين عمليات الاستخراج
+Persistent Cross-Run HTTP Asset Cache
+"""
+
+import time
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from .blob_store import BlobStore
+
+
+DEFAULT_CACHE_BYTES = 512 * 1024 * 1024
+
+# الحد الأعلى للصلاحية التقديرية من Last-Modified عند غياب Cache-Control/Expires
+MAX_HEURISTIC_LIFETIME = 24 * 3600
+
+CACHE_OWNER = 'asset_cache'
+
+
+def new_cache_stats() -> Dict[str, Any]:
+    """عدادات الذاكرة المؤقتة لعملية استخراج واحدة"""
+    return {'hits': 0, 'revalidated': 0, 'misses': 0, 'stored': 0, 'bytes_saved': 0, 'hit_rate': 0.0}
+
+
+def parse_cache_control(value: Optional[str]) -> Dict[str, Optional[str]]:
+    """توجيهات Cache-Control كقاموس (القيمة None للتوجيهات بدون قيمة)"""
+    directives = {}
+    for part in (value or '').split(','):
+        name, _, argument = part.strip().partition('=')
+        if name:
+            directives[name.lower()] = argument.strip('"') or None
+    return directives
+
+
+def _http_date(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def freshness(headers, now: Optional[float] = None) -> Tuple[bool, float]:
+    """(قابل للتخزين، موعد انتهاء الصلاحية) حسب Cache-Control ثم Expires ثم تقدير Last-Modified"""
+    now = now or time.time()
+    directives = parse_cache_control(headers.get('Cache-Control'))
+    if 'no-store' in directives or headers.get('Vary', '').strip() == '*':
+        return False, 0.0
+
+    date = _http_date(headers.get('Date')) or now
+    age_header = str(headers.get('Age') or '0')
+    age = float(age_header) if age_header.isdigit() else 0.0
+    if 'no-cache' in directives:
+        lifetime = 0.0
+    elif (directives.get('max-age') or '').isdigit():
+        lifetime = float(directives['max-age'])
+    elif headers.get('Expires'):
+        expires = _http_date(headers.get('Expires'))
+        lifetime = max(0.0, expires - date) if expires else 0.0
+    elif headers.get('Last-Modified'):
+        modified = _http_date(headers.get('Last-Modified'))
+        lifetime = min(MAX_HEURISTIC_LIFETIME, max(0.0, (date - modified) * 0.1)) if modified else 0.0
+    else:
+        lifetime = 0.0
+
+    expires_at = now + max(0.0, lifetime - age)
+    # نسخة منتهية تبقى مفيدة إذا أمكن التحقق منها بطلب شرطي
+    storable = expires_at > now or bool(headers.get('ETag') or headers.get('Last-Modified'))
+    return storable, expires_at
+
+
+class AssetResponse:
+    """استجابة أصل موحدة: من الشبكة أو من الذاكرة المؤقتة بنفس الواجهة (headers و iter_content)"""
+
+    def __init__(self, url: str, headers, status_code: int = 200, response: Optional[requests.Response] = None,
+                 blob_path=None, from_cache: Optional[str] = None):
+        self.url = url
+        self.headers = CaseInsensitiveDict(headers)
+        self.status_code = status_code
+        self.from_cache = from_cache
+        self.encoding = response.encoding if response is not None else get_encoding_from_headers(self.headers)
+        self._response = response
+        self._blob_path = blob_path
+        self._hasher = hashlib.sha256()
+        self.size = 0
+        self.complete = False
+
+    def iter_content(self, chunk_size: int = 65536) -> Iterator[bytes]:
+        if self._response is None:
+            with open(self._blob_path, 'rb') as f:
+                while True:
+                    chunk = f.read(chunk_size)
+                    if not chunk:
+                        break
+                    self.size += len(chunk)
+                    yield chunk
+            self.complete = True
+            return
+        for chunk in self._response.iter_content(chunk_size=chunk_size):
+            # sha256 أثناء القراءة ليُربط الإدخال بالجسم المحفوظ في مخزن الأصول
+            self._hasher.update(chunk)
+            self.size += len(chunk)
+            yield chunk
+        self.complete = True
+
+    @property
+    def digest(self) -> str:
+        return self._hasher.hexdigest()
+
+    def raise_for_status(self):
+        if self._response is not None:
+            self._response.raise_for_status()
+
+
+class AssetCache:
+    """ذاكرة مؤقتة مفتاحها الرابط المطلق، تحترم Cache-Control/ETag، وأجسامها في مخزن الأصول بحد حجم LRU"""
+
+    def __init__(self, blob_store: BlobStore, max_bytes: int = DEFAULT_CACHE_BYTES):
+        self.blob_store = blob_store
+        self.max_bytes = max(0, max_bytes)
+        self._lock = threading.RLock()
+        self.stats = new_cache_stats()
+
+        self.db_connection = sqlite3.connect(str(blob_store.root / 'asset_cache.db'), check_same_thread=False)
+        self.db_connection.execute('PRAGMA journal_mode=WAL')
+        self.db_connection.executescript('''
+            CREATE TABLE IF NOT EXISTS entries (
+                url TEXT PRIMARY KEY,
+                digest TEXT,
+                size INTEGER,
+                content_type TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                expires_at REAL,
+                stored_at REAL,
+                last_access REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_entries_access ON entries (last_access);
+        ''')
+        self.db_connection.commit()
+
+    # ---------- الإدخالات ----------
+
+    def lookup(self, url: str) -> Optional[Dict[str, Any]]:
+        """إدخال الرابط إذا كان جسمه ما زال في مخزن الأصول"""
+        with self._lock:
+            row = self.db_connection.execute('''
+                SELECT url, digest, size, content_type, etag, last_modified, expires_at
+                FROM entries WHERE url = ?
+            ''', (url,)).fetchone()
+        if not row:
+            return None
+        entry = dict(zip(('url', 'digest', 'size', 'content_type', 'etag', 'last_modified', 'expires_at'), row))
+        if not self.blob_store.has(entry['digest']):
+            self.invalidate(url)
+            return None
+        return entry
+
+    def store(self, url: str, headers, digest: str, size: int) -> bool:
+        """تسجيل جسم محفوظ في مخزن الأصول كإدخال للرابط؛ False إذا منعت الترويسات التخزين"""
+        storable, expires_at = freshness(headers)
+        if not storable or not self.max_bytes or size > self.max_bytes or not self.blob_store.has(digest):
+            return False
+        now = time.time()
+        # مرجع للذاكرة المؤقتة في مخزن الأصول حتى لا يحذف تنظيفه الجسم ما دام الإدخال موجوداً
+        self.blob_store.add_view(digest, f"cache:{url}", owner=CACHE_OWNER, mode='cache')
+        with self._lock:
+            self.db_connection.execute('''
+                INSERT OR REPLACE INTO entries
+                (url, digest, size, content_type, etag, last_modified, expires_at, stored_at, last_access)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (url, digest, size, headers.get('Content-Type', ''), headers.get('ETag'),
+                  headers.get('Last-Modified'), expires_at, now, now))
+            self.db_connection.commit()
+        self._evict()
+        return True
+
+    def invalidate(self, url: str):
+        with self._lock:
+            self.db_connection.execute('DELETE FROM entries WHERE url = ?', (url,))
+            self.db_connection.commit()
+        self.blob_store.release(f"cache:{url}")
+
+    def _touch(self, url: str, expires_at: Optional[float] = None):
+        with self._lock:
+            if expires_at is None:
+                self.db_connection.execute('UPDATE entries SET last_access = ? WHERE url = ?', (time.time(), url))
+            else:
+                self.db_connection.execute('UPDATE entries SET last_access = ?, expires_at = ? WHERE url = ?',
+                                           (time.time(), expires_at, url))
+            self.db_connection.commit()
+
+    def _evict(self):
+        """حذف الأقدم استخداماً حتى يعود الحجم الكلي تحت الحد"""
+        with self._lock:
+            total = self.db_connection.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            victims = []
+            for url, size in self.db_connection.execute('SELECT url, size FROM entries ORDER BY last_access'):
+                if total <= self.max_bytes:
+                    break
+                victims.append(url)
+                total -= size or 0
+        for url in victims:
+            self.invalidate(url)
+
+    def _record(self, stats: Optional[Dict[str, Any]], outcome: str, size: int = 0):
+        targets = [self.stats] + ([stats] if stats is not None else [])
+        with self._lock:
+            for counters in targets:
+                counters[outcome] += 1
+                if outcome in ('hits', 'revalidated'):
+                    counters['bytes_saved'] += size
+                lookups = counters['hits'] + counters['revalidated'] + counters['misses']
+                counters['hit_rate'] = round((counters['hits'] + counters['revalidated']) / max(lookups, 1) * 100, 1)
+
+    # ---------- الجلب ----------
+
+    @contextmanager
+    def fetch(self, session: requests.Session, url: str, stats: Optional[Dict[str, Any]] = None,
+              **request_kwargs) -> Iterator[AssetResponse]:
+        """جلب أصل عبر الذاكرة المؤقتة: إدخال صالح بلا شبكة، منتهٍ بطلب شرطي، وإلا طلب عادي يُخزن بعد حفظه"""
+        entry = self.lookup(url)
+        if entry and entry['expires_at'] > time.time():
+            self._touch(url)
+            self._record(stats, 'hits', entry['size'])
+            yield self._cached_response(entry, 'hit')
+            return
+
+        headers = dict(request_kwargs.pop('headers', None) or {})
+        if entry:
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                headers['If-Modified-Since'] = entry['last_modified']
+        request_kwargs['stream'] = True
+
+        with session.get(url, headers=headers, **request_kwargs) as response:
+            if entry and response.status_code == 304:
+                _, expires_at = freshness(response.headers)
+                self._touch(url, expires_at)
+                self._record(stats, 'revalidated', entry['size'])
+                yield self._cached_response(entry, 'revalidated')
+                return
+
+            response.raise_for_status()
+            self._record(stats, 'misses')
+            asset = AssetResponse(url, response.headers, response.status_code, response=response)
+            yield asset
+            # المستدعي حفظ الجسم كاملاً في مخزن الأصول: يصبح إدخالاً للمرات القادمة
+            if asset.complete and self.store(url, response.headers, asset.digest, asset.size):
+                with self._lock:
+                    self.stats['stored'] += 1
+                    if stats is not None:
+                        stats['stored'] += 1
+
+    def _cached_response(self, entry: Dict[str, Any], outcome: str) -> AssetResponse:
+        headers = {'Content-Type': entry['content_type'] or '', 'Content-Length': str(entry['size'])}
+        if entry['etag']:
+            headers['ETag'] = entry['etag']
+        if entry['last_modified']:
+            headers['Last-Modified'] = entry['last_modified']
+        return AssetResponse(entry['url'], headers, blob_path=self.blob_store.blob_path(entry['digest']),
+                             from_cache=outcome)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """عدادات العملية وحجم الذاكرة المؤقتة الحالي"""
+        with self._lock:
+            entries, total = self.db_connection.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries').fetchone()
+            return {**self.stats, 'entries': entries, 'size_bytes': total, 'max_bytes': self.max_bytes}
+
+    def close(self):
+        with self._lock:
+            self.db_connection.close()
+
+
+@contextmanager
+def open_asset(session: requests.Session, url: str, cache: Optional[AssetCache] = None,
+               stats: Optional[Dict[str, Any]] = None, **request_kwargs) -> Iterator[AssetResponse]:
+    """نقطة دخول موحدة لمنزلي الأصول: عبر الذاكرة المؤقتة إن وُجدت وإلا طلب GET متدفق مباشر"""
+    if cache is not None:
+        with cache.fetch(session, url, stats=stats, **request_kwargs) as asset:
+            yield asset
+        return
+    request_kwargs['stream'] = True
+    with session.get(url, **request_kwargs) as response:
+        response.raise_for_status()
+        yield AssetResponse(url, response.headers, response.status_code, response=response)
+
+
+_caches: Dict[str, AssetCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_asset_cache(blob_store: BlobStore, max_bytes: int = DEFAULT_CACHE_BYTES) -> AssetCache:
+    """ذاكرة مؤقتة مشتركة على مستوى العملية لكل مخزن أصول"""
+    key = str(blob_store.root.resolve())
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = _caches[key] = AssetCache(blob_store, max_bytes)
+        return cache
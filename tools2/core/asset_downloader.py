@@ -4,26 +4,81 @@ Advanced Asset Downloader
 """
 
 import os
+import time
+import heapq
+import threading
 import mimetypes
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from contextlib import contextmanager
+from dataclasses import dataclass
 from pathlib import Path
 from urllib.parse import urljoin, urlparse
-from typing import Dict, List, Any, Optional, Set
+from typing import Callable, Dict, Iterator, List, Any, Optional, Set, Tuple
 from bs4 import BeautifulSoup, Tag
 from .config import ExtractionConfig
 from .session_manager import SessionManager
 from .file_manager import FileManager
+from .asset_cache import AssetResponse, get_asset_cache, new_cache_stats, open_asset
+from .css_resolver import MAX_IMPORT_DEPTH, find_css_references, localize_css, resolve_css_url
+from .responsive_images import ImagePolicy, select_page_images
+from .download_budget import BudgetExceeded, DownloadBudget, asset_priority
+
+
+# الحدود الافتراضية لعدد الأصول من كل نوع في الصفحة (css_resources لكل ملف CSS)
+DEFAULT_ASSET_LIMITS = {
+    'images': 20,
+    'css': 10,
+    'js': 10,
+    'fonts': 5,
+    'documents': 3,
+    'css_resources': 100
+}
+
+# الذاكرة لكل تحميل جارٍ محدودة بحجم الجزء وحد ذاكرة مخزن الأصول (ما عدا ملفات CSS التي تُحلل بعد الحفظ)
+ASSET_CHUNK_SIZE = 64 * 1024
+
+DOCUMENT_EXTENSIONS = ('.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx', '.txt', '.zip')
+
+@dataclass
+class AssetTask:
+    """عنصر في قائمة الأصول: الرابط ونوعه والمفتاح الذي يظهر به في النتائج"""
+    url: str
+    category: str
+    url_key: str
+    filename_prefix: str
+    original_url: Optional[str] = None
+    parent: Optional[Dict[str, Any]] = None  # عنصر CSS الذي ورد فيه المورد
+    depth: int = 0  # عمق سلسلة @import
+    imported_by: Optional[str] = None
+    priority: Optional[int] = None  # ترتيب التحميل والإلغاء عند نفاد الميزانية (الأصغر أولاً)
+    
+    def __post_init__(self):
+        if self.priority is None:
+            self.priority = asset_priority(self.category)
 
 
 class AssetDownloader:
-    """منزل أصول متطور وآمن"""
+    """منزل أصول متطور وآمن: قائمة أصول مصنفة ثم تحميل متوازٍ بحدود عامة ولكل نطاق"""
     
     def __init__(self, config: ExtractionConfig, session_manager: SessionManager, file_manager: FileManager):
         self.config = config
         self.session = session_manager
         self.file_manager = file_manager
         self.downloaded_assets = set()
-        
-    def download_all_assets(self, soup: BeautifulSoup, base_url: str, extraction_folder: Path) -> Dict[str, Any]:
+        self.max_workers = max(1, config.concurrent_requests)
+        self.max_per_host = max(1, config.max_downloads_per_host)
+        self.asset_timeout = config.asset_timeout if config.asset_timeout > 0 else config.timeout
+        self.limits = {**DEFAULT_ASSET_LIMITS, **(config.max_assets_per_type or {})}
+        self.image_policy = ImagePolicy(config.image_viewport_width, config.image_dpr, config.image_selection)
+        self.critical_images = config.critical_images
+        self._lock = threading.Lock()
+        self._host_slots: Dict[str, threading.BoundedSemaphore] = {}
+        # ذاكرة مؤقتة مشتركة بين عمليات الاستخراج؛ أجسامها في مخزن الأصول نفسه
+        self.cache = get_asset_cache(file_manager.blob_store, config.asset_cache_mb * 1024 * 1024) \
+            if file_manager.blob_store and config.asset_cache_mb > 0 else None
+        
+    def download_all_assets(self, soup: BeautifulSoup, base_url: str, extraction_folder: Path,
+                            on_result: Optional[Callable[[str, Dict[str, Any]], None]] = None) -> Dict[str, Any]:
         """تحميل جميع الأصول من الصفحة"""
         
         download_results = {
@@ -34,6 +89,7 @@ class AssetDownloader:
             'documents': [],
             'other': [],
             'failed': [],
+            'skipped': [],
             'statistics': {
                 'total_found': 0,
                 'total_downloaded': 0,
@@ -45,455 +101,360 @@ class AssetDownloader:
         if not self.config.extract_assets:
             return download_results
         
-        # تحميل الصور
-        if self.config.extract_images:
-            images_result = self._download_images(soup, base_url, extraction_folder)
-            download_results['images'] = images_result
-        
-        # تحميل ملفات CSS
-        if self.config.extract_css:
-            css_result = self._download_css_files(soup, base_url, extraction_folder)
-            download_results['css'] = css_result
-        
-        # تحميل ملفات JavaScript
-        if self.config.extract_js:
-            js_result = self._download_js_files(soup, base_url, extraction_folder)
-            download_results['js'] = js_result
-        
-        # تحميل الخطوط
-        fonts_result = self._download_fonts(soup, base_url, extraction_folder)
-        download_results['fonts'] = fonts_result
-        
-        # تحميل المستندات
-        documents_result = self._download_documents(soup, base_url, extraction_folder)
-        download_results['documents'] = documents_result
+        started = time.monotonic()
+        cache_stats = new_cache_stats()
+        budget = DownloadBudget.from_config(self.config)
+        manifest = self.build_manifest(soup, base_url)
+        self.download_manifest(manifest, extraction_folder, download_results, on_result, cache_stats, budget)
         
         # تحديث الإحصائيات
         download_results['statistics'] = self._calculate_download_statistics(download_results)
+        download_results['statistics']['elapsed_seconds'] = round(time.monotonic() - started, 3)
+        download_results['statistics']['cache'] = cache_stats
+        download_results['statistics']['budget'] = budget.summary()
         
         return download_results
     
-    def _download_images(self, soup: BeautifulSoup, base_url: str, extraction_folder: Path) -> List[Dict[str, Any]]:
-        """تحميل الصور"""
-        images_result = []
-        images = soup.find_all('img', src=True)
+    def build_manifest(self, soup: BeautifulSoup, base_url: str) -> List[AssetTask]:
+        """بناء قائمة الأصول المصنفة قبل أي تحميل (CSS أولاً لأنها تكشف موارد إضافية)"""
+        manifest = []
+        if self.config.extract_css:
+            manifest += self._collect_css_files(soup, base_url)
+            manifest += self._collect_inline_css(soup, base_url)
+        if self.config.extract_images:
+            manifest += self._collect_images(soup, base_url)
+        if self.config.extract_js:
+            manifest += self._collect_js_files(soup, base_url)
+        manifest += self._collect_fonts(soup, base_url)
+        manifest += self._collect_documents(soup, base_url)
+        return manifest
+    
+    def download_manifest(self, manifest: List[AssetTask], extraction_folder: Path,
+                          download_results: Dict[str, Any],
+                          on_result: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+                          cache_stats: Optional[Dict[str, Any]] = None,
+                          budget: Optional[DownloadBudget] = None) -> Dict[str, Any]:
+        """تحميل قائمة الأصول بمجموعة خيوط حسب الأولوية؛ كل نتيجة تُضاف لبنية النتائج فور انتهائها"""
+        if not manifest:
+            return download_results
         
-        for img in images[:20]:  # أول 20 صورة
-            if not isinstance(img, Tag):
-                continue
-                
-            src = img.get('src')
-            if not src or src.startswith('data:'):
-                continue
-            
-            # تحويل الرابط النسبي إلى مطلق
-            if not src.startswith(('http://', 'https://')):
-                src = urljoin(base_url, src)
-            
-            # تجنب التحميل المكرر
-            if src in self.downloaded_assets:
+        local_paths = download_results.setdefault('local_paths', {})
+        # طابور أولويات بدل إرسال كل المهام للمجموعة: موارد CSS المكتشفة لاحقاً تتقدم على الوسائط المنتظرة
+        queue = []
+        for task in manifest:
+            heapq.heappush(queue, (task.priority, len(queue), task))
+        sequence = len(queue)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            pending = {}
+            while queue or pending:
+                while queue and len(pending) < self.max_workers:
+                    task = heapq.heappop(queue)[2]
+                    pending[pool.submit(self._download_task, task, extraction_folder, cache_stats, budget)] = task
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    task = pending.pop(future)
+                    result, discovered = future.result()
+                    if result['status'] == 'success':
+                        local_paths[task.url] = result['saved_path']
+                    if result['status'] == 'skipped':
+                        download_results['skipped'].append({'category': task.category, **result})
+                    elif task.parent is not None:
+                        task.parent['embedded_resources'].append(result)
+                    else:
+                        download_results[task.category].append(result)
+                    # موارد CSS تدخل نفس المجموعة بدل انتظار انتهاء بقية الأصول
+                    for child in discovered:
+                        heapq.heappush(queue, (child.priority, sequence, child))
+                        sequence += 1
+                    if on_result:
+                        on_result(task.category, result)
+        
+        # كل اعتماديات CSS محملة الآن: الملفات تشير إلى النسخ المحلية
+        self._localize_stylesheets(download_results['css'], local_paths, extraction_folder)
+        return download_results
+    
+    def _localize_stylesheets(self, css_items: List[Dict[str, Any]], local_paths: Dict[str, str],
+                              extraction_folder: Path):
+        """إعادة كتابة مراجع ملفات CSS المحملة إلى مسارات نسبية للأصول المحلية"""
+        for item in css_items:
+            if item.get('status') != 'success':
                 continue
-            
             try:
-                # تحميل الصورة
-                response = self.session.make_request(src)
-                if not response:
-                    images_result.append({
-                        'src': src,
-                        'status': 'failed',
-                        'error': 'فشل في الاتصال'
-                    })
+                saved_path = Path(item['saved_path'])
+                # surrogateescape يحفظ البايتات كما هي مهما كان ترميز الملف
+                css_content = saved_path.read_bytes().decode('utf-8', errors='surrogateescape')
+                localized, replaced = localize_css(css_content, item['href'], local_paths, saved_path.parent)
+                if not replaced:
                     continue
-                
-                # تحديد اسم الملف
-                filename = self._get_filename_from_url(src, 'image')
-                
-                # تحديد نوع الملف
-                content_type = response.headers.get('Content-Type', '')
-                file_extension = self._get_extension_from_content_type(content_type) or self._get_extension_from_url(src)
-                
-                if file_extension and not filename.endswith(file_extension):
-                    filename += file_extension
-                
-                # حفظ الصورة
-                saved_path = self.file_manager.save_asset_file(
-                    response.content, 
-                    extraction_folder, 
-                    filename, 
-                    'images'
-                )
-                
-                if saved_path:
-                    self.downloaded_assets.add(src)
-                    images_result.append({
-                        'src': src,
-                        'saved_path': str(saved_path),
-                        'filename': filename,
-                        'size_bytes': len(response.content),
-                        'content_type': content_type,
-                        'status': 'success'
-                    })
-                else:
-                    images_result.append({
-                        'src': src,
-                        'status': 'failed',
-                        'error': 'فشل في حفظ الملف'
-                    })
-                    
+                # عرض جديد بدل الكتابة فوق الملف: قد يكون رابطاً صلباً لجسم مشترك
+                stored = self.file_manager.save_asset_stream(
+                    [localized.encode('utf-8', errors='surrogateescape')], extraction_folder, item['filename'], 'css')
+                item.update({'saved_path': str(stored['path']), 'size_bytes': stored['size'],
+                             'sha256': stored['sha256'], 'localized_references': replaced})
+                local_paths[item['href']] = item['saved_path']
             except Exception as e:
-                images_result.append({
-                    'src': src,
-                    'status': 'failed',
-                    'error': str(e)
-                })
-        
-        return images_result
+                item['localize_error'] = str(e)
     
-    def _download_css_files(self, soup: BeautifulSoup, base_url: str, extraction_folder: Path) -> List[Dict[str, Any]]:
-        """تحميل ملفات CSS"""
-        css_result = []
-        css_links = soup.find_all('link', rel='stylesheet', href=True)
-        
-        for link in css_links[:10]:  # أول 10 ملفات CSS
+    def _claim(self, url: str) -> bool:
+        """حجز الرابط للتحميل؛ False إذا كان محملاً أو قيد التحميل"""
+        with self._lock:
+            if url in self.downloaded_assets:
+                return False
+            self.downloaded_assets.add(url)
+            return True
+    
+    def _absolute(self, url: str, base_url: str) -> str:
+        if not url.startswith(('http://', 'https://')):
+            return urljoin(base_url, url)
+        return url
+    
+    def _collect_images(self, soup: BeautifulSoup, base_url: str) -> List[AssetTask]:
+        """الصور في الصفحة: مرشح واحد لكل عنصر من srcset/sizes/<picture> وسمات التحميل الكسول"""
+        tasks = []
+        for choice in select_page_images(soup, base_url, self.image_policy)[:self.limits['images']]:
+            if self._claim(choice.url):
+                # الصور الأولى في الصفحة حرجة للعرض مثل CSS
+                tasks.append(AssetTask(choice.url, 'images', 'src', 'image',
+                                       priority=asset_priority('images', len(tasks), self.critical_images)))
+        return tasks
+    
+    def _collect_css_files(self, soup: BeautifulSoup, base_url: str) -> List[AssetTask]:
+        """ملفات CSS"""
+        tasks = []
+        for link in soup.find_all('link', rel='stylesheet', href=True)[:self.limits['css']]:
             if not isinstance(link, Tag):
                 continue
-                
             href = link.get('href')
             if not href:
                 continue
-            
-            # تحويل الرابط النسبي إلى مطلق
-            if not href.startswith(('http://', 'https://')):
-                href = urljoin(base_url, href)
-            
-            # تجنب التحميل المكرر
-            if href in self.downloaded_assets:
-                continue
-            
-            try:
-                response = self.session.make_request(href)
-                if not response:
-                    css_result.append({
-                        'href': href,
-                        'status': 'failed',
-                        'error': 'فشل في الاتصال'
-                    })
-                    continue
-                
-                filename = self._get_filename_from_url(href, 'style') + '.css'
-                
-                # حفظ ملف CSS
-                saved_path = self.file_manager.save_asset_file(
-                    response.content, 
-                    extraction_folder, 
-                    filename, 
-                    'css'
-                )
-                
-                if saved_path:
-                    self.downloaded_assets.add(href)
-                    
-                    # تحليل CSS للبحث عن موارد إضافية
-                    css_content = response.text
-                    embedded_resources = self._extract_css_resources(css_content, href, extraction_folder)
-                    
-                    css_result.append({
-                        'href': href,
-                        'saved_path': str(saved_path),
-                        'filename': filename,
-                        'size_bytes': len(response.content),
-                        'embedded_resources': embedded_resources,
-                        'status': 'success'
-                    })
-                else:
-                    css_result.append({
-                        'href': href,
-                        'status': 'failed',
-                        'error': 'فشل في حفظ الملف'
-                    })
-                    
-            except Exception as e:
-                css_result.append({
-                    'href': href,
-                    'status': 'failed',
-                    'error': str(e)
-                })
-        
-        return css_result
+            href = self._absolute(href, base_url)
+            if self._claim(href):
+                tasks.append(AssetTask(href, 'css', 'href', 'style'))
+        return tasks
     
-    def _download_js_files(self, soup: BeautifulSoup, base_url: str, extraction_folder: Path) -> List[Dict[str, Any]]:
-        """تحميل ملفات JavaScript"""
-        js_result = []
-        js_scripts = soup.find_all('script', src=True)
-        
-        for script in js_scripts[:10]:  # أول 10 سكريبتات
+    def _collect_inline_css(self, soup: BeautifulSoup, base_url: str) -> List[AssetTask]:
+        """اعتماديات CSS المضمنة في الصفحة (<style> و style="") لتعمل النسخة المحلية دون اتصال"""
+        tasks = []
+        for style in soup.find_all('style'):
+            if style.string:
+                tasks += self._extract_css_resources(style.string, base_url, None)
+        for tag in soup.find_all(style=True):
+            if isinstance(tag, Tag):
+                tasks += self._extract_css_resources(tag['style'], base_url, None)
+        return tasks
+    
+    def _collect_js_files(self, soup: BeautifulSoup, base_url: str) -> List[AssetTask]:
+        """ملفات JavaScript"""
+        tasks = []
+        for script in soup.find_all('script', src=True)[:self.limits['js']]:
             if not isinstance(script, Tag):
                 continue
-                
             src = script.get('src')
             if not src:
                 continue
-            
-            # تحويل الرابط النسبي إلى مطلق
-            if not src.startswith(('http://', 'https://')):
-                src = urljoin(base_url, src)
-            
-            # تجنب التحميل المكرر
-            if src in self.downloaded_assets:
-                continue
-            
-            try:
-                response = self.session.make_request(src)
-                if not response:
-                    js_result.append({
-                        'src': src,
-                        'status': 'failed',
-                        'error': 'فشل في الاتصال'
-                    })
-                    continue
-                
-                filename = self._get_filename_from_url(src, 'script') + '.js'
-                
-                # حفظ ملف JavaScript
-                saved_path = self.file_manager.save_asset_file(
-                    response.content, 
-                    extraction_folder, 
-                    filename, 
-                    'js'
-                )
-                
-                if saved_path:
-                    self.downloaded_assets.add(src)
-                    js_result.append({
-                        'src': src,
-                        'saved_path': str(saved_path),
-                        'filename': filename,
-                        'size_bytes': len(response.content),
-                        'status': 'success'
-                    })
-                else:
-                    js_result.append({
-                        'src': src,
-                        'status': 'failed',
-                        'error': 'فشل في حفظ الملف'
-                    })
-                    
-            except Exception as e:
-                js_result.append({
-                    'src': src,
-                    'status': 'failed',
-                    'error': str(e)
-                })
-        
-        return js_result
+            src = self._absolute(src, base_url)
+            if self._claim(src):
+                tasks.append(AssetTask(src, 'js', 'src', 'script'))
+        return tasks
     
-    def _download_fonts(self, soup: BeautifulSoup, base_url: str, extraction_folder: Path) -> List[Dict[str, Any]]:
-        """تحميل الخطوط"""
-        fonts_result = []
-        
-        # البحث عن روابط الخطوط في CSS
-        style_tags = soup.find_all('style')
-        link_tags = soup.find_all('link', rel='stylesheet')
-        
-        font_urls = set()
+    def _collect_fonts(self, soup: BeautifulSoup, base_url: str) -> List[AssetTask]:
+        """الخطوط من @font-face في style و Google Fonts وغيرها"""
+        font_urls = {}
         
-        # استخراج روابط الخطوط من style tags
-        for style in style_tags:
+        for style in soup.find_all('style'):
             if style.string:
-                font_urls.update(self._extract_font_urls_from_css(style.string, base_url))
+                font_urls.update(dict.fromkeys(self._extract_font_urls_from_css(style.string, base_url)))
         
-        # استخراج روابط الخطوط من Google Fonts وغيرها
-        for link in link_tags:
+        for link in soup.find_all('link', rel='stylesheet'):
             if isinstance(link, Tag):
                 href = link.get('href', '')
                 if 'fonts.googleapis.com' in href or 'fonts.gstatic.com' in href:
-                    font_urls.add(href)
+                    font_urls[href] = None
         
-        # تحميل الخطوط
-        for font_url in list(font_urls)[:5]:  # أول 5 خطوط
-            try:
-                response = self.session.make_request(font_url)
-                if not response:
-                    continue
-                
-                filename = self._get_filename_from_url(font_url, 'font')
-                file_extension = self._get_extension_from_url(font_url) or '.woff2'
-                
-                if not filename.endswith(file_extension):
-                    filename += file_extension
-                
-                saved_path = self.file_manager.save_asset_file(
-                    response.content, 
-                    extraction_folder, 
-                    filename, 
-                    'fonts'
-                )
-                
-                if saved_path:
-                    fonts_result.append({
-                        'url': font_url,
-                        'saved_path': str(saved_path),
-                        'filename': filename,
-                        'size_bytes': len(response.content),
-                        'status': 'success'
-                    })
-                    
-            except Exception as e:
-                fonts_result.append({
-                    'url': font_url,
-                    'status': 'failed',
-                    'error': str(e)
-                })
-        
-        return fonts_result
+        tasks = []
+        for font_url in list(font_urls)[:self.limits['fonts']]:
+            if self._claim(font_url):
+                tasks.append(AssetTask(font_url, 'fonts', 'url', 'font'))
+        return tasks
     
-    def _download_documents(self, soup: BeautifulSoup, base_url: str, extraction_folder: Path) -> List[Dict[str, Any]]:
-        """تحميل المستندات"""
-        documents_result = []
-        
-        # البحث عن روابط المستندات
-        document_extensions = ['.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx', '.txt', '.zip']
-        links = soup.find_all('a', href=True)
-        
-        for link in links:
+    def _collect_documents(self, soup: BeautifulSoup, base_url: str) -> List[AssetTask]:
+        """روابط المستندات"""
+        tasks = []
+        for link in soup.find_all('a', href=True):
+            if len(tasks) >= self.limits['documents']:
+                break
             if not isinstance(link, Tag):
                 continue
-                
             href = link.get('href')
-            if not href:
+            if not href or not href.lower().endswith(DOCUMENT_EXTENSIONS):
                 continue
-            
-            # فحص امتداد الملف
-            if not any(href.lower().endswith(ext) for ext in document_extensions):
+            href = self._absolute(href, base_url)
+            if self._claim(href):
+                tasks.append(AssetTask(href, 'documents', 'href', 'document'))
+        return tasks
+    
+    def _extract_css_resources(self, css_content: str, css_url: str, parent: Optional[Dict[str, Any]],
+                               depth: int = 0) -> List[AssetTask]:
+        """اعتماديات ملف CSS كعناصر جديدة في قائمة الأصول: @import (تكراري) والخطوط والصور و image-set"""
+        tasks = []
+        resources = 0
+        for reference in find_css_references(css_content):
+            resource_url = resolve_css_url(reference.url, css_url)
+            if not resource_url:
                 continue
-            
-            # تحويل الرابط النسبي إلى مطلق
-            if not href.startswith(('http://', 'https://')):
-                href = urljoin(base_url, href)
-            
-            # تجنب التحميل المكرر
-            if href in self.downloaded_assets:
+            if reference.kind == 'import':
+                # الحجز يمنع الدورات (a.css ← b.css ← a.css)؛ العمق حد أمان إضافي
+                if depth < MAX_IMPORT_DEPTH and self._claim(resource_url):
+                    tasks.append(AssetTask(resource_url, 'css', 'href', 'style', original_url=reference.url,
+                                           depth=depth + 1, imported_by=css_url))
                 continue
-            
-            try:
-                response = self.session.make_request(href)
-                if not response:
-                    continue
-                
-                filename = self._get_filename_from_url(href, 'document')
-                file_extension = self._get_extension_from_url(href)
-                
-                if file_extension and not filename.endswith(file_extension):
-                    filename += file_extension
+            if resources >= self.limits['css_resources']:
+                continue
+            resources += 1
+            if self._claim(resource_url):
+                is_font = reference.kind == 'font'
+                if is_font:
+                    category, url_key, prefix = 'fonts', 'full_url', 'font'
+                elif parent is None:
+                    # صورة من CSS مضمن في الصفحة: تُعامل كصور الصفحة
+                    category, url_key, prefix = 'images', 'src', 'image'
+                else:
+                    category, url_key, prefix = 'css_resources', 'full_url', 'css_resource'
+                tasks.append(AssetTask(resource_url, category, url_key, prefix,
+                                       original_url=reference.url, parent=parent))
+        return tasks
+    
+    def _host_slot(self, url: str) -> threading.BoundedSemaphore:
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = self._host_slots[host] = threading.BoundedSemaphore(self.max_per_host)
+            return slot
+    
+    @contextmanager
+    def _open_asset(self, url: str, cache_stats: Optional[Dict[str, Any]] = None,
+                    budget: Optional[DownloadBudget] = None, task: Optional[AssetTask] = None
+                    ) -> Iterator[Tuple[AssetResponse, Iterator[bytes]]]:
+        """طلب GET واحد (بدون HEAD ولا تأخير عام) أو نسخة من الذاكرة المؤقتة؛ يعطي الاستجابة ومكررة أجزاء بمهلة كلية وحد للحجم"""
+        max_size = self.config.max_file_size_mb * 1024 * 1024
+        category, priority = (task.category, task.priority) if task else ('other', asset_priority('other'))
+        with self._host_slot(url):
+            deadline = time.monotonic() + self.asset_timeout
+            with open_asset(self.session.session, url, cache=self.cache, stats=cache_stats, allow_redirects=True,
+                            timeout=(min(10, self.asset_timeout), self.asset_timeout),
+                            verify=self.config.verify_ssl) as asset:
+                if asset.from_cache != 'hit':
+                    self.session.count_requests()
+                content_length = asset.headers.get('Content-Length', '')
+                if content_length.isdigit() and int(content_length) > max_size:
+                    raise ValueError(f"File too large: {content_length} bytes")
+                if budget and content_length.isdigit():
+                    budget.expect(int(content_length), url, category, priority)
                 
-                saved_path = self.file_manager.save_asset_file(
-                    response.content, 
-                    extraction_folder, 
-                    filename, 
-                    'documents'
-                )
+                def chunks() -> Iterator[bytes]:
+                    size = 0
+                    for chunk in asset.iter_content(chunk_size=ASSET_CHUNK_SIZE):
+                        size += len(chunk)
+                        if size > max_size:
+                            raise ValueError(f"Response too large: {size} bytes")
+                        if time.monotonic() > deadline:
+                            raise TimeoutError(f"Asset timeout after {self.asset_timeout}s")
+                        if budget:
+                            budget.consume(len(chunk), url, category, priority)
+                        yield chunk
                 
-                if saved_path:
-                    self.downloaded_assets.add(href)
-                    documents_result.append({
-                        'href': href,
-                        'saved_path': str(saved_path),
-                        'filename': filename,
-                        'size_bytes': len(response.content),
-                        'document_type': self._get_document_type_from_extension(file_extension),
-                        'status': 'success'
-                    })
-                    
-                # حد أقصى 3 مستندات
-                if len(documents_result) >= 3:
-                    break
-                    
-            except Exception as e:
-                documents_result.append({
-                    'href': href,
-                    'status': 'failed',
-                    'error': str(e)
-                })
-        
-        return documents_result
+                yield asset, chunks()
     
-    def _extract_css_resources(self, css_content: str, css_url: str, extraction_folder: Path) -> List[Dict[str, Any]]:
-        """استخراج الموارد المضمنة في CSS"""
-        import re
-        
-        resources = []
-        
-        # البحث عن روابط الصور في CSS
-        url_pattern = r'url\(["\']?([^"\')\s]+)["\']?\)'
-        matches = re.findall(url_pattern, css_content)
-        
-        for match in matches[:5]:  # أول 5 موارد
-            resource_url = match
-            
-            # تحويل الرابط النسبي إلى مطلق
-            if not resource_url.startswith(('http://', 'https://', 'data:')):
-                css_base = '/'.join(css_url.split('/')[:-1])
-                resource_url = urljoin(css_base + '/', resource_url)
+    def _asset_filename(self, task: AssetTask, content_type: str) -> str:
+        """اسم الملف المحفوظ حسب نوع الأصل"""
+        filename = self._get_filename_from_url(task.url, task.filename_prefix)
+        if task.category == 'css':
+            return filename + '.css'
+        if task.category == 'js':
+            return filename + '.js'
+        
+        if task.category == 'images':
+            file_extension = self._get_extension_from_content_type(content_type) or self._get_extension_from_url(task.url)
+        elif task.category == 'fonts':
+            file_extension = self._get_extension_from_url(task.url) or '.woff2'
+        else:
+            file_extension = self._get_extension_from_url(task.url)
+        
+        if file_extension and not filename.endswith(file_extension):
+            filename += file_extension
+        return filename
+    
+    def _download_task(self, task: AssetTask, extraction_folder: Path,
+                       cache_stats: Optional[Dict[str, Any]] = None,
+                       budget: Optional[DownloadBudget] = None) -> Tuple[Dict[str, Any], List[AssetTask]]:
+        """تحميل أصل واحد وحفظه (داخل خيط)؛ يعيد عنصر النتيجة والموارد المكتشفة في CSS"""
+        result: Dict[str, Any] = {task.url_key: task.url}
+        if task.original_url is not None:
+            result = {'original_url': task.original_url, **result}
+        if task.imported_by:
+            result['imported_by'] = task.imported_by
+        discovered: List[AssetTask] = []
+        
+        reason = budget.reserve(task.url, task.category, task.priority) if budget else None
+        if reason:
+            with self._lock:
+                self.downloaded_assets.discard(task.url)
+            result.update({'status': 'skipped', 'reason': f'budget:{reason}', 'priority': task.priority})
+            return result, discovered
+        
+        try:
+            content = None
+            with self._open_asset(task.url, cache_stats, budget, task) as (asset, chunks):
+                content_type = asset.headers.get('Content-Type', '')
+                filename = self._asset_filename(task, content_type)
+                if task.category == 'css':
+                    # ملف CSS يُحلل بعد الحفظ فيبقى في الذاكرة؛ بقية الأصول تُكتب جزءاً جزءاً
+                    content = b''.join(chunks)
+                    chunks = iter((content,))
+                stored = self.file_manager.save_asset_stream(chunks, extraction_folder, filename, task.category)
             
-            # تجاهل data URLs
-            if resource_url.startswith('data:'):
-                continue
+            result.update({
+                'saved_path': str(stored['path']),
+                'filename': filename,
+                'size_bytes': stored['size'],
+                'sha256': stored['sha256'],
+                'from_cache': asset.from_cache
+            })
+            if task.category == 'images':
+                result['content_type'] = content_type
+            elif task.category == 'documents':
+                result['document_type'] = self._get_document_type_from_extension(self._get_extension_from_url(task.url))
+            elif task.category == 'css':
+                # تحليل CSS للبحث عن موارد إضافية
+                result['embedded_resources'] = []
+                css_content = content.decode(asset.encoding or 'utf-8', errors='replace')
+                discovered = self._extract_css_resources(css_content, task.url, result, task.depth)
+            result['status'] = 'success'
             
-            try:
-                response = self.session.make_request(resource_url)
-                if response:
-                    filename = self._get_filename_from_url(resource_url, 'css_resource')
-                    file_extension = self._get_extension_from_url(resource_url)
-                    
-                    if file_extension and not filename.endswith(file_extension):
-                        filename += file_extension
-                    
-                    saved_path = self.file_manager.save_asset_file(
-                        response.content, 
-                        extraction_folder, 
-                        filename, 
-                        'css_resources'
-                    )
-                    
-                    if saved_path:
-                        resources.append({
-                            'original_url': match,
-                            'full_url': resource_url,
-                            'saved_path': str(saved_path),
-                            'filename': filename,
-                            'size_bytes': len(response.content),
-                            'status': 'success'
-                        })
-                        
-            except Exception as e:
-                resources.append({
-                    'original_url': match,
-                    'full_url': resource_url,
-                    'status': 'failed',
-                    'error': str(e)
-                })
-        
-        return resources
+        except BudgetExceeded as e:
+            # أُلغي لنفاد الميزانية (قبل القراءة أو أثناءها): يُسجل كمتخطى لا كفشل
+            with self._lock:
+                self.downloaded_assets.discard(task.url)
+            result.update({'status': 'skipped', 'reason': 'budget', 'error': str(e), 'priority': task.priority})
+        except Exception as e:
+            # الفشل لا يمنع إعادة المحاولة من صفحة أخرى ولا يستهلك مكاناً من الميزانية
+            if budget:
+                budget.release()
+            with self._lock:
+                self.downloaded_assets.discard(task.url)
+            result.update({'status': 'failed', 'error': str(e) or type(e).__name__})
+        
+        return result, discovered
     
     def _extract_font_urls_from_css(self, css_content: str, base_url: str) -> Set[str]:
-        """استخراج روابط الخطوط من CSS"""
-        import re
-        
+        """استخراج روابط الخطوط من قواعد @font-face في CSS"""
         font_urls = set()
-        
-        # البحث عن @font-face rules
-        font_face_pattern = r'@font-face\s*{[^}]*url\(["\']?([^"\')\s]+)["\']?\)[^}]*}'
-        matches = re.findall(font_face_pattern, css_content, re.IGNORECASE | re.DOTALL)
-        
-        for match in matches:
-            if not match.startswith(('http://', 'https://', 'data:')):
-                font_url = urljoin(base_url, match)
-            else:
-                font_url = match
-            
-            if not font_url.startswith('data:'):
-                font_urls.add(font_url)
-        
+        for reference in find_css_references(css_content):
+            if reference.kind == 'font':
+                font_url = resolve_css_url(reference.url, base_url)
+                if font_url:
+                    font_urls.add(font_url)
         return font_urls
     
     def _get_filename_from_url(self, url: str, prefix: str = 'file') -> str:
@@ -592,6 +553,7 @@ class AssetDownloader:
             'total_found': total_found,
             'total_downloaded': total_downloaded,
             'total_failed': total_failed,
+            'total_skipped': len(download_results.get('skipped', [])),
             'success_rate': round((total_downloaded / max(total_found, 1)) * 100, 1),
             'total_size_bytes': total_size_bytes,
             'total_size_mb': round(total_size_bytes / (1024 * 1024), 2),
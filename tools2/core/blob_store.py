@@ -0,0 +1,395 @@
+"""
+مخزن الأصول المعنون بالمحتوى مع إزالة التكرار بين عمليات الاستخراج
+Content-Addressed Asset Blob Store
+"""
+
+import os
+import json
+import time
+import shutil
+import sqlite3
+import hashlib
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple, Union
+
+
+DEFAULT_BLOB_ROOT = "extracted_files/blobs"
+
+# الأجسام الأصغر من هذا الحد تبقى في الذاكرة حتى يُعرف hash؛ المكرر منها لا يُكتب على القرص أبداً
+DEFAULT_SPOOL_BYTES = 1024 * 1024
+
+VIEW_MODES = ('hardlink', 'manifest')
+
+# الأجسام للقراءة فقط: العروض روابط صلبة لنفس الملف فالكتابة داخل عرض تغيّر الجسم في كل مكان
+BLOB_FILE_MODE = 0o444
+
+
+def write_stream_atomic(chunks: Iterable[bytes], dest: Union[str, Path]) -> Tuple[str, int]:
+    """كتابة أجزاء إلى ملف مؤقت بجانب الوجهة مع sha256 والحجم أثناء الكتابة ثم نقله ذرياً؛ يعيد (digest, size)"""
+    dest = Path(dest)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    hasher = hashlib.sha256()
+    size = 0
+    fd, temp_path = tempfile.mkstemp(dir=dest.parent, prefix=f".{dest.name}.", suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in chunks:
+                if not chunk:
+                    continue
+                hasher.update(chunk)
+                size += len(chunk)
+                f.write(chunk)
+        # القارئ يرى الملف القديم أو الجديد كاملاً، لا ملفاً نصف مكتوب
+        os.replace(temp_path, dest)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return hasher.hexdigest(), size
+
+
+def detach_view(path: Union[str, Path]) -> bool:
+    """حذف ملف يشارك inode جسماً قبل إعادة كتابته في مكانه حتى تُكتب نسخة جديدة؛ True إذا حُذف"""
+    try:
+        if os.stat(path).st_nlink > 1:
+            os.unlink(path)
+            return True
+    except FileNotFoundError:
+        pass
+    return False
+
+
+class BlobStore:
+    """تخزين كل جسم مرة واحدة باسم sha256 وعرضه في مجلدات الاستخراج كروابط صلبة أو مراجع في سجل"""
+
+    def __init__(self, root: Union[str, Path] = DEFAULT_BLOB_ROOT, spool_bytes: int = DEFAULT_SPOOL_BYTES,
+                 view_mode: str = 'hardlink'):
+        if view_mode not in VIEW_MODES:
+            raise ValueError(f"view_mode must be one of {VIEW_MODES}")
+        self.root = Path(root)
+        self.objects_dir = self.root / 'objects'
+        self.tmp_dir = self.root / 'tmp'
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+        self.spool_bytes = max(0, spool_bytes)
+        self.view_mode = view_mode
+        self._lock = threading.RLock()
+        self.counters = {'puts': 0, 'deduplicated': 0, 'bytes_written': 0, 'bytes_deduplicated': 0,
+                         'link_fallbacks': 0}
+
+        self.db_connection = sqlite3.connect(str(self.root / 'blobs.db'), check_same_thread=False)
+        self.db_connection.execute('PRAGMA journal_mode=WAL')
+        self.db_connection.executescript('''
+            CREATE TABLE IF NOT EXISTS blobs (
+                digest TEXT PRIMARY KEY,
+                size INTEGER,
+                created_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS refs (
+                view_path TEXT PRIMARY KEY,
+                digest TEXT,
+                owner TEXT,
+                kind TEXT,
+                created_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_refs_digest ON refs (digest);
+            CREATE INDEX IF NOT EXISTS idx_refs_owner ON refs (owner);
+        ''')
+        self.db_connection.commit()
+
+    # ---------- الأجسام ----------
+
+    def blob_path(self, digest: str) -> Path:
+        """مسار الجسم بتوزيع على مستويين (ab/cd/abcd...) حتى لا يكبر مجلد واحد"""
+        return self.objects_dir / digest[:2] / digest[2:4] / digest
+
+    def has(self, digest: str) -> bool:
+        return self.blob_path(digest).exists()
+
+    def put_stream(self, chunks: Iterable[bytes]) -> Tuple[str, int, bool]:
+        """تخزين جسم من مكررة أجزاء مع حساب sha256 والحجم أثناء القراءة؛ يعيد (digest, size, كان_موجوداً)"""
+        hasher = hashlib.sha256()
+        buffered, size = [], 0
+        temp_file = None
+        temp_path = None
+        try:
+            for chunk in chunks:
+                if not chunk:
+                    continue
+                hasher.update(chunk)
+                size += len(chunk)
+                if temp_file is None and size <= self.spool_bytes:
+                    buffered.append(chunk)
+                    continue
+                if temp_file is None:
+                    # تجاوز حد الذاكرة: المتابعة في ملف مؤقت داخل نفس نظام الملفات ليكون النقل ذرياً
+                    fd, temp_path = tempfile.mkstemp(dir=self.tmp_dir, suffix='.part')
+                    temp_file = os.fdopen(fd, 'wb')
+                    temp_file.writelines(buffered)
+                    buffered = []
+                temp_file.write(chunk)
+            if temp_file is not None:
+                temp_file.close()
+                temp_file = None
+
+            digest = hasher.hexdigest()
+            target = self.blob_path(digest)
+            existed = target.exists()
+            if not existed:
+                target.parent.mkdir(parents=True, exist_ok=True)
+                if temp_path is None:
+                    fd, temp_path = tempfile.mkstemp(dir=self.tmp_dir, suffix='.part')
+                    with os.fdopen(fd, 'wb') as f:
+                        f.writelines(buffered)
+                os.replace(temp_path, target)
+                temp_path = None
+                os.chmod(target, BLOB_FILE_MODE)
+
+            with self._lock:
+                self.counters['puts'] += 1
+                if existed:
+                    self.counters['deduplicated'] += 1
+                    self.counters['bytes_deduplicated'] += size
+                else:
+                    self.counters['bytes_written'] += size
+                self.db_connection.execute('INSERT OR IGNORE INTO blobs (digest, size, created_at) VALUES (?, ?, ?)',
+                                           (digest, size, time.time()))
+                self.db_connection.commit()
+            return digest, size, existed
+        finally:
+            if temp_file is not None:
+                temp_file.close()
+            if temp_path is not None and os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def put_bytes(self, content: bytes) -> Tuple[str, int, bool]:
+        return self.put_stream([content])
+
+    def put_file(self, path: Union[str, Path]) -> Tuple[str, int, bool]:
+        """نقل ملف مكتمل على القرص (مثل تحميل .part) إلى المخزن دون نسخه؛ الملف المصدر لا يبقى"""
+        path = Path(path)
+        hasher = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                hasher.update(chunk)
+        digest = hasher.hexdigest()
+        size = path.stat().st_size
+        target = self.blob_path(digest)
+        existed = target.exists()
+        if existed:
+            path.unlink()
+        else:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                os.replace(path, target)
+            except OSError:
+                # نظام ملفات آخر: نسخ إلى tmp ثم نقل ذري
+                fd, temp_path = tempfile.mkstemp(dir=self.tmp_dir, suffix='.part')
+                os.close(fd)
+                shutil.copyfile(path, temp_path)
+                os.replace(temp_path, target)
+                path.unlink()
+            os.chmod(target, BLOB_FILE_MODE)
+
+        with self._lock:
+            self.counters['puts'] += 1
+            if existed:
+                self.counters['deduplicated'] += 1
+                self.counters['bytes_deduplicated'] += size
+            else:
+                self.counters['bytes_written'] += size
+            self.db_connection.execute('INSERT OR IGNORE INTO blobs (digest, size, created_at) VALUES (?, ?, ?)',
+                                       (digest, size, time.time()))
+            self.db_connection.commit()
+        return digest, size, existed
+
+    # ---------- العروض ----------
+
+    def add_view(self, digest: str, dest: Union[str, Path], owner: Optional[Union[str, Path]] = None,
+                 mode: Optional[str] = None) -> Path:
+        """ربط الجسم بمسار داخل مجلد استخراج؛ يعيد المسار الذي يُقرأ منه الملف (mode='cache' مرجع بلا ملف)"""
+        kind = mode or self.view_mode
+        # مفاتيح الذاكرة المؤقتة روابط لا مسارات: تُحفظ كما هي
+        view_key = str(dest) if kind == 'cache' else str(Path(dest))
+        dest = Path(dest)
+        owner = str(owner or dest.parent)
+        source = self.blob_path(digest)
+        readable_path = source
+
+        if kind == 'hardlink':
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            # لا نكتب أبداً داخل inode موجود: قد يكون رابطاً لجسم آخر
+            if dest.exists() or dest.is_symlink():
+                dest.unlink()
+            try:
+                os.link(source, dest)
+                readable_path = dest
+            except OSError:
+                # نظام ملفات لا يدعم الروابط الصلبة أو مجلد على قرص آخر: مرجع في السجل بدل نسخة
+                kind = 'manifest'
+                with self._lock:
+                    self.counters['link_fallbacks'] += 1
+
+        with self._lock:
+            self.db_connection.execute('''
+                INSERT OR REPLACE INTO refs (view_path, digest, owner, kind, created_at)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (view_key, digest, owner, kind, time.time()))
+            self.db_connection.commit()
+        return readable_path
+
+    def save_stream(self, chunks: Iterable[bytes], dest: Union[str, Path],
+                    owner: Optional[Union[str, Path]] = None) -> Dict[str, Any]:
+        """تخزين جسم وعرضه في المسار المطلوب بخطوة واحدة"""
+        digest, size, existed = self.put_stream(chunks)
+        path = self.add_view(digest, dest, owner)
+        return {'path': path, 'sha256': digest, 'size': size, 'deduplicated': existed}
+
+    def save_bytes(self, content: bytes, dest: Union[str, Path],
+                   owner: Optional[Union[str, Path]] = None) -> Dict[str, Any]:
+        return self.save_stream([content], dest, owner)
+
+    def save_file(self, path: Union[str, Path], dest: Union[str, Path],
+                  owner: Optional[Union[str, Path]] = None) -> Dict[str, Any]:
+        digest, size, existed = self.put_file(path)
+        path = self.add_view(digest, dest, owner)
+        return {'path': path, 'sha256': digest, 'size': size, 'deduplicated': existed}
+
+    def release(self, view_path: Union[str, Path]) -> bool:
+        """إزالة مرجع واحد وحذف الجسم فوراً إذا لم يبق له مرجع؛ True إذا حُذف الجسم"""
+        with self._lock:
+            row = self.db_connection.execute('SELECT digest FROM refs WHERE view_path = ?',
+                                             (str(view_path),)).fetchone()
+            if not row:
+                return False
+            self.db_connection.execute('DELETE FROM refs WHERE view_path = ?', (str(view_path),))
+            if self.ref_count(row[0]):
+                self.db_connection.commit()
+                return False
+            self.db_connection.execute('DELETE FROM blobs WHERE digest = ?', (row[0],))
+            self.db_connection.commit()
+        try:
+            self.blob_path(row[0]).unlink()
+        except FileNotFoundError:
+            pass
+        return True
+
+    def resolve(self, view_path: Union[str, Path]) -> Optional[Path]:
+        """المسار الفعلي لعرض (الرابط نفسه أو الجسم لمراجع السجل)"""
+        with self._lock:
+            row = self.db_connection.execute('SELECT digest, kind FROM refs WHERE view_path = ?',
+                                             (str(view_path),)).fetchone()
+        if not row:
+            return None
+        return Path(view_path) if row[1] == 'hardlink' else self.blob_path(row[0])
+
+    def views(self, owner: Union[str, Path]) -> Dict[str, str]:
+        """عروض مجلد استخراج: المسار ← sha256"""
+        with self._lock:
+            rows = self.db_connection.execute('SELECT view_path, digest FROM refs WHERE owner = ?',
+                                              (str(owner),)).fetchall()
+        return dict(rows)
+
+    def write_manifest(self, owner: Union[str, Path], filename: str = 'blob_manifest.json') -> Path:
+        """حفظ سجل العروض داخل مجلد الاستخراج (يكفي لإعادة بناء الملفات من المخزن)"""
+        manifest_path = Path(owner) / filename
+        entries = {view_path: {'sha256': digest, 'blob': str(self.blob_path(digest))}
+                   for view_path, digest in self.views(owner).items()}
+        with open(manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(entries, f, ensure_ascii=False, indent=2)
+        return manifest_path
+
+    def materialize(self, owner: Union[str, Path]) -> int:
+        """تحويل مراجع السجل لمجلد إلى ملفات فعلية (مثلاً قبل ضغطه أو نقله)"""
+        copied = 0
+        for view_path, digest in self.views(owner).items():
+            target = Path(view_path)
+            if target.exists():
+                continue
+            target.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(self.blob_path(digest), target)
+            copied += 1
+        return copied
+
+    # ---------- عدّ المراجع والتنظيف ----------
+
+    def ref_count(self, digest: str) -> int:
+        with self._lock:
+            return self.db_connection.execute('SELECT COUNT(*) FROM refs WHERE digest = ?', (digest,)).fetchone()[0]
+
+    def _ref_alive(self, view_path: str, digest: str, owner: str, kind: str) -> bool:
+        if kind == 'cache':
+            # مراجع الذاكرة المؤقتة للأصول تديرها AssetCache (تُزال عند الإخلاء)
+            return True
+        if kind == 'manifest':
+            return os.path.isdir(owner)
+        try:
+            # الرابط يبقى مرجعاً فقط إذا كان ما زال نفس الجسم (لم يُحذف أو يُستبدل)
+            return os.path.samefile(view_path, self.blob_path(digest))
+        except OSError:
+            return False
+
+    def gc(self, grace_seconds: float = 3600.0) -> Dict[str, int]:
+        """حذف المراجع التي اختفت عروضها ثم الأجسام التي لم يعد لها مراجع"""
+        with self._lock:
+            refs = self.db_connection.execute('SELECT view_path, digest, owner, kind FROM refs').fetchall()
+        dead = [(row[0],) for row in refs if not self._ref_alive(*row)]
+
+        cutoff = time.time() - grace_seconds
+        with self._lock:
+            self.db_connection.executemany('DELETE FROM refs WHERE view_path = ?', dead)
+            # مهلة للأجسام الجديدة: قد تكون خُزنت ولم يُضف عرضها بعد
+            orphans = self.db_connection.execute('''
+                SELECT digest, size FROM blobs
+                WHERE created_at < ? AND digest NOT IN (SELECT digest FROM refs)
+            ''', (cutoff,)).fetchall()
+            self.db_connection.executemany('DELETE FROM blobs WHERE digest = ?', [(d,) for d, _ in orphans])
+            self.db_connection.commit()
+
+        bytes_freed = 0
+        for digest, size in orphans:
+            try:
+                self.blob_path(digest).unlink()
+                bytes_freed += size or 0
+            except FileNotFoundError:
+                pass
+        return {'refs_removed': len(dead), 'blobs_removed': len(orphans), 'bytes_freed': bytes_freed}
+
+    def stats(self) -> Dict[str, Any]:
+        """حجم المخزن الفعلي مقابل حجم كل العروض والتوفير الناتج"""
+        with self._lock:
+            blobs, stored = self.db_connection.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs').fetchone()
+            refs, referenced = self.db_connection.execute('''
+                SELECT COUNT(*), COALESCE(SUM(blobs.size), 0)
+                FROM refs JOIN blobs ON blobs.digest = refs.digest
+            ''').fetchone()
+            counters = dict(self.counters)
+        return {
+            'blobs': blobs,
+            'stored_bytes': stored,
+            'references': refs,
+            'referenced_bytes': referenced,
+            'saved_bytes': max(0, referenced - stored),
+            **counters
+        }
+
+    def close(self):
+        with self._lock:
+            self.db_connection.close()
+
+
+_stores: Dict[str, BlobStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_blob_store(root: Union[str, Path] = DEFAULT_BLOB_ROOT) -> BlobStore:
+    """مخزن مشترك على مستوى العملية لكل مجلد جذر"""
+    key = os.path.abspath(str(root))
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = BlobStore(root)
+        return store
@@ -0,0 +1,529 @@
+"""
+خدمة مراقبة تغييرات المواقع
+Incremental Change-Monitoring Scheduler
+"""
+
+import re
+import json
+import time
+import heapq
+import random
+import sqlite3
+import hashlib
+import difflib
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+from bs4 import BeautifulSoup
+
+from .spider_engine import HostPoliteness
+from .host_scheduler import mount_scheduled_adapter
+
+
+DEFAULT_MONITOR_DB = "monitoring/monitoring.db"
+
+BLOCK_TAGS = ['title', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'li', 'td', 'th',
+              'pre', 'blockquote', 'dt', 'dd', 'figcaption', 'caption']
+
+_WHITESPACE_RE = re.compile(r'\s+')
+_MAX_BLOCK_TEXT = 500
+
+
+def extract_blocks(html: str) -> List[Tuple[str, str]]:
+    """كتل النص (العناوين والفقرات والعناصر...) مع بصمة لكل كتلة، بدون الكتل المتداخلة"""
+    soup = BeautifulSoup(html, 'html.parser')
+    for tag in soup(['script', 'style', 'noscript', 'template']):
+        tag.decompose()
+
+    blocks = []
+    for element in soup.find_all(BLOCK_TAGS):
+        # الكتلة التي تحتوي كتلاً أخرى تُمثلها كتلها الداخلية
+        if element.find(BLOCK_TAGS):
+            continue
+        text = _WHITESPACE_RE.sub(' ', element.get_text(' ')).strip()
+        if text:
+            digest = hashlib.blake2b(text.encode('utf-8'), digest_size=8).hexdigest()
+            blocks.append((digest, text[:_MAX_BLOCK_TEXT]))
+    return blocks
+
+
+def diff_blocks(old_blocks: List[Tuple[str, str]], new_blocks: List[Tuple[str, str]]) -> Dict[str, Any]:
+    """فرق على مستوى الكتل: المضاف والمحذوف بالترتيب"""
+    matcher = difflib.SequenceMatcher(None, [b[0] for b in old_blocks], [b[0] for b in new_blocks], autojunk=False)
+    added, removed = [], []
+    for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+        if tag in ('delete', 'replace'):
+            removed.extend(text for _, text in old_blocks[old_start:old_end])
+        if tag in ('insert', 'replace'):
+            added.extend(text for _, text in new_blocks[new_start:new_end])
+    return {
+        'added': added,
+        'removed': removed,
+        'changed_blocks': len(added) + len(removed),
+        'similarity': round(matcher.ratio(), 3)
+    }
+
+
+class MonitorStore:
+    """الروابط المراقبة وأحداث التغيير في SQLite"""
+
+    def __init__(self, db_path: str = DEFAULT_MONITOR_DB):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+
+        self.db_connection = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.db_connection.execute('PRAGMA journal_mode=WAL')
+        self.db_connection.executescript('''
+            CREATE TABLE IF NOT EXISTS monitored_urls (
+                url TEXT PRIMARY KEY,
+                interval REAL,
+                next_check REAL,
+                etag TEXT,
+                last_modified TEXT,
+                content_hash TEXT,
+                blocks TEXT,
+                status_code INTEGER,
+                checks INTEGER DEFAULT 0,
+                changes INTEGER DEFAULT 0,
+                not_modified INTEGER DEFAULT 0,
+                last_checked REAL,
+                last_changed REAL,
+                active INTEGER DEFAULT 1,
+                added_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_monitored_next ON monitored_urls (active, next_check);
+            CREATE TABLE IF NOT EXISTS change_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                url TEXT,
+                detected_at REAL,
+                change_type TEXT,
+                status_code INTEGER,
+                old_hash TEXT,
+                new_hash TEXT,
+                diff TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_change_events_url ON change_events (url, detected_at);
+        ''')
+        self.db_connection.commit()
+
+    def add_url(self, url: str, interval: float, next_check: Optional[float] = None) -> bool:
+        """إضافة رابط للمراقبة (أو إعادة تفعيله)، وإرجاع True إذا كان جديداً"""
+        now = time.time()
+        with self._lock:
+            cursor = self.db_connection.execute('''
+                INSERT OR IGNORE INTO monitored_urls (url, interval, next_check, added_at)
+                VALUES (?, ?, ?, ?)
+            ''', (url, interval, next_check if next_check is not None else now, now))
+            if cursor.rowcount == 0:
+                self.db_connection.execute(
+                    'UPDATE monitored_urls SET active = 1, interval = ? WHERE url = ?', (interval, url)
+                )
+            self.db_connection.commit()
+            return cursor.rowcount > 0
+
+    def remove_url(self, url: str):
+        """إيقاف مراقبة رابط (تبقى أحداثه)"""
+        with self._lock:
+            self.db_connection.execute('UPDATE monitored_urls SET active = 0 WHERE url = ?', (url,))
+            self.db_connection.commit()
+
+    def get_url(self, url: str) -> Optional[Dict[str, Any]]:
+        """حالة رابط مراقب"""
+        with self._lock:
+            self.db_connection.row_factory = sqlite3.Row
+            try:
+                row = self.db_connection.execute('SELECT * FROM monitored_urls WHERE url = ?', (url,)).fetchone()
+            finally:
+                self.db_connection.row_factory = None
+        if not row:
+            return None
+        data = dict(row)
+        data['blocks'] = json.loads(data['blocks']) if data['blocks'] else None
+        return data
+
+    def schedule(self) -> List[Tuple[float, str]]:
+        """مواعيد الفحص التالية لجميع الروابط النشطة"""
+        with self._lock:
+            return self.db_connection.execute(
+                'SELECT next_check, url FROM monitored_urls WHERE active = 1'
+            ).fetchall()
+
+    def update_url(self, url: str, **fields):
+        """تحديث حقول رابط مراقب"""
+        if 'blocks' in fields and fields['blocks'] is not None:
+            fields['blocks'] = json.dumps(fields['blocks'], ensure_ascii=False)
+        columns = ', '.join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self.db_connection.execute(
+                f'UPDATE monitored_urls SET {columns} WHERE url = ?', (*fields.values(), url)
+            )
+            self.db_connection.commit()
+
+    def record_event(self, url: str, change_type: str, status_code: Optional[int] = None,
+                     old_hash: Optional[str] = None, new_hash: Optional[str] = None,
+                     diff: Optional[Dict[str, Any]] = None) -> int:
+        """تسجيل حدث تغيير وإرجاع معرّفه"""
+        with self._lock:
+            cursor = self.db_connection.execute('''
+                INSERT INTO change_events (url, detected_at, change_type, status_code, old_hash, new_hash, diff)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (url, time.time(), change_type, status_code, old_hash, new_hash,
+                  json.dumps(diff, ensure_ascii=False) if diff is not None else None))
+            self.db_connection.commit()
+            return cursor.lastrowid
+
+    def get_events(self, url: Optional[str] = None, since: Optional[float] = None,
+                   limit: int = 100) -> List[Dict[str, Any]]:
+        """أحدث أحداث التغيير (لرابط أو للجميع)"""
+        query = 'SELECT id, url, detected_at, change_type, status_code, old_hash, new_hash, diff FROM change_events'
+        conditions, params = [], []
+        if url:
+            conditions.append('url = ?')
+            params.append(url)
+        if since is not None:
+            conditions.append('detected_at >= ?')
+            params.append(since)
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        query += ' ORDER BY id DESC LIMIT ?'
+        params.append(limit)
+
+        with self._lock:
+            rows = self.db_connection.execute(query, params).fetchall()
+        return [
+            {
+                'id': row[0], 'url': row[1], 'detected_at': row[2], 'change_type': row[3],
+                'status_code': row[4], 'old_hash': row[5], 'new_hash': row[6],
+                'diff': json.loads(row[7]) if row[7] else None
+            }
+            for row in rows
+        ]
+
+    def get_summary(self) -> Dict[str, Any]:
+        """ملخص المراقبة"""
+        with self._lock:
+            urls, active, checks, changes, not_modified = self.db_connection.execute(
+                'SELECT COUNT(*), SUM(active), SUM(checks), SUM(changes), SUM(not_modified) FROM monitored_urls'
+            ).fetchone()
+            events = self.db_connection.execute('SELECT COUNT(*) FROM change_events').fetchone()[0]
+            next_check = self.db_connection.execute(
+                'SELECT MIN(next_check) FROM monitored_urls WHERE active = 1'
+            ).fetchone()[0]
+        return {
+            'monitored_urls': urls or 0,
+            'active_urls': active or 0,
+            'total_checks': checks or 0,
+            'total_changes': changes or 0,
+            'not_modified_responses': not_modified or 0,
+            'change_events': events,
+            'next_check': next_check
+        }
+
+    def close(self):
+        """إغلاق قاعدة البيانات"""
+        with self._lock:
+            self.db_connection.commit()
+            self.db_connection.close()
+
+
+class ChangeMonitor:
+    """مجدول مراقبة: min-heap لمواعيد الفحص، طلبات شرطية، فروق على مستوى الكتل، وفترات متكيفة"""
+
+    def __init__(self, db_path: str = DEFAULT_MONITOR_DB, session: Optional[requests.Session] = None,
+                 max_workers: int = 8, default_interval: float = 3600.0, min_interval: float = 300.0,
+                 max_interval: float = 7 * 24 * 3600.0, speedup: float = 0.5, backoff: float = 1.5,
+                 timeout: float = 20, max_per_host: int = 2, host_delay: float = 1.0, verify: bool = True):
+        self.store = MonitorStore(db_path)
+        self.max_workers = max(1, max_workers)
+        self.default_interval = default_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.speedup = speedup
+        self.backoff = backoff
+        self.timeout = timeout
+        self.verify = verify
+        self.politeness = HostPoliteness(max_per_host, host_delay / max(1, max_per_host))
+
+        if session is None:
+            session = requests.Session()
+            mount_scheduled_adapter(session, pool_connections=self.max_workers, pool_maxsize=self.max_workers)
+        self.session = session
+
+        self._heap: List[Tuple[float, str]] = []
+        self._scheduled: Dict[str, float] = {}
+        self._removed = set()
+        self._heap_lock = threading.Lock()
+        self._stop = threading.Event()
+        self.stats = {'checks': 0, 'changed': 0, 'not_modified': 0, 'unchanged': 0, 'errors': 0,
+                      'bytes_downloaded': 0}
+
+    # ---------- الجدولة ----------
+
+    def _push(self, url: str, next_check: float):
+        with self._heap_lock:
+            if url in self._removed:
+                return
+            self._scheduled[url] = next_check
+            heapq.heappush(self._heap, (next_check, url))
+
+    def _load_schedule(self):
+        """بناء الكومة من قاعدة البيانات"""
+        with self._heap_lock:
+            self._heap = [(next_check or 0.0, url) for next_check, url in self.store.schedule()]
+            heapq.heapify(self._heap)
+            self._scheduled = {url: next_check for next_check, url in self._heap}
+
+    def _pop_due(self, now: float) -> Optional[str]:
+        """أخذ رابط حان موعده (مع تجاهل المدخلات القديمة في الكومة)"""
+        with self._heap_lock:
+            while self._heap and self._heap[0][0] <= now:
+                next_check, url = heapq.heappop(self._heap)
+                if self._scheduled.get(url) == next_check:
+                    del self._scheduled[url]
+                    return url
+            return None
+
+    def _seconds_until_next(self, now: float) -> Optional[float]:
+        with self._heap_lock:
+            return max(0.0, self._heap[0][0] - now) if self._heap else None
+
+    def add_url(self, url: str, interval: Optional[float] = None, check_now: bool = True) -> bool:
+        """إضافة رابط للمراقبة"""
+        interval = interval or self.default_interval
+        next_check = time.time() if check_now else time.time() + interval
+        with self._heap_lock:
+            self._removed.discard(url)
+        added = self.store.add_url(url, interval, next_check)
+        self._push(url, next_check if added else (self.store.get_url(url) or {}).get('next_check') or next_check)
+        return added
+
+    def add_urls(self, urls: List[str], interval: Optional[float] = None) -> int:
+        """إضافة عدة روابط مع توزيع فحصها الأول على فترة قصيرة"""
+        added = 0
+        spread = min(len(urls), 60)
+        for index, url in enumerate(urls):
+            interval_value = interval or self.default_interval
+            next_check = time.time() + (index % spread if spread else 0)
+            with self._heap_lock:
+                self._removed.discard(url)
+            if self.store.add_url(url, interval_value, next_check):
+                self._push(url, next_check)
+                added += 1
+        return added
+
+    def remove_url(self, url: str):
+        """إيقاف مراقبة رابط"""
+        self.store.remove_url(url)
+        with self._heap_lock:
+            self._scheduled.pop(url, None)
+            self._removed.add(url)
+
+    def _next_interval(self, interval: float, changed: bool) -> float:
+        """الصفحات المتغيرة تُفحص أسرع، والثابتة تتباعد تدريجياً"""
+        interval = interval * (self.speedup if changed else self.backoff)
+        return min(max(interval, self.min_interval), self.max_interval)
+
+    # ---------- الفحص ----------
+
+    def check_url(self, url: str) -> Dict[str, Any]:
+        """فحص رابط واحد بطلب شرطي وتسجيل التغيير إن وُجد"""
+        state = self.store.get_url(url)
+        if state is None:
+            self.store.add_url(url, self.default_interval)
+            state = self.store.get_url(url)
+
+        headers = {}
+        if state.get('etag'):
+            headers['If-None-Match'] = state['etag']
+        if state.get('last_modified'):
+            headers['If-Modified-Since'] = state['last_modified']
+
+        now = time.time()
+        interval = state.get('interval') or self.default_interval
+        result = {'url': url, 'status': 'unchanged', 'status_code': None, 'event_id': None, 'bytes': 0}
+        updates = {'last_checked': now, 'checks': (state.get('checks') or 0) + 1}
+        changed = False
+
+        host = urlparse(url).netloc
+        self.politeness.acquire(host)
+        try:
+            response = self.session.get(url, headers=headers, timeout=self.timeout, verify=self.verify)
+        except requests.RequestException as e:
+            response = None
+            result.update({'status': 'error', 'error': str(e)})
+        finally:
+            self.politeness.release(host)
+
+        if response is None:
+            if state.get('status_code') is not None:
+                # نسجل بداية الانقطاع فقط وليس كل فحص فاشل
+                result['event_id'] = self.store.record_event(url, 'error', diff={'error': result['error']})
+            updates['status_code'] = None
+            self.stats['errors'] += 1
+
+        elif response.status_code == 304:
+            result.update({'status': 'not_modified', 'status_code': 304})
+            updates['not_modified'] = (state.get('not_modified') or 0) + 1
+            self.stats['not_modified'] += 1
+
+        else:
+            body = response.content
+            result['status_code'] = response.status_code
+            result['bytes'] = len(body)
+            self.stats['bytes_downloaded'] += len(body)
+
+            content_hash = hashlib.sha256(body).hexdigest()
+            updates.update({
+                'status_code': response.status_code,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified')
+            })
+
+            if state.get('content_hash') is None:
+                blocks = extract_blocks(response.text)
+                updates.update({'content_hash': content_hash, 'blocks': blocks})
+                result['status'] = 'baseline'
+                result['event_id'] = self.store.record_event(
+                    url, 'baseline', response.status_code, None, content_hash, {'blocks': len(blocks)}
+                )
+
+            elif response.status_code != state.get('status_code'):
+                changed = True
+                result['status'] = 'changed'
+                updates['content_hash'] = content_hash
+                result['event_id'] = self.store.record_event(
+                    url, 'status', response.status_code, state['content_hash'], content_hash,
+                    {'old_status': state.get('status_code'), 'new_status': response.status_code}
+                )
+
+            elif content_hash != state['content_hash']:
+                blocks = extract_blocks(response.text)
+                diff = diff_blocks([tuple(block) for block in state.get('blocks') or []], blocks)
+                updates.update({'content_hash': content_hash, 'blocks': blocks})
+                # تغيّر في الترميز فقط (معرّفات، رموز CSRF...) لا يُعد تغييراً في المحتوى
+                if diff['changed_blocks']:
+                    changed = True
+                    result['status'] = 'changed'
+                    result['diff'] = diff
+                    result['event_id'] = self.store.record_event(
+                        url, 'content', response.status_code, state['content_hash'], content_hash, diff
+                    )
+
+        if changed:
+            updates['changes'] = (state.get('changes') or 0) + 1
+            updates['last_changed'] = now
+            self.stats['changed'] += 1
+        elif result['status'] == 'unchanged':
+            self.stats['unchanged'] += 1
+
+        if result['status'] != 'baseline':
+            interval = self._next_interval(interval, changed)
+        # تشويش بسيط حتى لا تتزامن الروابط المضافة معاً
+        next_check = now + interval * random.uniform(0.9, 1.1)
+        updates.update({'interval': interval, 'next_check': next_check})
+        self.store.update_url(url, **updates)
+
+        self.stats['checks'] += 1
+        result.update({'interval': round(interval, 1), 'next_check': next_check})
+        return result
+
+    def run_due(self, on_event: Optional[Callable[[Dict[str, Any]], Any]] = None) -> List[Dict[str, Any]]:
+        """فحص الروابط التي حان موعدها الآن فقط ثم الخروج (مناسب للتشغيل الدوري من cron)"""
+        self._load_schedule()
+        now = time.time()
+        due = []
+        url = self._pop_due(now)
+        while url is not None:
+            due.append(url)
+            url = self._pop_due(now)
+
+        results = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self.check_url, url): url for url in due}
+            for future in as_completed(futures):
+                results.append(self._finish_check(futures[future], future, on_event))
+        return results
+
+    def _finish_check(self, url: str, future, on_event) -> Dict[str, Any]:
+        """نتيجة فحص منتهٍ: إعادة جدولة الرابط وإبلاغ المستمع بالتغيير"""
+        try:
+            result = future.result()
+        except Exception as e:
+            # خطأ غير متوقع: إعادة المحاولة بعد الفترة الدنيا
+            result = {'url': url, 'status': 'error', 'error': str(e),
+                      'next_check': time.time() + self.min_interval}
+            self.store.update_url(url, next_check=result['next_check'])
+        self._push(url, result['next_check'])
+        if on_event and result.get('status') in ('changed', 'error'):
+            on_event(result)
+        return result
+
+    def run(self, duration: Optional[float] = None, max_checks: Optional[int] = None,
+            on_event: Optional[Callable[[Dict[str, Any]], Any]] = None) -> Dict[str, Any]:
+        """تشغيل المجدول حتى انتهاء المدة أو عدد الفحوص أو stop()"""
+        self._stop.clear()
+        self._load_schedule()
+        started = time.time()
+        deadline = started + duration if duration is not None else None
+        results = []
+        submitted = 0
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            in_flight = {}
+            while not self._stop.is_set():
+                now = time.time()
+                if deadline is not None and now >= deadline:
+                    break
+
+                while len(in_flight) < self.max_workers and (max_checks is None or submitted < max_checks):
+                    url = self._pop_due(now)
+                    if url is None:
+                        break
+                    in_flight[executor.submit(self.check_url, url)] = url
+                    submitted += 1
+
+                if not in_flight:
+                    wait_for = self._seconds_until_next(now)
+                    if (max_checks is not None and submitted >= max_checks) or wait_for is None:
+                        break
+                    if deadline is not None:
+                        wait_for = min(wait_for, deadline - now)
+                    # انتظار قصير متكرر حتى تُلتقط الروابط المضافة وstop()
+                    self._stop.wait(min(wait_for, 1.0))
+                    continue
+
+                done, _ = wait(list(in_flight), timeout=1.0, return_when=FIRST_COMPLETED)
+                for future in done:
+                    results.append(self._finish_check(in_flight.pop(future), future, on_event))
+
+        return {
+            'results': results,
+            'checks': len(results),
+            'duration': round(time.time() - started, 2),
+            'stats': dict(self.stats)
+        }
+
+    def stop(self):
+        """إيقاف run() بعد انتهاء الفحوص الجارية"""
+        self._stop.set()
+
+    def get_status(self, url: Optional[str] = None, events_limit: int = 20) -> Dict[str, Any]:
+        """ملخص المراقبة أو حالة رابط واحد مع أحدث أحداثه"""
+        if url:
+            state = self.store.get_url(url)
+            if state:
+                state.pop('blocks', None)
+            return {'url_state': state, 'events': self.store.get_events(url, limit=events_limit)}
+        return {**self.store.get_summary(), 'session_stats': dict(self.stats),
+                'recent_events': self.store.get_events(limit=events_limit)}
+
+    def close(self):
+        """إغلاق قاعدة البيانات والجلسة"""
+        self.stop()
+        self.store.close()
+        self.session.close()
@@ -21,6 +21,12 @@ class ExtractionConfig:
     timeout: int = 30
     max_retries: int = 3
     delay_between_requests: float = 1.0
+    concurrent_requests: int = 8
+    max_downloads_per_host: int = 4
+    asset_timeout: float = 30.0
+    asset_cache_mb: int = 512  # 0 = بدون ذاكرة مؤقتة للأصول بين عمليات الاستخراج
+    segmented_download_mb: int = 16  # الملفات الأكبر تُحمل على أجزاء Range متوازية
+    download_segments: int = 4  # 1 = تحميل متسلسل قابل للاستئناف فقط
     user_agent: str = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
     verify_ssl: bool = True
     
@@ -29,6 +35,15 @@ class ExtractionConfig:
     max_pages: int = 100
     max_file_size_mb: int = 50
     allowed_domains: List[str] = None
+    max_assets_per_type: Dict[str, int] = None  # None = الحدود الافتراضية لمنزل الأصول
+    budget_max_mb: int = 500  # ميزانية كل عملية استخراج (0 = بلا حد)
+    budget_max_assets: int = 1000
+    budget_max_seconds: float = 600.0
+    critical_images: int = 6  # الصور الأولى في الصفحة تُحمل مع CSS قبل غيرها
+    image_viewport_width: int = 1366  # نافذة العرض المستهدفة لاختيار مرشح srcset
+    image_dpr: float = 1.0
+    image_selection: str = "target"  # target, largest, smallest
+    image_probe_kb: int = 64  # أقصى ما يُقرأ من كل صورة لفحص ترويستها (0 = تقدير الأحجام من السمات فقط)
     
     # ميزات الاستخراج
     extract_content: bool = True
@@ -72,10 +87,25 @@ class ExtractionConfig:
             'timeout': self.timeout,
             'max_retries': self.max_retries,
             'delay_between_requests': self.delay_between_requests,
+            'concurrent_requests': self.concurrent_requests,
+            'max_downloads_per_host': self.max_downloads_per_host,
+            'asset_timeout': self.asset_timeout,
+            'asset_cache_mb': self.asset_cache_mb,
+            'segmented_download_mb': self.segmented_download_mb,
+            'download_segments': self.download_segments,
             'verify_ssl': self.verify_ssl,
             'max_depth': self.max_depth,
             'max_pages': self.max_pages,
             'max_file_size_mb': self.max_file_size_mb,
+            'max_assets_per_type': self.max_assets_per_type,
+            'budget_max_mb': self.budget_max_mb,
+            'budget_max_assets': self.budget_max_assets,
+            'budget_max_seconds': self.budget_max_seconds,
+            'critical_images': self.critical_images,
+            'image_viewport_width': self.image_viewport_width,
+            'image_dpr': self.image_dpr,
+            'image_selection': self.image_selection,
+            'image_probe_kb': self.image_probe_kb,
             'features': {
                 'extract_content': self.extract_content,
                 'extract_assets': self.extract_assets,
@@ -110,10 +140,25 @@ class ExtractionConfig:
         config.timeout = data.get('timeout', 30)
         config.max_retries = data.get('max_retries', 3)
         config.delay_between_requests = data.get('delay_between_requests', 1.0)
+        config.concurrent_requests = data.get('concurrent_requests', 8)
+        config.max_downloads_per_host = data.get('max_downloads_per_host', 4)
+        config.asset_timeout = data.get('asset_timeout', 30.0)
+        config.asset_cache_mb = data.get('asset_cache_mb', 512)
+        config.segmented_download_mb = data.get('segmented_download_mb', 16)
+        config.download_segments = data.get('download_segments', 4)
         config.verify_ssl = data.get('verify_ssl', True)
         config.max_depth = data.get('max_depth', 3)
         config.max_pages = data.get('max_pages', 100)
         config.max_file_size_mb = data.get('max_file_size_mb', 50)
+        config.max_assets_per_type = data.get('max_assets_per_type')
+        config.budget_max_mb = data.get('budget_max_mb', 500)
+        config.budget_max_assets = data.get('budget_max_assets', 1000)
+        config.budget_max_seconds = data.get('budget_max_seconds', 600.0)
+        config.critical_images = data.get('critical_images', 6)
+        config.image_viewport_width = data.get('image_viewport_width', 1366)
+        config.image_dpr = data.get('image_dpr', 1.0)
+        config.image_selection = data.get('image_selection', 'target')
+        config.image_probe_kb = data.get('image_probe_kb', 64)
         
         # الميزات
         features = data.get('features', {})
@@ -10,6 +10,8 @@ from typing import Dict, List, Any, Optional, Set, Tuple
 from bs4 import BeautifulSoup, Tag, NavigableString
 from .config import ExtractionConfig
 from .session_manager import SessionManager
+from .image_probe import probe_images
+from .responsive_images import ImagePolicy, select_image
 
 
 class ContentExtractor:
@@ -244,8 +246,9 @@ class ContentExtractor:
         return doc_types.get(ext, 'Unknown Document')
     
     def extract_images_analysis(self, soup: BeautifulSoup, base_url: str) -> Dict[str, Any]:
-        """تحليل شامل للصور"""
+        """تحليل شامل للصور (الأبعاد والأحجام الفعلية من ترويسات الصور عند تفعيل الفحص)"""
         images = soup.find_all('img')
+        policy = ImagePolicy(self.config.image_viewport_width, self.config.image_dpr, self.config.image_selection)
         
         image_analysis = []
         formats = {}
@@ -254,18 +257,12 @@ class ContentExtractor:
         for img in images[:30]:  # أول 30 صورة
             if not isinstance(img, Tag):
                 continue
-                
-            src = img.get('src')
-            if not src:
-                continue
             
-            # تحويل الروابط النسبية إلى مطلقة
-            if not src.startswith(('http://', 'https://', 'data:')):
-                src = urljoin(base_url, src)
-            
-            # تجاهل الصور data:
-            if src.startswith('data:'):
+            # الرابط الذي سيحمله المتصفح فعلاً (srcset و <picture> والتحميل الكسول)؛ صور data: تُتجاهل
+            choice = select_image(img, base_url, policy)
+            if choice is None or not choice.url.startswith(('http://', 'https://')):
                 continue
+            src = choice.url
             
             alt = img.get('alt', '')
             width = img.get('width', '')
@@ -273,14 +270,6 @@ class ContentExtractor:
             img_class = img.get('class', [])
             loading = img.get('loading', '')
             
-            # تحديد تنسيق الصورة
-            image_format = self._get_image_format(src)
-            formats[image_format] = formats.get(image_format, 0) + 1
-            
-            # تقدير حجم الصورة
-            estimated_size = self._estimate_image_size(width, height, image_format)
-            total_estimated_size += estimated_size
-            
             image_info = {
                 'src': src,
                 'alt': alt,
@@ -288,27 +277,87 @@ class ContentExtractor:
                 'height': str(height) if height else '',
                 'class': img_class if isinstance(img_class, list) else [img_class] if img_class else [],
                 'loading': loading,
-                'format': image_format,
-                'estimated_size_kb': estimated_size
+                'format': self._get_image_format(src),
+                'natural_width': None,
+                'natural_height': None,
+                'size_source': 'estimate'
             }
             
             image_analysis.append(image_info)
         
+        probe_stats = self._probe_image_headers(image_analysis)
+        
+        for image_info in image_analysis:
+            image_format = image_info['format']
+            formats[image_format] = formats.get(image_format, 0) + 1
+            
+            if image_info['size_source'] != 'probe':
+                # تقدير حجم الصورة من الأبعاد الفعلية إن عُرفت وإلا من السمات
+                image_info['estimated_size_kb'] = self._estimate_image_size(
+                    image_info['natural_width'] or image_info['width'],
+                    image_info['natural_height'] or image_info['height'],
+                    image_format
+                )
+            total_estimated_size += image_info['estimated_size_kb']
+        
+        total_size_mb = total_estimated_size / 1024
         return {
             'total_images': len(images),
             'analyzed_images': len(image_analysis),
             'images': image_analysis,
             'formats_distribution': formats,
             'lazy_loading_count': len(soup.find_all('img', loading='lazy')),
-            'total_estimated_size_mb': round(total_estimated_size / 1024, 2),
-            'optimization_suggestions': self._get_image_optimization_suggestions(formats, total_estimated_size)
+            'total_estimated_size_mb': round(total_size_mb, 2),
+            'probe': probe_stats,
+            'optimization_suggestions': self._get_image_optimization_suggestions(formats, total_size_mb, image_analysis)
         }
     
+    def _probe_image_headers(self, image_analysis: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """فحص ترويسات كل الصور بالتوازي وتحديث التنسيق والأبعاد والحجم الفعلي"""
+        probe_bytes = self.config.image_probe_kb * 1024
+        stats = {'enabled': probe_bytes > 0, 'probed': 0, 'failed': 0, 'bytes_read': 0, 'full_size_bytes': 0}
+        if not probe_bytes or not image_analysis or not self.session.session:
+            return stats
+        
+        results = probe_images(
+            self.session.session,
+            [image_info['src'] for image_info in image_analysis],
+            max_workers=self.config.concurrent_requests,
+            max_bytes=probe_bytes,
+            # مثل AssetDownloader: asset_timeout <= 0 يعني استخدام timeout العام
+            timeout=self.config.asset_timeout if self.config.asset_timeout > 0 else self.config.timeout,
+            verify=self.config.verify_ssl
+        )
+        self.session.count_requests(sum(result['requests'] for result in results.values()))
+        
+        for image_info in image_analysis:
+            result = results.get(image_info['src'])
+            if not result:
+                continue
+            stats['bytes_read'] += result['bytes_read']
+            if not result['success']:
+                stats['failed'] += 1
+                continue
+            stats['probed'] += 1
+            image_info['format'] = result['format']
+            image_info['natural_width'] = result['width']
+            image_info['natural_height'] = result['height']
+            if result['size'] is not None:
+                stats['full_size_bytes'] += result['size']
+                image_info['size_bytes'] = result['size']
+                image_info['estimated_size_kb'] = max(1, round(result['size'] / 1024))
+                image_info['size_source'] = 'probe'
+        
+        return stats
+    
     def _get_image_format(self, src: str) -> str:
         """تحديد تنسيق الصورة من الرابط"""
         if '.' in src:
             ext = src.split('.')[-1].split('?')[0].lower()
-            common_formats = ['jpg', 'jpeg', 'png', 'gif', 'webp', 'svg', 'bmp', 'tiff']
+            common_formats = ['jpg', 'jpeg', 'png', 'gif', 'webp', 'avif', 'svg', 'bmp', 'tiff']
+            if ext == 'jpg':
+                # نفس الاسم الذي يعيده فحص الترويسة
+                return 'jpeg'
             return ext if ext in common_formats else 'unknown'
         return 'unknown'
     
@@ -324,6 +373,7 @@ class ContentExtractor:
                 'png': 0.3,
                 'gif': 0.15,
                 'webp': 0.08,
+                'avif': 0.06,
                 'svg': 0.02,
                 'bmp': 3.0
             }
@@ -335,7 +385,8 @@ class ContentExtractor:
         except:
             return 50  # تقدير افتراضي
     
-    def _get_image_optimization_suggestions(self, formats: Dict[str, int], total_size_mb: float) -> List[str]:
+    def _get_image_optimization_suggestions(self, formats: Dict[str, int], total_size_mb: float,
+                                            images: Optional[List[Dict[str, Any]]] = None) -> List[str]:
         """اقتراحات تحسين الصور"""
         suggestions = []
         
@@ -345,12 +396,33 @@ class ContentExtractor:
         if 'bmp' in formats:
             suggestions.append("تحويل صور BMP إلى تنسيقات أحدث مثل WEBP أو JPEG")
         
-        if formats.get('jpg', 0) + formats.get('jpeg', 0) > formats.get('webp', 0) * 2:
+        if formats.get('jpeg', 0) > (formats.get('webp', 0) + formats.get('avif', 0)) * 2:
             suggestions.append("استخدام تنسيق WEBP لتحسين الأداء")
         
-        if not any(fmt in formats for fmt in ['webp', 'svg']):
+        if not any(fmt in formats for fmt in ['webp', 'avif', 'svg']):
             suggestions.append("استخدام تنسيقات حديثة مثل WEBP أو SVG")
         
+        # اقتراحات تعتمد على الأبعاد والأحجام الفعلية المفحوصة
+        heavy = [img for img in images or [] if img.get('size_source') == 'probe' and img['estimated_size_kb'] > 300]
+        if heavy:
+            suggestions.append(f"{len(heavy)} صور يتجاوز حجمها 300KB - يُنصح بضغطها")
+        
+        oversized = 0
+        for img in images or []:
+            try:
+                displayed = int(img['width'])
+            except (TypeError, ValueError):
+                continue
+            natural = img.get('natural_width')
+            if natural and displayed > 0 and natural > displayed * 2:
+                oversized += 1
+        if oversized:
+            suggestions.append(f"{oversized} صور أبعادها الفعلية أكبر من ضعف حجم عرضها - استخدم srcset أو صوراً مصغرة")
+        
+        missing_dimensions = sum(1 for img in images or [] if img.get('natural_width') and not (img['width'] and img['height']))
+        if missing_dimensions:
+            suggestions.append(f"{missing_dimensions} صور بلا سمات width/height - إضافتها تمنع إزاحة التخطيط")
+        
         return suggestions
     
     def extract_seo_analysis(self, soup: BeautifulSoup) -> Dict[str, Any]:
@@ -0,0 +1,258 @@
+"""
+واجهة الزحف المشتركة مع توحيد الروابط
+Shared Deduplicating Crawl Frontier
+"""
+
+import heapq
+import hashlib
+import math
+import posixpath
+from collections import deque
+from typing import Any, Dict, Iterable, Optional
+from urllib.parse import urljoin, urlparse, urlunparse, parse_qsl, urlencode
+
+from .crawl_scoring import CrawlScorerFunc, apply_scorer, rescore_item
+
+
+# معاملات تتبع لا تغير محتوى الصفحة
+TRACKING_PARAMS = {
+    'utm_source', 'utm_medium', 'utm_campaign', 'utm_term', 'utm_content',
+    'fbclid', 'gclid', 'msclkid', 'yclid', 'mc_cid', 'mc_eid', '_ga', 'ref_src'
+}
+
+_DEFAULT_DROP = frozenset(TRACKING_PARAMS)
+
+_DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def canonicalize_url(url: str, base_url: Optional[str] = None,
+                     drop_params: Iterable[str] = TRACKING_PARAMS) -> Optional[str]:
+    """توحيد الرابط: حذف #fragment والمنفذ الافتراضي والشرطة الأخيرة ومعاملات التتبع وترتيب query
+
+    يعيد None لرابط لا يمكن تحليله (منفذ غير رقمي، IPv6 بلا قوس إغلاق...) أو ليس http(s) مطلقاً
+    (mailto: و javascript: و //cdn بلا رابط أساس) ليتخطاه المستدعي.
+    """
+    try:
+        if base_url:
+            url = urljoin(base_url, url)
+        parsed = urlparse(url.strip())
+        port = parsed.port
+    except ValueError:
+        return None
+    scheme = parsed.scheme.lower()
+    host = (parsed.hostname or '').lower()
+    if scheme not in _DEFAULT_PORTS or not host:
+        return None
+    if ':' in host:
+        # hostname يحذف أقواس IPv6 ولا يصح الرابط بدونها
+        host = f"[{host}]"
+
+    netloc = host
+    if port and port != _DEFAULT_PORTS.get(scheme):
+        netloc = f"{host}:{port}"
+    if parsed.username:
+        userinfo = parsed.username + (f":{parsed.password}" if parsed.password else '')
+        netloc = f"{userinfo}@{netloc}"
+
+    path = parsed.path or '/'
+    if '.' in path or '//' in path:
+        # حل ./ و ../ ودمج الشرطات المكررة
+        path = posixpath.normpath(path)
+        if path.startswith('//'):
+            path = '/' + path.lstrip('/')
+    if len(path) > 1 and path.endswith('/'):
+        path = path.rstrip('/') or '/'
+
+    query = ''
+    if parsed.query:
+        drop = _DEFAULT_DROP if drop_params is TRACKING_PARAMS else {param.lower() for param in drop_params}
+        query_pairs = [
+            (key, value) for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+            if key.lower() not in drop
+        ]
+        query = urlencode(sorted(query_pairs))
+
+    return urlunparse((scheme, netloc, path, parsed.params, query, ''))
+
+
+class BloomFilter:
+    """مرشح Bloom بسيط لعضوية تقريبية بذاكرة ثابتة (للزحف الكبير جداً)"""
+
+    def __init__(self, capacity: int = 1_000_000, error_rate: float = 0.001):
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, int(round(self.size / self.capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        for i in range(self.hash_count):
+            yield (first + i * second) % self.size
+
+    def add(self, item: str) -> bool:
+        """إضافة عنصر، وإرجاع True إذا كان جديداً"""
+        is_new = False
+        for position in self._positions(item):
+            byte_index, bit = divmod(position, 8)
+            if not self.bits[byte_index] & (1 << bit):
+                self.bits[byte_index] |= (1 << bit)
+                is_new = True
+        if is_new:
+            self.count += 1
+        return is_new
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position // 8] & (1 << (position % 8)) for position in self._positions(item))
+
+    def __len__(self) -> int:
+        return self.count
+
+
+class CrawlFrontier:
+    """قائمة انتظار الزحف: توحيد الروابط + مجموعة بصمات للمكرر + deque أو heap حسب الأولوية
+
+    scorer: دالة أولوية (مثل CrawlScorer) تُطبق على كل رابط، ويُعاد تقييم الرابط المنتظر
+    كلما أُضيف مرة أخرى (رابط وارد جديد) فيتقدم في الترتيب.
+    """
+
+    def __init__(self, use_priority: bool = False, use_bloom: bool = False,
+                 bloom_capacity: int = 1_000_000, bloom_error_rate: float = 0.001,
+                 max_size: Optional[int] = None, scorer: Optional[CrawlScorerFunc] = None):
+        self.use_priority = use_priority or scorer is not None
+        self.max_size = max_size
+        self.scorer = scorer
+        self._queue = deque()
+        self._heap = []
+        self._sequence = 0
+        # الروابط المنتظرة ورقم آخر مدخل heap صالح لكل منها (المدخلات الأقدم تُتجاهل عند السحب)
+        self._queued: Dict[str, Dict[str, Any]] = {}
+        self._live_sequence: Dict[str, int] = {}
+        self._stale = 0
+        self._seen = BloomFilter(bloom_capacity, bloom_error_rate) if use_bloom else set()
+        self.stats = {'added': 0, 'duplicates': 0, 'dropped': 0, 'invalid': 0, 'popped': 0, 'rescored': 0}
+
+    @staticmethod
+    def canonicalize(url: str, base_url: Optional[str] = None) -> Optional[str]:
+        """توحيد الرابط"""
+        return canonicalize_url(url, base_url)
+
+    def _fingerprint(self, canonical_url: str):
+        """بصمة ثابتة الحجم للرابط الموحد"""
+        if isinstance(self._seen, BloomFilter):
+            return canonical_url
+        return hashlib.blake2b(canonical_url.encode('utf-8'), digest_size=8).digest()
+
+    def seen(self, url: str, canonical: bool = False) -> bool:
+        """هل سبقت إضافة الرابط"""
+        canonical_url = url if canonical else self.canonicalize(url)
+        return canonical_url is not None and self._fingerprint(canonical_url) in self._seen
+
+    def mark_seen(self, url: str, canonical: bool = False) -> Optional[str]:
+        """تسجيل الرابط كمُضاف دون وضعه في قائمة الانتظار"""
+        canonical_url = url if canonical else self.canonicalize(url)
+        if canonical_url is None:
+            return None
+        self._seen.add(self._fingerprint(canonical_url))
+        return canonical_url
+
+    def add(self, url: str, depth: int = 0, priority: float = 0.0, base_url: Optional[str] = None,
+            **meta) -> Optional[str]:
+        """إضافة رابط جديد، وإرجاع الرابط الموحد أو None إذا كان مكرراً أو تجاوز الحد أو غير صالح"""
+        canonical_url = self.canonicalize(url, base_url)
+        if canonical_url is None:
+            self.stats['invalid'] += 1
+            return None
+        fingerprint = self._fingerprint(canonical_url)
+
+        if fingerprint in self._seen:
+            self.stats['duplicates'] += 1
+            item = self._queued.get(canonical_url) if self.scorer is not None else None
+            if item is not None:
+                self.stats['rescored'] += 1
+                if rescore_item(self.scorer, item, depth, priority, meta):
+                    # المدخل القديم في heap يصبح غير صالح ويُتجاهل عند السحب
+                    self._stale += 1
+                    self._push(item)
+            return None
+        if self.max_size is not None and len(self) >= self.max_size:
+            self.stats['dropped'] += 1
+            return None
+
+        self._seen.add(fingerprint)
+        item = {'url': canonical_url, 'depth': depth, 'priority': priority}
+        item.update(meta)
+
+        if self.scorer is not None:
+            item['base_priority'] = priority
+            item['inlinks'] = 1 if depth > 0 else 0
+            apply_scorer(self.scorer, item)
+            self._queued[canonical_url] = item
+            self._push(item)
+        elif self.use_priority:
+            self._push(item)
+        else:
+            self._queue.append(item)
+
+        self.stats['added'] += 1
+        return canonical_url
+
+    def _push(self, item: Dict[str, Any]):
+        if self.scorer is not None:
+            self._live_sequence[item['url']] = self._sequence
+        heapq.heappush(self._heap, (-item['priority'], item['depth'], self._sequence, item))
+        self._sequence += 1
+
+    def pop(self) -> Optional[Dict[str, Any]]:
+        """أخذ العنصر التالي (الأعلى أولوية، أو الأقدم)"""
+        if self.use_priority:
+            while True:
+                if not self._heap:
+                    return None
+                _, _, sequence, item = heapq.heappop(self._heap)
+                if self.scorer is None:
+                    break
+                if self._live_sequence.get(item['url']) == sequence:
+                    del self._live_sequence[item['url']]
+                    del self._queued[item['url']]
+                    break
+                self._stale -= 1
+        else:
+            if not self._queue:
+                return None
+            item = self._queue.popleft()
+        self.stats['popped'] += 1
+        return item
+
+    def __len__(self) -> int:
+        return len(self._heap) - self._stale if self.use_priority else len(self._queue)
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    def __contains__(self, url: str) -> bool:
+        return self.seen(url)
+
+    def clear(self):
+        """تفريغ قائمة الانتظار والروابط المسجلة"""
+        self._queue.clear()
+        self._heap.clear()
+        self._queued.clear()
+        self._live_sequence.clear()
+        self._stale = 0
+        if isinstance(self._seen, BloomFilter):
+            self._seen = BloomFilter(self._seen.capacity, self._seen.error_rate)
+        else:
+            self._seen.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """إحصائيات الواجهة"""
+        return {
+            **self.stats,
+            'queued': len(self),
+            'seen': len(self._seen),
+            'bloom_filter': isinstance(self._seen, BloomFilter)
+        }
@@ -0,0 +1,137 @@
+"""
+تقييم أولوية الروابط في قائمة الزحف
+Crawl Frontier Priority Scoring
+"""
+
+import re
+import math
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+from urllib.parse import urlparse, parse_qsl
+
+
+# دالة التقييم: تستلم عنصر الواجهة (url, depth, inlinks وبيانات sitemap...) وتعيد رقماً، الأعلى يُزحف أولاً
+CrawlScorerFunc = Callable[[Dict[str, Any]], float]
+
+# صفحة البداية تُزحف قبل أي رابط آخر مهما كانت درجته
+SEED_PRIORITY = 1_000_000.0
+
+_NUMBER_RE = re.compile(r'\d+')
+
+# صفحات قوائم متسلسلة وأرشيفات وترتيب/تصفية: قيمتها قليلة بعد أول نسخة منها
+DEFAULT_PATTERN_PENALTIES: Tuple[Tuple[str, float], ...] = (
+    (r'/page/\d+', 2.0),
+    (r'[?&](page|paged|p|pg|start|offset)=\d+', 2.0),
+    (r'/(tag|tags|category|categories|author|archive|archives)/', 1.0),
+    (r'/\d{4}/\d{1,2}(/\d{1,2})?/?$', 1.0),
+    (r'[?&](sort|order|orderby|filter|view|replytocom|share|print)=', 1.5),
+    (r'/(feed|rss|amp|print)/?$', 1.5),
+)
+
+
+def url_template(url: str) -> str:
+    """قالب الرابط: المجلد الأب بعد توحيد الأرقام + مفاتيح query؛ الروابط ذات المقطع الواحد قالب مستقل"""
+    parsed = urlparse(url)
+    segments = [segment for segment in (parsed.path or '/').split('/') if segment]
+    if len(segments) > 1:
+        # /blog/first-post و /blog/second-post قالب واحد؛ /about و /contact صفحتان مختلفتان
+        segments = [_NUMBER_RE.sub('{n}', segment) for segment in segments[:-1]] + ['*']
+    else:
+        segments = ['{n}' if segment.isdigit() else segment for segment in segments]
+    keys = sorted({key for key, _ in parse_qsl(parsed.query, keep_blank_values=True)})
+    return '/' + '/'.join(segments) + (f"?{'&'.join(keys)}" if keys else '')
+
+
+def _parse_lastmod(value: Any) -> Optional[datetime]:
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        text = str(value).strip()
+        if text.endswith('Z'):
+            text = text[:-1] + '+00:00'
+        try:
+            parsed = datetime.fromisoformat(text)
+        except ValueError:
+            return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+class CrawlScorer:
+    """الدالة الافتراضية للأولوية: العمق، الروابط الواردة، sitemap (priority/lastmod)، نمط الرابط وجِدّة القالب
+
+    مثيل واحد لكل زحف: يحفظ عدد الروابط التي رآها من كل قالب لتقل جِدّة تكراراته.
+    """
+
+    def __init__(self, depth_weight: float = 1.0, inlink_weight: float = 1.0, sitemap_weight: float = 2.0,
+                 freshness_weight: float = 1.0, novelty_weight: float = 2.0, freshness_days: float = 365.0,
+                 pattern_penalties: Iterable[Tuple[str, float]] = DEFAULT_PATTERN_PENALTIES):
+        self.depth_weight = depth_weight
+        self.inlink_weight = inlink_weight
+        self.sitemap_weight = sitemap_weight
+        self.freshness_weight = freshness_weight
+        self.novelty_weight = novelty_weight
+        self.freshness_days = max(1.0, freshness_days)
+        self.pattern_penalties = [(re.compile(pattern, re.IGNORECASE), penalty)
+                                  for pattern, penalty in pattern_penalties]
+        self._templates: Counter = Counter()
+
+    def template_rank(self, item: Dict[str, Any]) -> int:
+        """ترتيب الرابط بين روابط قالبه (0 لأول رابط)؛ يُحفظ في العنصر فلا يتغير عند إعادة التقييم"""
+        rank = item.get('template_rank')
+        if rank is None:
+            template = url_template(item['url'])
+            rank = item['template_rank'] = self._templates[template]
+            self._templates[template] += 1
+        return rank
+
+    def freshness(self, lastmod: Any) -> float:
+        """1 لصفحة عُدلت الآن وتنخفض خطياً حتى 0 بعد freshness_days"""
+        modified = _parse_lastmod(lastmod)
+        if modified is None:
+            return 0.0
+        age_days = (datetime.now(timezone.utc) - modified).total_seconds() / 86400
+        return min(1.0, max(0.0, 1.0 - age_days / self.freshness_days))
+
+    def pattern_penalty(self, url: str) -> float:
+        """مجموع عقوبات أنماط الترقيم والأرشيف والتصفية المطابقة للرابط"""
+        return sum(penalty for pattern, penalty in self.pattern_penalties if pattern.search(url))
+
+    def __call__(self, item: Dict[str, Any]) -> float:
+        depth = item.get('depth', 0)
+        if depth == 0:
+            return SEED_PRIORITY
+
+        score = -self.depth_weight * depth
+        score += self.inlink_weight * math.log2(1 + item.get('inlinks', 0))
+        if item.get('sitemap_priority') is not None:
+            # 0.5 هي القيمة الافتراضية في مواصفة sitemap
+            score += self.sitemap_weight * (float(item['sitemap_priority']) - 0.5)
+        if item.get('lastmod'):
+            score += self.freshness_weight * self.freshness(item['lastmod'])
+        score += self.novelty_weight / (1 + self.template_rank(item))
+        score -= self.pattern_penalty(item['url'])
+        return score
+
+
+def apply_scorer(scorer: CrawlScorerFunc, item: Dict[str, Any]) -> float:
+    """الأولوية النهائية = الأولوية الأساسية من المستدعي (مثل خفض المكررات) + درجة الدالة"""
+    item['priority'] = round(item.get('base_priority', 0.0) + scorer(item), 6)
+    return item['priority']
+
+
+def rescore_item(scorer: CrawlScorerFunc, item: Dict[str, Any], depth: int, priority: float,
+                 meta: Dict[str, Any]) -> bool:
+    """رابط وارد جديد لرابط منتظر: تحديث الإشارات وإعادة التقييم؛ True إذا تغير موضعه في الترتيب"""
+    old_key = (item['priority'], item['depth'])
+    item['inlinks'] = item.get('inlinks', 0) + 1
+    item['base_priority'] = priority
+    item['depth'] = min(item['depth'], depth)
+    for key, value in meta.items():
+        # تكميل الإشارات الناقصة فقط (مثل lastmod من sitemap بعد اكتشاف الرابط في صفحة)
+        if value is not None and item.get(key) is None:
+            item[key] = value
+    apply_scorer(scorer, item)
+    return (item['priority'], item['depth']) != old_key
@@ -0,0 +1,376 @@
+"""
+حالة الزحف الدائمة القابلة للاستئناف
+Disk-Backed Resumable Crawl State
+"""
+
+import json
+import time
+import uuid
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .crawl_frontier import canonicalize_url
+from .crawl_scoring import CrawlScorerFunc, apply_scorer, rescore_item
+
+
+DEFAULT_CRAWL_DB = "extracted_files/crawl_state.db"
+# عدد الصفوف المقروءة في كل دفعة عند المرور على نتائج الصفحات
+RESULTS_BATCH_SIZE = 200
+
+
+class CrawlStore:
+    """تخزين واجهة الزحف والصفحات المكتملة في SQLite مع نقاط حفظ دورية"""
+
+    def __init__(self, db_path: str = DEFAULT_CRAWL_DB, checkpoint_every: int = 25):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.checkpoint_every = max(1, checkpoint_every)
+        self._lock = threading.RLock()
+        self._pending_writes: Dict[str, int] = {}
+        self._checkpoint_intervals: Dict[str, int] = {}
+
+        self.db_connection = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.db_connection.execute('PRAGMA journal_mode=WAL')
+        self.db_connection.executescript('''
+            CREATE TABLE IF NOT EXISTS crawls (
+                crawl_id TEXT PRIMARY KEY,
+                kind TEXT,
+                start_url TEXT,
+                config TEXT,
+                output_folder TEXT,
+                status TEXT,
+                pages_done INTEGER DEFAULT 0,
+                created_at REAL,
+                updated_at REAL,
+                checkpoint_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS crawl_urls (
+                crawl_id TEXT,
+                url TEXT,
+                depth INTEGER,
+                priority REAL DEFAULT 0,
+                meta TEXT,
+                state TEXT,
+                status_code INTEGER,
+                content_hash TEXT,
+                result TEXT,
+                updated_at REAL,
+                PRIMARY KEY (crawl_id, url)
+            );
+            CREATE INDEX IF NOT EXISTS idx_crawl_urls_queue ON crawl_urls (crawl_id, state, priority);
+        ''')
+        self.db_connection.commit()
+
+    # ---------- الزحفات ----------
+
+    def create_crawl(self, start_url: str, kind: str, config: Dict[str, Any], output_folder: str,
+                     crawl_id: Optional[str] = None) -> str:
+        """تسجيل زحف جديد وإرجاع معرّفه"""
+        crawl_id = crawl_id or f"crawl_{int(time.time())}_{uuid.uuid4().hex[:8]}"
+        now = time.time()
+        with self._lock:
+            self.db_connection.execute('''
+                INSERT OR REPLACE INTO crawls
+                (crawl_id, kind, start_url, config, output_folder, status, pages_done, created_at, updated_at, checkpoint_at)
+                VALUES (?, ?, ?, ?, ?, 'running', 0, ?, ?, ?)
+            ''', (crawl_id, kind, start_url, json.dumps(config, ensure_ascii=False, default=str),
+                  str(output_folder), now, now, now))
+            self.db_connection.commit()
+        return crawl_id
+
+    def get_crawl(self, crawl_id: str) -> Optional[Dict[str, Any]]:
+        """بيانات زحف مسجل"""
+        with self._lock:
+            row = self.db_connection.execute(
+                'SELECT crawl_id, kind, start_url, config, output_folder, status, pages_done, '
+                'created_at, updated_at, checkpoint_at FROM crawls WHERE crawl_id = ?',
+                (crawl_id,)
+            ).fetchone()
+            if not row:
+                return None
+            queued = self.db_connection.execute(
+                "SELECT COUNT(*) FROM crawl_urls WHERE crawl_id = ? AND state IN ('queued', 'in_progress')",
+                (crawl_id,)
+            ).fetchone()[0]
+
+        return {
+            'crawl_id': row[0],
+            'kind': row[1],
+            'start_url': row[2],
+            'config': json.loads(row[3]) if row[3] else {},
+            'output_folder': row[4],
+            'status': row[5],
+            'pages_done': row[6],
+            'created_at': row[7],
+            'updated_at': row[8],
+            'checkpoint_at': row[9],
+            'urls_pending': queued
+        }
+
+    def list_crawls(self, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        """قائمة الزحفات المسجلة (اختيارياً حسب الحالة)"""
+        with self._lock:
+            if status:
+                rows = self.db_connection.execute(
+                    'SELECT crawl_id FROM crawls WHERE status = ? ORDER BY created_at DESC', (status,)
+                ).fetchall()
+            else:
+                rows = self.db_connection.execute('SELECT crawl_id FROM crawls ORDER BY created_at DESC').fetchall()
+        return [self.get_crawl(row[0]) for row in rows]
+
+    def prepare_resume(self, crawl_id: str) -> int:
+        """إعادة الصفحات التي انقطع زحفها إلى قائمة الانتظار"""
+        with self._lock:
+            cursor = self.db_connection.execute(
+                "UPDATE crawl_urls SET state = 'queued' WHERE crawl_id = ? AND state = 'in_progress'",
+                (crawl_id,)
+            )
+            self.db_connection.execute(
+                "UPDATE crawls SET status = 'running', updated_at = ? WHERE crawl_id = ?",
+                (time.time(), crawl_id)
+            )
+            self.db_connection.commit()
+            return cursor.rowcount
+
+    def finish_crawl(self, crawl_id: str, status: str = 'completed'):
+        """إنهاء الزحف مع نقطة حفظ أخيرة"""
+        self.checkpoint(crawl_id, status)
+
+    def checkpoint(self, crawl_id: str, status: str = 'running'):
+        """كتابة التغييرات المعلقة على القرص"""
+        now = time.time()
+        with self._lock:
+            pages_done = self.db_connection.execute(
+                "SELECT COUNT(*) FROM crawl_urls WHERE crawl_id = ? AND state = 'done'", (crawl_id,)
+            ).fetchone()[0]
+            self.db_connection.execute(
+                'UPDATE crawls SET status = ?, pages_done = ?, updated_at = ?, checkpoint_at = ? WHERE crawl_id = ?',
+                (status, pages_done, now, now, crawl_id)
+            )
+            self.db_connection.commit()
+            self._pending_writes[crawl_id] = 0
+
+    def set_checkpoint_interval(self, crawl_id: str, pages: int):
+        """تغيير عدد الصفحات بين نقاط الحفظ لزحف معين"""
+        self._checkpoint_intervals[crawl_id] = max(1, pages)
+
+    def _maybe_checkpoint(self, crawl_id: str):
+        """نقطة حفظ كل checkpoint_every صفحة"""
+        self._pending_writes[crawl_id] = self._pending_writes.get(crawl_id, 0) + 1
+        if self._pending_writes[crawl_id] >= self._checkpoint_intervals.get(crawl_id, self.checkpoint_every):
+            self.checkpoint(crawl_id)
+
+    # ---------- الروابط ----------
+
+    def enqueue(self, crawl_id: str, url: str, depth: int = 0, priority: float = 0.0,
+                meta: Optional[Dict[str, Any]] = None) -> bool:
+        """إضافة رابط موحد إلى الانتظار إذا لم يُرَ من قبل"""
+        with self._lock:
+            cursor = self.db_connection.execute('''
+                INSERT OR IGNORE INTO crawl_urls (crawl_id, url, depth, priority, meta, state, updated_at)
+                VALUES (?, ?, ?, ?, ?, 'queued', ?)
+            ''', (crawl_id, url, depth, priority, json.dumps(meta or {}, ensure_ascii=False), time.time()))
+            return cursor.rowcount == 1
+
+    def dequeue(self, crawl_id: str) -> Optional[Dict[str, Any]]:
+        """أخذ الرابط التالي (الأعلى أولوية ثم الأقدم) ووسمه قيد الزحف"""
+        with self._lock:
+            row = self.db_connection.execute('''
+                SELECT rowid, url, depth, priority, meta FROM crawl_urls
+                WHERE crawl_id = ? AND state = 'queued'
+                ORDER BY priority DESC, rowid LIMIT 1
+            ''', (crawl_id,)).fetchone()
+            if not row:
+                return None
+            self.db_connection.execute(
+                "UPDATE crawl_urls SET state = 'in_progress' WHERE rowid = ?", (row[0],)
+            )
+
+        item = json.loads(row[4]) if row[4] else {}
+        item.update({'url': row[1], 'depth': row[2], 'priority': row[3]})
+        return item
+
+    def get_queued(self, crawl_id: str, url: str) -> Optional[Dict[str, Any]]:
+        """عنصر رابط ما زال في الانتظار (أو None)"""
+        with self._lock:
+            row = self.db_connection.execute('''
+                SELECT depth, priority, meta FROM crawl_urls
+                WHERE crawl_id = ? AND url = ? AND state = 'queued'
+            ''', (crawl_id, url)).fetchone()
+        if not row:
+            return None
+        item = json.loads(row[2]) if row[2] else {}
+        item.update({'url': url, 'depth': row[0], 'priority': row[1]})
+        return item
+
+    def requeue(self, crawl_id: str, url: str, depth: int, priority: float,
+                meta: Optional[Dict[str, Any]] = None):
+        """تحديث عمق وأولوية رابط منتظر بعد إعادة تقييمه"""
+        with self._lock:
+            self.db_connection.execute('''
+                UPDATE crawl_urls SET depth = ?, priority = ?, meta = ?
+                WHERE crawl_id = ? AND url = ? AND state = 'queued'
+            ''', (depth, priority, json.dumps(meta or {}, ensure_ascii=False), crawl_id, url))
+
+    def queued_count(self, crawl_id: str) -> int:
+        """عدد الروابط في الانتظار"""
+        with self._lock:
+            return self.db_connection.execute(
+                "SELECT COUNT(*) FROM crawl_urls WHERE crawl_id = ? AND state = 'queued'", (crawl_id,)
+            ).fetchone()[0]
+
+    def is_seen(self, crawl_id: str, url: str) -> bool:
+        """هل سبقت إضافة الرابط لهذا الزحف"""
+        with self._lock:
+            return self.db_connection.execute(
+                'SELECT 1 FROM crawl_urls WHERE crawl_id = ? AND url = ?', (crawl_id, url)
+            ).fetchone() is not None
+
+    def record_page(self, crawl_id: str, url: str, status: str, status_code: Optional[int] = None,
+                    content: Optional[bytes] = None, result: Optional[Dict[str, Any]] = None):
+        """تسجيل نتيجة صفحة ('done' أو 'failed' أو 'duplicate') مع بصمة المحتوى"""
+        content_hash = hashlib.sha256(content).hexdigest() if content is not None else None
+        now = time.time()
+        with self._lock:
+            cursor = self.db_connection.execute('''
+                UPDATE crawl_urls SET state = ?, status_code = ?, content_hash = ?, result = ?, updated_at = ?
+                WHERE crawl_id = ? AND url = ?
+            ''', (status, status_code, content_hash, json.dumps(result or {}, ensure_ascii=False, default=str),
+                  now, crawl_id, url))
+            if cursor.rowcount == 0:
+                self.db_connection.execute('''
+                    INSERT INTO crawl_urls (crawl_id, url, depth, state, status_code, content_hash, result, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (crawl_id, url, (result or {}).get('depth', 0), status, status_code, content_hash,
+                      json.dumps(result or {}, ensure_ascii=False, default=str), now))
+            self._maybe_checkpoint(crawl_id)
+
+    def count_pages(self, crawl_id: str, state: str = 'done') -> int:
+        """عدد الصفحات في حالة معينة"""
+        with self._lock:
+            return self.db_connection.execute(
+                'SELECT COUNT(*) FROM crawl_urls WHERE crawl_id = ? AND state = ?', (crawl_id, state)
+            ).fetchone()[0]
+
+    def iter_page_results(self, crawl_id: str,
+                          batch_size: int = RESULTS_BATCH_SIZE) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """المرور على نتائج الصفحات المكتملة والفاشلة والمكررة دون تحميلها كلها معاً
+
+        تُقرأ دفعات بحسب rowid فلا يبقى في الذاكرة أكثر من دفعة، ولا يبقى المؤشر مفتوحاً
+        بين الدفعات (الكتابة على نفس الاتصال أثناء المرور آمنة).
+        """
+        last_rowid = 0
+        while True:
+            with self._lock:
+                rows = self.db_connection.execute(
+                    "SELECT rowid, url, result FROM crawl_urls WHERE crawl_id = ? AND rowid > ? "
+                    "AND state IN ('done', 'failed', 'duplicate') ORDER BY rowid LIMIT ?",
+                    (crawl_id, last_rowid, batch_size)
+                ).fetchall()
+            for last_rowid, url, result in rows:
+                yield url, json.loads(result) if result else {}
+            if len(rows) < batch_size:
+                return
+
+    def frontier(self, crawl_id: str, scorer: Optional[CrawlScorerFunc] = None) -> 'PersistentCrawlFrontier':
+        """واجهة زحف مخزنة على القرص لهذا الزحف"""
+        return PersistentCrawlFrontier(self, crawl_id, scorer)
+
+    def close(self):
+        """إغلاق قاعدة البيانات"""
+        with self._lock:
+            self.db_connection.commit()
+            self.db_connection.close()
+
+
+class PersistentCrawlFrontier:
+    """نفس واجهة CrawlFrontier لكن الانتظار والروابط المرئية في SQLite (ذاكرة ثابتة)
+
+    إشارات scorer (الروابط الواردة، ترتيب القالب...) تُحفظ مع الرابط فتبقى بعد الاستئناف.
+    """
+
+    def __init__(self, store: CrawlStore, crawl_id: str, scorer: Optional[CrawlScorerFunc] = None):
+        self.store = store
+        self.crawl_id = crawl_id
+        self.scorer = scorer
+        self.stats = {'added': 0, 'duplicates': 0, 'dropped': 0, 'invalid': 0, 'popped': 0, 'rescored': 0}
+
+    @staticmethod
+    def canonicalize(url: str, base_url: Optional[str] = None) -> Optional[str]:
+        """توحيد الرابط"""
+        return canonicalize_url(url, base_url)
+
+    def add(self, url: str, depth: int = 0, priority: float = 0.0, base_url: Optional[str] = None,
+            **meta) -> Optional[str]:
+        """إضافة رابط جديد، وإرجاع الرابط الموحد أو None إذا كان مكرراً أو غير صالح"""
+        canonical_url = self.canonicalize(url, base_url)
+        if canonical_url is None:
+            self.stats['invalid'] += 1
+            return None
+        if self.scorer is not None:
+            queued = self.store.get_queued(self.crawl_id, canonical_url)
+            if queued is not None:
+                self.stats['duplicates'] += 1
+                self.stats['rescored'] += 1
+                if rescore_item(self.scorer, queued, depth, priority, meta):
+                    self.store.requeue(self.crawl_id, canonical_url, queued['depth'], queued['priority'],
+                                       self._signals(queued))
+                return None
+            if self.store.is_seen(self.crawl_id, canonical_url):
+                self.stats['duplicates'] += 1
+                return None
+            item = dict(meta, url=canonical_url, depth=depth, base_priority=priority,
+                        inlinks=1 if depth > 0 else 0)
+            priority = apply_scorer(self.scorer, item)
+            meta = self._signals(item)
+        if self.store.enqueue(self.crawl_id, canonical_url, depth, priority, meta):
+            self.stats['added'] += 1
+            return canonical_url
+        self.stats['duplicates'] += 1
+        return None
+
+    @staticmethod
+    def _signals(item: Dict[str, Any]) -> Dict[str, Any]:
+        """ما يُحفظ في عمود meta: كل شيء عدا الأعمدة المستقلة"""
+        return {key: value for key, value in item.items() if key not in ('url', 'depth', 'priority')}
+
+    def pop(self) -> Optional[Dict[str, Any]]:
+        """أخذ العنصر التالي"""
+        item = self.store.dequeue(self.crawl_id)
+        if item is not None:
+            self.stats['popped'] += 1
+        return item
+
+    def seen(self, url: str, canonical: bool = False) -> bool:
+        """هل سبقت إضافة الرابط"""
+        canonical_url = url if canonical else self.canonicalize(url)
+        return canonical_url is not None and self.store.is_seen(self.crawl_id, canonical_url)
+
+    def __len__(self) -> int:
+        return self.store.queued_count(self.crawl_id)
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    def __contains__(self, url: str) -> bool:
+        return self.seen(url)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """إحصائيات الواجهة"""
+        return {**self.stats, 'queued': len(self), 'crawl_id': self.crawl_id}
+
+
+_default_store: Optional[CrawlStore] = None
+_default_store_lock = threading.Lock()
+
+
+def get_crawl_store(db_path: str = DEFAULT_CRAWL_DB) -> CrawlStore:
+    """مخزن الزحف المشترك على مستوى العملية"""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = CrawlStore(db_path)
+        return _default_store
@@ -0,0 +1,276 @@
+"""
+محلل اعتماديات CSS وإعادة كتابة المراجع لمسارات محلية
+CSS Dependency Tokenizer and Local Path Rewriter
+"""
+
+import os
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple, Union
+from urllib.parse import urljoin, urldefrag
+
+from bs4 import BeautifulSoup, Tag
+
+from .responsive_images import LAZY_SRC_ATTRIBUTES, LAZY_SRCSET_ATTRIBUTES, parse_srcset
+
+
+# أقصى عمق لسلاسل @import (الدورات تُكتشف بالروابط المحجوزة، هذا حد أمان إضافي)
+MAX_IMPORT_DEPTH = 10
+
+_IDENT_RE = re.compile(r'-?[A-Za-z_][\w-]*')
+_IDENT_CHARS = re.compile(r'[\w-]')
+_NON_FETCHABLE = ('data:', 'about:', 'javascript:', 'blob:', 'mailto:')
+_NEEDS_QUOTES = re.compile(r'[\s()\'"\\]')
+
+# سمات الصورة المتجاوبة والكسولة التي تُحذف بعد توجيه src للنسخة المحلية (وإلا حمّل المتصفح البعيدة)
+_RESPONSIVE_IMAGE_ATTRIBUTES = ('srcset', 'sizes', 'data-sizes') + LAZY_SRCSET_ATTRIBUTES + LAZY_SRC_ATTRIBUTES
+
+
+@dataclass
+class CssReference:
+    """مرجع واحد في نص CSS: الرابط كما كُتب ونوعه وموضعه (لإعادة الكتابة)"""
+    url: str
+    kind: str  # import / font / image
+    start: int
+    end: int
+    quoted: bool
+
+
+def _read_string(css: str, i: int) -> Tuple[int, int, int]:
+    """سلسلة نصية تبدأ عند i: (بداية المحتوى، نهايته، الموضع بعدها)"""
+    quote = css[i]
+    j = i + 1
+    n = len(css)
+    while j < n:
+        char = css[j]
+        if char == '\\':
+            j += 2
+            continue
+        if char == quote:
+            return i + 1, j, j + 1
+        if char == '\n':
+            # سلسلة غير منتهية: تنتهي عند السطر كما في مواصفة CSS
+            break
+        j += 1
+    return i + 1, j, j
+
+
+def _skip_whitespace(css: str, i: int) -> int:
+    while i < len(css) and css[i].isspace():
+        i += 1
+    return i
+
+
+def _read_url_token(css: str, i: int) -> Tuple[Optional[Tuple[int, int, bool]], int]:
+    """محتوى url(...) بعد القوس المفتوح: ((بداية، نهاية، بين علامات تنصيص)، الموضع بعد القوس المغلق)"""
+    i = _skip_whitespace(css, i)
+    if i < len(css) and css[i] in '"\'':
+        start, end, i = _read_string(css, i)
+        close = css.find(')', i)
+        return (start, end, True), (len(css) if close < 0 else close + 1)
+    close = css.find(')', i)
+    close = len(css) if close < 0 else close
+    start, end = i, close
+    while end > start and css[end - 1].isspace():
+        end -= 1
+    return (start, end, False), close + 1
+
+
+def find_css_references(css: str) -> List[CssReference]:
+    """تحليل نص CSS بمحلل رموز بسيط: @import و url() (مع تمييز @font-face) و image-set()
+
+    التعليقات والسلاسل خارج هذه السياقات تُتخطى فلا تُلتقط روابط منها كما يحدث مع التعبيرات النمطية.
+    """
+    references: List[CssReference] = []
+    i, n = 0, len(css)
+    block_depth = 0
+    font_face_depth = None
+    pending_font_face = False
+    paren_depth = 0
+    image_set_depth = None
+
+    while i < n:
+        char = css[i]
+
+        if css.startswith('/*', i):
+            close = css.find('*/', i + 2)
+            i = n if close < 0 else close + 2
+            continue
+
+        if char in '"\'':
+            start, end, after = _read_string(css, i)
+            if image_set_depth is not None and paren_depth == image_set_depth:
+                # image-set("a.png" 1x, "b.png" 2x): السلاسل المجردة روابط (وليس type("image/avif"))
+                references.append(CssReference(css[start:end], 'image', start, end, True))
+            i = after
+            continue
+
+        if char == '@':
+            match = _IDENT_RE.match(css, i + 1)
+            name = match.group(0).lower() if match else ''
+            i = match.end() if match else i + 1
+            if name == 'import':
+                j = _skip_whitespace(css, i)
+                if css[j:j + 4].lower() == 'url(':
+                    token, i = _read_url_token(css, j + 4)
+                elif j < n and css[j] in '"\'':
+                    start, end, i = _read_string(css, j)
+                    token = (start, end, True)
+                else:
+                    token = None
+                if token and token[1] > token[0]:
+                    references.append(CssReference(css[token[0]:token[1]], 'import', *token))
+            elif name == 'font-face':
+                pending_font_face = True
+            continue
+
+        if char == '{':
+            block_depth += 1
+            if pending_font_face:
+                font_face_depth = block_depth
+                pending_font_face = False
+        elif char == '}':
+            if font_face_depth == block_depth:
+                font_face_depth = None
+            block_depth = max(0, block_depth - 1)
+        elif char == ';':
+            pending_font_face = False
+        elif char == '(':
+            paren_depth += 1
+        elif char == ')':
+            if image_set_depth == paren_depth:
+                image_set_depth = None
+            paren_depth = max(0, paren_depth - 1)
+        elif (char.isalpha() or char == '-') and (i == 0 or not _IDENT_CHARS.match(css[i - 1])):
+            match = _IDENT_RE.match(css, i)
+            if match and match.end() < n and css[match.end()] == '(':
+                name = match.group(0).lower()
+                if name == 'url':
+                    token, i = _read_url_token(css, match.end() + 1)
+                    if token[1] > token[0]:
+                        kind = 'font' if font_face_depth is not None else 'image'
+                        references.append(CssReference(css[token[0]:token[1]], kind, *token))
+                    continue
+                if name in ('image-set', '-webkit-image-set'):
+                    paren_depth += 1
+                    image_set_depth = paren_depth
+                    i = match.end() + 1
+                    continue
+            if match:
+                i = match.end()
+                continue
+        i += 1
+
+    return references
+
+
+def resolve_css_url(reference: str, base_url: str) -> Optional[str]:
+    """رابط مطلق للمرجع بالنسبة لملف CSS؛ None لما لا يُجلب (data:، #id داخل SVG...)"""
+    reference = reference.strip()
+    if not reference or reference.startswith('#') or reference.lower().startswith(_NON_FETCHABLE):
+        return None
+    absolute, _ = urldefrag(urljoin(base_url, reference))
+    return absolute if absolute.startswith(('http://', 'https://')) else None
+
+
+def rewrite_css(css: str, references: List[CssReference],
+                replacement: Callable[[CssReference], Optional[str]]) -> Tuple[str, int]:
+    """استبدال المراجع (من النهاية للبداية لتبقى المواضع صحيحة)؛ يعيد النص وعدد المراجع المستبدلة"""
+    parts = []
+    last = len(css)
+    count = 0
+    for reference in sorted(references, key=lambda ref: ref.start, reverse=True):
+        new_value = replacement(reference)
+        if new_value is None:
+            continue
+        if not reference.quoted and _NEEDS_QUOTES.search(new_value):
+            new_value = '"' + new_value.replace('"', '\\"') + '"'
+        parts.append(css[reference.end:last])
+        parts.append(new_value)
+        last = reference.start
+        count += 1
+    parts.append(css[:last])
+    return ''.join(reversed(parts)), count
+
+
+def relative_asset_path(target: Union[str, Path], from_dir: Union[str, Path]) -> str:
+    """مسار نسبي بفواصل URL من مجلد الملف إلى الأصل المحلي"""
+    return Path(os.path.relpath(target, from_dir)).as_posix()
+
+
+def localize_css(css: str, css_url: str, local_paths: Dict[str, str], from_dir: Union[str, Path]) -> Tuple[str, int]:
+    """إعادة كتابة مراجع نص CSS إلى المسارات المحلية المحملة"""
+    def replacement(reference: CssReference) -> Optional[str]:
+        absolute = resolve_css_url(reference.url, css_url)
+        target = local_paths.get(absolute) if absolute else None
+        return relative_asset_path(target, from_dir) if target else None
+
+    return rewrite_css(css, find_css_references(css), replacement)
+
+
+def _image_urls(img: Tag) -> List[str]:
+    """كل روابط عنصر img: srcset و <source> الأب <picture> وسمات التحميل الكسول ثم src"""
+    picture = img.parent if isinstance(img.parent, Tag) and img.parent.name == 'picture' else None
+    elements = (picture.find_all('source', recursive=False) if picture is not None else []) + [img]
+    urls = []
+    for element in elements:
+        for attribute in ('srcset',) + LAZY_SRCSET_ATTRIBUTES:
+            urls.extend(candidate.url for candidate in parse_srcset(element.get(attribute) or ''))
+    urls.extend(img.get(attribute) for attribute in LAZY_SRC_ATTRIBUTES + ('src',) if img.get(attribute))
+    return urls
+
+
+def localize_html(html: str, page_url: str, local_paths: Dict[str, str], from_dir: Union[str, Path]) -> Tuple[str, int]:
+    """نسخة من الصفحة تشير إلى الأصول المحلية (src/href و srcset و <style> و style="") لتعمل دون اتصال"""
+    soup = BeautifulSoup(html, 'html.parser')
+    base = soup.find('base', href=True)
+    base_url = urljoin(page_url, base['href']) if base else page_url
+    count = 0
+
+    def local(value: Optional[str]) -> Optional[str]:
+        if not value:
+            return None
+        absolute, _ = urldefrag(urljoin(base_url, value.strip()))
+        target = local_paths.get(absolute)
+        return relative_asset_path(target, from_dir) if target else None
+
+    # المحمل اختار مرشحاً واحداً لكل صورة: src يشير إليه وتُحذف srcset/sizes والسمات الكسولة و <source>
+    for img in soup.find_all('img'):
+        new_value = next(filter(None, map(local, _image_urls(img))), None)
+        if not new_value:
+            continue
+        picture = img.parent if isinstance(img.parent, Tag) and img.parent.name == 'picture' else None
+        if picture is not None:
+            for source in picture.find_all('source', recursive=False):
+                source.decompose()
+        for attribute in _RESPONSIVE_IMAGE_ATTRIBUTES:
+            if attribute in img.attrs:
+                del img[attribute]
+        img['src'] = new_value
+        count += 1
+
+    for tag in soup.find_all(['link', 'script', 'source', 'video', 'audio', 'a']):
+        for attribute in ('href', 'src'):
+            new_value = local(tag.get(attribute))
+            if new_value:
+                tag[attribute] = new_value
+                count += 1
+
+    for style in soup.find_all('style'):
+        if style.string:
+            text, replaced = localize_css(style.string, base_url, local_paths, from_dir)
+            if replaced:
+                style.string = text
+                count += replaced
+
+    for tag in soup.find_all(style=True):
+        text, replaced = localize_css(tag['style'], base_url, local_paths, from_dir)
+        if replaced:
+            tag['style'] = text
+            count += replaced
+
+    if base:
+        # المسارات المحلية نسبية لمجلد الصفحة وليس لرابط الموقع
+        base.decompose()
+    return str(soup), count
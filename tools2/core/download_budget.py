@@ -0,0 +1,144 @@
+"""
+ميزانية التحميل لكل عملية استخراج (البايتات والعدد والوقت) مع أولويات الأصول
+Per-Extraction Download Budget
+"""
+
+import time
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+
+# الأولوية الأصغر تُحمل أولاً وتبقى آخر ما يُلغى
+PRIORITY_CRITICAL = 0  # CSS والصور الأولى في الصفحة
+PRIORITY_HIGH = 1      # JavaScript والخطوط وموارد CSS
+PRIORITY_NORMAL = 2    # بقية الصور
+PRIORITY_LOW = 3       # الوسائط والمستندات
+
+CATEGORY_PRIORITIES = {
+    'css': PRIORITY_CRITICAL,
+    'js': PRIORITY_HIGH,
+    'fonts': PRIORITY_HIGH,
+    'css_resources': PRIORITY_HIGH,
+    'images': PRIORITY_NORMAL,
+    'media': PRIORITY_LOW,
+    'documents': PRIORITY_LOW,
+    'other': PRIORITY_LOW
+}
+
+# عدد الصور الأولى في الصفحة التي تعامل كحرجة (تقريب لما يظهر أعلى الصفحة)
+DEFAULT_CRITICAL_IMAGES = 6
+
+DEFAULT_BUDGET_MB = 500
+DEFAULT_BUDGET_ASSETS = 1000
+DEFAULT_BUDGET_SECONDS = 600.0
+# أقصى حجم لملف واحد في التحميل القابل للاستئناف (مثل max_file_size_mb في ExtractionConfig)
+DEFAULT_MAX_FILE_MB = 50
+
+
+def asset_priority(category: str, index: Optional[int] = None,
+                   critical_images: int = DEFAULT_CRITICAL_IMAGES) -> int:
+    """أولوية الأصل حسب نوعه؛ index ترتيب الصورة في الصفحة"""
+    if category == 'images' and index is not None and index < critical_images:
+        return PRIORITY_CRITICAL
+    return CATEGORY_PRIORITIES.get(category, PRIORITY_LOW)
+
+
+class BudgetExceeded(Exception):
+    """نفدت ميزانية الاستخراج؛ التحميل الجاري يُلغى"""
+
+
+class DownloadBudget:
+    """ميزانية مشتركة بين خيوط التحميل: كل أصل يحجز مكاناً قبل الطلب ويُحتسب كل جزء يُقرأ"""
+
+    def __init__(self, max_bytes: Optional[int] = None, max_assets: Optional[int] = None,
+                 max_seconds: Optional[float] = None, cancel_above: int = PRIORITY_CRITICAL):
+        # 0 أو None = بلا حد
+        self.max_bytes = max_bytes or None
+        self.max_assets = max_assets or None
+        self.max_seconds = max_seconds or None
+        # عند نفاد الميزانية تُلغى التحميلات الجارية ذات الأولوية الأدنى من هذا المستوى؛ الحرجة تكمل
+        self.cancel_above = cancel_above
+        self.started = time.monotonic()
+        self.used_bytes = 0
+        self.admitted = 0
+        self.exhausted: Optional[str] = None
+        self.skipped: List[Dict[str, Any]] = []
+        self.cancelled: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config) -> 'DownloadBudget':
+        return cls(config.budget_max_mb * 1024 * 1024, config.budget_max_assets, config.budget_max_seconds)
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def remaining_seconds(self) -> Optional[float]:
+        return None if self.max_seconds is None else max(0.0, self.max_seconds - self.elapsed)
+
+    def _check_locked(self) -> Optional[str]:
+        """سبب النفاد إن وُجد (يُحفظ أول سبب)"""
+        if self.exhausted:
+            return self.exhausted
+        if self.max_seconds is not None and self.elapsed >= self.max_seconds:
+            self.exhausted = 'time'
+        elif self.max_bytes is not None and self.used_bytes >= self.max_bytes:
+            self.exhausted = 'bytes'
+        return self.exhausted
+
+    def reserve(self, url: str, category: str, priority: int) -> Optional[str]:
+        """حجز مكان لأصل قبل طلبه؛ يعيد سبب التخطي (ويسجله) أو None إذا قُبل"""
+        with self._lock:
+            reason = self._check_locked()
+            if not reason and self.max_assets is not None and self.admitted >= self.max_assets:
+                reason = 'assets'
+            if reason:
+                self.skipped.append({'url': url, 'category': category, 'priority': priority, 'reason': reason})
+                return reason
+            self.admitted += 1
+            return None
+
+    def expect(self, size: Optional[int], url: str, category: str, priority: int):
+        """فحص الحجم المعلن قبل قراءة الجسم: ما سيتجاوز المتبقي حتماً يُتخطى بدل تحميله ثم إلغائه"""
+        with self._lock:
+            if not size or self.max_bytes is None or priority <= self.cancel_above \
+                    or self.used_bytes + size <= self.max_bytes:
+                return
+            self.admitted -= 1
+            self.skipped.append({'url': url, 'category': category, 'priority': priority, 'reason': 'bytes',
+                                 'size': size})
+        raise BudgetExceeded(f"Asset of {size} bytes exceeds the remaining extraction budget")
+
+    def release(self):
+        """إعادة مكان أصل محجوز فشل تحميله لسبب غير الميزانية (كما يفعل expect عند التخطي)"""
+        with self._lock:
+            self.admitted = max(0, self.admitted - 1)
+
+    def consume(self, size: int, url: str, category: str, priority: int):
+        """احتساب بايتات مقروءة؛ يرفع BudgetExceeded لإلغاء التحميل الجاري إن كانت أولويته منخفضة"""
+        with self._lock:
+            self.used_bytes += size
+            reason = self._check_locked()
+            if reason and priority > self.cancel_above:
+                self.cancelled.append({'url': url, 'category': category, 'priority': priority, 'reason': reason})
+                raise BudgetExceeded(f"Extraction budget exhausted ({reason})")
+
+    def track(self, chunks: Iterable[bytes], url: str, category: str, priority: int) -> Iterator[bytes]:
+        """تمرير أجزاء التحميل عبر الميزانية"""
+        for chunk in chunks:
+            self.consume(len(chunk), url, category, priority)
+            yield chunk
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            self._check_locked()
+            return {
+                'limits': {'max_bytes': self.max_bytes, 'max_assets': self.max_assets,
+                           'max_seconds': self.max_seconds},
+                'used': {'bytes': self.used_bytes, 'assets': self.admitted,
+                         'seconds': round(self.elapsed, 3)},
+                'exhausted': self.exhausted,
+                'skipped': list(self.skipped),
+                'cancelled': list(self.cancelled)
+            }
@@ -16,6 +16,7 @@ from .file_manager import FileManager
 from .content_extractor import ContentExtractor
 from .security_analyzer import SecurityAnalyzer
 from .asset_downloader import AssetDownloader
+from .css_resolver import localize_html
 from .cms_detector import CMSDetector
 from .screenshot_engine import ScreenshotEngine
 from .database_analyzer import DatabaseAnalyzer
@@ -46,12 +47,18 @@ class AdvancedExtractorEngine:
         self.ai_analyzer = BasicAIAnalyzer()
         
         # محرك الزحف (للاستخراج الشامل)
+        self.spider_engine = self._create_spider_engine()
+    
+    def _create_spider_engine(self) -> AdvancedSpiderEngine:
+        """إنشاء محرك زحف متوازٍ وفق الإعدادات الحالية يشارك جلسة HTTP"""
         spider_config = SpiderConfig(
             max_pages=self.config.max_pages,
             max_depth=self.config.max_depth,
-            delay_between_requests=self.config.delay_between_requests
+            delay_between_requests=self.config.delay_between_requests,
+            concurrent_requests=self.config.concurrent_requests,
+            max_requests_per_host=self.config.concurrent_requests
         )
-        self.spider_engine = AdvancedSpiderEngine(spider_config)
+        return AdvancedSpiderEngine(spider_config, self.session_manager)
         
     def extract_website(self, url: str, extraction_type: str = None) -> Dict[str, Any]:
         """استخراج شامل للموقع"""
@@ -152,6 +159,8 @@ class AdvancedExtractorEngine:
             # الزحف المتعدد الصفحات (للاستخراج الشامل فقط)
             if self.config.extraction_type == 'complete' and self.config.max_pages > 1:
                 print("🕷️ بدء الزحف متعدد الصفحات...")
+                # الإعدادات قد تتغير حسب نوع الاستخراج
+                self.spider_engine = self._create_spider_engine()
                 crawl_result = self.spider_engine.crawl_website(url, self.config)
                 result['spider_crawl'] = crawl_result
                 
@@ -166,6 +175,13 @@ class AdvancedExtractorEngine:
                 print("💾 تحميل الأصول...")
                 assets_result = self.asset_downloader.download_all_assets(soup, url, extraction_folder)
                 result['assets'] = assets_result
+                
+                # نسخة من الصفحة تشير إلى الأصول المحلية لتعمل دون اتصال
+                if assets_result.get('local_paths'):
+                    offline_html, _ = localize_html(response.text, url, assets_result['local_paths'],
+                                                    extraction_folder / 'html')
+                    result['offline_page'] = str(self.file_manager.save_html_content(
+                        offline_html, extraction_folder, 'page_offline.html'))
             
             # حساب وقت التنفيذ
             result['duration'] = round(time.time() - start_time, 2)
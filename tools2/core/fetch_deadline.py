@@ -0,0 +1,143 @@
+"""
+مهلة الجلب المشتركة لسلسلة تجاوز الحماية
+Request-Scoped Fetch Deadline
+"""
+
+import time
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional
+
+from urllib3.util.retry import Retry
+
+
+class DeadlineExceeded(Exception):
+    """تم استنفاد المهلة المخصصة للطلب"""
+
+
+class FetchDeadline:
+    """مهلة زمنية مطلقة تُمرَّر عبر جميع طرق الجلب والمحاولات والتأخيرات"""
+
+    # أقل وقت يستحق معه إرسال محاولة HTTP جديدة
+    MIN_ATTEMPT_SECONDS = 1.0
+
+    _local = threading.local()
+
+    def __init__(self, budget_seconds: float):
+        self.budget_seconds = max(float(budget_seconds), 0.0)
+        self.started_at = time.monotonic()
+        self.expires_at = self.started_at + self.budget_seconds
+        self.skipped_steps: List[Dict[str, Any]] = []
+
+    @classmethod
+    def from_budget(cls, budget_seconds: Optional[float]) -> Optional['FetchDeadline']:
+        """إنشاء مهلة من عدد الثواني (None يعني بدون مهلة)"""
+        if budget_seconds is None:
+            return None
+        return cls(budget_seconds)
+
+    @classmethod
+    def current(cls) -> Optional['FetchDeadline']:
+        """المهلة النشطة في الخيط الحالي"""
+        return getattr(cls._local, 'deadline', None)
+
+    @contextmanager
+    def activate(self):
+        """تفعيل المهلة للخيط الحالي حتى تراها استراتيجية إعادة المحاولة"""
+        previous = getattr(self._local, 'deadline', None)
+        self._local.deadline = self
+        try:
+            yield self
+        finally:
+            self._local.deadline = previous
+
+    def remaining(self) -> float:
+        """الوقت المتبقي بالثواني"""
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def elapsed(self) -> float:
+        """الوقت المنقضي منذ بدء المهلة"""
+        return time.monotonic() - self.started_at
+
+    def expired(self) -> bool:
+        """هل انتهت المهلة"""
+        return self.remaining() <= 0
+
+    def can_afford(self, seconds: float) -> bool:
+        """هل يكفي الوقت المتبقي لخطوة تكلفتها التقريبية seconds"""
+        return self.remaining() >= seconds
+
+    def check(self, step: str = ''):
+        """رفع DeadlineExceeded إذا انتهت المهلة"""
+        if self.expired():
+            raise DeadlineExceeded(f"انتهت مهلة الجلب ({self.budget_seconds} ثانية) {step}".strip())
+
+    def timeout(self, default: float) -> float:
+        """timeout للطلب لا يتجاوز الوقت المتبقي"""
+        remaining = self.remaining()
+        if remaining < self.MIN_ATTEMPT_SECONDS:
+            raise DeadlineExceeded(f"الوقت المتبقي ({remaining:.2f} ثانية) لا يكفي لطلب جديد")
+        return min(float(default), remaining)
+
+    def sleep(self, seconds: float, reserve: float = 0.0) -> float:
+        """تأخير لا يتجاوز الوقت المتبقي مع حجز reserve ثانية للخطوة التالية"""
+        delay = max(min(seconds, self.remaining() - reserve), 0.0)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    def skip(self, step: str, reason: str = ''):
+        """تسجيل خطوة تم تخطيها بسبب المهلة"""
+        self.skipped_steps.append({
+            'step': step,
+            'reason': reason or 'الوقت المتبقي غير كافٍ',
+            'remaining': round(self.remaining(), 2)
+        })
+
+    def to_dict(self) -> Dict[str, Any]:
+        """ملخص المهلة لإرفاقه بالنتائج"""
+        return {
+            'budget_seconds': self.budget_seconds,
+            'elapsed_seconds': round(self.elapsed(), 2),
+            'remaining_seconds': round(self.remaining(), 2),
+            'expired': self.expired(),
+            'skipped_steps': list(self.skipped_steps)
+        }
+
+
+class DeadlineRetry(Retry):
+    """استراتيجية إعادة محاولة تحترم المهلة النشطة في الخيط الحالي"""
+
+    def is_exhausted(self) -> bool:
+        deadline = FetchDeadline.current()
+        if deadline is not None:
+            backoff = super().get_backoff_time()
+            if not deadline.can_afford(backoff + FetchDeadline.MIN_ATTEMPT_SECONDS):
+                return True
+        return super().is_exhausted()
+
+    def get_backoff_time(self) -> float:
+        backoff = super().get_backoff_time()
+        deadline = FetchDeadline.current()
+        if deadline is not None:
+            return min(backoff, deadline.remaining())
+        return backoff
+
+    def get_retry_after(self, response) -> Optional[float]:
+        retry_after = super().get_retry_after(response)
+        deadline = FetchDeadline.current()
+        if retry_after is not None and deadline is not None:
+            return min(retry_after, deadline.remaining())
+        return retry_after
+
+
+def deadline_scope(deadline: Optional[FetchDeadline]):
+    """سياق يفعّل المهلة إن وجدت"""
+    if deadline is None:
+        return _null_scope()
+    return deadline.activate()
+
+
+@contextmanager
+def _null_scope():
+    yield None
@@ -9,18 +9,21 @@ import csv
 import shutil
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Any, Optional, Union
+from typing import Dict, Iterable, List, Any, Optional, Union
 import zipfile
 import tempfile
+from .blob_store import get_blob_store, write_stream_atomic
 
 
 class FileManager:
     """مدير شامل للملفات والمجلدات"""
     
-    def __init__(self, base_directory: str = "extracted_files"):
+    def __init__(self, base_directory: str = "extracted_files", deduplicate_assets: bool = True):
         self.base_dir = Path(base_directory)
         self.base_dir.mkdir(exist_ok=True)
         self._setup_directory_structure()
+        # الأصول تُخزن مرة واحدة بحسب المحتوى وتظهر في مجلدات الاستخراج كروابط صلبة
+        self.blob_store = get_blob_store(self.base_dir / 'blobs') if deduplicate_assets else None
         
     def _setup_directory_structure(self):
         """إعداد هيكل المجلدات الأساسي"""
@@ -130,6 +133,8 @@ class FileManager:
         file_path = assets_folder / safe_filename
         
         try:
+            if self.blob_store:
+                return self.blob_store.save_bytes(content, file_path, owner=extraction_folder)['path']
             with open(file_path, 'wb') as f:
                 f.write(content)
             return file_path
@@ -137,6 +142,26 @@ class FileManager:
             print(f"Error saving asset {filename}: {str(e)}")
             return None
     
+    def save_asset_stream(self, chunks: Iterable[bytes], extraction_folder: Path, filename: str,
+                          asset_type: str = "general") -> Dict[str, Any]:
+        """حفظ أصل من مكررة أجزاء دون تجميعه في الذاكرة: sha256 والحجم أثناء الكتابة ونقل ذري للملف النهائي
+
+        أخطاء المكررة (مهلة، تجاوز الحجم...) تُعاد للمستدعي ولا يبقى ملف ناقص.
+        """
+        assets_folder = extraction_folder / 'assets' / asset_type
+        assets_folder.mkdir(parents=True, exist_ok=True)
+        
+        safe_filename = self._sanitize_filename(filename)
+        if not safe_filename:
+            safe_filename = f"asset_{datetime.now().strftime('%H%M%S')}"
+        
+        file_path = assets_folder / safe_filename
+        
+        if self.blob_store:
+            return self.blob_store.save_stream(chunks, file_path, owner=extraction_folder)
+        digest, size = write_stream_atomic(chunks, file_path)
+        return {'path': file_path, 'sha256': digest, 'size': size, 'deduplicated': False}
+    
     def generate_html_report(self, data: Dict[str, Any], extraction_folder: Path) -> Path:
         """إنشاء تقرير HTML"""
         exports_folder = extraction_folder / 'exports'
@@ -0,0 +1,296 @@
+"""
+جدولة الطلبات لكل نطاق على مستوى العملية
+Process-Wide Per-Host Request Scheduler
+"""
+
+import time
+import threading
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from typing import Any, Deque, Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .fetch_deadline import FetchDeadline, DeadlineExceeded
+
+
+# الحالات التي تعني "أبطئ" وليس "ممنوع": تعالج بتراجع على مستوى النطاق كله
+THROTTLE_STATUSES = frozenset({429, 503})
+
+_current_job: ContextVar[Optional[str]] = ContextVar('host_scheduler_job', default=None)
+
+
+@contextmanager
+def job_scope(job: str):
+    """تسمية المهمة الحالية: الطلبات داخلها تتقاسم النطاق بعدل مع المهام الأخرى"""
+    token = _current_job.set(job)
+    try:
+        yield
+    finally:
+        _current_job.reset(token)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """قيمة Retry-After بالثواني (عدد ثوانٍ أو تاريخ HTTP)"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+class _Waiter:
+    __slots__ = ('event', 'start_at')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.start_at = 0.0
+
+
+class _HostState:
+    """حالة نطاق واحد: الحد الحالي للتزامن، الطلبات الجارية، طوابير المهام والتراجع"""
+
+    def __init__(self, max_concurrency: int, min_interval: float):
+        self.max_concurrency = max_concurrency
+        self.limit = max_concurrency
+        self.min_interval = min_interval
+        self.active = 0
+        self.next_start = 0.0
+        self.backoff_until = 0.0
+        self.strikes = 0
+        self.successes = 0
+        self.waiting: 'OrderedDict[str, Deque[_Waiter]]' = OrderedDict()
+        self.stats = {'requests': 0, 'throttled': 0, 'waited_seconds': 0.0}
+
+
+class HostScheduler:
+    """كل الطلبات تمر من هنا: حد تزامن لكل نطاق، طوابير عادلة بين المهام، وتراجع عند 429/Retry-After"""
+
+    def __init__(self, max_per_host: int = 6, min_interval: float = 0.0, base_backoff: float = 1.0,
+                 max_backoff: float = 300.0, max_throttle_retries: int = 2):
+        self.max_per_host = max(1, max_per_host)
+        self.min_interval = max(0.0, min_interval)
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.max_throttle_retries = max(0, max_throttle_retries)
+        self._lock = threading.Lock()
+        self._hosts: Dict[str, _HostState] = {}
+
+    @staticmethod
+    def host_of(url_or_host: str) -> str:
+        if '://' in url_or_host:
+            return urlparse(url_or_host).netloc.lower()
+        return url_or_host.lower()
+
+    def _state(self, host: str) -> _HostState:
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = _HostState(self.max_per_host, self.min_interval)
+        return state
+
+    def configure_host(self, url_or_host: str, max_concurrency: Optional[int] = None,
+                       min_interval: Optional[float] = None):
+        """إعدادات خاصة بنطاق (مثل Crawl-delay أو حد أقل لموقع حساس)"""
+        host = self.host_of(url_or_host)
+        with self._lock:
+            state = self._state(host)
+            if max_concurrency is not None:
+                state.max_concurrency = max(1, max_concurrency)
+                state.limit = min(state.limit, state.max_concurrency)
+            if min_interval is not None:
+                state.min_interval = max(self.min_interval, min_interval)
+
+    def _dispatch(self, state: _HostState):
+        """منح الأماكن الفارغة بالتناوب بين المهام المنتظرة (round-robin)"""
+        while state.active < state.limit and state.waiting:
+            job, queue = next(iter(state.waiting.items()))
+            waiter = queue.popleft()
+            del state.waiting[job]
+            if queue:
+                state.waiting[job] = queue
+            now = time.monotonic()
+            waiter.start_at = max(now, state.next_start, state.backoff_until)
+            state.next_start = waiter.start_at + state.min_interval
+            state.active += 1
+            state.stats['requests'] += 1
+            waiter.event.set()
+
+    def acquire(self, url_or_host: str, job: Optional[str] = None, timeout: Optional[float] = None) -> bool:
+        """انتظار دور المهمة على النطاق؛ False إذا انتهت المهلة قبل الحصول على مكان
+
+        مع FetchDeadline نشطة لا يتجاوز الانتظار الوقت المتبقي منها، وترفع DeadlineExceeded بدل النوم بعدها.
+        """
+        host = self.host_of(url_or_host)
+        job = job or _current_job.get() or threading.current_thread().name
+        waiter = _Waiter()
+        queued_at = time.monotonic()
+
+        deadline = FetchDeadline.current()
+        limited_by_deadline = deadline is not None and (timeout is None or deadline.remaining() < timeout)
+        if limited_by_deadline:
+            timeout = deadline.remaining()
+        wait_until = None if timeout is None else queued_at + timeout
+
+        with self._lock:
+            state = self._state(host)
+            state.waiting.setdefault(job, deque()).append(waiter)
+            self._dispatch(state)
+
+        if not waiter.event.wait(timeout):
+            with self._lock:
+                if not waiter.event.is_set():
+                    queue = state.waiting.get(job)
+                    if queue is not None:
+                        queue.remove(waiter)
+                        if not queue:
+                            del state.waiting[job]
+                    if limited_by_deadline:
+                        raise DeadlineExceeded(f"انتهت مهلة الجلب أثناء انتظار دور {host}")
+                    return False
+            # مُنح المكان لحظة انتهاء المهلة: نستخدمه
+
+        # الانتظار حتى موعد البدء؛ تراجع جديد أثناء الانتظار يؤخره أكثر
+        while True:
+            with self._lock:
+                start_at = max(waiter.start_at, state.backoff_until)
+                if wait_until is not None and start_at > wait_until:
+                    # موعد البدء بعد المهلة: إعادة المكان بدل النوم بلا فائدة
+                    state.active = max(0, state.active - 1)
+                    state.stats['requests'] -= 1
+                    self._dispatch(state)
+                    if limited_by_deadline:
+                        raise DeadlineExceeded(
+                            f"تراجع {host} ({start_at - time.monotonic():.1f} ثانية) يتجاوز مهلة الجلب")
+                    return False
+            delay = start_at - time.monotonic()
+            if delay <= 0:
+                break
+            time.sleep(min(delay, 1.0))
+
+        with self._lock:
+            state.stats['waited_seconds'] += time.monotonic() - queued_at
+        return True
+
+    def release(self, url_or_host: str, status_code: Optional[int] = None,
+                retry_after: Optional[str] = None) -> Optional[float]:
+        """تحرير المكان مع نتيجة الطلب؛ يعيد مدة التراجع إذا كانت الاستجابة تطلب الإبطاء"""
+        host = self.host_of(url_or_host)
+        backoff = None
+        with self._lock:
+            state = self._state(host)
+            state.active = max(0, state.active - 1)
+
+            if status_code in THROTTLE_STATUSES or (status_code == 403 and retry_after):
+                backoff = parse_retry_after(retry_after)
+                if backoff is None:
+                    backoff = self.base_backoff * (2 ** state.strikes)
+                backoff = min(backoff, self.max_backoff)
+                state.strikes += 1
+                state.successes = 0
+                state.backoff_until = max(state.backoff_until, time.monotonic() + backoff)
+                # تخفيض التزامن للنصف (AIMD) بدل الاستمرار في الضغط على الموقع
+                state.limit = max(1, state.limit // 2)
+                state.stats['throttled'] += 1
+            elif status_code is not None and status_code < 400:
+                state.strikes = 0
+                state.successes += 1
+                if state.limit < state.max_concurrency and state.successes >= state.limit * 4:
+                    state.limit += 1
+                    state.successes = 0
+
+            self._dispatch(state)
+        return backoff
+
+    @contextmanager
+    def slot(self, url: str, job: Optional[str] = None):
+        """مكان على نطاق الرابط؛ تُكتب status_code و retry_after في القاموس المعاد لتُحتسب عند التحرير"""
+        self.acquire(url, job)
+        outcome: Dict[str, Any] = {}
+        try:
+            yield outcome
+        finally:
+            self.release(url, outcome.get('status_code'), outcome.get('retry_after'))
+
+    def get_stats(self, url_or_host: Optional[str] = None) -> Dict[str, Any]:
+        """إحصائيات النطاقات (أو نطاق واحد)"""
+        with self._lock:
+            hosts = [self.host_of(url_or_host)] if url_or_host else list(self._hosts)
+            now = time.monotonic()
+            return {
+                host: {
+                    **self._hosts[host].stats,
+                    'limit': self._hosts[host].limit,
+                    'max_concurrency': self._hosts[host].max_concurrency,
+                    'active': self._hosts[host].active,
+                    'waiting': sum(len(queue) for queue in self._hosts[host].waiting.values()),
+                    'backoff_remaining': round(max(0.0, self._hosts[host].backoff_until - now), 2)
+                }
+                for host in hosts if host in self._hosts
+            }
+
+
+class ScheduledHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter يمرر كل طلب عبر HostScheduler ويعيد المحاولة بعد التراجع عند 429/503"""
+
+    def __init__(self, *args, scheduler: Optional[HostScheduler] = None, job: Optional[str] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.scheduler = scheduler or get_host_scheduler()
+        self.job = job or f"session-{id(self)}"
+        # التراجع عند 429/503 للنطاق كله يتولاه المجدول بدل انتظار urllib3 وهو يحجز المكان
+        self.max_retries = self.max_retries.new(
+            status_forcelist=set(self.max_retries.status_forcelist or ()) - THROTTLE_STATUSES,
+            respect_retry_after_header=False
+        )
+
+    def send(self, request, **kwargs):
+        job = _current_job.get() or self.job
+        attempts = self.scheduler.max_throttle_retries + 1
+        for attempt in range(attempts):
+            self.scheduler.acquire(request.url, job)
+            status_code = retry_after = backoff = None
+            try:
+                response = super().send(request, **kwargs)
+                status_code = response.status_code
+                retry_after = response.headers.get('Retry-After')
+            finally:
+                backoff = self.scheduler.release(request.url, status_code, retry_after)
+            if status_code not in THROTTLE_STATUSES or attempt == attempts - 1:
+                return response
+            # لا إعادة محاولة لا تتسع لها المهلة: نعيد استجابة التراجع كما هي
+            deadline = FetchDeadline.current()
+            if deadline is not None and not deadline.can_afford((backoff or 0.0) + FetchDeadline.MIN_ATTEMPT_SECONDS):
+                deadline.skip('throttle_retry', f"التراجع ({backoff:.1f} ثانية) يتجاوز الوقت المتبقي")
+                return response
+            response.close()
+        return response
+
+
+def mount_scheduled_adapter(session: requests.Session, **adapter_kwargs) -> ScheduledHTTPAdapter:
+    """تركيب ScheduledHTTPAdapter على http و https للجلسة"""
+    adapter = ScheduledHTTPAdapter(**adapter_kwargs)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return adapter
+
+
+_default_scheduler: Optional[HostScheduler] = None
+_default_scheduler_lock = threading.Lock()
+
+
+def get_host_scheduler() -> HostScheduler:
+    """المجدول المشترك على مستوى العملية"""
+    global _default_scheduler
+    with _default_scheduler_lock:
+        if _default_scheduler is None:
+            _default_scheduler = HostScheduler()
+        return _default_scheduler
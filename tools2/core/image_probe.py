@@ -0,0 +1,293 @@
+"""
+فحص الصور من ترويساتها: الأبعاد والتنسيق والحجم دون تحميل الملف كاملاً
+Header-Only Image Probe
+"""
+
+import re
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import requests
+
+
+# يكفي عادة لترويسة JPEG مع بيانات EXIF كبيرة؛ بقية التنسيقات تُحسم في أول بضع مئات من البايتات
+DEFAULT_PROBE_BYTES = 64 * 1024
+DEFAULT_PROBE_WORKERS = 8
+# الطلب الأول؛ يكفي لترويسات PNG و GIF و WebP و AVIF ومعظم ملفات JPEG
+_FIRST_RANGE_BYTES = 8 * 1024
+_CHUNK_SIZE = 4096
+# بعد هذا القدر بلا توقيع معروف فالملف ليس صورة مدعومة ولا داعي لإكمال القراءة
+_SNIFF_BYTES = 32
+
+_PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+# علامات SOFn التي تحمل الأبعاد (C4 و C8 و CC ليست إطارات)
+_JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+# علامات بلا طول: RSTn و SOI و EOI و TEM
+_JPEG_STANDALONE = frozenset(range(0xD0, 0xDA)) | {0x01}
+_HEIF_BRANDS = {b'avif': 'avif', b'avis': 'avif', b'heic': 'heic', b'heix': 'heic',
+                b'hevc': 'heic', b'hevx': 'heic', b'mif1': 'heic', b'msf1': 'heic'}
+_CONTENT_RANGE_RE = re.compile(r'bytes\s+\d+-\d+/(\d+)', re.IGNORECASE)
+_SVG_TAG_RE = re.compile(rb'<svg\b[^>]*>', re.IGNORECASE | re.DOTALL)
+_SVG_LENGTH_RE = r'\b{}\s*=\s*["\']\s*(\d+(?:\.\d+)?)(?:px)?\s*["\']'
+
+
+@dataclass
+class ImageHeader:
+    """ما تكشفه ترويسة الصورة: التنسيق والأبعاد الفعلية"""
+    format: str
+    width: Optional[int] = None
+    height: Optional[int] = None
+
+
+def sniff_format(data: bytes) -> Optional[str]:
+    """التنسيق من التوقيع في أول البايتات"""
+    if data.startswith(_PNG_SIGNATURE):
+        return 'png'
+    if data.startswith(b'\xff\xd8\xff'):
+        return 'jpeg'
+    if data[:6] in (b'GIF87a', b'GIF89a'):
+        return 'gif'
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'webp'
+    if data[4:8] == b'ftyp':
+        return _heif_brand_format(data)
+    if data[:2] == b'BM':
+        return 'bmp'
+    if data.lstrip()[:5] in (b'<?xml', b'<svg ', b'<svg>', b'<!--', b'<!DOC') and b'<svg' in data:
+        return 'svg'
+    return None
+
+
+def _heif_brand_format(data: bytes) -> Optional[str]:
+    """avif إن ظهر في العلامات الرئيسية أو المتوافقة (AVIF يعلن غالباً mif1 كعلامة رئيسية)، وإلا HEIC"""
+    size = struct.unpack('>I', data[:4])[0] if len(data) >= 4 else 0
+    brands = [data[8:12]] + [data[i:i + 4] for i in range(16, min(size, len(data)) - 3, 4)]
+    if b'avif' in brands or b'avis' in brands:
+        return 'avif'
+    return next((_HEIF_BRANDS[brand] for brand in brands if brand in _HEIF_BRANDS), None)
+
+
+def _parse_png(data: bytes) -> Optional[Tuple[int, int]]:
+    if len(data) < 24 or data[12:16] != b'IHDR':
+        return None
+    return struct.unpack('>II', data[16:24])
+
+
+def _parse_gif(data: bytes) -> Optional[Tuple[int, int]]:
+    if len(data) < 10:
+        return None
+    return struct.unpack('<HH', data[6:10])
+
+
+def _parse_jpeg(data: bytes) -> Optional[Tuple[int, int]]:
+    """المرور على مقاطع JPEG حتى أول SOFn (الارتفاع ثم العرض بعد بايت الدقة)"""
+    i, n = 2, len(data)
+    while i < n:
+        if data[i] != 0xFF:
+            return None
+        while i < n and data[i] == 0xFF:
+            i += 1
+        if i >= n:
+            return None
+        marker = data[i]
+        i += 1
+        if marker in _JPEG_STANDALONE:
+            continue
+        if marker == 0xDA:
+            # بداية بيانات الصورة دون إطار: ملف تالف
+            return None
+        if i + 2 > n:
+            return None
+        length = struct.unpack('>H', data[i:i + 2])[0]
+        if marker in _JPEG_SOF_MARKERS:
+            if i + 7 > n:
+                return None
+            height, width = struct.unpack('>HH', data[i + 3:i + 7])
+            return width, height
+        i += length
+    return None
+
+
+def _parse_webp(data: bytes) -> Optional[Tuple[int, int]]:
+    """الأبعاد من أول مقطع: VP8 (مفقود) أو VP8L (بلا فقد) أو VP8X (موسع)"""
+    if len(data) < 30:
+        return None
+    chunk = data[12:16]
+    if chunk == b'VP8 ' and data[23:26] == b'\x9d\x01\x2a':
+        width, height = struct.unpack('<HH', data[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b'VP8L' and data[20] == 0x2F:
+        bits = struct.unpack('<I', data[21:25])[0]
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b'VP8X':
+        width = int.from_bytes(data[24:27], 'little') + 1
+        height = int.from_bytes(data[27:30], 'little') + 1
+        return width, height
+    return None
+
+
+def _iter_boxes(data: bytes, start: int, end: int) -> Iterable[Tuple[bytes, int, int]]:
+    """صناديق ISO BMFF بين start و end: (النوع، بداية المحتوى، نهاية الصندوق)"""
+    i = start
+    while i + 8 <= end:
+        size, kind = struct.unpack('>I4s', data[i:i + 8])
+        header = 8
+        if size == 1:
+            if i + 16 > end:
+                return
+            size = struct.unpack('>Q', data[i + 8:i + 16])[0]
+            header = 16
+        elif size == 0:
+            size = end - i
+        if size < header:
+            return
+        yield kind, i + header, i + size
+        i += size
+
+
+def _parse_heif(data: bytes) -> Optional[Tuple[int, int]]:
+    """AVIF/HEIC: أكبر ispe في meta/iprp/ipco (الصورة الأساسية وليس المصغرات أو أجزاء الشبكة)"""
+    n = len(data)
+    for kind, body, end in _iter_boxes(data, 0, n):
+        if kind != b'meta':
+            continue
+        if end > n:
+            # صندوق meta لم يكتمل بعد؛ ننتظر بايتات أكثر
+            return None
+        sizes = []
+        # meta صندوق كامل: 4 بايتات للإصدار والأعلام
+        for child, child_body, child_end in _iter_boxes(data, body + 4, end):
+            if child != b'iprp':
+                continue
+            for prop, prop_body, prop_end in _iter_boxes(data, child_body, child_end):
+                if prop != b'ipco':
+                    continue
+                for item, item_body, item_end in _iter_boxes(data, prop_body, prop_end):
+                    if item == b'ispe' and item_body + 12 <= item_end:
+                        sizes.append(struct.unpack('>II', data[item_body + 4:item_body + 12]))
+        return max(sizes, key=lambda size: size[0] * size[1]) if sizes else None
+    return None
+
+
+def _parse_bmp(data: bytes) -> Optional[Tuple[int, int]]:
+    if len(data) < 26:
+        return None
+    width, height = struct.unpack('<ii', data[18:26])
+    return abs(width), abs(height)
+
+
+def _parse_svg(data: bytes) -> Optional[Tuple[int, int]]:
+    """width/height في وسم svg، وإلا أبعاد viewBox"""
+    match = _SVG_TAG_RE.search(data)
+    if not match:
+        return None
+    tag = match.group(0).decode('utf-8', 'replace')
+    width = re.search(_SVG_LENGTH_RE.format('width'), tag)
+    height = re.search(_SVG_LENGTH_RE.format('height'), tag)
+    if width and height:
+        return int(float(width.group(1))), int(float(height.group(1)))
+    view_box = re.search(r'\bviewBox\s*=\s*["\']\s*[-\d.]+[\s,]+[-\d.]+[\s,]+([\d.]+)[\s,]+([\d.]+)', tag)
+    if view_box:
+        return int(float(view_box.group(1))), int(float(view_box.group(2)))
+    return None
+
+
+_PARSERS = {
+    'png': _parse_png,
+    'jpeg': _parse_jpeg,
+    'gif': _parse_gif,
+    'webp': _parse_webp,
+    'avif': _parse_heif,
+    'heic': _parse_heif,
+    'bmp': _parse_bmp,
+    'svg': _parse_svg
+}
+
+
+def parse_image_header(data: bytes) -> Optional[ImageHeader]:
+    """تنسيق الصورة وأبعادها من أول بايتاتها؛ None إن لم تكفِ البايتات أو لم يُعرف التنسيق"""
+    image_format = sniff_format(data)
+    if image_format is None:
+        return None
+    try:
+        dimensions = _PARSERS[image_format](data)
+    except (struct.error, IndexError, ValueError):
+        dimensions = None
+    if not dimensions:
+        return None
+    return ImageHeader(image_format, dimensions[0], dimensions[1])
+
+
+def _total_size(response: requests.Response) -> Optional[int]:
+    """الحجم الكامل للصورة: من Content-Range لاستجابة 206 أو Content-Length لاستجابة 200"""
+    if response.status_code == 206:
+        match = _CONTENT_RANGE_RE.match(response.headers.get('Content-Range', ''))
+        return int(match.group(1)) if match else None
+    length = response.headers.get('Content-Length', '')
+    return int(length) if length.isdigit() else None
+
+
+def probe_image(session: requests.Session, url: str, max_bytes: int = DEFAULT_PROBE_BYTES,
+                timeout: float = 15, verify: bool = True) -> Dict[str, Any]:
+    """قراءة أول بايتات الصورة فقط (Range، أو قطع الاتصال بعد الترويسة إن تجاهل الخادم Range)"""
+    result: Dict[str, Any] = {
+        'success': False, 'url': url, 'format': None, 'width': None, 'height': None,
+        'size': None, 'bytes_read': 0, 'requests': 0, 'content_type': None, 'ranged': False
+    }
+    data = b''
+    header = None
+    # طلب صغير أولاً؛ الباقي حتى max_bytes فقط إن لم تظهر الأبعاد فيه (JPEG مع EXIF كبير مثلاً)
+    end = min(max_bytes, _FIRST_RANGE_BYTES) - 1
+    try:
+        while header is None:
+            headers = {'Range': f'bytes={len(data)}-{end}', 'Accept-Encoding': 'identity',
+                       'Accept': 'image/avif,image/webp,image/*,*/*;q=0.8'}
+            with session.get(url, headers=headers, stream=True, timeout=timeout, verify=verify) as response:
+                result['requests'] += 1
+                if response.status_code not in (200, 206):
+                    result['error'] = f'HTTP {response.status_code}'
+                    return result
+                if response.status_code == 200 and data:
+                    # الخادم تجاهل Range في الطلب الثاني: الجسم يبدأ من جديد
+                    data = b''
+                result['ranged'] = response.status_code == 206
+                result['size'] = _total_size(response) or result['size']
+                result['content_type'] = response.headers.get('Content-Type', '').split(';')[0].strip() or None
+                for chunk in response.iter_content(_CHUNK_SIZE):
+                    data += chunk
+                    header = parse_image_header(data)
+                    if header or len(data) >= max_bytes:
+                        break
+                    if len(data) >= _SNIFF_BYTES and sniff_format(data) is None:
+                        break
+                # الخروج من with يغلق الاتصال دون قراءة بقية الجسم
+            if header or not result['ranged'] or len(data) >= max_bytes or len(data) <= end \
+                    or sniff_format(data) is None or (result['size'] and len(data) >= result['size']):
+                break
+            end = max_bytes - 1
+    except Exception as e:
+        # فشل فحص صورة واحدة (رابط غير صالح، timeout خاطئ...) لا يُسقط فحص بقية الصور
+        result['error'] = str(e)
+        return result
+    finally:
+        result['bytes_read'] = len(data)
+
+    if header is None:
+        result['error'] = 'Unrecognized image format' if sniff_format(data) is None \
+            else 'Image dimensions not found in the probed bytes'
+        return result
+    result.update({'success': True, 'format': header.format, 'width': header.width, 'height': header.height})
+    return result
+
+
+def probe_images(session: requests.Session, urls: Iterable[str], max_workers: int = DEFAULT_PROBE_WORKERS,
+                 **options) -> Dict[str, Dict[str, Any]]:
+    """فحص كل الروابط بالتوازي (حد التزامن لكل نطاق يبقى لمجدول الجلسة)؛ النتيجة مفهرسة بالرابط"""
+    unique = list(dict.fromkeys(urls))
+    if not unique:
+        return {}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(unique)))) as executor:
+        results = executor.map(lambda url: probe_image(session, url, **options), unique)
+        return dict(zip(unique, results))
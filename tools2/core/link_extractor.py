@@ -0,0 +1,220 @@
+"""
+استخراج الروابط السريع بدون شجرة BeautifulSoup
+Fast Link Extraction for Crawl Discovery
+"""
+
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from typing import Dict, List, Optional, Tuple, Union
+from urllib.parse import urljoin
+
+from .crawl_frontier import canonicalize_url
+
+try:
+    import lxml.html
+    from lxml import etree
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+
+_SKIPPED_SCHEMES = ('javascript:', 'mailto:', 'tel:', 'data:', '#')
+_HIDDEN_TAGS = ('script', 'style', 'noscript', 'template', 'head', 'title')
+_VISIBLE_TEXT_XPATH = '//text()[not(ancestor::script or ancestor::style or ancestor::noscript ' \
+                      'or ancestor::template or ancestor::head or ancestor::title)]'
+
+
+@dataclass
+class PageLinks:
+    """ما يحتاجه الزحف من الصفحة: العنوان والروابط وعدد الأصول (والنص الظاهر عند الطلب)"""
+    title: str = ''
+    description: str = ''
+    links: List[Tuple[str, str]] = field(default_factory=list)  # (رابط موحد, نص الرابط)
+    external_links: int = 0
+    images: int = 0
+    stylesheets: int = 0
+    scripts: int = 0
+    forms: int = 0
+    text: Optional[str] = None
+
+    @property
+    def urls(self) -> List[str]:
+        return [url for url, _ in self.links]
+
+    @property
+    def assets(self) -> Dict[str, int]:
+        return {'images': self.images, 'css': self.stylesheets, 'js': self.scripts}
+
+
+class _LinkCollector:
+    """تجميع الروابط: توحيد كل href مرة واحدة وتصفية غير HTTP والروابط الخارجية"""
+
+    def __init__(self, page: PageLinks, base_url: str, base_domain: Optional[str]):
+        self.page = page
+        self.base_url = base_url
+        self.base_domain = base_domain
+        self._resolved: Dict[str, Tuple[str, str]] = {}
+        self._seen_urls = set()
+
+    def add(self, href: Optional[str], text: str = ''):
+        href = (href or '').strip()
+        if not href or href.lower().startswith(_SKIPPED_SCHEMES):
+            return
+
+        resolved = self._resolved.get(href)
+        if resolved is None:
+            url = canonicalize_url(href, self.base_url)
+            # الرابط الموحد دائماً scheme://netloc/path فلا حاجة لتحليله مرة أخرى
+            scheme, _, rest = (url or '').partition('://')
+            if scheme not in ('http', 'https'):
+                # يشمل الروابط التالفة التي لا يمكن توحيدها
+                kind = 'skipped'
+            elif self.base_domain is not None and rest.split('/', 1)[0] != self.base_domain:
+                kind = 'external'
+            else:
+                kind = 'internal'
+            resolved = self._resolved[href] = (url, kind)
+
+        url, kind = resolved
+        if kind == 'external':
+            self.page.external_links += 1
+        elif kind == 'internal' and url not in self._seen_urls:
+            self._seen_urls.add(url)
+            self.page.links.append((url, text.strip()[:200]))
+
+
+def _extract_with_lxml(html: Union[str, bytes], base_url: str, base_domain: Optional[str],
+                       with_text: bool) -> PageLinks:
+    page = PageLinks()
+    try:
+        doc = lxml.html.document_fromstring(html)
+    except ValueError:
+        # نص Unicode مع تصريح ترميز XML
+        doc = lxml.html.document_fromstring(html.encode('utf-8') if isinstance(html, str) else html)
+    except etree.ParserError:
+        # مستند فارغ
+        if with_text:
+            page.text = ''
+        return page
+
+    base_href = doc.find('.//base[@href]')
+    if base_href is not None:
+        base_url = urljoin(base_url, base_href.get('href'))
+    collector = _LinkCollector(page, base_url, base_domain)
+
+    for element in doc.iter('a', 'title', 'meta', 'img', 'link', 'script', 'form'):
+        tag = element.tag
+        if tag == 'a':
+            if element.get('href') is not None:
+                collector.add(element.get('href'), element.text_content())
+        elif tag == 'title':
+            if not page.title:
+                page.title = element.text_content().strip()
+        elif tag == 'meta':
+            if not page.description and (element.get('name') or '').lower() == 'description':
+                page.description = (element.get('content') or '').strip()
+        elif tag == 'img':
+            page.images += 1
+        elif tag == 'link':
+            if 'stylesheet' in (element.get('rel') or '').lower().split():
+                page.stylesheets += 1
+        elif tag == 'script':
+            if element.get('src') is not None:
+                page.scripts += 1
+        else:
+            page.forms += 1
+
+    if with_text:
+        page.text = ' '.join(doc.xpath(_VISIBLE_TEXT_XPATH))
+    return page
+
+
+class _TokenScanner(HTMLParser):
+    """بديل بدون lxml: مسح رموز HTML بمحلل المكتبة القياسية دون بناء شجرة"""
+
+    def __init__(self, collector: _LinkCollector, with_text: bool):
+        super().__init__(convert_charrefs=True)
+        self.collector = collector
+        self.page = collector.page
+        self.with_text = with_text
+        self._texts: List[str] = []
+        self._hidden_depth = 0
+        self._in_title = False
+        self._anchor: Optional[Tuple[str, List[str]]] = None
+
+    def handle_starttag(self, tag, attrs):
+        attributes = dict(attrs)
+        if tag in _HIDDEN_TAGS:
+            self._hidden_depth += 1
+            self._in_title = tag == 'title' and not self.page.title
+        if tag == 'a' and attributes.get('href') is not None:
+            self._finish_anchor()
+            self._anchor = (attributes['href'], [])
+        elif tag == 'base' and attributes.get('href'):
+            self.collector.base_url = urljoin(self.collector.base_url, attributes['href'])
+        elif tag == 'meta':
+            if not self.page.description and (attributes.get('name') or '').lower() == 'description':
+                self.page.description = (attributes.get('content') or '').strip()
+        elif tag == 'img':
+            self.page.images += 1
+        elif tag == 'link':
+            if 'stylesheet' in (attributes.get('rel') or '').lower().split():
+                self.page.stylesheets += 1
+        elif tag == 'script':
+            if attributes.get('src') is not None:
+                self.page.scripts += 1
+        elif tag == 'form':
+            self.page.forms += 1
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag in _HIDDEN_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in _HIDDEN_TAGS and self._hidden_depth:
+            self._hidden_depth -= 1
+            if tag == 'title':
+                self._in_title = False
+                self.page.title = self.page.title.strip()
+        elif tag == 'a':
+            self._finish_anchor()
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.page.title += data
+        if self._anchor is not None:
+            self._anchor[1].append(data)
+        if self.with_text and not self._hidden_depth:
+            self._texts.append(data)
+
+    def _finish_anchor(self):
+        if self._anchor is not None:
+            href, parts = self._anchor
+            self._anchor = None
+            self.collector.add(href, ''.join(parts))
+
+    def close(self):
+        super().close()
+        self._finish_anchor()
+        if self.with_text:
+            self.page.text = ' '.join(self._texts)
+
+
+def extract_links(html: Union[str, bytes], base_url: str, base_domain: Optional[str] = None,
+                  with_text: bool = False) -> PageLinks:
+    """الروابط الموحدة والعنوان وعدد الأصول دون بناء شجرة BeautifulSoup
+
+    base_domain: عند تحديده تُعاد روابط هذا النطاق فقط وتُعد الباقية في external_links.
+    with_text: حساب النص الظاهر أيضاً (لبصمة SimHash).
+    """
+    if LXML_AVAILABLE:
+        return _extract_with_lxml(html, base_url, base_domain, with_text)
+
+    page = PageLinks()
+    if isinstance(html, bytes):
+        html = html.decode('utf-8', errors='replace')
+    scanner = _TokenScanner(_LinkCollector(page, base_url, base_domain), with_text)
+    scanner.feed(html)
+    scanner.close()
+    return page
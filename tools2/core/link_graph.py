@@ -0,0 +1,345 @@
+"""
+رسم الروابط المضغوط بمعرفات رقمية
+Compact Integer-ID Link Graph (CSR)
+"""
+
+import time
+from array import array
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+
+LinkInput = Union[str, Tuple[str, str]]
+
+
+class LinkGraph:
+    """الروابط كأرقام: كل رابط يُخزن مرة واحدة ويأخذ معرفاً، والحواف مصفوفات CSR، ونص الرابط يُخزن مرة واحدة
+
+    الحواف تُضاف إلى مصفوفات متتالية وتُرتب إلى CSR (indptr/indices) عند أول استعلام بعد الإضافة.
+    """
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._urls: List[str] = []
+        self._texts: Dict[str, int] = {'': 0}
+        self._text_list: List[str] = ['']
+        self._src = array('I')
+        self._dst = array('I')
+        self._text_ids = array('I')
+        self._depth = array('i')        # عمق الزحف لكل عقدة (-1 لرابط لم يُزحف)
+        self._external = array('I')     # عدد الروابط الخارجية لكل صفحة
+        self._crawled = bytearray()
+        self._csr = None
+        self._reverse = None
+
+    # ---------- البناء ----------
+
+    def intern(self, url: str) -> int:
+        """معرف الرابط (يُنشأ عند أول ظهور)"""
+        node = self._ids.get(url)
+        if node is None:
+            node = self._ids[url] = len(self._urls)
+            self._urls.append(url)
+            self._depth.append(-1)
+            self._external.append(0)
+            self._crawled.append(0)
+            self._csr = self._reverse = None
+        return node
+
+    def _intern_text(self, text: str) -> int:
+        text = (text or '').strip()
+        text_id = self._texts.get(text)
+        if text_id is None:
+            text_id = self._texts[text] = len(self._text_list)
+            self._text_list.append(text)
+        return text_id
+
+    def add_page(self, url: str, links: Iterable[LinkInput] = (), depth: int = 0, external_links: int = 0):
+        """صفحة مزحوفة مع روابطها الداخلية (روابط نصية أو أزواج (رابط, نص))"""
+        source = self.intern(url)
+        self._crawled[source] = 1
+        self._depth[source] = depth
+        self._external[source] += external_links
+
+        targets = set()
+        for link in links:
+            target_url, text = (link, '') if isinstance(link, str) else link
+            target = self.intern(target_url)
+            # الرابط الذاتي والمكرر في نفس الصفحة لا يغيران البنية
+            if target == source or target in targets:
+                continue
+            targets.add(target)
+            self._src.append(source)
+            self._dst.append(target)
+            self._text_ids.append(self._intern_text(text))
+        self._csr = self._reverse = None
+
+    @classmethod
+    def from_pages(cls, pages: Iterable[Tuple[str, Dict[str, Any]]], link_key: str = 'links') -> 'LinkGraph':
+        """بناء الرسم من نتائج (url, dict) بروابط نصية أو قواميس {'href'/'url', 'text'}"""
+        graph = cls()
+        for url, page in pages:
+            links = []
+            for link in page.get(link_key) or ():
+                if isinstance(link, dict):
+                    target = link.get('href') or link.get('url')
+                    if target:
+                        links.append((target, link.get('text', '')))
+                elif link:
+                    links.append(link)
+            external = page.get('external_links', 0)
+            graph.add_page(url, links, page.get('depth', 0), external if isinstance(external, int) else 0)
+        return graph
+
+    # ---------- CSR ----------
+
+    def _build(self, source, target):
+        """ترتيب الحواف حسب المصدر: indptr[i]..indptr[i+1] مواضع حواف العقدة i في indices"""
+        node_count = len(self._urls)
+        if NUMPY_AVAILABLE:
+            source = np.frombuffer(source, dtype=np.uint32) if len(source) else np.zeros(0, dtype=np.uint32)
+            target = np.frombuffer(target, dtype=np.uint32) if len(target) else np.zeros(0, dtype=np.uint32)
+            order = np.argsort(source, kind='stable')
+            indptr = np.zeros(node_count + 1, dtype=np.int64)
+            np.cumsum(np.bincount(source, minlength=node_count), out=indptr[1:])
+            return indptr, target[order], order
+
+        # ترتيب بالعد (counting sort) بدون numpy
+        indptr = array('q', [0]) * (node_count + 1)
+        for node in source:
+            indptr[node + 1] += 1
+        for node in range(node_count):
+            indptr[node + 1] += indptr[node]
+        cursor = array('q', indptr)
+        indices = array('I', [0]) * len(source)
+        order = array('q', [0]) * len(source)
+        for position, node in enumerate(source):
+            slot = cursor[node]
+            indices[slot] = target[position]
+            order[slot] = position
+            cursor[node] += 1
+        return indptr, indices, order
+
+    def _forward(self):
+        if self._csr is None:
+            self._csr = self._build(self._src, self._dst)
+        return self._csr
+
+    def _backward(self):
+        if self._reverse is None:
+            self._reverse = self._build(self._dst, self._src)
+        return self._reverse
+
+    # ---------- الاستعلامات ----------
+
+    def __len__(self) -> int:
+        return len(self._urls)
+
+    def __contains__(self, url: str) -> bool:
+        return url in self._ids
+
+    @property
+    def edge_count(self) -> int:
+        return len(self._src)
+
+    @property
+    def backend(self) -> str:
+        return 'numpy' if NUMPY_AVAILABLE else 'array'
+
+    def url(self, node: int) -> str:
+        return self._urls[node]
+
+    def _edges(self, csr, url: str) -> List[Tuple[str, str]]:
+        node = self._ids.get(url)
+        if node is None:
+            return []
+        indptr, indices, order = csr
+        start, end = int(indptr[node]), int(indptr[node + 1])
+        return [(self._urls[int(indices[slot])], self._text_list[self._text_ids[int(order[slot])]])
+                for slot in range(start, end)]
+
+    def out_links(self, url: str) -> List[Tuple[str, str]]:
+        """روابط الصفحة الصادرة مع نصوصها"""
+        return self._edges(self._forward(), url)
+
+    def in_links(self, url: str) -> List[Tuple[str, str]]:
+        """الصفحات التي تشير إلى الرابط مع نص الرابط فيها"""
+        return self._edges(self._backward(), url)
+
+    def _degree(self, nodes) -> Sequence[int]:
+        if NUMPY_AVAILABLE:
+            values = np.frombuffer(nodes, dtype=np.uint32) if len(nodes) else np.zeros(0, dtype=np.uint32)
+            return np.bincount(values, minlength=len(self._urls))
+        counts = array('q', [0]) * len(self._urls)
+        for node in nodes:
+            counts[node] += 1
+        return counts
+
+    def in_degree(self) -> Sequence[int]:
+        """عدد الروابط الواردة لكل معرف"""
+        return self._degree(self._dst)
+
+    def out_degree(self) -> Sequence[int]:
+        """عدد الروابط الصادرة لكل معرف"""
+        return self._degree(self._src)
+
+    def roots(self) -> List[int]:
+        """الصفحات المزحوفة بعمق 0 (نقاط البداية)"""
+        return [node for node in range(len(self._urls)) if self._crawled[node] and self._depth[node] == 0]
+
+    def _crawled_nodes(self):
+        if NUMPY_AVAILABLE:
+            if not self._crawled:
+                return np.zeros(0, dtype=np.int64)
+            return np.flatnonzero(np.frombuffer(self._crawled, dtype=np.uint8))
+        return [node for node in range(len(self._urls)) if self._crawled[node]]
+
+    def _distribution(self, values, nodes) -> Dict[int, int]:
+        """توزيع القيم على العقد المحددة"""
+        if NUMPY_AVAILABLE:
+            keys, counts = np.unique(np.asarray(values)[nodes], return_counts=True)
+            return {int(key): int(count) for key, count in zip(keys, counts)}
+        return dict(sorted(Counter(values[node] for node in nodes).items()))
+
+    def orphans(self) -> List[str]:
+        """صفحات مزحوفة (ليست نقطة بداية) لا يشير إليها أي رابط من الصفحات المزحوفة"""
+        in_degree = self.in_degree()
+        nodes = self._crawled_nodes()
+        if NUMPY_AVAILABLE:
+            depths = np.frombuffer(self._depth, dtype=np.int32)
+            nodes = nodes[(depths[nodes] != 0) & (in_degree[nodes] == 0)]
+            return [self._urls[node] for node in nodes.tolist()]
+        return [self._urls[node] for node in nodes if self._depth[node] != 0 and not in_degree[node]]
+
+    def click_depths(self, roots: Optional[Iterable[str]] = None) -> Sequence[int]:
+        """أقصر عدد نقرات من نقاط البداية لكل معرف (-1 لغير القابل للوصول) بمسح BFS على مستويات"""
+        indptr, indices, _ = self._forward()
+        node_count = len(self._urls)
+        frontier = [self._ids[url] for url in roots if url in self._ids] if roots is not None else self.roots()
+
+        if NUMPY_AVAILABLE:
+            depths = np.full(node_count, -1, dtype=np.int64)
+            frontier = np.unique(np.asarray(frontier, dtype=np.int64))
+            level = 0
+            while frontier.size:
+                depths[frontier] = level
+                starts, ends = indptr[frontier], indptr[frontier + 1]
+                counts = ends - starts
+                total = int(counts.sum())
+                if not total:
+                    break
+                # مواضع جميع حواف المستوى دفعة واحدة دون حلقة على العقد
+                offsets = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(total)
+                neighbours = np.unique(indices[offsets].astype(np.int64))
+                frontier = neighbours[depths[neighbours] < 0]
+                level += 1
+            return depths
+
+        depths = array('q', [-1]) * node_count
+        for node in frontier:
+            depths[node] = 0
+        level = 0
+        while frontier:
+            level += 1
+            next_frontier = []
+            for node in frontier:
+                for slot in range(indptr[node], indptr[node + 1]):
+                    neighbour = indices[slot]
+                    if depths[neighbour] < 0:
+                        depths[neighbour] = level
+                        next_frontier.append(neighbour)
+            frontier = next_frontier
+        return depths
+
+    def pagerank(self, damping: float = 0.85, max_iterations: int = 50, tolerance: float = 1e-6) -> Sequence[float]:
+        """درجات PageRank لكل معرف (الصفحات بلا روابط صادرة توزع وزنها على الكل)"""
+        node_count = len(self._urls)
+        if not node_count:
+            return []
+        out_degree = self.out_degree()
+        teleport = (1.0 - damping) / node_count
+
+        if NUMPY_AVAILABLE:
+            source = np.frombuffer(self._src, dtype=np.uint32).astype(np.int64) if len(self._src) else np.zeros(0, dtype=np.int64)
+            target = np.frombuffer(self._dst, dtype=np.uint32).astype(np.int64) if len(self._dst) else np.zeros(0, dtype=np.int64)
+            weights = 1.0 / out_degree[source] if source.size else np.zeros(0)
+            dangling = out_degree == 0
+            ranks = np.full(node_count, 1.0 / node_count)
+            for _ in range(max_iterations):
+                spread = np.bincount(target, weights=ranks[source] * weights, minlength=node_count)
+                updated = teleport + damping * (spread + ranks[dangling].sum() / node_count)
+                converged = np.abs(updated - ranks).sum() < tolerance
+                ranks = updated
+                if converged:
+                    break
+            return ranks
+
+        edges = list(zip(self._src, self._dst, [damping / out_degree[node] for node in self._src]))
+        dangling = [node for node in range(node_count) if not out_degree[node]]
+        ranks = [1.0 / node_count] * node_count
+        for _ in range(max_iterations):
+            base = teleport + damping * sum(ranks[node] for node in dangling) / node_count
+            updated = [base] * node_count
+            for source, target, weight in edges:
+                updated[target] += ranks[source] * weight
+            converged = sum(abs(new - old) for new, old in zip(updated, ranks)) < tolerance
+            ranks = updated
+            if converged:
+                break
+        return ranks
+
+    def memory_bytes(self) -> int:
+        """الحجم التقريبي: نصوص الروابط ونصوص الروابط المشتركة والمصفوفات"""
+        strings = sum(len(url) for url in self._urls) + sum(len(text) for text in self._text_list)
+        arrays = sum(part.itemsize * len(part) for part in
+                     (self._src, self._dst, self._text_ids, self._depth, self._external)) + len(self._crawled)
+        # مدخلات القواميس والقوائم (مؤشر + مفتاح لكل عنصر تقريباً)
+        overhead = 100 * (len(self._urls) + len(self._text_list))
+        return strings + arrays + overhead
+
+    def _top(self, values: Sequence, count: int, nodes=None) -> List[int]:
+        """أعلى count عقدة حسب القيمة (من nodes فقط إن حُددت)"""
+        if NUMPY_AVAILABLE:
+            nodes = np.arange(len(self._urls)) if nodes is None else np.asarray(nodes)
+            order = np.argsort(-np.asarray(values)[nodes], kind='stable')[:count]
+            return nodes[order].tolist()
+        nodes = range(len(self._urls)) if nodes is None else nodes
+        return sorted(nodes, key=lambda node: -values[node])[:count]
+
+    def report(self, top: int = 10, roots: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """تقرير البنية: الروابط، توزيع العمق، الأكثر ارتباطاً، الصفحات اليتيمة، عمق النقر و PageRank"""
+        started = time.perf_counter()
+        crawled = self._crawled_nodes()
+        in_degree = self.in_degree()
+        click_depths = self.click_depths(roots)
+        ranks = self.pagerank()
+        external = sum(self._external)
+
+        return {
+            'total_internal_links': self.edge_count,
+            'total_external_links': external,
+            'pages_crawled': len(crawled),
+            'urls_discovered': len(self._urls),
+            'unique_anchor_texts': len(self._text_list) - 1,
+            'depth_distribution': self._distribution(self._depth, crawled),
+            'click_depth_distribution': self._distribution(click_depths, crawled),
+            'most_linked_pages': [
+                {'url': self._urls[node], 'incoming_links': int(in_degree[node])}
+                for node in self._top(in_degree, top) if in_degree[node]
+            ],
+            'orphan_pages': self.orphans(),
+            'top_pagerank': [
+                {'url': self._urls[node], 'score': round(float(ranks[node]), 6)}
+                for node in self._top(ranks, top, crawled)
+            ],
+            'link_density': round((self.edge_count + external) / len(crawled), 2) if len(crawled) else 0,
+            'graph_memory_bytes': self.memory_bytes(),
+            'backend': self.backend,
+            'compute_ms': round((time.perf_counter() - started) * 1000, 2)
+        }
@@ -0,0 +1,182 @@
+"""
+كشف الصفحات شبه المكررة أثناء الزحف
+Near-Duplicate Page Detection (SimHash + LSH)
+"""
+
+import re
+import hashlib
+import threading
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse, parse_qsl
+
+from bs4 import BeautifulSoup
+from bs4.element import Comment
+
+
+FINGERPRINT_BITS = 64
+# أقل عدد من المقاطع تُحسب معه البصمة؛ صفحات بلا نص تقريباً (تُرسم بـ JavaScript) لا تُقارن
+MIN_SHINGLES = 8
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+_NUMBER_RE = re.compile(r'\d+')
+_HIDDEN_TAGS = {'script', 'style', 'noscript', 'template', 'head', 'title'}
+
+
+def visible_text(page) -> str:
+    """النص الظاهر للصفحة (HTML أو BeautifulSoup) دون script/style والتعليقات، ودون تعديل الشجرة"""
+    if isinstance(page, (str, bytes)):
+        page = BeautifulSoup(page, 'html.parser')
+    return ' '.join(
+        text for text in page.find_all(string=True)
+        if not isinstance(text, Comment) and text.parent.name not in _HIDDEN_TAGS
+    )
+
+
+def simhash(text: str, shingle_size: int = 4, min_shingles: int = MIN_SHINGLES) -> Optional[int]:
+    """بصمة SimHash بطول 64 بت لمقاطع الكلمات (shingles) في النص؛ None إن كان النص أقصر من min_shingles مقطعاً"""
+    words = _WORD_RE.findall(text.lower())
+    if not words or max(1, len(words) - shingle_size + 1) < min_shingles:
+        return None
+    if len(words) <= shingle_size:
+        shingles = [' '.join(words)]
+    else:
+        shingles = [' '.join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)]
+
+    # عدّ البتات لكل موضع بايت دفعة واحدة بدل المرور على 64 بت لكل مقطع
+    digests = b''.join(hashlib.blake2b(s.encode('utf-8'), digest_size=8).digest() for s in shingles)
+    half = len(shingles) / 2
+    fingerprint = 0
+    for byte_index in range(8):
+        bit_counts = [0] * 8
+        for value, count in Counter(digests[byte_index::8]).items():
+            for bit in range(8):
+                if value >> bit & 1:
+                    bit_counts[bit] += count
+        for bit in range(8):
+            if bit_counts[bit] > half:
+                fingerprint |= 1 << (byte_index * 8 + bit)
+    return fingerprint
+
+
+def hamming_distance(first: int, second: int) -> int:
+    """عدد البتات المختلفة بين بصمتين"""
+    return (first ^ second).bit_count()
+
+
+def url_pattern(url: str) -> str:
+    """نمط الرابط: الأرقام في المسار تصبح {n} ومفاتيح query فقط مرتبة"""
+    parsed = urlparse(url)
+    path = _NUMBER_RE.sub('{n}', parsed.path or '/')
+    keys = sorted({key for key, _ in parse_qsl(parsed.query, keep_blank_values=True)})
+    return f"{parsed.netloc.lower()}{path}" + (f"?{'&'.join(keys)}" if keys else '')
+
+
+class NearDuplicateIndex:
+    """فهرس LSH لبصمات SimHash: يكشف الصفحة شبه المكررة ويتتبع أنماط الروابط التي تنتجها"""
+
+    def __init__(self, max_distance: int = 8, shingle_size: int = 4,
+                 min_pattern_samples: int = 5, suppress_ratio: float = 0.8,
+                 min_shingles: int = MIN_SHINGLES):
+        self.max_distance = max(0, max_distance)
+        self.shingle_size = shingle_size
+        self.min_shingles = min_shingles
+        self.min_pattern_samples = min_pattern_samples
+        self.suppress_ratio = suppress_ratio
+
+        # max_distance + 1 نطاقات: بصمتان على مسافة <= max_distance تتطابقان في نطاق واحد على الأقل
+        self.bands = min(FINGERPRINT_BITS, self.max_distance + 1)
+        self.band_bits = FINGERPRINT_BITS // self.bands
+        self._band_mask = (1 << self.band_bits) - 1
+        self._buckets: List[Dict[int, List[Tuple[str, int]]]] = [defaultdict(list) for _ in range(self.bands)]
+        self._patterns: Dict[str, List[int]] = defaultdict(lambda: [0, 0])  # [total, duplicates]
+        self._lock = threading.Lock()
+        self.stats = {'pages': 0, 'duplicates': 0, 'suppressed': 0, 'too_short': 0}
+
+    def fingerprint(self, text: str) -> Optional[int]:
+        return simhash(text, self.shingle_size, self.min_shingles)
+
+    def _band_keys(self, fingerprint: int):
+        for band in range(self.bands):
+            yield band, (fingerprint >> (band * self.band_bits)) & self._band_mask
+
+    def find(self, fingerprint: int) -> Optional[str]:
+        """أقرب صفحة مفهرسة ضمن max_distance (أو None)"""
+        with self._lock:
+            return self._find(fingerprint)
+
+    def _find(self, fingerprint: int) -> Optional[str]:
+        best_url, best_distance = None, self.max_distance + 1
+        for band, key in self._band_keys(fingerprint):
+            for url, candidate in self._buckets[band].get(key, ()):
+                distance = hamming_distance(fingerprint, candidate)
+                if distance < best_distance:
+                    best_url, best_distance = url, distance
+        return best_url
+
+    def add(self, url: str, fingerprint: int):
+        """فهرسة صفحة فريدة (مثلاً عند استئناف زحف محفوظ)"""
+        with self._lock:
+            self._add(url, fingerprint)
+
+    def _add(self, url: str, fingerprint: int):
+        for band, key in self._band_keys(fingerprint):
+            self._buckets[band][key].append((url, fingerprint))
+
+    def check(self, url: str, fingerprint: Optional[int]) -> Optional[str]:
+        """فحص الصفحة وتسجيلها: يعيد رابط الأصل إذا كانت شبه مكررة، وإلا يفهرسها ويعيد None"""
+        with self._lock:
+            if fingerprint is None:
+                # نص أقصر من أن يُقارن: لا تُعد مكررة ولا تُفهرس فلا تطابقها صفحات فارغة أخرى
+                self.stats['too_short'] += 1
+                return None
+            original = self._find(fingerprint)
+            counts = self._patterns[url_pattern(url)]
+            counts[0] += 1
+            self.stats['pages'] += 1
+            if original is not None:
+                counts[1] += 1
+                self.stats['duplicates'] += 1
+            else:
+                self._add(url, fingerprint)
+            return original
+
+    def check_text(self, url: str, text: str) -> Tuple[Optional[str], Optional[int]]:
+        """حساب البصمة من النص ثم check"""
+        fingerprint = self.fingerprint(text)
+        return self.check(url, fingerprint), fingerprint
+
+    def duplicate_ratio(self, url: str) -> float:
+        """نسبة الصفحات المكررة التي أنتجها نمط هذا الرابط حتى الآن"""
+        with self._lock:
+            total, duplicates = self._patterns.get(url_pattern(url), (0, 0))
+        return duplicates / total if total else 0.0
+
+    def is_suppressed(self, url: str) -> bool:
+        """هل ينتج نمط الرابط مكررات غالباً (يُتخطى بدل جلبه)"""
+        with self._lock:
+            total, duplicates = self._patterns.get(url_pattern(url), (0, 0))
+            suppressed = total >= self.min_pattern_samples and duplicates / total >= self.suppress_ratio
+            if suppressed:
+                self.stats['suppressed'] += 1
+        return suppressed
+
+    def priority(self, url: str, base: float = 0.0) -> float:
+        """أولوية الرابط في قائمة الزحف بعد خفضها حسب نسبة تكرار نمطه"""
+        return base - self.duplicate_ratio(url)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """إحصائيات الفهرس والأنماط الأكثر تكراراً"""
+        with self._lock:
+            noisy = sorted(
+                ((pattern, counts[1], counts[0]) for pattern, counts in self._patterns.items() if counts[1]),
+                key=lambda item: item[1], reverse=True
+            )[:10]
+            return {
+                **self.stats,
+                'unique_pages': self.stats['pages'] - self.stats['duplicates'],
+                'duplicate_patterns': [
+                    {'pattern': pattern, 'duplicates': duplicates, 'total': total}
+                    for pattern, duplicates, total in noisy
+                ]
+            }
@@ -0,0 +1,326 @@
+"""
+خط جلب غير متزامن مع عمليات تحليل متعددة
+Async Fetch / Multiprocess Parse Pipeline
+"""
+
+import os
+import queue
+import asyncio
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import timedelta
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from .host_scheduler import THROTTLE_STATUSES, get_host_scheduler, mount_scheduled_adapter
+
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
+
+# الصفحات الأكبر من هذا الحد تُمرر للعمليات عبر ذاكرة مشتركة بدل نسخها في الأنبوب
+SHARED_MEMORY_THRESHOLD = 256 * 1024
+
+
+@dataclass
+class FetchedPage:
+    """صفحة مجلوبة بالبايتات الخام كما تُسلم لعملية التحليل (بديل خفيف عن requests.Response)"""
+    url: str
+    status_code: int = 0
+    headers: Dict[str, str] = field(default_factory=dict)
+    content: bytes = b''
+    encoding: Optional[str] = None
+    elapsed_seconds: float = 0.0
+    final_url: Optional[str] = None
+    error: Optional[str] = None
+    shared_block: Optional[Tuple[str, int]] = None
+
+    def __post_init__(self):
+        # نفس سلوك requests: أسماء الترويسات غير حساسة لحالة الأحرف
+        self.headers = CaseInsensitiveDict(self.headers)
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and 200 <= self.status_code < 400
+
+    @property
+    def text(self) -> str:
+        try:
+            return self.content.decode(self.encoding or 'utf-8', errors='replace')
+        except LookupError:
+            # charset غير معروف في Content-Type
+            return self.content.decode('utf-8', errors='replace')
+
+    @property
+    def elapsed(self) -> timedelta:
+        return timedelta(seconds=self.elapsed_seconds)
+
+    def raise_for_status(self):
+        """نفس سلوك requests: خطأ لحالات 4xx/5xx وأخطاء الجلب"""
+        if self.error:
+            raise requests.ConnectionError(self.error)
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}")
+
+
+def _pack_page(page: FetchedPage) -> Tuple[FetchedPage, Optional[shared_memory.SharedMemory]]:
+    """نقل جسم الصفحة الكبيرة إلى ذاكرة مشتركة؛ العملية تقرؤه دون تسلسل عبر الأنبوب"""
+    size = len(page.content)
+    if size < SHARED_MEMORY_THRESHOLD:
+        return page, None
+    block = shared_memory.SharedMemory(create=True, size=size)
+    try:
+        block.buf[:size] = page.content
+        packed = FetchedPage(**{**page.__dict__, 'content': b'', 'shared_block': (block.name, size)})
+    except BaseException:
+        _release_block(block)
+        raise
+    return packed, block
+
+
+def _release_block(block: Optional[shared_memory.SharedMemory]):
+    """إغلاق الذاكرة المشتركة وحذفها (العملية الأم فقط)"""
+    if block is not None:
+        block.close()
+        block.unlink()
+
+
+def _process_context():
+    """forkserver (أو spawn) بدل fork: خيط الجلب يشغل asyncio.run وقد تُنسخ أقفاله مقفلة في العملية الجديدة"""
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+def _attach_block(name: str) -> shared_memory.SharedMemory:
+    """فتح الذاكرة المشتركة دون تسجيلها في resource_tracker (العملية الأم هي من يحذفها)"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13
+        block = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(block._name, 'shared_memory')
+        return block
+
+
+def _unpack_page(page: FetchedPage) -> FetchedPage:
+    """استعادة جسم الصفحة داخل عملية التحليل"""
+    if page.shared_block:
+        name, size = page.shared_block
+        block = _attach_block(name)
+        try:
+            page.content = bytes(block.buf[:size])
+        finally:
+            block.close()
+        page.shared_block = None
+    return page
+
+
+def _run_parse(parse_func: Callable[[FetchedPage], Any], page: FetchedPage) -> Any:
+    """نقطة الدخول في عملية التحليل"""
+    return parse_func(_unpack_page(page))
+
+
+class ParsePipeline:
+    """جلب متزامن (asyncio/aiohttp) يسلم البايتات إلى ProcessPoolExecutor للتحليل، والنتائج تُعاد فور جهوزها"""
+
+    def __init__(self, parse_func: Callable[[FetchedPage], Any], parse_workers: Optional[int] = None,
+                 fetch_concurrency: int = 16, timeout: float = 10, headers: Optional[Dict[str, str]] = None,
+                 verify: bool = False, max_bytes: int = 20 * 1024 * 1024,
+                 initializer: Optional[Callable] = None, initargs: tuple = (),
+                 use_processes: bool = True):
+        self.parse_func = parse_func
+        self.parse_workers = parse_workers or os.cpu_count() or 1
+        self.fetch_concurrency = max(1, fetch_concurrency)
+        self.timeout = timeout
+        self.headers = dict(headers or {})
+        self.verify = verify
+        self.max_bytes = max_bytes
+        self.initializer = initializer
+        self.initargs = initargs
+        self.use_processes = use_processes
+        self._in_processes = False
+        # حد للصفحات المنتظرة للتحليل حتى لا يسبق الجلبُ التحليلَ بالذاكرة
+        self.max_pending = self.parse_workers * 4
+        self.stats = {'fetched': 0, 'fetch_errors': 0, 'parsed': 0, 'parse_errors': 0,
+                      'bytes': 0, 'shared_memory_pages': 0}
+
+    def _create_executor(self):
+        if self.use_processes:
+            try:
+                executor = ProcessPoolExecutor(max_workers=self.parse_workers, mp_context=_process_context(),
+                                               initializer=self.initializer, initargs=self.initargs)
+                self._in_processes = True
+                return executor
+            except (OSError, NotImplementedError, ImportError):
+                # بيئات لا تدعم العمليات المتعددة: التحليل في خيوط
+                pass
+        if self.initializer:
+            self.initializer(*self.initargs)
+        return ThreadPoolExecutor(max_workers=self.parse_workers)
+
+    def run(self, urls: Iterable[str]) -> Iterator[Tuple[str, Any]]:
+        """تنفيذ الخط وإعادة (url, نتيجة) بترتيب الانتهاء
+
+        فشل الجلب يصل لدالة التحليل كصفحة فيها error (raise_for_status يرفعه) فتبقى النتائج بشكل واحد.
+        """
+        urls = list(dict.fromkeys(urls))
+        if not urls:
+            return
+
+        results: 'queue.Queue[Tuple[str, Any]]' = queue.Queue()
+        slots = threading.BoundedSemaphore(self.max_pending)
+        executor = self._create_executor()
+
+        def on_parsed(url: str, block, future):
+            _release_block(block)
+            slots.release()
+            try:
+                result = future.result()
+                self.stats['parsed'] += 1
+            except Exception as e:
+                result = {'success': False, 'url': url, 'error': f"خطأ في التحليل: {str(e)}"}
+                self.stats['parse_errors'] += 1
+            results.put((url, result))
+
+        handed = set()
+
+        def hand_off(page: FetchedPage):
+            """تسليم الصفحة لعملية تحليل (يُستدعى من خيط الجلب وقد ينتظر مكاناً فارغاً)"""
+            handed.add(page.url)
+            if page.error:
+                self.stats['fetch_errors'] += 1
+            else:
+                self.stats['fetched'] += 1
+                self.stats['bytes'] += len(page.content)
+            slots.acquire()
+            block = None
+            try:
+                packed, block = _pack_page(page) if self._in_processes else (page, None)
+                if block is not None:
+                    self.stats['shared_memory_pages'] += 1
+                future = executor.submit(_run_parse, self.parse_func, packed)
+            except Exception as e:
+                # الصفحة لن تصل لعملية التحليل: الذاكرة المشتركة المحجوزة لها تُحذف هنا
+                _release_block(block)
+                slots.release()
+                results.put((page.url, {'success': False, 'url': page.url, 'error': f"خطأ في التحليل: {str(e)}"}))
+                return
+            future.add_done_callback(lambda f, url=page.url, block=block: on_parsed(url, block, f))
+
+        fetcher = threading.Thread(target=self._fetch_all, args=(urls, hand_off, handed, results), daemon=True)
+        fetcher.start()
+        try:
+            for _ in range(len(urls)):
+                yield results.get()
+        finally:
+            fetcher.join()
+            executor.shutdown(wait=True)
+
+    def _fetch_all(self, urls, hand_off, handed, results):
+        """مرحلة الجلب كاملة في خيط مستقل"""
+        try:
+            if AIOHTTP_AVAILABLE:
+                asyncio.run(self._fetch_async(urls, hand_off))
+            else:
+                self._fetch_threaded(urls, hand_off)
+        except Exception as e:
+            # خطأ غير متوقع في مرحلة الجلب: لا نترك المستهلك ينتظر
+            for url in urls:
+                if url in handed:
+                    continue
+                results.put((url, {'success': False, 'url': url, 'error': f"خطأ في الجلب: {str(e)}"}))
+
+    async def _fetch_async(self, urls, hand_off):
+        semaphore = asyncio.Semaphore(self.fetch_concurrency)
+        loop = asyncio.get_running_loop()
+        # التسليم قد ينتظر مكاناً في طابور التحليل، فلا يُنفذ داخل حلقة الأحداث
+        handoff_pool = ThreadPoolExecutor(max_workers=1)
+        # انتظار دور النطاق يحجز خيطاً لا حلقة الأحداث
+        slot_pool = ThreadPoolExecutor(max_workers=self.fetch_concurrency)
+        scheduler = get_host_scheduler()
+        job = f"pipeline-{id(self)}"
+        connector = aiohttp.TCPConnector(limit=self.fetch_concurrency, ssl=None if self.verify else False)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+
+        async with aiohttp.ClientSession(headers=self.headers, connector=connector, timeout=timeout) as session:
+
+            async def fetch(url: str):
+                async with semaphore:
+                    # نفس المجدول المشترك لكل نطاق الذي تمر به جلسات requests
+                    for attempt in range(scheduler.max_throttle_retries + 1):
+                        await loop.run_in_executor(slot_pool, scheduler.acquire, url, job)
+                        page = None
+                        try:
+                            page = await self._fetch_one_async(session, url, loop)
+                        finally:
+                            scheduler.release(url, page.status_code if page and not page.error else None,
+                                              page.headers.get('Retry-After') if page else None)
+                        if page.status_code not in THROTTLE_STATUSES:
+                            break
+                await loop.run_in_executor(handoff_pool, hand_off, page)
+
+            try:
+                await asyncio.gather(*(fetch(url) for url in urls))
+            finally:
+                handoff_pool.shutdown(wait=True)
+                slot_pool.shutdown(wait=True)
+
+    async def _fetch_one_async(self, session, url: str, loop) -> FetchedPage:
+        started = loop.time()
+        try:
+            async with session.get(url, max_redirects=10) as response:
+                chunks, size = [], 0
+                while size < self.max_bytes:
+                    chunk = await response.content.read(min(65536, self.max_bytes - size))
+                    if not chunk:
+                        break
+                    chunks.append(chunk)
+                    size += len(chunk)
+                content = b''.join(chunks)
+                return FetchedPage(
+                    url=url,
+                    status_code=response.status,
+                    headers=dict(response.headers),
+                    content=content,
+                    # get_encoding() يحاول التخمين من جسم لم يُقرأ عبر read() فيفشل دون charset؛
+                    # بلا charset يُترك الترميز لـ FetchedPage.text
+                    encoding=response.charset,
+                    elapsed_seconds=loop.time() - started,
+                    final_url=str(response.url)
+                )
+        except Exception as e:
+            return FetchedPage(url=url, error=str(e) or type(e).__name__,
+                               elapsed_seconds=loop.time() - started)
+
+    def _fetch_threaded(self, urls, hand_off):
+        """بديل بدون aiohttp: requests في مجموعة خيوط"""
+        session = requests.Session()
+        mount_scheduled_adapter(session, pool_maxsize=self.fetch_concurrency)
+        session.headers.update(self.headers)
+
+        def fetch(url: str):
+            try:
+                response = session.get(url, timeout=self.timeout, verify=self.verify)
+                page = FetchedPage(
+                    url=url,
+                    status_code=response.status_code,
+                    headers=dict(response.headers),
+                    content=response.content[:self.max_bytes],
+                    encoding=response.encoding or response.apparent_encoding,
+                    elapsed_seconds=response.elapsed.total_seconds(),
+                    final_url=response.url
+                )
+            except requests.RequestException as e:
+                page = FetchedPage(url=url, error=str(e))
+            hand_off(page)
+
+        with ThreadPoolExecutor(max_workers=self.fetch_concurrency) as pool:
+            list(pool.map(fetch, urls))
@@ -0,0 +1,358 @@
+"""
+تحميل قابل للاستئناف بطلبات Range مع تقسيم الملفات الكبيرة
+Resumable Ranged Downloader
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+import requests
+
+from .download_budget import BudgetExceeded, DownloadBudget, asset_priority
+
+
+PART_SUFFIX = '.part'
+DEFAULT_CHUNK_SIZE = 64 * 1024
+# الملفات الأكبر من هذا الحد تُحمل على أجزاء متوازية إذا قبل الخادم Range
+DEFAULT_SEGMENT_THRESHOLD = 16 * 1024 * 1024
+DEFAULT_SEGMENTS = 4
+# حفظ تقدم الأجزاء على القرص كل هذا القدر من البايتات (الاستئناف بعد الانقطاع يعيد أقل من ذلك)
+STATE_SAVE_BYTES = 1024 * 1024
+
+RETRY_STATUSES = (408, 425, 429, 500, 502, 503, 504)
+TRANSIENT_ERRORS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                    requests.exceptions.ChunkedEncodingError)
+
+_CONTENT_RANGE_RE = re.compile(r'bytes\s+(\d+)-(\d+)/(\d+|\*)', re.IGNORECASE)
+
+
+class DownloadTooLarge(ValueError):
+    """حجم الملف يتجاوز الحد المسموح (يُكتشف من Content-Length قبل الكتابة أو أثناء التدفق)"""
+
+
+class _IncompleteBody(requests.exceptions.ChunkedEncodingError):
+    """انقطع الجسم قبل الحجم المعلن: خطأ عابر يُستأنف من آخر بايت"""
+
+
+class _RangeMismatch(Exception):
+    """الخادم لم يحترم نطاق الجزء (تغير الملف أو توقف دعم Range)"""
+
+
+class _BudgetMeter:
+    """احتساب تحميل واحد على ميزانية الاستخراج: الحجم المعلن قبل الجسم ثم كل جزء يُكتب"""
+
+    def __init__(self, budget: Optional[DownloadBudget], url: str, category: str, priority: int):
+        self.budget = budget
+        self.args = (url, category, priority)
+
+    def expect(self, size: Optional[int]):
+        if self.budget is not None:
+            self.budget.expect(size, *self.args)
+
+    def consume(self, size: int):
+        if self.budget is not None:
+            self.budget.consume(size, *self.args)
+
+
+def file_sha256(path: Union[str, Path], chunk_size: int = 1024 * 1024) -> str:
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def _content_range(response: requests.Response) -> Optional[tuple]:
+    match = _CONTENT_RANGE_RE.match(response.headers.get('Content-Range', ''))
+    if not match:
+        return None
+    total = None if match.group(3) == '*' else int(match.group(3))
+    return int(match.group(1)), int(match.group(2)), total
+
+
+class RangedDownloader:
+    """تحميل ملف إلى <الوجهة>.part مع استئناف Range بعد الأخطاء العابرة وتقسيم اختياري للملفات الكبيرة"""
+
+    def __init__(self, session: requests.Session, max_bytes: Optional[int] = None, attempts: int = 3,
+                 segment_threshold: int = DEFAULT_SEGMENT_THRESHOLD, segments: int = DEFAULT_SEGMENTS,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, timeout: float = 30, verify: Optional[bool] = None,
+                 backoff: float = 0.5, headers: Optional[Dict[str, str]] = None):
+        self.session = session
+        self.max_bytes = max_bytes
+        self.attempts = max(1, attempts)
+        self.segment_threshold = segment_threshold
+        self.segments = max(1, segments)
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self.verify = session.verify if verify is None else verify
+        self.backoff = backoff
+        # بدون ضغط: Content-Length والإزاحات تطابق البايتات المكتوبة
+        self.headers = {'Accept-Encoding': 'identity', **(headers or {})}
+        self._lock = threading.Lock()
+
+    # ---------- الحالة على القرص ----------
+
+    @staticmethod
+    def part_paths(dest: Union[str, Path]):
+        dest = Path(dest)
+        return dest.with_name(dest.name + PART_SUFFIX), dest.with_name(dest.name + PART_SUFFIX + '.json')
+
+    def _load_state(self, state_path: Path, part_path: Path, url: str) -> Dict[str, Any]:
+        """حالة تحميل سابق للرابط نفسه؛ ملف .part بلا حالة مطابقة يُحذف"""
+        state: Dict[str, Any] = {}
+        if state_path.exists():
+            try:
+                state = json.loads(state_path.read_text(encoding='utf-8'))
+            except (OSError, ValueError):
+                state = {}
+        if state.get('url') != url or not part_path.exists():
+            self._discard(part_path, state_path, state)
+        return state
+
+    def _save_state(self, state_path: Path, state: Dict[str, Any]):
+        with self._lock:
+            temp_path = state_path.with_name(state_path.name + '.tmp')
+            temp_path.write_text(json.dumps(state), encoding='utf-8')
+            os.replace(temp_path, state_path)
+
+    def _discard(self, part_path: Path, state_path: Path, state: Dict[str, Any]):
+        state.clear()
+        for path in (part_path, state_path):
+            if path.exists():
+                path.unlink()
+
+    # ---------- التحميل ----------
+
+    def download(self, url: str, dest: Union[str, Path], blob_store=None,
+                 owner: Optional[Union[str, Path]] = None, budget: Optional[DownloadBudget] = None,
+                 category: str = 'other', priority: Optional[int] = None) -> Dict[str, Any]:
+        """تحميل الرابط إلى dest (أو إلى مخزن الأصول)؛ الملف الجزئي يبقى بعد الفشل ليُستأنف في المرة التالية
+
+        مع budget (أصل محجوز مسبقاً بـ reserve) يُفحص الحجم المعلن ويُحتسب كل جزء يُكتب، ويُلغى التحميل عند نفادها.
+        """
+        dest = Path(dest)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        part_path, state_path = self.part_paths(dest)
+        state = self._load_state(state_path, part_path, url)
+        stats = {'requests': 0, 'attempts': 0, 'resumed_bytes': 0, 'segments': 1}
+        result = {'success': False, 'url': url, 'filepath': str(dest)}
+        meter = _BudgetMeter(budget, url, category, asset_priority(category) if priority is None else priority)
+
+        try:
+            self._fetch(url, part_path, state_path, state, stats, meter)
+            if blob_store is not None:
+                stored = blob_store.save_file(part_path, dest, owner)
+                result.update({'filepath': str(stored['path']), 'size': stored['size'], 'sha256': stored['sha256'],
+                               'deduplicated': stored['deduplicated']})
+            else:
+                digest = file_sha256(part_path)
+                size = part_path.stat().st_size
+                os.replace(part_path, dest)
+                result.update({'size': size, 'sha256': digest})
+            if state_path.exists():
+                state_path.unlink()
+            result.update({'success': True, 'content_type': state.get('content_type') or 'unknown'})
+        except DownloadTooLarge as e:
+            # لا فائدة من الاستئناف: الجزء المحمل يُحذف
+            self._discard(part_path, state_path, state)
+            result['error'] = str(e)
+        except BudgetExceeded as e:
+            # الميزانية لا تتجدد داخل عملية الاستخراج نفسها: الجزء المحمل يُحذف
+            self._discard(part_path, state_path, state)
+            result.update({'error': str(e), 'budget_exceeded': True})
+        except Exception as e:
+            result['error'] = str(e)
+            result['resumable'] = part_path.exists() and state_path.exists()
+            result['partial_bytes'] = self._written_bytes(part_path, state)
+
+        result.update({'accept_ranges': state.get('accept_ranges', False), **stats})
+        return result
+
+    def _written_bytes(self, part_path: Path, state: Dict[str, Any]) -> int:
+        if state.get('segments'):
+            return sum(segment[2] for segment in state['segments'])
+        return part_path.stat().st_size if part_path.exists() else 0
+
+    def _fetch(self, url: str, part_path: Path, state_path: Path, state: Dict[str, Any],
+               stats: Dict[str, Any], meter: _BudgetMeter) -> Dict[str, Any]:
+        """محاولات متتالية؛ كل محاولة تستأنف من الإزاحة المحفوظة بدل البدء من الصفر"""
+        for attempt in range(self.attempts):
+            stats['attempts'] = attempt + 1
+            try:
+                if state.get('segments'):
+                    stats['resumed_bytes'] = max(stats['resumed_bytes'], self._written_bytes(part_path, state))
+                    self._download_segments(url, part_path, state_path, state, stats, meter)
+                else:
+                    self._download_stream(url, part_path, state_path, state, stats, meter)
+                return state
+            except (DownloadTooLarge, BudgetExceeded):
+                raise
+            except Exception as e:
+                if not self._is_transient(e) or attempt + 1 >= self.attempts:
+                    raise
+                time.sleep(self.backoff * (2 ** attempt))
+        return state
+
+    @staticmethod
+    def _is_transient(error: Exception) -> bool:
+        if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+            return error.response.status_code in RETRY_STATUSES
+        return isinstance(error, TRANSIENT_ERRORS)
+
+    def _request(self, url: str, headers: Dict[str, str], stats: Dict[str, Any]) -> requests.Response:
+        with self._lock:
+            stats['requests'] += 1
+        return self.session.get(url, headers={**self.headers, **headers}, stream=True,
+                                timeout=(min(10, self.timeout), self.timeout), verify=self.verify,
+                                allow_redirects=True)
+
+    def _download_stream(self, url: str, part_path: Path, state_path: Path, state: Dict[str, Any],
+                         stats: Dict[str, Any], meter: _BudgetMeter) -> Dict[str, Any]:
+        """طلب GET واحد: يكشف دعم Range من الاستجابة الأولى (بلا HEAD) ويستأنف من حجم ملف .part"""
+        offset = part_path.stat().st_size if part_path.exists() and state else 0
+        headers = {}
+        if offset:
+            headers['Range'] = f'bytes={offset}-'
+            validator = state.get('etag') or state.get('last_modified')
+            if validator:
+                # إذا تغير الملف على الخادم يعيد 200 بالنسخة الجديدة كاملة بدل خلط نسختين
+                headers['If-Range'] = validator
+
+        with self._request(url, headers, stats) as response:
+            if response.status_code == 416 and offset and offset == state.get('total'):
+                return state
+            content_range = _content_range(response) if response.status_code == 206 else None
+            if response.status_code == 416 or (response.status_code == 206 and
+                                               not (offset and content_range and content_range[0] == offset)):
+                # الملف الجزئي لا يطابق ما لدى الخادم: البدء من جديد في المحاولة التالية
+                self._discard(part_path, state_path, state)
+                raise _IncompleteBody(f"Unusable range response (status {response.status_code}), restarting")
+            response.raise_for_status()
+
+            if offset and content_range:
+                stats['resumed_bytes'] = max(stats['resumed_bytes'], offset)
+                mode = 'ab'
+                meter.expect(content_range[2] - offset if content_range[2] is not None else None)
+            else:
+                offset, mode = 0, 'wb'
+                content_length = response.headers.get('Content-Length')
+                state.clear()
+                state.update({
+                    'url': url,
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified'),
+                    'content_type': response.headers.get('Content-Type'),
+                    'total': int(content_length) if content_length and content_length.isdigit() else None,
+                    'accept_ranges': response.headers.get('Accept-Ranges', '').lower() == 'bytes'
+                })
+                self._check_size(state['total'])
+                meter.expect(state['total'])
+                self._save_state(state_path, state)
+                if self._should_segment(state):
+                    self._start_segments(response, url, part_path, state_path, state, stats, meter)
+                    return state
+
+            written = offset
+            with open(part_path, mode) as f:
+                for chunk in response.iter_content(chunk_size=self.chunk_size):
+                    if not chunk:
+                        continue
+                    self._check_size(written + len(chunk), streaming=True)
+                    meter.consume(len(chunk))
+                    f.write(chunk)
+                    written += len(chunk)
+            if state.get('total') is not None and written < state['total']:
+                raise _IncompleteBody(f"Connection closed at {written} of {state['total']} bytes")
+        return state
+
+    def _check_size(self, size: Optional[int], streaming: bool = False):
+        if self.max_bytes and size is not None and size > self.max_bytes:
+            label = 'Download exceeded' if streaming else 'File exceeds'
+            raise DownloadTooLarge(f"{label} maximum size: {size} > {self.max_bytes} bytes")
+
+    def _should_segment(self, state: Dict[str, Any]) -> bool:
+        return (self.segments > 1 and state['accept_ranges'] and state['total'] is not None
+                and state['total'] >= self.segment_threshold and bool(state.get('etag') or state.get('last_modified')))
+
+    # ---------- الأجزاء المتوازية ----------
+
+    def _start_segments(self, response: requests.Response, url: str, part_path: Path, state_path: Path,
+                        state: Dict[str, Any], stats: Dict[str, Any], meter: _BudgetMeter):
+        """تقسيم الملف إلى نطاقات؛ الجزء الأول يُقرأ من الاستجابة الأولى نفسها والبقية بطلبات Range متوازية"""
+        total = state['total']
+        size = -(-total // self.segments)
+        state['segments'] = [[start, min(start + size, total) - 1, 0] for start in range(0, total, size)]
+        with open(part_path, 'wb') as f:
+            f.truncate(total)
+        self._save_state(state_path, state)
+        self._download_segments(url, part_path, state_path, state, stats, meter, first_response=response)
+
+    def _download_segments(self, url: str, part_path: Path, state_path: Path, state: Dict[str, Any],
+                           stats: Dict[str, Any], meter: _BudgetMeter,
+                           first_response: Optional[requests.Response] = None):
+        segments: List[List[int]] = state['segments']
+        stats['segments'] = len(segments)
+        pending = [i for i, (start, end, done) in enumerate(segments) if start + done <= end]
+        errors = []
+
+        def run(index: int):
+            try:
+                if index == 0 and first_response is not None:
+                    self._write_segment(first_response, part_path, state_path, state, segments[0], meter)
+                else:
+                    self._fetch_segment(url, part_path, state_path, state, segments[index], stats, meter)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                self._save_state(state_path, state)
+
+        with ThreadPoolExecutor(max_workers=min(self.segments, max(1, len(pending)))) as pool:
+            list(pool.map(run, pending))
+        if any(isinstance(e, _RangeMismatch) for e in errors):
+            # الأجزاء المحملة لم تعد صالحة: المحاولة التالية تبدأ تحميلاً جديداً
+            self._discard(part_path, state_path, state)
+            raise _IncompleteBody(str(next(e for e in errors if isinstance(e, _RangeMismatch))))
+        if errors:
+            # خطأ غير عابر في أي جزء يغلب؛ وإلا تستأنف المحاولة التالية الأجزاء الناقصة فقط
+            raise next((e for e in errors if not self._is_transient(e)), errors[0])
+
+    def _fetch_segment(self, url: str, part_path: Path, state_path: Path, state: Dict[str, Any],
+                       segment: List[int], stats: Dict[str, Any], meter: _BudgetMeter):
+        start, end, done = segment
+        headers = {'Range': f'bytes={start + done}-{end}', 'If-Range': state.get('etag') or state['last_modified']}
+        with self._request(url, headers, stats) as response:
+            response.raise_for_status()
+            content_range = _content_range(response)
+            if response.status_code != 206 or not content_range or content_range[0] != start + done:
+                # الخادم أعاد الملف كاملاً: تغير منذ بدء التحميل أو لم يعد يدعم Range
+                raise _RangeMismatch(f"Server did not honour range {start + done}-{end} (status {response.status_code})")
+            self._write_segment(response, part_path, state_path, state, segment, meter)
+
+    def _write_segment(self, response: requests.Response, part_path: Path, state_path: Path,
+                       state: Dict[str, Any], segment: List[int], meter: _BudgetMeter):
+        start, end, _ = segment
+        unsaved = 0
+        with open(part_path, 'r+b') as f:
+            f.seek(start + segment[2])
+            for chunk in response.iter_content(chunk_size=self.chunk_size):
+                remaining = end + 1 - (start + segment[2])
+                if remaining <= 0:
+                    break
+                chunk = chunk[:remaining]
+                meter.consume(len(chunk))
+                f.write(chunk)
+                segment[2] += len(chunk)
+                unsaved += len(chunk)
+                if unsaved >= STATE_SAVE_BYTES:
+                    f.flush()
+                    self._save_state(state_path, state)
+                    unsaved = 0
+        if start + segment[2] <= end:
+            raise _IncompleteBody(f"Segment {start}-{end} closed at {start + segment[2]}")
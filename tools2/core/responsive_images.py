@@ -0,0 +1,284 @@
+"""
+اختيار صورة واحدة لكل عنصر من srcset و sizes و <picture>
+Responsive Image Candidate Selection
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+from urllib.parse import urljoin, urldefrag
+
+from bs4 import BeautifulSoup, Tag
+
+
+DEFAULT_VIEWPORT_WIDTH = 1366
+DEFAULT_DPR = 1.0
+SELECTION_MODES = ('target', 'largest', 'smallest')
+
+# سمات التحميل الكسول الشائعة (بالترتيب: الأولى تغلب)
+LAZY_SRC_ATTRIBUTES = ('data-src', 'data-lazy-src', 'data-original', 'data-lazy', 'data-url')
+LAZY_SRCSET_ATTRIBUTES = ('data-srcset', 'data-lazy-srcset')
+
+# أنواع الصور التي يعرضها المتصفح الهدف (لتصفية <source type>)
+SUPPORTED_IMAGE_TYPES = ('image/avif', 'image/webp', 'image/png', 'image/jpeg', 'image/jpg',
+                         'image/gif', 'image/svg+xml', 'image/bmp', 'image/x-icon')
+
+# حجم الخط الافتراضي لتحويل em/rem في sizes و media
+_FONT_SIZE_PX = 16.0
+
+_DESCRIPTOR_RE = re.compile(r'^(\d+(?:\.\d+)?)([wxh])$', re.IGNORECASE)
+_LENGTH_RE = re.compile(r'^(-?\d+(?:\.\d+)?)(px|vw|em|rem)?$', re.IGNORECASE)
+_FEATURE_RE = re.compile(r'\(\s*(min|max)-width\s*:\s*(\d+(?:\.\d+)?)(px|em|rem)?\s*\)', re.IGNORECASE)
+_SIZES_ENTRY_RE = re.compile(r'^(?:(.*?\))\s+)?((?:calc|min|max|clamp)\(.*\)|[^\s()]+)$', re.IGNORECASE)
+# صور بديلة يضعها التحميل الكسول في src حتى يُستبدل الرابط الحقيقي
+_PLACEHOLDER_RE = re.compile(r'^data:|(?:^|/)(?:blank|spacer|placeholder|pixel|1x1)\.(?:gif|png|svg|jpe?g)(?:$|\?)',
+                             re.IGNORECASE)
+
+
+@dataclass
+class ImageCandidate:
+    """مرشح واحد من srcset: الرابط وواصف العرض أو الكثافة"""
+    url: str
+    width: Optional[int] = None
+    density: Optional[float] = None
+
+
+@dataclass
+class ImagePolicy:
+    """سياسة الاختيار: عرض نافذة العرض وكثافة البكسل والنمط (target/largest/smallest)"""
+    viewport_width: int = DEFAULT_VIEWPORT_WIDTH
+    dpr: float = DEFAULT_DPR
+    mode: str = 'target'
+    supported_types: Tuple[str, ...] = SUPPORTED_IMAGE_TYPES
+
+    def __post_init__(self):
+        if self.mode not in SELECTION_MODES:
+            self.mode = 'target'
+        if self.viewport_width <= 0:
+            self.viewport_width = DEFAULT_VIEWPORT_WIDTH
+        if self.dpr <= 0:
+            self.dpr = DEFAULT_DPR
+
+
+@dataclass
+class ImageChoice:
+    """الصورة المختارة لعنصر واحد ومن أين جاءت"""
+    url: str
+    source: str  # src / srcset / picture / lazy
+    candidates: int = 1
+    width: Optional[int] = None
+    density: Optional[float] = None
+    alternatives: List[str] = field(default_factory=list)
+
+
+def parse_srcset(value: str) -> List[ImageCandidate]:
+    """تحليل srcset حسب خوارزمية HTML (الفواصل داخل الروابط مسموحة)"""
+    candidates: List[ImageCandidate] = []
+    if not value:
+        return candidates
+    i, n = 0, len(value)
+    while i < n:
+        while i < n and (value[i].isspace() or value[i] == ','):
+            i += 1
+        if i >= n:
+            break
+        start = i
+        while i < n and not value[i].isspace():
+            i += 1
+        url = value[start:i]
+        descriptors = ''
+        if url.endswith(','):
+            url = url.rstrip(',')
+        else:
+            # الواصفات حتى الفاصلة التالية خارج الأقواس
+            start, depth = i, 0
+            while i < n:
+                char = value[i]
+                if char == '(':
+                    depth += 1
+                elif char == ')':
+                    depth = max(0, depth - 1)
+                elif char == ',' and depth == 0:
+                    break
+                i += 1
+            descriptors = value[start:i]
+        if not url:
+            continue
+        candidate = ImageCandidate(url)
+        valid = True
+        for token in descriptors.split():
+            match = _DESCRIPTOR_RE.match(token)
+            if not match:
+                valid = False
+                break
+            number, unit = float(match.group(1)), match.group(2).lower()
+            if unit == 'w' and candidate.width is None and candidate.density is None:
+                candidate.width = int(number)
+            elif unit == 'x' and candidate.width is None and candidate.density is None:
+                candidate.density = number
+            elif unit != 'h':
+                valid = False
+        if valid and (candidate.width is None or candidate.width > 0) and (candidate.density is None or candidate.density > 0):
+            candidates.append(candidate)
+    return candidates
+
+
+def _length_px(value: str, viewport_width: int) -> Optional[float]:
+    match = _LENGTH_RE.match(value.strip())
+    if not match:
+        return None
+    number, unit = float(match.group(1)), (match.group(2) or 'px').lower()
+    if number < 0:
+        return None
+    if unit == 'vw':
+        return number * viewport_width / 100
+    if unit in ('em', 'rem'):
+        return number * _FONT_SIZE_PX
+    return number
+
+
+def media_matches(query: Optional[str], viewport_width: int) -> bool:
+    """تقييم بسيط لشرط media: min-width/max-width مع and، والقائمة بالفواصل تعني "أو"؛ print لا يطابق"""
+    if not query or not query.strip():
+        return True
+    for part in query.split(','):
+        part = part.strip().lower()
+        if not part:
+            continue
+        negate = part.startswith('not ')
+        if negate:
+            part = part[4:]
+        if re.match(r'^(only\s+)?print\b', part):
+            matched = False
+        else:
+            matched = True
+            for kind, number, unit in _FEATURE_RE.findall(part):
+                limit = float(number) * (_FONT_SIZE_PX if unit.lower() in ('em', 'rem') else 1)
+                if kind.lower() == 'min' and viewport_width < limit:
+                    matched = False
+                elif kind.lower() == 'max' and viewport_width > limit:
+                    matched = False
+        if matched != negate:
+            return True
+    return False
+
+
+def parse_sizes(value: Optional[str], viewport_width: int) -> float:
+    """عرض الخانة بالبكسل من sizes: طول أول شرط مطابق، وإلا 100vw"""
+    for entry in (value or '').split(','):
+        match = _SIZES_ENTRY_RE.match(entry.strip())
+        if not match:
+            continue
+        condition, length = match.groups()
+        if condition and not media_matches(condition, viewport_width):
+            continue
+        if '(' in length:
+            # calc()/min()/max(): تقريب بعرض نافذة العرض بدل تقييم التعبير
+            return float(viewport_width)
+        width = _length_px(length, viewport_width)
+        if width is not None:
+            return width
+    return float(viewport_width)
+
+
+def choose_candidate(candidates: List[ImageCandidate], policy: ImagePolicy,
+                     slot_width: Optional[float] = None) -> Optional[ImageCandidate]:
+    """أصغر مرشح يغطي كثافة البكسل المطلوبة (أو الأكبر/الأصغر حسب النمط)"""
+    if not candidates:
+        return None
+    slot_width = slot_width or float(policy.viewport_width)
+
+    def density(candidate: ImageCandidate) -> float:
+        if candidate.width is not None:
+            return candidate.width / slot_width
+        return candidate.density if candidate.density is not None else 1.0
+
+    ranked = sorted(candidates, key=density)
+    if policy.mode == 'largest':
+        return ranked[-1]
+    if policy.mode == 'smallest':
+        return ranked[0]
+    for candidate in ranked:
+        if density(candidate) >= policy.dpr:
+            return candidate
+    return ranked[-1]
+
+
+def _is_placeholder(url: Optional[str]) -> bool:
+    return not url or bool(_PLACEHOLDER_RE.search(url))
+
+
+def _image_candidates(img: Tag) -> Tuple[List[ImageCandidate], Optional[str], str]:
+    """مرشحو عنصر img نفسه: srcset (أو بديله الكسول) مع src كمرشح 1x؛ يعيد (المرشحين، sizes، المصدر)"""
+    srcset, source = img.get('srcset'), 'srcset'
+    for attribute in LAZY_SRCSET_ATTRIBUTES:
+        if img.get(attribute):
+            srcset, source = img.get(attribute), 'lazy'
+            break
+    src, src_source = img.get('src'), 'src'
+    for attribute in LAZY_SRC_ATTRIBUTES:
+        if img.get(attribute) and not _is_placeholder(img.get(attribute)):
+            src, src_source = img.get(attribute), 'lazy'
+            break
+    if _is_placeholder(src):
+        src = None
+    sizes = img.get('data-sizes') or img.get('sizes')
+
+    candidates = parse_srcset(srcset) if srcset else []
+    candidates = [c for c in candidates if not c.url.lower().startswith('data:')]
+    if src and not any(c.width is not None for c in candidates) \
+            and not any(c.density == 1.0 for c in candidates):
+        # src هو المرشح 1x الضمني عندما لا يحدده srcset
+        candidates.append(ImageCandidate(src.strip(), density=1.0))
+    if not candidates:
+        return [], sizes, src_source
+    return candidates, sizes, source if srcset else src_source
+
+
+def select_image(img: Tag, base_url: str, policy: ImagePolicy) -> Optional[ImageChoice]:
+    """اختيار صورة واحدة لعنصر img (مع <source> الأب <picture> إن وجد)"""
+    picture = img.parent if isinstance(img.parent, Tag) and img.parent.name == 'picture' else None
+    candidates, sizes, source = [], None, 'src'
+    if picture is not None:
+        for element in picture.find_all('source', recursive=False):
+            media_type = (element.get('type') or '').split(';')[0].strip().lower()
+            if media_type and media_type not in policy.supported_types:
+                continue
+            if not media_matches(element.get('media'), policy.viewport_width):
+                continue
+            srcset = element.get('srcset') or next(
+                (element.get(a) for a in LAZY_SRCSET_ATTRIBUTES if element.get(a)), None)
+            parsed = [c for c in parse_srcset(srcset) if not c.url.lower().startswith('data:')]
+            if parsed:
+                # أول <source> مطابق يحسم الاختيار كما في المتصفح
+                candidates, sizes, source = parsed, element.get('sizes') or img.get('sizes'), 'picture'
+                break
+    if not candidates:
+        candidates, sizes, source = _image_candidates(img)
+    if not candidates:
+        return None
+
+    chosen = choose_candidate(candidates, policy, parse_sizes(sizes, policy.viewport_width))
+    url, _ = urldefrag(urljoin(base_url, chosen.url.strip()))
+    alternatives = []
+    for candidate in candidates:
+        other, _ = urldefrag(urljoin(base_url, candidate.url.strip()))
+        if other != url and other not in alternatives:
+            alternatives.append(other)
+    return ImageChoice(url, source, len(candidates), chosen.width, chosen.density, alternatives)
+
+
+def select_page_images(soup: BeautifulSoup, base_url: str, policy: Optional[ImagePolicy] = None) -> List[ImageChoice]:
+    """صورة واحدة لكل img في الصفحة، بلا تكرار للرابط نفسه بين العناصر أو سمات التحميل الكسول"""
+    policy = policy or ImagePolicy()
+    choices: List[ImageChoice] = []
+    seen = set()
+    for img in soup.find_all('img'):
+        if not isinstance(img, Tag):
+            continue
+        choice = select_image(img, base_url, policy)
+        if choice is None or not choice.url.startswith(('http://', 'https://')) or choice.url in seen:
+            continue
+        seen.add(choice.url)
+        choices.append(choice)
+    return choices
@@ -0,0 +1,221 @@
+"""
+ذاكرة robots.txt المشتركة
+Shared robots.txt Cache
+"""
+
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+from urllib.parse import urljoin, urlparse
+from urllib.robotparser import RobotFileParser
+
+import requests
+
+
+class RobotsRules:
+    """قواعد robots.txt لأصل واحد (scheme://host) مع الحقول المحللة"""
+
+    def __init__(self, origin: str, status_code: Optional[int] = None, text: str = '',
+                 error: Optional[str] = None):
+        self.origin = origin
+        self.robots_url = urljoin(origin, '/robots.txt')
+        self.status_code = status_code
+        self.error = error
+        self.fetched_at = time.time()
+        self.exists = status_code == 200
+
+        self.parser = RobotFileParser(self.robots_url)
+        self.user_agents: List[str] = []
+        self.disallowed_paths: List[str] = []
+        self.allowed_paths: List[str] = []
+        self.sitemap_urls: List[str] = []
+        self._crawl_delays: Dict[str, float] = {}
+
+        if status_code in (401, 403):
+            # نفس سلوك RobotFileParser.read: الوصول الممنوع يعني منع الكل
+            self.parser.disallow_all = True
+        elif self.exists:
+            self._parse(text)
+        else:
+            self.parser.allow_all = True
+
+    def _parse(self, text: str):
+        """تحليل النص مرة واحدة: القواعد للمحلل والحقول للتقارير"""
+        lines = text.splitlines()
+        self.parser.parse(lines)
+
+        group_agents: List[str] = []
+        in_rules = False
+        for raw_line in lines:
+            line = raw_line.split('#', 1)[0].strip()
+            key, _, value = line.partition(':')
+            key, value = key.strip().lower(), value.strip()
+            if not key:
+                continue
+
+            if key == 'user-agent':
+                if in_rules:
+                    group_agents, in_rules = [], False
+                group_agents.append(value.lower())
+                if value and value not in self.user_agents:
+                    self.user_agents.append(value)
+            elif key == 'sitemap':
+                if value:
+                    self.sitemap_urls.append(urljoin(self.origin, value))
+            elif key in ('disallow', 'allow', 'crawl-delay'):
+                in_rules = True
+                if key == 'disallow' and value and value not in self.disallowed_paths:
+                    self.disallowed_paths.append(value)
+                elif key == 'allow' and value and value not in self.allowed_paths:
+                    self.allowed_paths.append(value)
+                elif key == 'crawl-delay':
+                    try:
+                        delay = float(value)
+                    except ValueError:
+                        continue
+                    for agent in group_agents:
+                        self._crawl_delays[agent] = delay
+
+        self.sitemap_urls = list(dict.fromkeys(self.sitemap_urls))
+
+    def can_fetch(self, url: str, user_agent: str = '*') -> bool:
+        """هل يُسمح بجلب الرابط"""
+        return self.parser.can_fetch(user_agent, url)
+
+    def crawl_delay(self, user_agent: str = '*') -> Optional[float]:
+        """Crawl-delay للوكيل (أو لمجموعة *)"""
+        agent = (user_agent or '*').split('/')[0].lower()
+        for name, delay in self._crawl_delays.items():
+            if name != '*' and name in agent:
+                return delay
+        return self._crawl_delays.get('*')
+
+    def to_analysis(self, user_agent: str = '*') -> Dict[str, Any]:
+        """حقول تحليل robots.txt بالشكل المستخدم في نتائج الزحف"""
+        analysis = {
+            'exists': self.exists,
+            'robots_url': self.robots_url,
+            'status_code': self.status_code,
+            'user_agents': list(self.user_agents),
+            'disallowed_paths': list(self.disallowed_paths),
+            'allowed_paths': list(self.allowed_paths),
+            'crawl_delay': self.crawl_delay(user_agent),
+            'sitemap_urls': list(self.sitemap_urls),
+            'compliance_score': 100 if self.exists else 0
+        }
+        if self.error:
+            analysis['error'] = self.error
+        return analysis
+
+
+class RobotsCache:
+    """ذاكرة robots.txt لكل أصل مع TTL؛ جلب واحد لكل أصل مهما كثرت الخيوط"""
+
+    def __init__(self, ttl_seconds: float = 3600.0, error_ttl_seconds: float = 300.0,
+                 max_entries: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.error_ttl_seconds = error_ttl_seconds
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[str, RobotsRules]' = OrderedDict()
+        self._fetch_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'expired': 0}
+
+    @staticmethod
+    def origin_of(url: str) -> str:
+        """الأصل scheme://host[:port]"""
+        parsed = urlparse(url)
+        return f"{parsed.scheme.lower()}://{parsed.netloc.lower()}"
+
+    def _is_fresh(self, rules: RobotsRules) -> bool:
+        ttl = self.error_ttl_seconds if rules.error or (rules.status_code or 0) >= 500 else self.ttl_seconds
+        return time.time() - rules.fetched_at < ttl
+
+    def _cached(self, origin: str) -> Optional[RobotsRules]:
+        with self._lock:
+            rules = self._entries.get(origin)
+            if rules is None:
+                return None
+            if not self._is_fresh(rules):
+                del self._entries[origin]
+                self.stats['expired'] += 1
+                return None
+            self._entries.move_to_end(origin)
+            return rules
+
+    def get(self, url: str, session: Optional[requests.Session] = None, timeout: float = 10,
+            verify: bool = True) -> RobotsRules:
+        """قواعد أصل الرابط من الذاكرة، أو جلبها عبر الجلسة المعطاة"""
+        origin = self.origin_of(url)
+        rules = self._cached(origin)
+        if rules is not None:
+            with self._lock:
+                self.stats['hits'] += 1
+            return rules
+
+        with self._lock:
+            fetch_lock = self._fetch_locks.setdefault(origin, threading.Lock())
+
+        with fetch_lock:
+            # ربما جلبه خيط آخر أثناء الانتظار
+            rules = self._cached(origin)
+            if rules is not None:
+                with self._lock:
+                    self.stats['hits'] += 1
+                return rules
+
+            rules = self._fetch(origin, session or requests.Session(), timeout, verify)
+            with self._lock:
+                self.stats['misses'] += 1
+                self._entries[origin] = rules
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            return rules
+
+    @staticmethod
+    def _fetch(origin: str, session: requests.Session, timeout: float, verify: bool) -> RobotsRules:
+        """جلب robots.txt مرة واحدة"""
+        try:
+            response = session.get(urljoin(origin, '/robots.txt'), timeout=timeout, verify=verify)
+        except requests.RequestException as e:
+            return RobotsRules(origin, error=str(e))
+        text = response.text if response.status_code == 200 else ''
+        return RobotsRules(origin, response.status_code, text)
+
+    def can_fetch(self, url: str, user_agent: str = '*', session: Optional[requests.Session] = None,
+                  timeout: float = 10, verify: bool = True) -> bool:
+        """هل يُسمح بجلب الرابط حسب robots.txt لأصله"""
+        return self.get(url, session, timeout, verify).can_fetch(url, user_agent)
+
+    def invalidate(self, url: str):
+        """حذف قواعد أصل الرابط من الذاكرة"""
+        with self._lock:
+            self._entries.pop(self.origin_of(url), None)
+
+    def clear(self):
+        """تفريغ الذاكرة"""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """إحصائيات الذاكرة"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['cached_origins'] = len(self._entries)
+        total = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / total, 3) if total else 0.0
+        return stats
+
+
+_default_cache: Optional[RobotsCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_robots_cache() -> RobotsCache:
+    """ذاكرة robots.txt المشتركة على مستوى العملية"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = RobotsCache()
+        return _default_cache
@@ -0,0 +1,241 @@
+"""
+مجمع جلسات تجاوز الحماية لكل نطاق
+Per-Domain Challenge-Solver Session Pool
+"""
+
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+
+
+DEFAULT_COOKIE_DIR = "extracted_files/scraper_sessions"
+
+
+class _PooledSession:
+    """جلسة واحدة في المجمع مع بيانات عمرها وقفل استخدامها"""
+
+    def __init__(self, session: requests.Session):
+        self.session = session
+        self.created_at = time.time()
+        self.last_used = self.created_at
+        self.lock = threading.Lock()
+        self.in_use = 0
+
+
+class ScraperSessionPool:
+    """جلسات طويلة العمر (مثل CloudScraper) لكل نطاق حتى تُدفع كلفة التحدي مرة واحدة لكل TTL"""
+
+    def __init__(self, factory: Callable[[], requests.Session], ttl_seconds: float = 1800.0,
+                 max_age_seconds: float = 6 * 3600.0, max_sessions: int = 32,
+                 cookie_dir: Optional[str] = DEFAULT_COOKIE_DIR):
+        self.factory = factory
+        self.ttl_seconds = ttl_seconds
+        self.max_age_seconds = max_age_seconds
+        self.max_sessions = max_sessions
+        self.cookie_dir = Path(cookie_dir) if cookie_dir else None
+        if self.cookie_dir:
+            self.cookie_dir.mkdir(parents=True, exist_ok=True)
+
+        self._sessions: 'OrderedDict[str, _PooledSession]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'restored': 0, 'expired': 0, 'evicted': 0, 'invalidated': 0}
+
+    @staticmethod
+    def domain_of(url: str) -> str:
+        """استخراج النطاق من الرابط"""
+        return urlparse(url).netloc.lower() or url.lower()
+
+    def _is_expired(self, entry: _PooledSession, now: float) -> bool:
+        """انتهاء الجلسة بسبب الخمول أو تجاوز العمر الأقصى"""
+        return (now - entry.last_used > self.ttl_seconds or
+                now - entry.created_at > self.max_age_seconds)
+
+    @contextmanager
+    def checkout(self, url: str):
+        """استعارة جلسة النطاق (طلب واحد في كل مرة لكل نطاق) ثم إعادتها"""
+        domain = self.domain_of(url)
+        entry = self._acquire_entry(domain)
+
+        with entry.lock:
+            try:
+                yield entry.session
+            finally:
+                entry.last_used = time.time()
+                self._save_cookies(domain, entry.session)
+                with self._lock:
+                    entry.in_use -= 1
+
+    def _acquire_entry(self, domain: str) -> _PooledSession:
+        """الحصول على جلسة صالحة للنطاق أو إنشاء واحدة جديدة"""
+        now = time.time()
+        stale = []
+
+        with self._lock:
+            entry = self._sessions.get(domain)
+            if entry is not None and entry.in_use == 0 and self._is_expired(entry, now):
+                stale.append(self._sessions.pop(domain))
+                self.stats['expired'] += 1
+                entry = None
+
+            if entry is None:
+                self.stats['misses'] += 1
+                entry = _PooledSession(self._new_session(domain))
+                self._sessions[domain] = entry
+                stale.extend(self._evict_overflow())
+            else:
+                self.stats['hits'] += 1
+                self._sessions.move_to_end(domain)
+
+            entry.in_use += 1
+
+        for old in stale:
+            self._close(old.session)
+        return entry
+
+    def _evict_overflow(self):
+        """إخراج الجلسات الأقدم استخداماً عند تجاوز الحد الأقصى (يُستدعى مع القفل)"""
+        evicted = []
+        for domain in list(self._sessions):
+            if len(self._sessions) <= self.max_sessions:
+                break
+            if self._sessions[domain].in_use == 0:
+                evicted.append(self._sessions.pop(domain))
+                self.stats['evicted'] += 1
+        return evicted
+
+    def _new_session(self, domain: str) -> requests.Session:
+        """إنشاء جلسة جديدة واستعادة كوكيز التحدي المحفوظة إن كانت حديثة"""
+        session = self.factory()
+        if self._load_cookies(domain, session):
+            self.stats['restored'] += 1
+        return session
+
+    def invalidate(self, url: str):
+        """إسقاط جلسة النطاق وكوكيزها (مثلاً بعد فشل التحدي)"""
+        domain = self.domain_of(url)
+        with self._lock:
+            entry = self._sessions.get(domain)
+            if entry is not None and entry.in_use == 0:
+                self._sessions.pop(domain)
+            else:
+                entry = None
+            self.stats['invalidated'] += 1
+
+        if entry is not None:
+            self._close(entry.session)
+        cookie_file = self._cookie_file(domain)
+        if cookie_file and cookie_file.exists():
+            cookie_file.unlink()
+
+    def _cookie_file(self, domain: str) -> Optional[Path]:
+        """مسار ملف كوكيز النطاق"""
+        if not self.cookie_dir:
+            return None
+        safe_name = domain.replace(':', '_').replace('/', '_')
+        return self.cookie_dir / f"{safe_name}.json"
+
+    def _save_cookies(self, domain: str, session: requests.Session):
+        """حفظ الكوكيز وUser-Agent (كوكيز التحدي مرتبطة به)"""
+        cookie_file = self._cookie_file(domain)
+        if not cookie_file or not len(session.cookies):
+            return
+
+        data = {
+            'saved_at': time.time(),
+            'user_agent': session.headers.get('User-Agent'),
+            'cookies': [
+                {
+                    'name': cookie.name,
+                    'value': cookie.value,
+                    'domain': cookie.domain,
+                    'path': cookie.path,
+                    'expires': cookie.expires,
+                    'secure': cookie.secure
+                }
+                for cookie in session.cookies
+            ]
+        }
+        try:
+            temp_file = cookie_file.with_suffix('.tmp')
+            temp_file.write_text(json.dumps(data, ensure_ascii=False), encoding='utf-8')
+            temp_file.replace(cookie_file)
+        except OSError:
+            pass
+
+    def _load_cookies(self, domain: str, session: requests.Session) -> bool:
+        """استعادة الكوكيز غير المنتهية إذا كان الملف أحدث من TTL"""
+        cookie_file = self._cookie_file(domain)
+        if not cookie_file or not cookie_file.exists():
+            return False
+
+        try:
+            data = json.loads(cookie_file.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return False
+
+        now = time.time()
+        if now - data.get('saved_at', 0) > self.ttl_seconds:
+            return False
+
+        restored = False
+        for cookie in data.get('cookies', []):
+            if cookie.get('expires') and cookie['expires'] < now:
+                continue
+            session.cookies.set(
+                cookie['name'], cookie['value'],
+                domain=cookie.get('domain'), path=cookie.get('path', '/'),
+                expires=cookie.get('expires'), secure=cookie.get('secure', False)
+            )
+            restored = True
+
+        if restored and data.get('user_agent'):
+            session.headers['User-Agent'] = data['user_agent']
+        return restored
+
+    @staticmethod
+    def _close(session: requests.Session):
+        """إغلاق جلسة بهدوء"""
+        try:
+            session.close()
+        except Exception:
+            pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        """إحصائيات المجمع"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['active_sessions'] = len(self._sessions)
+        total = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / total, 3) if total else 0.0
+        return stats
+
+    def close_all(self):
+        """إغلاق جميع الجلسات"""
+        with self._lock:
+            entries = list(self._sessions.values())
+            self._sessions.clear()
+        for entry in entries:
+            self._close(entry.session)
+
+
+_pools: Dict[str, ScraperSessionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_scraper_pool(factory: Callable[[], requests.Session],
+                     cookie_dir: Optional[str] = DEFAULT_COOKIE_DIR) -> ScraperSessionPool:
+    """مجمع مشترك على مستوى العملية لكل مجلد كوكيز: الجلسات المحلولة تُعاد بين الطلبات والمستخرجات"""
+    key = os.path.abspath(str(cookie_dir)) if cookie_dir else ''
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ScraperSessionPool(factory, cookie_dir=cookie_dir)
+        return pool
@@ -6,11 +6,13 @@ Secure Session and Connection Manager
 import requests
 import time
 import ssl
+import threading
 from urllib3.util.retry import Retry
-from requests.adapters import HTTPAdapter
 from typing import Dict, Optional, Any
 import urllib3
 from .config import ExtractionConfig
+from .host_scheduler import mount_scheduled_adapter
+from .ranged_download import RangedDownloader
 
 
 class SessionManager:
@@ -21,6 +23,13 @@ class SessionManager:
         self.session = self._create_secure_session()
         self.request_count = 0
         self.last_request_time = 0
+        # الجلسة تُستخدم من عدة خيوط (تحميل الأصول والزحف المتوازي)
+        self._count_lock = threading.Lock()
+    
+    def count_requests(self, count: int = 1):
+        """زيادة عداد الطلبات بأمان بين الخيوط"""
+        with self._count_lock:
+            self.request_count += count
         
     def _create_secure_session(self) -> requests.Session:
         """إنشاء جلسة HTTP آمنة ومحسنة"""
@@ -34,15 +43,14 @@ class SessionManager:
             allowed_methods=["HEAD", "GET", "OPTIONS"]
         )
         
-        adapter = HTTPAdapter(
+        # كل الطلبات تمر عبر المجدول المشترك لكل نطاق (حد تزامن وتراجع عند 429)
+        mount_scheduled_adapter(
+            session,
             max_retries=retry_strategy,
             pool_connections=10,
             pool_maxsize=20
         )
         
-        session.mount("http://", adapter)
-        session.mount("https://", adapter)
-        
         # إعداد headers آمنة
         session.headers.update({
             'User-Agent': self.config.user_agent,
@@ -74,10 +82,14 @@ class SessionManager:
         
         self.last_request_time = time.time()
     
-    def make_request(self, url: str, method: str = 'GET', **kwargs) -> Optional[requests.Response]:
+    def make_request(self, url: str, method: str = 'GET', rate_limit: bool = True,
+                     check_size: bool = True, **kwargs) -> Optional[requests.Response]:
         """تنفيذ طلب HTTP آمن مع معالجة الأخطاء"""
-        self._enforce_rate_limit()
-        self.request_count += 1
+        # rate_limit/check_size=False لمن يدير التأخير لكل نطاق بنفسه (مثل محرك الزحف المتوازي)؛
+        # check_size=False يلغي طلب HEAD فقط، وحد الحجم يبقى مطبقاً أثناء قراءة الجسم
+        if rate_limit:
+            self._enforce_rate_limit()
+        self.count_requests()
         
         try:
             # إعداد المعاملات الافتراضية
@@ -85,18 +97,20 @@ class SessionManager:
                 'timeout': self.config.timeout,
                 'verify': self.config.verify_ssl,
                 'allow_redirects': True,
-                'stream': False
+                # الجسم يُقرأ على دفعات حتى الحد الأقصى بدل تحميله كاملاً ثم رفضه
+                'stream': True
             }
             request_kwargs.update(kwargs)
+            max_bytes = self.config.max_file_size_mb * 1024 * 1024
             
             # تحقق من حجم الاستجابة المتوقع
-            if 'stream' not in kwargs:
+            if check_size and 'stream' not in kwargs:
                 # طلب HEAD أولاً للتحقق من الحجم
                 try:
                     head_response = self.session.head(url, timeout=10, verify=self.config.verify_ssl)
                     content_length = head_response.headers.get('Content-Length')
                     
-                    if content_length and int(content_length) > self.config.max_file_size_mb * 1024 * 1024:
+                    if content_length and int(content_length) > max_bytes:
                         raise ValueError(f"File too large: {content_length} bytes")
                         
                 except Exception:
@@ -106,9 +120,9 @@ class SessionManager:
             # تنفيذ الطلب
             response = self.session.request(method, url, **request_kwargs)
             
-            # التحقق من حجم المحتوى الفعلي
-            if hasattr(response, 'content') and len(response.content) > self.config.max_file_size_mb * 1024 * 1024:
-                raise ValueError(f"Response too large: {len(response.content)} bytes")
+            # التحقق من حجم المحتوى الفعلي أثناء القراءة (من طلب stream صريح يقرؤه المستدعي بنفسه)
+            if 'stream' not in kwargs:
+                self._read_capped(response, max_bytes)
             
             response.raise_for_status()
             return response
@@ -137,35 +151,43 @@ class SessionManager:
             print(f"Unexpected error for URL: {url}: {str(e)}")
             return None
     
+    @staticmethod
+    def _read_capped(response: requests.Response, max_bytes: int):
+        """قراءة جسم استجابة stream إلى response.content مع إيقاف القراءة عند تجاوز max_bytes"""
+        with response:
+            content_length = response.headers.get('Content-Length', '')
+            if content_length.isdigit() and int(content_length) > max_bytes:
+                raise ValueError(f"Response too large: {content_length} bytes")
+            chunks, size = [], 0
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise ValueError(f"Response too large: more than {max_bytes} bytes")
+                chunks.append(chunk)
+            response._content = b''.join(chunks)
+            response._content_consumed = True
+    
     def download_file(self, url: str, file_path: str, chunk_size: int = 8192) -> bool:
-        """تحميل ملف بشكل آمن مع التحقق من الحجم"""
-        try:
-            response = self.make_request(url, stream=True)
-            if not response:
-                return False
-            
-            total_size = 0
-            max_size = self.config.max_file_size_mb * 1024 * 1024
-            
-            with open(file_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=chunk_size):
-                    if chunk:
-                        total_size += len(chunk)
-                        
-                        # التحقق من الحجم أثناء التحميل
-                        if total_size > max_size:
-                            f.close()
-                            import os
-                            os.remove(file_path)
-                            raise ValueError(f"File exceeds maximum size: {total_size} bytes")
-                        
-                        f.write(chunk)
-            
-            return True
-            
-        except Exception as e:
-            print(f"Error downloading file {url}: {str(e)}")
-            return False
+        """تحميل ملف بشكل آمن مع التحقق من الحجم (قابل للاستئناف من file_path.part بعد الانقطاع)"""
+        self._enforce_rate_limit()
+        result = self.ranged_downloader(chunk_size=chunk_size).download(url, file_path)
+        self.count_requests(result['requests'])
+        if not result['success']:
+            print(f"Error downloading file {url}: {result['error']}")
+        return result['success']
+    
+    def ranged_downloader(self, **overrides) -> RangedDownloader:
+        """محمّل Range بإعدادات الجلسة: حد الحجم يُفحص من Content-Length قبل الكتابة"""
+        options = {
+            'max_bytes': self.config.max_file_size_mb * 1024 * 1024,
+            'attempts': self.config.max_retries + 1,
+            'segment_threshold': self.config.segmented_download_mb * 1024 * 1024,
+            'segments': self.config.download_segments,
+            'timeout': self.config.timeout,
+            'verify': self.config.verify_ssl
+        }
+        options.update(overrides)
+        return RangedDownloader(self.session, **options)
     
     def get_session_stats(self) -> Dict[str, Any]:
         """إحصائيات الجلسة"""
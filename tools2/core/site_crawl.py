@@ -0,0 +1,257 @@
+"""
+نتيجة زحف واحدة تستهلكها جميع المراحل
+Crawl-Once Site Result
+"""
+
+import json
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from xml.sax.saxutils import escape
+
+from .link_graph import LinkGraph
+
+
+@dataclass
+class CrawledPage:
+    """صفحة مزحوفة واحدة (تُحفظ على القرص مرة واحدة)"""
+    url: str
+    depth: int = 0
+    title: str = ''
+    status_code: Optional[int] = None
+    file_path: str = ''
+    links: List[str] = field(default_factory=list)
+    external_links: int = 0
+    assets: Dict[str, int] = field(default_factory=lambda: {'images': 0, 'css': 0, 'js': 0})
+    forms: int = 0
+    lastmod: Optional[str] = None
+    simhash: Optional[int] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, url: str, data: Dict[str, Any]) -> 'CrawledPage':
+        """بناء الصفحة من نتيجة محفوظة (مثل CrawlStore)"""
+        known = {key: value for key, value in data.items() if key in cls.__dataclass_fields__}
+        known['url'] = url
+        return cls(**known)
+
+
+class SiteCrawl:
+    """نتيجة الزحف الوحيدة للموقع: خريطة الموقع والصفحات المحفوظة والإحصائيات والتقارير تقرأ منها"""
+
+    def __init__(self, start_url: str, pages_folder: Optional[Path] = None, crawl_id: Optional[str] = None):
+        self.start_url = start_url
+        self.pages_folder = Path(pages_folder) if pages_folder else None
+        self.crawl_id = crawl_id
+        self.pages: Dict[str, CrawledPage] = {}
+        self.errors: List[Dict[str, Any]] = []
+        self.duplicates: Dict[str, str] = {}
+        self.fetches = 0
+        self.store = None
+
+    def add_page(self, page: CrawledPage):
+        self.pages[page.url] = page
+
+    def add_error(self, url: str, error: str, depth: int = 0):
+        self.errors.append({'url': url, 'error': error, 'depth': depth})
+
+    def add_duplicate(self, url: str, original_url: str):
+        """صفحة شبه مكررة: لا تُحفظ ولا تُتبع روابطها"""
+        self.duplicates[url] = original_url
+
+    def load_results(self, results: Iterable):
+        """تحميل نتائج (url, dict) محفوظة، الفاشلة منها تذهب إلى الأخطاء"""
+        for url, data in results:
+            if data.get('duplicate_of'):
+                self.add_duplicate(url, data['duplicate_of'])
+            elif data.get('error'):
+                self.errors.append(data)
+            else:
+                self.add_page(CrawledPage.from_dict(url, data))
+
+    def attach_store(self, store, crawl_id: str):
+        """قراءة النتائج من CrawlStore على دفعات بدل تحميل الصفحات في الذاكرة (تشمل الجلسات السابقة)"""
+        self.store = store
+        self.crawl_id = crawl_id
+        self.pages = {}
+        self.errors = []
+        self.duplicates = {}
+
+    def _iter_results(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """نتائج (url, dict) للصفحات والأخطاء والمكررات من المخزن أو من الذاكرة"""
+        if self.store is not None:
+            yield from self.store.iter_page_results(self.crawl_id)
+            return
+        for url, page in self.pages.items():
+            yield url, page.to_dict()
+        for error in self.errors:
+            yield error['url'], error
+        for url, original_url in self.duplicates.items():
+            yield url, {'url': url, 'duplicate_of': original_url}
+
+    def iter_pages(self) -> Iterator[CrawledPage]:
+        """المرور على الصفحات المحفوظة واحدة واحدة"""
+        if self.store is None:
+            yield from self.pages.values()
+            return
+        for url, data in self.store.iter_page_results(self.crawl_id):
+            if not data.get('duplicate_of') and not data.get('error'):
+                yield CrawledPage.from_dict(url, data)
+
+    @property
+    def urls(self) -> List[str]:
+        return [page.url for page in self.iter_pages()]
+
+    def __len__(self) -> int:
+        if self.store is not None:
+            return self.store.count_pages(self.crawl_id)
+        return len(self.pages)
+
+    def link_graph(self) -> LinkGraph:
+        """رسم الروابط الداخلية للصفحات المزحوفة"""
+        graph = LinkGraph()
+        for page in self.iter_pages():
+            graph.add_page(page.url, page.links, page.depth, page.external_links)
+        return graph
+
+    @staticmethod
+    def _map_entry(page: CrawledPage) -> Dict[str, Any]:
+        return {
+            'title': page.title,
+            'depth': page.depth,
+            'file_path': page.file_path,
+            'links': page.links,
+            'assets': page.assets,
+            'forms': page.forms
+        }
+
+    def _summarize(self) -> Dict[str, Any]:
+        """إحصائيات الزحف ورسم الروابط والأخطاء والمكررات بمرور واحد على النتائج"""
+        totals = {'pages': 0, 'links': 0, 'forms': 0, 'internal': 0, 'external': 0}
+        assets_found = {'images': 0, 'css': 0, 'js': 0}
+        errors, duplicates = [], {}
+        graph = LinkGraph()
+        for url, data in self._iter_results():
+            if data.get('duplicate_of'):
+                duplicates[url] = data['duplicate_of']
+                continue
+            if data.get('error'):
+                errors.append(data)
+                continue
+            page = CrawledPage.from_dict(url, data)
+            totals['pages'] += 1
+            totals['links'] += len(page.links)
+            totals['forms'] += page.forms
+            totals['external'] += page.external_links
+            for asset_type, count in page.assets.items():
+                assets_found[asset_type] = assets_found.get(asset_type, 0) + count
+            graph.add_page(page.url, page.links, page.depth, page.external_links)
+
+        return {
+            'pages_crawled': totals['pages'],
+            'total_links_found': totals['links'],
+            'external_links': totals['external'],
+            'assets_found': assets_found,
+            'forms_found': totals['forms'],
+            'errors': errors,
+            'duplicates_skipped': len(duplicates),
+            'duplicates': duplicates,
+            'link_structure': graph.report() if totals['pages'] else {},
+            'crawl_id': self.crawl_id
+        }
+
+    def to_crawl_results(self) -> Dict[str, Any]:
+        """الشكل المستخدم في crawl_results للتحميل الشامل
+
+        مع CrawlStore لا تُجمع crawl_map في الذاكرة: تُكتب صفحةً صفحة في crawl_map.json (crawl_map_file).
+        """
+        summary = self._summarize()
+        external_links = summary.pop('external_links')
+        if self.store is None:
+            summary['crawl_map'] = {url: self._map_entry(page) for url, page in self.pages.items()}
+            return summary
+        map_file = self.save_map(summary=dict(summary, external_links=external_links))
+        summary['crawl_map_file'] = str(map_file) if map_file else None
+        return summary
+
+    def to_pages_summary(self) -> Dict[str, Any]:
+        """الشكل المستخدم في crawl_results للاستخراج (V2)"""
+        summary = self._summarize()
+        internal_links = summary['total_links_found']
+        external_links = summary['external_links']
+        return {
+            'pages_found': [
+                {
+                    'url': page.url,
+                    'title': page.title or 'بدون عنوان',
+                    'file_path': page.file_path,
+                    'status': 'success'
+                }
+                for page in self.iter_pages()
+            ],
+            'pages_crawled': summary['pages_crawled'],
+            'total_links': internal_links + external_links,
+            'internal_links': internal_links,
+            'external_links': external_links,
+            'duplicates_skipped': summary['duplicates_skipped'],
+            'success': True,
+            'errors': [f"خطأ في زحف {error['url']}: {error['error']}" for error in summary['errors']]
+        }
+
+    def sitemap_entries(self) -> Iterator[Dict[str, Any]]:
+        """مدخلات خريطة الموقع من الصفحات المزحوفة (الأولوية حسب العمق)"""
+        for page in self.iter_pages():
+            yield {
+                'url': page.url,
+                'title': page.title,
+                'lastmod': page.lastmod,
+                'priority': round(max(0.1, 1.0 - 0.2 * page.depth), 1)
+            }
+
+    def write_xml_sitemap(self, xml_file: Path) -> Path:
+        """كتابة sitemap.xml من الصفحات المزحوفة مدخلاً مدخلاً"""
+        today = datetime.now().strftime("%Y-%m-%d")
+        xml_file = Path(xml_file)
+        xml_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(xml_file, 'w', encoding='utf-8') as f:
+            f.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                    '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n')
+            for entry in self.sitemap_entries():
+                f.write('  <url>\n'
+                        f'    <loc>{escape(entry["url"])}</loc>\n'
+                        f'    <lastmod>{entry["lastmod"] or today}</lastmod>\n'
+                        f'    <priority>{entry["priority"]}</priority>\n'
+                        '  </url>\n')
+            f.write('</urlset>')
+        return xml_file
+
+    def save_map(self, map_file: Optional[Path] = None,
+                 summary: Optional[Dict[str, Any]] = None) -> Optional[Path]:
+        """حفظ crawl_map.json بجانب الصفحات المحفوظة (crawl_map تُكتب صفحةً صفحة)"""
+        if map_file is None:
+            if not self.pages_folder:
+                return None
+            map_file = self.pages_folder / 'crawl_map.json'
+        if summary is None:
+            summary = self._summarize()
+        summary = {key: value for key, value in summary.items() if key not in ('crawl_map', 'external_links')}
+
+        def dump(value, indent: str) -> str:
+            return json.dumps(value, ensure_ascii=False, indent=2, default=str).replace('\n', '\n' + indent)
+
+        map_file = Path(map_file)
+        map_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(map_file, 'w', encoding='utf-8') as f:
+            f.write('{\n')
+            for key, value in summary.items():
+                f.write(f'  {dump(key, "")}: {dump(value, "  ")},\n')
+            f.write('  "crawl_map": {')
+            separator = '\n'
+            for page in self.iter_pages():
+                f.write(f'{separator}    {dump(page.url, "")}: {dump(self._map_entry(page), "    ")}')
+                separator = ',\n'
+            f.write('\n  }\n}\n' if separator != '\n' else '}\n}\n')
+        return map_file
@@ -0,0 +1,212 @@
+"""
+قراءة خرائط المواقع بشكل متدفق
+Streaming Sitemap Ingestion
+"""
+
+import io
+import gzip
+import threading
+import xml.etree.ElementTree as ET
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urljoin
+
+import requests
+
+
+DEFAULT_SITEMAP_PATHS = ['/sitemap.xml', '/sitemap_index.xml', '/wp-sitemap.xml']
+
+_GZIP_MAGIC = b'\x1f\x8b'
+
+
+def _local_name(tag: str) -> str:
+    """اسم الوسم بدون namespace"""
+    return tag.rsplit('}', 1)[-1].lower()
+
+
+class SitemapIngestor:
+    """جلب sitemap و sitemap index (مع gzip) وتحليلها بـ iterparse وتمرير كل رابط فور قراءته"""
+
+    def __init__(self, session: requests.Session, timeout: float = 15, max_workers: int = 4,
+                 max_urls: int = 50000, max_sitemaps: int = 200, verify: bool = True):
+        self.session = session
+        self.timeout = timeout
+        self.max_workers = max(1, max_workers)
+        self.max_urls = max_urls
+        self.max_sitemaps = max_sitemaps
+        self.verify = verify
+        self._emit_lock = threading.Lock()
+
+    def robots_sitemaps(self, base_url: str) -> List[str]:
+        """روابط Sitemap: المعلنة في robots.txt"""
+        try:
+            response = self.session.get(urljoin(base_url, '/robots.txt'), timeout=self.timeout, verify=self.verify)
+            if response.status_code != 200:
+                return []
+        except requests.RequestException:
+            return []
+
+        sitemaps = []
+        for line in response.text.splitlines():
+            key, _, value = line.partition(':')
+            if key.strip().lower() == 'sitemap' and value.strip():
+                sitemaps.append(urljoin(base_url, value.strip()))
+        return sitemaps
+
+    def candidate_sitemaps(self, base_url: str, robots_sitemaps: Optional[Iterable[str]] = None) -> List[str]:
+        """المرشحون: ما في robots.txt أولاً ثم المسارات المعروفة"""
+        if robots_sitemaps is None:
+            robots_sitemaps = self.robots_sitemaps(base_url)
+        candidates = list(robots_sitemaps) + [urljoin(base_url, path) for path in DEFAULT_SITEMAP_PATHS]
+        return list(dict.fromkeys(candidates))
+
+    def ingest(self, base_url: str, on_url: Optional[Callable[[Dict[str, Any]], Any]] = None,
+               robots_sitemaps: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """قراءة جميع الخرائط وتمرير كل رابط إلى on_url (يُستدعى تحت قفل، مرة لكل رابط)"""
+        analysis = {
+            'sitemaps_found': [],
+            'sitemap_indexes': [],
+            'total_urls': 0,
+            'url_types': {},
+            'last_modified_dates': {'oldest': None, 'newest': None},
+            'priorities': {},
+            'change_frequencies': {},
+            'errors': [],
+            'truncated': False
+        }
+        counters = {'priorities': Counter(), 'change_frequencies': Counter(), 'url_types': Counter()}
+
+        def emit(entry: Dict[str, Any]) -> bool:
+            with self._emit_lock:
+                if analysis['total_urls'] >= self.max_urls:
+                    analysis['truncated'] = True
+                    return False
+                analysis['total_urls'] += 1
+
+                lastmod = entry.get('lastmod')
+                if lastmod:
+                    dates = analysis['last_modified_dates']
+                    if not dates['oldest'] or lastmod < dates['oldest']:
+                        dates['oldest'] = lastmod
+                    if not dates['newest'] or lastmod > dates['newest']:
+                        dates['newest'] = lastmod
+                if entry.get('priority') is not None:
+                    counters['priorities'][str(entry['priority'])] += 1
+                if entry.get('changefreq'):
+                    counters['change_frequencies'][entry['changefreq']] += 1
+                path = entry['url'].split('?', 1)[0].rstrip('/')
+                tail = path.rsplit('/', 1)[-1]
+                counters['url_types'][tail.rsplit('.', 1)[-1].lower() if '.' in tail else 'page'] += 1
+
+                if on_url:
+                    on_url(entry)
+                return True
+
+        scheduled = set()
+        pending = {}
+        default_paths = {urljoin(base_url, path) for path in DEFAULT_SITEMAP_PATHS}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+
+            def schedule(sitemap_url: str):
+                if sitemap_url in scheduled or len(scheduled) >= self.max_sitemaps:
+                    return
+                scheduled.add(sitemap_url)
+                pending[executor.submit(self._ingest_one, sitemap_url, emit)] = sitemap_url
+
+            for sitemap_url in self.candidate_sitemaps(base_url, robots_sitemaps):
+                schedule(sitemap_url)
+
+            # اتباع ملفات الفهرس بالتوازي
+            while pending:
+                done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                for future in done:
+                    sitemap_url = pending.pop(future)
+                    try:
+                        kind, children = future.result()
+                    except Exception as e:
+                        # المسارات الافتراضية غير الموجودة ليست أخطاء
+                        if sitemap_url not in default_paths:
+                            analysis['errors'].append(f"{sitemap_url}: {str(e)}")
+                        continue
+
+                    analysis['sitemaps_found'].append(sitemap_url)
+                    if kind == 'sitemapindex':
+                        analysis['sitemap_indexes'].append(sitemap_url)
+                        for child in children:
+                            schedule(urljoin(sitemap_url, child))
+
+        analysis['priorities'] = dict(counters['priorities'])
+        analysis['change_frequencies'] = dict(counters['change_frequencies'])
+        analysis['url_types'] = dict(counters['url_types'])
+        return analysis
+
+    def _open_stream(self, sitemap_url: str) -> Tuple[requests.Response, io.BufferedReader]:
+        """فتح الاستجابة كتدفق مع فك gzip (ترميز النقل أو ملف .gz)"""
+        response = self.session.get(sitemap_url, timeout=self.timeout, verify=self.verify, stream=True)
+        response.raise_for_status()
+        response.raw.decode_content = True
+        # BufferedReader يحتاج أن يبقى التدفق مفتوحاً حتى نهاية القراءة
+        response.raw.auto_close = False
+
+        stream = io.BufferedReader(response.raw)
+        if stream.peek(2)[:2] == _GZIP_MAGIC:
+            stream = io.BufferedReader(gzip.GzipFile(fileobj=stream))
+        return response, stream
+
+    def _ingest_one(self, sitemap_url: str, emit: Callable[[Dict[str, Any]], bool]) -> Tuple[str, List[str]]:
+        """تحليل ملف واحد عنصراً عنصراً؛ يعيد نوعه وروابط الخرائط الفرعية"""
+        response, stream = self._open_stream(sitemap_url)
+        kind = None
+        children = []
+        root = None
+
+        try:
+            for event, elem in ET.iterparse(stream, events=('start', 'end')):
+                if event == 'start':
+                    if root is None:
+                        root = elem
+                        kind = _local_name(elem.tag)
+                        if kind not in ('urlset', 'sitemapindex'):
+                            raise ValueError(f"ليس ملف sitemap ({kind})")
+                    continue
+
+                name = _local_name(elem.tag)
+                if name not in ('url', 'sitemap'):
+                    continue
+
+                fields = {_local_name(child.tag): (child.text or '').strip() for child in elem}
+                loc = fields.get('loc')
+                if loc:
+                    if name == 'sitemap':
+                        children.append(loc)
+                    else:
+                        entry = {
+                            'url': loc,
+                            'lastmod': fields.get('lastmod') or None,
+                            'changefreq': fields.get('changefreq') or None,
+                            'priority': self._parse_priority(fields.get('priority')),
+                            'sitemap': sitemap_url
+                        }
+                        if not emit(entry):
+                            break
+
+                # تحرير الذاكرة: لا نحتفظ بالعناصر المقروءة
+                elem.clear()
+                if root is not None:
+                    root.clear()
+        finally:
+            response.close()
+
+        return kind, children
+
+    @staticmethod
+    def _parse_priority(value: Optional[str]) -> Optional[float]:
+        """تحويل priority إلى رقم بين 0 و1"""
+        if not value:
+            return None
+        try:
+            return min(max(float(value), 0.0), 1.0)
+        except ValueError:
+            return None
@@ -6,14 +6,24 @@ Advanced Spider Engine for Multi-Page Crawling
 import re
 import time
 import asyncio
+import threading
 from pathlib import Path
 from typing import Dict, List, Any, Optional, Set, Tuple
 from urllib.parse import urljoin, urlparse, urlunparse
-from urllib.robotparser import RobotFileParser
 from dataclasses import dataclass
 from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 import xml.etree.ElementTree as ET
 
+from .session_manager import SessionManager
+from .crawl_frontier import CrawlFrontier, canonicalize_url
+from .crawl_scoring import CrawlScorer, CrawlScorerFunc
+from .sitemap_ingestor import SitemapIngestor
+from .robots_cache import RobotsRules, get_robots_cache
+from .near_duplicates import NearDuplicateIndex, simhash
+from .link_extractor import extract_links
+from .link_graph import LinkGraph
+
 
 @dataclass
 class SpiderConfig:
@@ -26,6 +36,12 @@ class SpiderConfig:
     allowed_file_types: List[str] = None
     excluded_patterns: List[str] = None
     concurrent_requests: int = 5
+    max_requests_per_host: int = 5
+    use_sitemaps: bool = True
+    max_sitemap_urls: int = 50000
+    detect_near_duplicates: bool = True
+    near_duplicate_distance: int = 8
+    scorer: Optional[CrawlScorerFunc] = None  # أولوية الروابط ضمن max_pages (الافتراضي CrawlScorer)
     
     def __post_init__(self):
         if self.allowed_file_types is None:
@@ -34,17 +50,67 @@ class SpiderConfig:
             self.excluded_patterns = ['/admin/', '/login/', '/logout/', '/wp-admin/', '/cgi-bin/']
 
 
+class HostPoliteness:
+    """أدب الزحف لكل نطاق: حد للطلبات المتزامنة وفاصل زمني أدنى بين بدء الطلبات"""
+    
+    def __init__(self, max_per_host: int, min_interval: float):
+        self.max_per_host = max(1, max_per_host)
+        self.min_interval = max(0.0, min_interval)
+        self._lock = threading.Lock()
+        self._slots: Dict[str, threading.Semaphore] = {}
+        self._next_start: Dict[str, float] = {}
+        self._host_intervals: Dict[str, float] = {}
+    
+    def set_host_interval(self, host: str, min_interval: float):
+        """فاصل أدنى خاص بالنطاق (مثل Crawl-delay)؛ لا يقل عن الفاصل العام"""
+        with self._lock:
+            self._host_intervals[host] = max(self.min_interval, min_interval)
+    
+    def _slot(self, host: str) -> threading.Semaphore:
+        with self._lock:
+            if host not in self._slots:
+                self._slots[host] = threading.Semaphore(self.max_per_host)
+            return self._slots[host]
+    
+    def acquire(self, host: str):
+        """حجز مكان على النطاق والانتظار حتى موعد البدء المسموح"""
+        self._slot(host).acquire()
+        with self._lock:
+            now = time.monotonic()
+            start_at = max(now, self._next_start.get(host, 0.0))
+            self._next_start[host] = start_at + self._host_intervals.get(host, self.min_interval)
+        if start_at > now:
+            time.sleep(start_at - now)
+    
+    def release(self, host: str):
+        """تحرير مكان النطاق"""
+        self._slot(host).release()
+
+
 class AdvancedSpiderEngine:
     """محرك زحف متطور لاستكشاف المواقع"""
     
-    def __init__(self, config: SpiderConfig):
+    def __init__(self, config: SpiderConfig, session_manager: Optional[SessionManager] = None):
         self.config = config
+        self.session_manager = session_manager
         self.visited_urls = set()
         self.discovered_urls = set()
-        self.crawl_queue = deque()
-        self.robots_parser = None
+        self.crawl_queue = CrawlFrontier(scorer=config.scorer or CrawlScorer())
+        self.robots_cache = get_robots_cache()
+        self.robots_rules: Optional[RobotsRules] = None
         self.sitemap_urls = set()
         self.crawl_errors = []
+        self.pages_crawled = []
+        self.duplicate_pages = {}
+        self.duplicate_index = None
+        # بنية الروابط بمعرفات رقمية بدل قوائم القواميس في كل صفحة
+        self.link_graph = LinkGraph()
+        
+        # كل مكان (slot) على النطاق ينتظر delay_between_requests بين طلباته
+        self.politeness = HostPoliteness(
+            config.max_requests_per_host,
+            config.delay_between_requests / max(1, config.max_requests_per_host)
+        )
         
     def crawl_website(self, start_url: str, extraction_config) -> Dict[str, Any]:
         """بدء عملية الزحف الشاملة"""
@@ -60,10 +126,16 @@ class AdvancedSpiderEngine:
             'link_structure': {},
             'content_summary': {},
             'errors': [],
+            'duplicates': {},
             'crawl_duration': 0
         }
         
         start_time = time.time()
+        self.cleanup()
+        
+        owns_session = self.session_manager is None
+        if owns_session:
+            self.session_manager = SessionManager(extraction_config)
         
         try:
             print(f"🕷️ بدء الزحف من: {start_url}")
@@ -72,13 +144,13 @@ class AdvancedSpiderEngine:
             robots_analysis = self._analyze_robots_txt(start_url)
             crawl_result['robots_analysis'] = robots_analysis
             
-            # 2. البحث عن واستكشاف sitemap
+            # 2. إعداد الزحف
+            self._initialize_crawl(start_url)
+            
+            # 3. البحث عن sitemap وتغذية قائمة الزحف بروابطه
             sitemap_analysis = self._discover_and_analyze_sitemap(start_url)
             crawl_result['sitemap_analysis'] = sitemap_analysis
             
-            # 3. إعداد الزحف
-            self._initialize_crawl(start_url)
-            
             # 4. تنفيذ الزحف
             pages_crawled = self._perform_crawl(start_url, extraction_config)
             crawl_result['pages_crawled'] = pages_crawled
@@ -96,10 +168,17 @@ class AdvancedSpiderEngine:
             crawl_result['total_pages_crawled'] = len(pages_crawled)
             crawl_result['crawl_depth_reached'] = max([page.get('depth', 0) for page in pages_crawled] + [0])
             crawl_result['errors'] = self.crawl_errors
+            crawl_result['duplicates'] = dict(self.duplicate_pages)
+            if self.duplicate_index:
+                crawl_result['duplicate_stats'] = self.duplicate_index.get_stats()
             
         except Exception as e:
             crawl_result['errors'].append(f"خطأ في الزحف: {str(e)}")
             print(f"❌ خطأ في الزحف: {e}")
+        finally:
+            if owns_session:
+                self.session_manager.close()
+                self.session_manager = None
         
         crawl_result['crawl_duration'] = round(time.time() - start_time, 2)
         print(f"✅ انتهى الزحف في {crawl_result['crawl_duration']} ثانية")
@@ -109,174 +188,233 @@ class AdvancedSpiderEngine:
     def _analyze_robots_txt(self, base_url: str) -> Dict[str, Any]:
         """تحليل ملف robots.txt"""
         
-        robots_analysis = {
-            'exists': False,
-            'user_agents': [],
-            'disallowed_paths': [],
-            'allowed_paths': [],
-            'crawl_delay': None,
-            'sitemap_urls': [],
-            'compliance_score': 0
-        }
+        # من الذاكرة المشتركة (مرة لكل أصل خلال TTL) وعبر جلسة الزحف نفسها
+        self.robots_rules = self._get_robots_rules(base_url)
+        robots_analysis = self.robots_rules.to_analysis(self._user_agent())
         
-        try:
-            robots_url = urljoin(base_url, '/robots.txt')
-            
-            # محاولة تحميل robots.txt
-            self.robots_parser = RobotFileParser()
-            self.robots_parser.set_url(robots_url)
-            self.robots_parser.read()
-            
-            robots_analysis['exists'] = True
-            
-            # تحليل المحتوى (تحتاج تطوير إضافي)
-            # هنا يمكن إضافة تحليل أكثر تفصيلاً
-            
-            print(f"📋 تم العثور على robots.txt: {robots_url}")
-            
-        except Exception as e:
-            robots_analysis['error'] = str(e)
-            print(f"⚠️ لا يمكن الوصول لـ robots.txt: {e}")
+        if robots_analysis['exists']:
+            print(f"📋 تم العثور على robots.txt: {robots_analysis['robots_url']}")
+        elif robots_analysis.get('error'):
+            print(f"⚠️ لا يمكن الوصول لـ robots.txt: {robots_analysis['error']}")
+        
+        # Crawl-delay يصبح الفاصل الأدنى لهذا النطاق في محدد المعدل
+        crawl_delay = robots_analysis['crawl_delay']
+        if crawl_delay and self.config.respect_robots_txt:
+            self.politeness.set_host_interval(urlparse(base_url).netloc, crawl_delay)
+            print(f"⏱️ Crawl-delay: {crawl_delay} ثانية")
         
         return robots_analysis
     
+    def _get_robots_rules(self, url: str) -> RobotsRules:
+        """قواعد robots.txt لأصل الرابط"""
+        return self.robots_cache.get(
+            url, self.session_manager.session,
+            timeout=self.session_manager.config.timeout,
+            verify=self.session_manager.config.verify_ssl
+        )
+    
+    def _user_agent(self) -> str:
+        """وكيل المستخدم المستخدم في مطابقة قواعد robots.txt"""
+        return self.session_manager.session.headers.get('User-Agent', '*')
+    
     def _discover_and_analyze_sitemap(self, base_url: str) -> Dict[str, Any]:
-        """اكتشاف وتحليل sitemap"""
-        
-        sitemap_analysis = {
-            'sitemaps_found': [],
-            'total_urls': 0,
-            'url_types': {},
-            'last_modified_dates': [],
-            'priorities': [],
-            'change_frequencies': []
-        }
+        """اكتشاف وتحليل sitemap (robots.txt والمسارات المعروفة) وإضافة روابطه إلى قائمة الزحف"""
         
-        # مواقع محتملة لـ sitemap
-        potential_sitemaps = [
-            '/sitemap.xml',
-            '/sitemap_index.xml',
-            '/sitemap.txt',
-            '/sitemaps.xml',
-            '/wp-sitemap.xml'
-        ]
-        
-        for sitemap_path in potential_sitemaps:
-            try:
-                sitemap_url = urljoin(base_url, sitemap_path)
-                # هنا يمكن إضافة كود لتحميل وتحليل sitemap
-                # نحتاج session manager للطلبات
-                print(f"🗺️ فحص sitemap: {sitemap_url}")
-                
-            except Exception as e:
-                continue
+        if not self.config.use_sitemaps:
+            return {'sitemaps_found': [], 'total_urls': 0, 'skipped': True}
+        
+        ingestor = SitemapIngestor(
+            self.session_manager.session,
+            timeout=self.session_manager.config.timeout,
+            max_workers=self.config.concurrent_requests,
+            max_urls=self.config.max_sitemap_urls,
+            verify=self.session_manager.config.verify_ssl
+        )
+        
+        # خرائط robots.txt معروفة مسبقاً من الذاكرة فلا حاجة لجلبه مرة أخرى
+        robots_sitemaps = self.robots_rules.sitemap_urls if self.robots_rules else None
+        
+        queued_before = len(self.crawl_queue)
+        sitemap_analysis = ingestor.ingest(base_url, on_url=self._add_sitemap_entry,
+                                           robots_sitemaps=robots_sitemaps)
+        sitemap_analysis['urls_queued'] = len(self.crawl_queue) - queued_before
+        self.sitemap_urls.update(sitemap_analysis['sitemaps_found'])
+        
+        for sitemap_url in sitemap_analysis['sitemaps_found']:
+            print(f"🗺️ sitemap: {sitemap_url}")
+        if sitemap_analysis['total_urls']:
+            print(f"🗺️ {sitemap_analysis['total_urls']} رابط من sitemap، أضيف منها {sitemap_analysis['urls_queued']} للزحف")
         
         return sitemap_analysis
     
+    def _add_sitemap_entry(self, entry: Dict[str, Any]):
+        """إضافة رابط من sitemap إلى قائمة الزحف مع lastmod و priority"""
+        url = entry['url']
+        if not self._should_queue(url):
+            return
+        
+        canonical_url = self.crawl_queue.add(
+            url, depth=1, parent_url=entry.get('sitemap'), link_text='SITEMAP',
+            lastmod=entry.get('lastmod'), sitemap_priority=entry.get('priority')
+        )
+        if canonical_url:
+            self.discovered_urls.add(canonical_url)
+    
     def _initialize_crawl(self, start_url: str):
         """تهيئة عملية الزحف"""
         
         # إضافة URL البداية إلى قائمة الانتظار
-        parsed_start = urlparse(start_url)
-        self.base_domain = parsed_start.netloc
+        canonical_start = self.crawl_queue.add(start_url, depth=0, parent_url=None, link_text='START')
+        if canonical_start is None:
+            raise ValueError(f"رابط البداية ليس رابط http(s) صالحاً: {start_url}")
+        self.base_domain = urlparse(canonical_start).netloc
         
-        self.crawl_queue.append({
-            'url': start_url,
-            'depth': 0,
-            'parent_url': None,
-            'link_text': 'START'
-        })
-        
-        self.discovered_urls.add(start_url)
+        self.discovered_urls.add(canonical_start)
     
     def _perform_crawl(self, start_url: str, extraction_config) -> List[Dict[str, Any]]:
-        """تنفيذ عملية الزحف الرئيسية"""
-        
-        pages_crawled = []
-        
-        while self.crawl_queue and len(pages_crawled) < self.config.max_pages:
-            
-            current_item = self.crawl_queue.popleft()
-            current_url = current_item['url']
-            current_depth = current_item['depth']
-            
-            # تحقق من أننا لم نزحف هذا الرابط من قبل
-            if current_url in self.visited_urls:
-                continue
-            
-            # تحقق من عمق الزحف
-            if current_depth > self.config.max_depth:
-                continue
-            
-            # تحقق من robots.txt
-            if self.config.respect_robots_txt and self.robots_parser:
-                if not self.robots_parser.can_fetch('*', current_url):
-                    print(f"🚫 منع بواسطة robots.txt: {current_url}")
-                    continue
-            
-            try:
-                print(f"🔍 زحف: {current_url} (عمق: {current_depth})")
+        """تنفيذ عملية الزحف الرئيسية بمجموعة عمال متوازية (concurrent_requests)"""
+        
+        pages_crawled = self.pages_crawled
+        in_flight = {}
+        if self.config.detect_near_duplicates:
+            self.duplicate_index = NearDuplicateIndex(self.config.near_duplicate_distance)
+        
+        with ThreadPoolExecutor(max_workers=max(1, self.config.concurrent_requests)) as executor:
+            while True:
+                # ملء العمال من قائمة الانتظار دون تجاوز الحد الأقصى للصفحات
+                # المكررات لا تستهلك حد الصفحات، لكن لها حد مماثل
+                while (self.crawl_queue and len(in_flight) < self.config.concurrent_requests and
+                       len(pages_crawled) + len(in_flight) < self.config.max_pages and
+                       len(self.duplicate_pages) < self.config.max_pages):
+                    
+                    current_item = self.crawl_queue.pop()
+                    current_url = current_item['url']
+                    
+                    # تحقق من أننا لم نزحف هذا الرابط من قبل ومن عمق الزحف
+                    if current_url in self.visited_urls or current_item['depth'] > self.config.max_depth:
+                        continue
+                    
+                    # أنماط الروابط التي تنتج مكررات غالباً لا تُجلب
+                    if (self.duplicate_index and current_item['depth'] > 0 and
+                            self.duplicate_index.is_suppressed(current_url)):
+                        continue
+                    
+                    # تحقق من robots.txt
+                    if self.config.respect_robots_txt:
+                        if not self._get_robots_rules(current_url).can_fetch(current_url, self._user_agent()):
+                            print(f"🚫 منع بواسطة robots.txt: {current_url}")
+                            continue
+                    
+                    self.visited_urls.add(current_url)
+                    future = executor.submit(self._crawl_single_page, current_url, current_item['depth'], current_item)
+                    in_flight[future] = current_item
                 
-                # هنا نحتاج session manager للطلب
-                page_data = self._crawl_single_page(current_url, current_depth, current_item)
+                if not in_flight:
+                    break
                 
-                if page_data:
+                done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+                
+                for future in done:
+                    current_item = in_flight.pop(future)
+                    current_url = current_item['url']
+                    current_depth = current_item['depth']
+                    
+                    try:
+                        page_data = future.result()
+                    except Exception as e:
+                        error_msg = f"خطأ في زحف {current_url}: {str(e)}"
+                        self.crawl_errors.append(error_msg)
+                        print(f"❌ {error_msg}")
+                        continue
+                    
+                    if not page_data:
+                        continue
+                    
+                    # الصفحة شبه المكررة تُسجل ولا تُتبع روابطها
+                    if self.duplicate_index and page_data.get('simhash') is not None:
+                        original_url = self.duplicate_index.check(current_url, page_data['simhash'])
+                        if original_url:
+                            self.duplicate_pages[current_url] = original_url
+                            continue
+                    
                     pages_crawled.append(page_data)
-                    self.visited_urls.add(current_url)
                     
                     # استخراج الروابط الجديدة
+                    new_links = self._extract_links_from_page(page_data, current_url, current_depth)
+                    self._record_links(current_url, current_depth, new_links)
                     if current_depth < self.config.max_depth:
-                        new_links = self._extract_links_from_page(page_data, current_url, current_depth)
                         self._add_links_to_queue(new_links, current_depth + 1, current_url)
-                
-                # تأخير بين الطلبات
-                time.sleep(self.config.delay_between_requests)
-                
-            except Exception as e:
-                error_msg = f"خطأ في زحف {current_url}: {str(e)}"
-                self.crawl_errors.append(error_msg)
-                print(f"❌ {error_msg}")
-                continue
+                    # الروابط محفوظة في link_graph فلا تبقى نسخة منها في كل صفحة
+                    page_data.pop('discovered_links', None)
         
         return pages_crawled
     
     def _crawl_single_page(self, url: str, depth: int, item_info: Dict) -> Optional[Dict[str, Any]]:
-        """زحف صفحة واحدة (يحتاج session manager)"""
+        """زحف صفحة واحدة عبر SessionManager (يُنفَّذ داخل عامل)"""
+        
+        host = urlparse(url).netloc
+        print(f"🔍 زحف: {url} (عمق: {depth})")
         
-        # هنا نحتاج session manager للطلب الفعلي
-        # حالياً سنرجع بيانات أساسية
+        self.politeness.acquire(host)
+        try:
+            response = self.session_manager.make_request(url, rate_limit=False, check_size=False)
+        finally:
+            self.politeness.release(host)
+        
+        if response is None:
+            self.crawl_errors.append(f"فشل تحميل {url}")
+            return None
+        
+        content_type = response.headers.get('Content-Type', '').split(';')[0].strip() or 'text/html'
         
         page_data = {
             'url': url,
+            'final_url': response.url,
             'depth': depth,
             'parent_url': item_info.get('parent_url'),
             'link_text': item_info.get('link_text', ''),
             'title': '',
             'description': '',
-            'content_length': 0,
+            'content_length': len(response.content),
             'links_count': 0,
             'images_count': 0,
-            'response_code': 200,
-            'content_type': 'text/html',
+            'response_code': response.status_code,
+            'content_type': content_type,
             'discovered_links': [],
             'timestamp': time.time()
         }
         
-        # محاكاة معالجة الصفحة
-        # في التطبيق الحقيقي، هنا سنستخدم session manager للحصول على المحتوى
-        # ثم نحلل HTML باستخدام BeautifulSoup
+        if 'html' not in content_type:
+            return page_data
+        
+        # مسار سريع: الزحف يحتاج الروابط والعنوان فقط فلا تُبنى شجرة BeautifulSoup
+        page_links = extract_links(response.text, response.url, with_text=self.config.detect_near_duplicates)
+        
+        page_data['title'] = page_links.title
+        page_data['description'] = page_links.description
+        page_data['discovered_links'] = [{'url': link_url, 'text': text} for link_url, text in page_links.links]
+        page_data['links_count'] = len(page_data['discovered_links'])
+        page_data['images_count'] = page_links.images
+        if self.config.detect_near_duplicates:
+            page_data['simhash'] = simhash(page_links.text)
         
         return page_data
     
     def _extract_links_from_page(self, page_data: Dict, base_url: str, current_depth: int) -> List[Dict[str, Any]]:
         """استخراج الروابط من الصفحة"""
         
-        links = []
-        
-        # هنا نحتاج المحتوى الفعلي للصفحة لاستخراج الروابط
-        # حالياً سنرجع قائمة فارغة
-        
-        return links
+        return page_data.get('discovered_links', [])
+    
+    def _record_links(self, url: str, depth: int, links: List[Dict]):
+        """تسجيل روابط الصفحة في رسم الروابط (الداخلية كحواف والخارجية كعدد)"""
+        base_domain = getattr(self, 'base_domain', '')
+        internal, external = [], 0
+        for link in links:
+            if urlparse(link['url']).netloc == base_domain:
+                internal.append((link['url'], link.get('text', '')))
+            else:
+                external += 1
+        self.link_graph.add_page(url, internal, depth, external)
     
     def _add_links_to_queue(self, links: List[Dict], depth: int, parent_url: str):
         """إضافة روابط جديدة لقائمة الزحف"""
@@ -284,32 +422,33 @@ class AdvancedSpiderEngine:
         for link in links:
             url = link.get('url', '')
             
-            if not url or url in self.visited_urls:
-                continue
-            
-            # تحقق من أنواع الملفات المسموحة
-            if not self._is_allowed_url(url):
+            if not url or url in self.visited_urls or not self._should_queue(url):
                 continue
             
-            # تحقق من الروابط الخارجية
-            if not self.config.follow_external_links:
-                parsed = urlparse(url)
-                if parsed.netloc and parsed.netloc != self.base_domain:
-                    continue
-            
-            # تحقق من الأنماط المستبعدة
-            if self._is_excluded_url(url):
-                continue
-            
-            # إضافة إلى قائمة الانتظار
-            if url not in self.discovered_urls:
-                self.crawl_queue.append({
-                    'url': url,
-                    'depth': depth,
-                    'parent_url': parent_url,
-                    'link_text': link.get('text', '')
-                })
-                self.discovered_urls.add(url)
+            # إضافة إلى قائمة الانتظار (الواجهة تتجاهل المكرر بعد التوحيد)
+            canonical_url = self.crawl_queue.add(url, depth=depth, parent_url=parent_url,
+                                                 link_text=link.get('text', ''))
+            if canonical_url:
+                self.discovered_urls.add(canonical_url)
+    
+    def _should_queue(self, url: str) -> bool:
+        """مرشحات الإضافة لقائمة الزحف: نوع الملف، النطاق، الأنماط المستبعدة"""
+        
+        # تحقق من أنواع الملفات المسموحة
+        if not self._is_allowed_url(url):
+            return False
+        
+        # روابط ليست http(s) مطلقة (mailto: و javascript: و //cdn) لا تُزحف أبداً
+        canonical_url = canonicalize_url(url)
+        if canonical_url is None:
+            return False
+        
+        # تحقق من الروابط الخارجية
+        if not self.config.follow_external_links and urlparse(canonical_url).netloc != self.base_domain:
+            return False
+        
+        # تحقق من الأنماط المستبعدة
+        return not self._is_excluded_url(url)
     
     def _is_allowed_url(self, url: str) -> bool:
         """تحقق من أن الرابط مسموح"""
@@ -341,21 +480,19 @@ class AdvancedSpiderEngine:
         return False
     
     def _analyze_link_structure(self) -> Dict[str, Any]:
-        """تحليل بنية الروابط"""
-        
-        structure = {
-            'total_internal_links': 0,
-            'total_external_links': 0,
-            'depth_distribution': {},
-            'most_linked_pages': [],
-            'orphan_pages': [],
-            'link_density': 0
-        }
-        
-        # تحليل بناءً على البيانات المجمعة
-        # هنا يمكن إضافة تحليل أكثر تفصيلاً
+        """تحليل بنية الروابط من رسم الروابط (درجات الدخول، الصفحات اليتيمة، عمق النقر، PageRank)"""
+        
+        if not self.pages_crawled:
+            return {
+                'total_internal_links': 0,
+                'total_external_links': 0,
+                'depth_distribution': {},
+                'most_linked_pages': [],
+                'orphan_pages': [],
+                'link_density': 0
+            }
         
-        return structure
+        return self.link_graph.report()
     
     def _generate_content_summary(self, pages_crawled: List[Dict]) -> Dict[str, Any]:
         """توليد ملخص المحتوى"""
@@ -434,7 +571,12 @@ class AdvancedSpiderEngine:
         """تنظيف الذاكرة"""
         self.visited_urls.clear()
         self.discovered_urls.clear()
-        self.crawl_queue.clear()
+        # واجهة جديدة: عدادات قوالب الروابط في CrawlScorer تخص زحفاً واحداً
+        self.crawl_queue = CrawlFrontier(scorer=self.config.scorer or CrawlScorer())
         self.crawl_errors.clear()
         self.sitemap_urls.clear()
-        self.robots_parser = None
\ No newline at end of file
+        self.pages_crawled = []
+        self.duplicate_pages = {}
+        self.duplicate_index = None
+        self.link_graph = LinkGraph()
+        self.robots_rules = None
\ No newline at end of file
@@ -0,0 +1,191 @@
+"""
+ذاكرة استراتيجيات الجلب لكل نطاق
+Per-Domain Fetch Strategy Memory
+"""
+
+import json
+import time
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Union
+from urllib.parse import urlparse
+
+from requests.structures import CaseInsensitiveDict
+
+
+STRATEGY_DB_NAME = "fetch_strategies.db"
+# مجلد الإخراج الافتراضي لـ AdvancedWebsiteExtractor؛ يُستخدم فقط إن لم يمرر المستدعي مجلده
+DEFAULT_OUTPUT_DIRECTORY = "extracted_files"
+
+# Headers لا معنى لحفظها أو إعادة استخدامها
+_VOLATILE_HEADERS = {'cookie', 'content-length', 'host', 'authorization'}
+
+
+class DomainStrategyStore:
+    """جدول دائم (SQLite) لنجاح/فشل وزمن كل طريقة جلب لكل نطاق"""
+
+    def __init__(self, db_path: Union[str, Path], half_life_hours: float = 72.0,
+                 max_age_days: float = 30.0):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.half_life_seconds = half_life_hours * 3600
+        self.max_age_seconds = max_age_days * 86400
+        self._lock = threading.Lock()
+
+        self.db_connection = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.db_connection.execute('''
+            CREATE TABLE IF NOT EXISTS fetch_strategies (
+                domain TEXT,
+                method TEXT,
+                successes REAL DEFAULT 0,
+                failures REAL DEFAULT 0,
+                avg_latency REAL DEFAULT 0,
+                headers TEXT,
+                user_agent TEXT,
+                last_success_at REAL,
+                updated_at REAL,
+                PRIMARY KEY (domain, method)
+            )
+        ''')
+        self.db_connection.commit()
+
+    @staticmethod
+    def domain_of(url: str) -> str:
+        """استخراج النطاق من الرابط"""
+        return urlparse(url).netloc.lower() or url.lower()
+
+    def _decay_factor(self, updated_at: Optional[float], now: float) -> float:
+        """معامل التضاؤل الأسي حسب عمر السجل"""
+        if not updated_at or self.half_life_seconds <= 0:
+            return 1.0
+        return 0.5 ** (max(now - updated_at, 0) / self.half_life_seconds)
+
+    def record(self, domain: str, method: str, success: bool, latency: float,
+               headers: Optional[Dict[str, str]] = None):
+        """تسجيل نتيجة محاولة جلب"""
+        now = time.time()
+
+        with self._lock:
+            row = self.db_connection.execute(
+                'SELECT successes, failures, avg_latency, headers, user_agent, last_success_at, updated_at '
+                'FROM fetch_strategies WHERE domain = ? AND method = ?',
+                (domain, method)
+            ).fetchone()
+
+            if row:
+                successes, failures, avg_latency, stored_headers, user_agent, last_success_at, updated_at = row
+                factor = self._decay_factor(updated_at, now)
+                successes *= factor
+                failures *= factor
+            else:
+                successes, failures, avg_latency = 0.0, 0.0, 0.0
+                stored_headers, user_agent, last_success_at = None, None, None
+
+            if success:
+                successes += 1
+                # متوسط متحرك لزمن الاستجابة الناجحة
+                avg_latency = latency if not avg_latency else (avg_latency * 0.7 + latency * 0.3)
+                last_success_at = now
+                if headers:
+                    clean_headers = {k: v for k, v in headers.items() if k.lower() not in _VOLATILE_HEADERS}
+                    stored_headers = json.dumps(clean_headers, ensure_ascii=False)
+                    # httpx يعيد أسماء headers بأحرف صغيرة
+                    user_agent = CaseInsensitiveDict(clean_headers).get('User-Agent', user_agent)
+            else:
+                failures += 1
+
+            self.db_connection.execute('''
+                INSERT OR REPLACE INTO fetch_strategies
+                (domain, method, successes, failures, avg_latency, headers, user_agent, last_success_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (domain, method, successes, failures, avg_latency, stored_headers, user_agent, last_success_at, now))
+            self.db_connection.commit()
+
+    def get_stats(self, domain: str) -> Dict[str, Dict[str, Any]]:
+        """إحصائيات الطرق لنطاق معين بعد تطبيق التضاؤل"""
+        now = time.time()
+
+        with self._lock:
+            rows = self.db_connection.execute(
+                'SELECT method, successes, failures, avg_latency, user_agent, last_success_at, updated_at '
+                'FROM fetch_strategies WHERE domain = ?',
+                (domain,)
+            ).fetchall()
+
+        stats = {}
+        for method, successes, failures, avg_latency, user_agent, last_success_at, updated_at in rows:
+            if updated_at and now - updated_at > self.max_age_seconds:
+                continue
+            factor = self._decay_factor(updated_at, now)
+            successes *= factor
+            failures *= factor
+            stats[method] = {
+                'successes': round(successes, 3),
+                'failures': round(failures, 3),
+                'success_rate': round((successes + 1) / (successes + failures + 2), 3),
+                'avg_latency': round(avg_latency or 0, 3),
+                'user_agent': user_agent,
+                'last_success_at': last_success_at
+            }
+
+        return stats
+
+    def ranked_methods(self, domain: str, methods: List[str]) -> List[str]:
+        """ترتيب الطرق بحيث تُجرَّب الأنجح تاريخياً أولاً (مع الحفاظ على الترتيب الافتراضي عند التساوي)"""
+        stats = self.get_stats(domain)
+        if not stats:
+            return list(methods)
+
+        def sort_key(item):
+            index, method = item
+            method_stats = stats.get(method)
+            if not method_stats:
+                # طريقة لم تُجرَّب: احتمال محايد
+                return (-0.5, 0.0, index)
+            return (-method_stats['success_rate'], method_stats['avg_latency'], index)
+
+        return [method for _, method in sorted(enumerate(methods), key=sort_key)]
+
+    def get_profile(self, domain: str, method: str) -> Optional[CaseInsensitiveDict]:
+        """Headers وUser-Agent آخر نجاح لهذه الطريقة على النطاق (بلا حساسية لحالة الأحرف)"""
+        with self._lock:
+            row = self.db_connection.execute(
+                'SELECT headers, updated_at FROM fetch_strategies WHERE domain = ? AND method = ? AND headers IS NOT NULL',
+                (domain, method)
+            ).fetchone()
+
+        if not row or (row[1] and time.time() - row[1] > self.max_age_seconds):
+            return None
+
+        try:
+            return CaseInsensitiveDict(json.loads(row[0]))
+        except (TypeError, ValueError):
+            return None
+
+    def prune_stale(self) -> int:
+        """حذف السجلات الأقدم من max_age"""
+        cutoff = time.time() - self.max_age_seconds
+        with self._lock:
+            cursor = self.db_connection.execute('DELETE FROM fetch_strategies WHERE updated_at < ?', (cutoff,))
+            self.db_connection.commit()
+            return cursor.rowcount
+
+    def close(self):
+        """إغلاق قاعدة البيانات"""
+        with self._lock:
+            self.db_connection.close()
+
+
+_default_store: Optional[DomainStrategyStore] = None
+_default_store_lock = threading.Lock()
+
+
+def get_strategy_store(output_directory: Optional[Union[str, Path]] = None) -> DomainStrategyStore:
+    """الذاكرة المشتركة على مستوى العملية، تُنشأ عند أول استخدام داخل مجلد الإخراج لأول مستدعٍ"""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = DomainStrategyStore(Path(output_directory or DEFAULT_OUTPUT_DIRECTORY) / STRATEGY_DB_NAME)
+            _default_store.prune_stale()
+        return _default_store
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+اختبار الذاكرة المؤقتة للأصول على خادم محلي
+Test for the Persistent Asset Cache
+"""
+
+import sys
+import time
+import tempfile
+import threading
+from collections import Counter
+from pathlib import Path
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import requests
+
+from core.blob_store import BlobStore
+from core.asset_cache import AssetCache, new_cache_stats, open_asset
+
+BODY = b'.card { padding: 8px; }\n' * 40
+ETAG = '"css-v1"'
+
+
+class _CacheHandler(BaseHTTPRequestHandler):
+    """/fresh: max-age؛ /etag: no-cache مع ETag (304 عند التطابق)؛ /nostore: no-store؛ /lru/*: max-age"""
+    hits = Counter()
+    conditional = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        type(self).hits[self.path] += 1
+        if self.path == '/etag' and self.headers.get('If-None-Match') == ETAG:
+            type(self).conditional.append(self.path)
+            self.send_response(304)
+            self.send_header('ETag', ETAG)
+            self.send_header('Cache-Control', 'no-cache')
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/css')
+        self.send_header('Content-Length', str(len(BODY)))
+        if self.path == '/etag':
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('ETag', ETAG)
+        elif self.path == '/nostore':
+            self.send_header('Cache-Control', 'no-store')
+            self.send_header('ETag', ETAG)
+        else:
+            self.send_header('Cache-Control', 'max-age=3600')
+        self.end_headers()
+        self.wfile.write(BODY)
+
+
+def _start_server() -> ThreadingHTTPServer:
+    _CacheHandler.hits = Counter()
+    _CacheHandler.conditional = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _CacheHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _fetch(cache: AssetCache, url: str, dest: Path, stats: dict) -> tuple:
+    """جلب أصل عبر الذاكرة المؤقتة وحفظه في مخزن الأصول كما يفعل المنزلون؛ يعيد (المصدر، المحتوى)"""
+    with open_asset(requests.Session(), url, cache=cache, stats=stats, timeout=5) as asset:
+        stored = cache.blob_store.save_stream(asset.iter_content(), dest)
+    return asset.from_cache, Path(stored['path']).read_bytes()
+
+
+def _with_cache(test, max_bytes: int = 1024 * 1024):
+    """تشغيل اختبار بذاكرة مؤقتة ومخزن أصول مؤقتين وخادم محلي"""
+    server = _start_server()
+    base = f"http://127.0.0.1:{server.server_port}"
+    try:
+        with tempfile.TemporaryDirectory() as folder:
+            store = BlobStore(Path(folder) / 'blobs')
+            cache = AssetCache(store, max_bytes=max_bytes)
+            try:
+                return test(cache, base, Path(folder))
+            finally:
+                cache.close()
+                store.close()
+    finally:
+        server.shutdown()
+
+
+def test_fresh_entry_served_without_request():
+    """Cache-Control: max-age يجعل الطلب الثاني من الذاكرة دون شبكة"""
+    print("🧪 اختبار الإدخال الصالح دون طلب...")
+
+    def run(cache, base, folder):
+        stats = new_cache_stats()
+        first = _fetch(cache, base + '/fresh', folder / 'run1' / 'a.css', stats)
+        second = _fetch(cache, base + '/fresh', folder / 'run2' / 'a.css', stats)
+        return first, second, stats
+
+    first, second, stats = _with_cache(run)
+    assert first == (None, BODY) and second == ('hit', BODY), (first[0], second[0])
+    assert _CacheHandler.hits['/fresh'] == 1, _CacheHandler.hits
+    assert stats['hits'] == 1 and stats['misses'] == 1 and stats['bytes_saved'] == len(BODY), stats
+    print(f"✅ طلب واحد للخادم، نسبة الإصابة {stats['hit_rate']}%")
+
+
+def test_etag_revalidation():
+    """no-cache مع ETag: الطلب الثاني شرطي (If-None-Match) ويُقرأ الجسم من المخزن بعد 304"""
+    print("\n🧪 اختبار التحقق بـ ETag...")
+
+    def run(cache, base, folder):
+        stats = new_cache_stats()
+        _fetch(cache, base + '/etag', folder / 'run1' / 'b.css', stats)
+        second = _fetch(cache, base + '/etag', folder / 'run2' / 'b.css', stats)
+        return second, stats
+
+    second, stats = _with_cache(run)
+    assert second == ('revalidated', BODY), second[0]
+    assert _CacheHandler.hits['/etag'] == 2 and _CacheHandler.conditional == ['/etag'], _CacheHandler.hits
+    assert stats['revalidated'] == 1 and stats['bytes_saved'] == len(BODY), stats
+    print("✅ أعيد 304 واستُخدمت النسخة المحفوظة")
+
+
+def test_no_store_not_cached():
+    """no-store يمنع التخزين حتى مع ETag"""
+    print("\n🧪 اختبار no-store...")
+
+    def run(cache, base, folder):
+        stats = new_cache_stats()
+        _fetch(cache, base + '/nostore', folder / 'run1' / 'c.css', stats)
+        second = _fetch(cache, base + '/nostore', folder / 'run2' / 'c.css', stats)
+        return second, stats, cache.lookup(base + '/nostore')
+
+    second, stats, entry = _with_cache(run)
+    assert second == (None, BODY), second[0]
+    assert entry is None
+    assert _CacheHandler.hits['/nostore'] == 2 and not _CacheHandler.conditional, _CacheHandler.hits
+    assert stats['stored'] == 0 and stats['misses'] == 2, stats
+    print("✅ لم يُخزن الأصل وطُلب مرتين")
+
+
+def test_lru_eviction():
+    """عند تجاوز الحد يُحذف الإدخال الأقدم استخداماً لا الأقدم تخزيناً"""
+    print("\n🧪 اختبار الإخلاء LRU...")
+
+    def run(cache, base, folder):
+        stats = new_cache_stats()
+        for name in ('a', 'b'):
+            _fetch(cache, f"{base}/lru/{name}", folder / 'run1' / f"{name}.css", stats)
+            time.sleep(0.01)
+        # استخدام a يجعل b الأقدم استخداماً
+        _fetch(cache, f"{base}/lru/a", folder / 'run2' / 'a.css', stats)
+        time.sleep(0.01)
+        _fetch(cache, f"{base}/lru/c", folder / 'run2' / 'c.css', stats)
+        kept = {name: cache.lookup(f"{base}/lru/{name}") is not None for name in ('a', 'b', 'c')}
+        return kept, cache.get_stats()
+
+    # يتسع لجسمين فقط (أسماء مختلفة لكن نفس المحتوى: الحجم يُحسب لكل إدخال)
+    kept, cache_stats = _with_cache(run, max_bytes=len(BODY) * 2 + len(BODY) // 2)
+    assert kept == {'a': True, 'b': False, 'c': True}, kept
+    assert cache_stats['entries'] == 2 and cache_stats['size_bytes'] <= cache_stats['max_bytes'], cache_stats
+    print(f"✅ أُخلي b وبقي {cache_stats['entries']} إدخالات")
+
+
+def run_all_tests() -> bool:
+    """تشغيل جميع الاختبارات"""
+    tests = [
+        test_fresh_entry_served_without_request,
+        test_etag_revalidation,
+        test_no_store_not_cached,
+        test_lru_eviction
+    ]
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ فشل {test.__name__}: {e}")
+    print(f"\n📋 اجتازت: {passed}/{len(tests)}")
+    return passed == len(tests)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_all_tests() else 1)
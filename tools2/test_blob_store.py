@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+اختبار مخزن الأصول المعنون بالمحتوى
+Test for the Content-Addressed Blob Store
+"""
+
+import os
+import sys
+import stat
+import hashlib
+import tempfile
+from pathlib import Path
+
+from core.blob_store import BlobStore, BLOB_FILE_MODE, detach_view
+
+BODY = b'body { color: #222; }\n' * 64
+BODY_SHA256 = hashlib.sha256(BODY).hexdigest()
+
+
+def _mode(path: Path) -> int:
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def test_identical_bodies_stored_once():
+    """نفس الجسم في استخراجين يُخزن مرة واحدة ويُعرض كرابط صلب لنفس الملف"""
+    print("🧪 اختبار تخزين الأجسام المكررة مرة واحدة...")
+    with tempfile.TemporaryDirectory() as folder:
+        store = BlobStore(Path(folder) / 'blobs')
+        first = store.save_bytes(BODY, Path(folder) / 'run1' / 'css' / 'site.css')
+        second = store.save_stream(iter([BODY[:100], BODY[100:]]), Path(folder) / 'run2' / 'css' / 'main.css')
+        stats = store.stats()
+        store.close()
+
+        assert first['sha256'] == second['sha256'] == BODY_SHA256
+        assert not first['deduplicated'] and second['deduplicated'], (first, second)
+        assert os.path.samefile(first['path'], second['path'])
+        assert stats['blobs'] == 1 and stats['references'] == 2, stats
+        assert stats['saved_bytes'] == len(BODY), stats
+    print(f"✅ جسم واحد لعرضين، وُفر {stats['saved_bytes']} بايت")
+
+
+def test_blobs_are_read_only():
+    """الأجسام تُحفظ للقراءة فقط (والعروض تشاركها نفس inode) سواء جاءت من تدفق أو من ملف"""
+    print("\n🧪 اختبار الأجسام للقراءة فقط...")
+    with tempfile.TemporaryDirectory() as folder:
+        # spool_bytes صغير حتى يمر التدفق عبر ملف مؤقت
+        store = BlobStore(Path(folder) / 'blobs', spool_bytes=64)
+        streamed = store.save_bytes(BODY, Path(folder) / 'run' / 'a.css')
+        part_file = Path(folder) / 'download.part'
+        part_file.write_bytes(b'%PDF-1.4 document')
+        moved = store.save_file(part_file, Path(folder) / 'run' / 'guide.pdf')
+        leftovers = list(store.tmp_dir.iterdir())
+        store.close()
+
+        for saved in (streamed, moved):
+            assert _mode(store.blob_path(saved['sha256'])) == BLOB_FILE_MODE
+            assert _mode(saved['path']) == BLOB_FILE_MODE
+        assert not part_file.exists()
+        assert leftovers == [], leftovers
+    print("✅ الأجسام بصلاحية 0444 ولم يبق ملف مؤقت")
+
+
+def test_detach_view_before_rewrite():
+    """detach_view يفصل العرض عن الجسم فالكتابة في مكانه لا تغير الجسم ولا العروض الأخرى"""
+    print("\n🧪 اختبار detach_view قبل إعادة الكتابة...")
+    with tempfile.TemporaryDirectory() as folder:
+        store = BlobStore(Path(folder) / 'blobs')
+        view = Path(store.save_bytes(BODY, Path(folder) / 'run1' / 'site.css')['path'])
+        other = Path(store.save_bytes(BODY, Path(folder) / 'run2' / 'site.css')['path'])
+        plain = Path(folder) / 'plain.css'
+        plain.write_bytes(b'a {}')
+
+        assert detach_view(view) is True
+        assert not view.exists()
+        view.write_bytes(b'rewritten')
+
+        assert store.blob_path(BODY_SHA256).read_bytes() == BODY
+        assert other.read_bytes() == BODY
+        assert detach_view(plain) is False and plain.exists()
+        assert detach_view(Path(folder) / 'missing.css') is False
+        # العرض المستبدل لم يعد مرجعاً؛ gc يزيله ويبقي الجسم للعرض الآخر
+        result = store.gc(grace_seconds=0)
+        assert result['refs_removed'] == 1 and result['blobs_removed'] == 0, result
+        store.close()
+    print("✅ الكتابة بعد الفصل لم تمس الجسم المشترك")
+
+
+def test_release_deletes_last_reference():
+    """release يحذف الجسم فقط عند إزالة آخر مرجع له"""
+    print("\n🧪 اختبار release ومرجع الجسم الأخير...")
+    with tempfile.TemporaryDirectory() as folder:
+        store = BlobStore(Path(folder) / 'blobs')
+        first = store.save_bytes(BODY, Path(folder) / 'run1' / 'site.css')['path']
+        second = store.save_bytes(BODY, Path(folder) / 'run2' / 'site.css')['path']
+
+        assert store.release(first) is False
+        assert store.has(BODY_SHA256)
+        assert store.release(second) is True
+        assert not store.has(BODY_SHA256)
+        assert store.stats()['blobs'] == 0
+        store.close()
+    print("✅ حُذف الجسم مع آخر مرجع")
+
+
+def run_all_tests() -> bool:
+    """تشغيل جميع الاختبارات"""
+    tests = [
+        test_identical_bodies_stored_once,
+        test_blobs_are_read_only,
+        test_detach_view_before_rewrite,
+        test_release_deletes_last_reference
+    ]
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ فشل {test.__name__}: {e}")
+    print(f"\n📋 اجتازت: {passed}/{len(tests)}")
+    return passed == len(tests)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_all_tests() else 1)
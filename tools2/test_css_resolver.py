@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+اختبار محلل اعتماديات CSS وإعادة كتابة المراجع
+Test for the CSS Dependency Tokenizer and Rewriter
+"""
+
+import sys
+
+from core.css_resolver import find_css_references, localize_css, resolve_css_url
+
+CSS_URL = 'https://example.com/static/css/site.css'
+
+
+def _refs(css: str) -> list:
+    return [(reference.url, reference.kind) for reference in find_css_references(css)]
+
+
+def test_comments_and_strings_skipped():
+    """روابط داخل التعليقات والسلاسل العادية لا تُلتقط"""
+    print("🧪 اختبار تخطي التعليقات والسلاسل...")
+    css = ('/* background: url(old.png); @import "legacy.css"; */\n'
+           '.a::before { content: "url(not-a-link.png)"; }\n'
+           '.b { background: url(real.png) }')
+
+    assert _refs(css) == [('real.png', 'image')], _refs(css)
+    # تعليق غير منتهٍ يستهلك بقية الملف
+    assert _refs('.c { color: red } /* url(x.png)') == []
+    print("✅ التُقط المرجع الحقيقي فقط")
+
+
+def test_imports():
+    """@import بسلسلة أو url() وبشروط media، مع اختلاف حالة الأحرف"""
+    print("\n🧪 اختبار @import...")
+    css = ('@import "base.css";\n'
+           "@IMPORT url('print.css') print;\n"
+           '@import url(  theme.css  ) screen and (min-width: 600px);\n'
+           '.x { background: url(icon.svg#star) }')
+
+    assert _refs(css) == [('base.css', 'import'), ('print.css', 'import'), ('theme.css', 'import'),
+                          ('icon.svg#star', 'image')], _refs(css)
+    print("✅ ثلاثة ملفات @import ومرجع صورة")
+
+
+def test_font_face_sources():
+    """url() داخل @font-face خطوط، وخارجه صور (حتى بعد الكتلة مباشرة)"""
+    print("\n🧪 اختبار @font-face...")
+    css = ('@font-face { font-family: Brand; '
+           'src: url(fonts/brand.woff2) format("woff2"), url("fonts/brand.woff") format("woff"); }\n'
+           '@media (min-width: 600px) { .hero { background-image: url(img/hero.jpg); } }\n'
+           'body { background: url(img/bg.png) }')
+
+    assert _refs(css) == [('fonts/brand.woff2', 'font'), ('fonts/brand.woff', 'font'),
+                          ('img/hero.jpg', 'image'), ('img/bg.png', 'image')], _refs(css)
+    print("✅ الخطوط والصور مصنفة بحسب الكتلة")
+
+
+def test_image_set():
+    """image-set بسلاسل مجردة و url() ونسخة -webkit-؛ type() لا يُعد رابطاً"""
+    print("\n🧪 اختبار image-set...")
+    css = ('.a { background-image: image-set("a.avif" type("image/avif") 1x, url(a@2x.png) 2x); }\n'
+           '.b { background-image: -webkit-image-set("b.png" 1x, "b@2x.png" 2x); }\n'
+           '.c { content: "c.png"; }')
+
+    assert _refs(css) == [('a.avif', 'image'), ('a@2x.png', 'image'), ('b.png', 'image'),
+                          ('b@2x.png', 'image')], _refs(css)
+    print("✅ أربعة مرشحين من image-set")
+
+
+def test_resolve_css_url():
+    """الروابط النسبية تُحل بالنسبة لملف CSS، وما لا يُجلب يعيد None"""
+    print("\n🧪 اختبار حل الروابط...")
+    assert resolve_css_url('../img/a.png', CSS_URL) == 'https://example.com/static/img/a.png'
+    assert resolve_css_url('/fonts/b.woff2#iefix', CSS_URL) == 'https://example.com/fonts/b.woff2'
+    assert resolve_css_url('//cdn.example.net/c.png', CSS_URL) == 'https://cdn.example.net/c.png'
+    for reference in ('data:image/png;base64,AAAA', '#gradient', '  ', 'javascript:void(0)'):
+        assert resolve_css_url(reference, CSS_URL) is None, reference
+    print("✅ الروابط محلولة والمراجع غير القابلة للجلب متجاهلة")
+
+
+def test_localize_quotes_unquoted_paths():
+    """المسار المحلي الذي يحتوي مسافات أو أقواساً يُوضع بين علامات تنصيص في url() غير المنصص"""
+    print("\n🧪 اختبار إعادة الكتابة مع علامات التنصيص...")
+    css = ('.a { background: url(../img/photo.png); }\n'
+           ".b { background: url('../img/logo.png'); }\n"
+           '.c { background: url(data:image/gif;base64,R0lG); }\n'
+           '.d { background: url(../img/missing.png); }')
+    local_paths = {
+        'https://example.com/static/img/photo.png': '/out/assets/images/photo (1).png',
+        'https://example.com/static/img/logo.png': '/out/assets/images/logo.png',
+    }
+
+    rewritten, count = localize_css(css, CSS_URL, local_paths, '/out/assets/css')
+
+    assert count == 2, count
+    assert 'url("../images/photo (1).png")' in rewritten, rewritten
+    assert "url('../images/logo.png')" in rewritten, rewritten
+    assert 'url(data:image/gif;base64,R0lG)' in rewritten
+    assert 'url(../img/missing.png)' in rewritten
+    print(f"✅ أعيدت كتابة {count} مراجع دون كسر بنية CSS")
+
+
+def run_all_tests() -> bool:
+    """تشغيل جميع الاختبارات"""
+    tests = [
+        test_comments_and_strings_skipped,
+        test_imports,
+        test_font_face_sources,
+        test_image_set,
+        test_resolve_css_url,
+        test_localize_quotes_unquoted_paths
+    ]
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ فشل {test.__name__}: {e}")
+    print(f"\n📋 اجتازت: {passed}/{len(tests)}")
+    return passed == len(tests)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_all_tests() else 1)
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+اختبار ميزانية تحميل الأصول في الاستخراج (V2) على خادم محلي
+Test for the Extraction Download Budget across Asset Categories
+"""
+
+import sys
+import tempfile
+import threading
+from pathlib import Path
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from bs4 import BeautifulSoup
+
+from advanced_extractor import AdvancedWebsiteExtractorV2
+from core.download_budget import DownloadBudget
+
+FILES = {
+    '/hero.png': ('image/png', b'\x89PNG' + b'0' * 2048),
+    '/site.css': ('text/css', b'body { margin: 0; }'),
+    '/app.js': ('application/javascript', b'console.log("app");'),
+    '/intro.mp4': ('video/mp4', b'\x00' * 4096),
+}
+PAGE = """<html><head><link rel="stylesheet" href="/site.css"><script src="/app.js"></script></head>
+<body><img src="/hero.png"><img src="/missing.png"><video src="/intro.mp4"></video></body></html>"""
+
+
+class _AssetHandler(BaseHTTPRequestHandler):
+    """أصول ثابتة؛ أي مسار آخر يرد 404"""
+    requested = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        type(self).requested.append(self.path)
+        if self.path not in FILES:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        content_type, body = FILES[self.path]
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def _download_assets(**budget) -> dict:
+    """تحميل أصول الصفحة بمسار V2 ضمن ميزانية معينة"""
+    _AssetHandler.requested = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _AssetHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}/"
+    try:
+        with tempfile.TemporaryDirectory() as folder:
+            extractor = AdvancedWebsiteExtractorV2(output_directory=folder)
+            extractor.asset_budget = dict(budget)
+            extraction_folder = Path(folder) / 'extraction'
+            for category in ('images', 'css', 'js', 'fonts', 'media', 'documents'):
+                (extraction_folder / '02_assets' / category).mkdir(parents=True)
+            return extractor._download_comprehensive_assets(BeautifulSoup(PAGE, 'html.parser'), base_url,
+                                                            extraction_folder)
+    finally:
+        server.shutdown()
+
+
+def test_all_categories_use_budget():
+    """الصور و CSS و JS تُحتسب بايتاتها في نفس الميزانية مع الوسائط"""
+    print("🧪 اختبار احتساب كل الأنواع في الميزانية...")
+    result = _download_assets(max_bytes=1024 * 1024)
+
+    downloaded = {Path(asset['path']).name: asset['size']
+                  for category in ('images', 'css', 'js', 'media') for asset in result[category] if asset['success']}
+    assert sorted(downloaded) == ['app.js', 'hero.png', 'intro.mp4', 'site.css'], downloaded
+    assert result['budget']['used']['bytes'] == sum(downloaded.values()), result['budget']
+    assert result['budget']['used']['assets'] == 4, result['budget']
+    print(f"✅ احتُسب {result['budget']['used']['bytes']} بايت من {len(downloaded)} أصول")
+
+
+def test_failed_download_releases_slot():
+    """الصورة المفقودة (404) تعيد مكانها فيبقى للأصل التالي مكان ضمن حد العدد"""
+    print("\n🧪 اختبار إعادة المكان بعد فشل التحميل...")
+    result = _download_assets(max_assets=3)
+
+    assert [asset['success'] for asset in result['images']] == [True, False], result['images']
+    assert not result['images'][1].get('skipped'), result['images'][1]
+    assert result['css'][0]['success'] and result['js'][0]['success'], (result['css'], result['js'])
+    assert result['media'][0]['skipped'], result['media']
+    assert '/intro.mp4' not in _AssetHandler.requested, _AssetHandler.requested
+    assert result['budget']['used']['assets'] == 3, result['budget']
+    assert [item['reason'] for item in result['budget']['skipped']] == ['assets'], result['budget']
+    print("✅ الفشل لم يستهلك مكاناً والوسائط تُخطيت عند امتلاء الحد")
+
+
+def test_release_keeps_count_non_negative():
+    """release بعد expect الذي أعاد المكان لا ينزل بالعداد تحت الصفر"""
+    print("\n🧪 اختبار release على الميزانية...")
+    budget = DownloadBudget(max_assets=2)
+    assert budget.reserve('/a', 'images', 2) is None
+    budget.release()
+    budget.release()
+    assert budget.admitted == 0, budget.admitted
+    print("✅ العداد لا يصبح سالباً")
+
+
+def run_all_tests() -> bool:
+    """تشغيل جميع الاختبارات"""
+    tests = [
+        test_all_categories_use_budget,
+        test_failed_download_releases_slot,
+        test_release_keeps_count_non_negative
+    ]
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ فشل {test.__name__}: {e}")
+    print(f"\n📋 اجتازت: {passed}/{len(tests)}")
+    return passed == len(tests)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_all_tests() else 1)
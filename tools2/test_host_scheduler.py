@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+اختبار جدولة النطاقات مع مهلة الجلب على خادم محلي
+Test for the Per-Host Scheduler under a Fetch Deadline
+"""
+
+import sys
+import time
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import requests
+
+from core.fetch_deadline import FetchDeadline, DeadlineExceeded
+from core.host_scheduler import HostScheduler, mount_scheduled_adapter
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """/throttled ترد 429 مع Retry-After المطلوب في الاستعلام، وغيرها 200"""
+    hits = 0
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        type(self).hits += 1
+        if self.path.startswith('/throttled'):
+            self.send_response(429)
+            self.send_header('Retry-After', self.path.rpartition('=')[2])
+        else:
+            self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+
+def _start_server() -> ThreadingHTTPServer:
+    _Handler.hits = 0
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _session(scheduler: HostScheduler) -> requests.Session:
+    session = requests.Session()
+    mount_scheduled_adapter(session, scheduler=scheduler)
+    return session
+
+
+def test_throttle_retry_respects_deadline():
+    """429 مع Retry-After أطول من المهلة يعاد فوراً بدل النوم ثم إعادة المحاولة"""
+    print("🧪 اختبار إعادة المحاولة بعد 429 ضمن المهلة...")
+    server = _start_server()
+    url = f"http://127.0.0.1:{server.server_port}/throttled?after=4"
+    deadline = FetchDeadline(2)
+    try:
+        started = time.monotonic()
+        with deadline.activate():
+            response = _session(HostScheduler()).get(url, timeout=2)
+        elapsed = time.monotonic() - started
+    finally:
+        server.shutdown()
+
+    assert response.status_code == 429
+    assert _Handler.hits == 1, _Handler.hits
+    assert elapsed < 1.5, elapsed
+    assert deadline.skipped_steps and deadline.skipped_steps[0]['step'] == 'throttle_retry'
+    print(f"✅ أعيدت استجابة 429 خلال {elapsed:.2f} ثانية دون إعادة محاولة")
+
+
+def test_acquire_raises_instead_of_sleeping_past_deadline():
+    """تراجع النطاق الأطول من المهلة يرفع DeadlineExceeded ويعيد المكان"""
+    print("\n🧪 اختبار acquire مع تراجع يتجاوز المهلة...")
+    scheduler = HostScheduler(max_per_host=1)
+    scheduler.acquire('example.com')
+    scheduler.release('example.com', 429, '5')
+
+    started = time.monotonic()
+    try:
+        with FetchDeadline(1).activate():
+            scheduler.acquire('example.com')
+        raise AssertionError("acquire لم ترفع DeadlineExceeded")
+    except DeadlineExceeded:
+        pass
+    elapsed = time.monotonic() - started
+
+    stats = scheduler.get_stats('example.com')['example.com']
+    assert elapsed < 0.5, elapsed
+    assert stats['active'] == 0, stats
+    assert stats['requests'] == 1, stats
+    # بدون مهلة يبقى السلوك كما هو: timeout صريح يعيد False
+    assert scheduler.acquire('example.com', timeout=0.2) is False
+    print(f"✅ رُفعت DeadlineExceeded خلال {elapsed:.2f} ثانية")
+
+
+def test_throttle_retry_without_deadline():
+    """بدون مهلة يبقى التراجع وإعادة المحاولة كما هما"""
+    print("\n🧪 اختبار إعادة المحاولة بدون مهلة...")
+    server = _start_server()
+    url = f"http://127.0.0.1:{server.server_port}/throttled?after=0"
+    try:
+        response = _session(HostScheduler(max_throttle_retries=2)).get(url, timeout=2)
+    finally:
+        server.shutdown()
+
+    assert response.status_code == 429
+    assert _Handler.hits == 3, _Handler.hits
+    print("✅ أعيدت المحاولة مرتين بعد 429")
+
+
+def run_all_tests() -> bool:
+    """تشغيل جميع الاختبارات"""
+    tests = [
+        test_throttle_retry_respects_deadline,
+        test_acquire_raises_instead_of_sleeping_past_deadline,
+        test_throttle_retry_without_deadline
+    ]
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ فشل {test.__name__}: {e}")
+    print(f"\n📋 اجتازت: {passed}/{len(tests)}")
+    return passed == len(tests)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_all_tests() else 1)
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+اختبار كشف الصفحات شبه المكررة (SimHash + LSH)
+Test for Near-Duplicate Page Detection
+"""
+
+import sys
+import random
+
+from core.near_duplicates import (NearDuplicateIndex, hamming_distance, simhash, url_pattern,
+                                  visible_text)
+
+ARTICLE = ' '.join(
+    f"section {i} explains how the crawler schedules requests per host and respects robots rules"
+    for i in range(30)
+)
+OTHER_ARTICLE = ' '.join(
+    f"chapter {i} describes baking bread with sourdough starter flour water and salt overnight"
+    for i in range(30)
+)
+
+
+def _flip_bits(fingerprint: int, count: int, rng: random.Random) -> int:
+    for bit in rng.sample(range(64), count):
+        fingerprint ^= 1 << bit
+    return fingerprint
+
+
+def test_lsh_threshold_is_exact():
+    """كل بصمة ضمن max_distance تُكتشف (مهما توزعت البتات على النطاقات) وما بعدها لا يُكتشف"""
+    print("🧪 اختبار حد المسافة في LSH...")
+    rng = random.Random(7)
+    for max_distance in (0, 3, 8):
+        index = NearDuplicateIndex(max_distance=max_distance)
+        originals = {}
+        for n in range(50):
+            fingerprint = rng.getrandbits(64)
+            originals[f"https://example.com/page/{n}"] = fingerprint
+            index.add(f"https://example.com/page/{n}", fingerprint)
+
+        for url, fingerprint in originals.items():
+            near = _flip_bits(fingerprint, max_distance, rng)
+            match = index.find(near)
+            assert match is not None and hamming_distance(originals[match], near) <= max_distance, (max_distance, url)
+            # البصمات عشوائية فلا بصمة أخرى ضمن الحد من far
+            assert index.find(_flip_bits(fingerprint, max_distance + 1, rng)) is None, (max_distance, url)
+    print("✅ المسافة <= الحد تُكتشف دائماً وما فوقها لا يُكتشف")
+
+
+def test_near_duplicate_text():
+    """نفس المقال مع تغيير صغير (تاريخ وعداد) مكرر، ومقال آخر ليس مكرراً"""
+    print("\n🧪 اختبار النصوص شبه المكررة...")
+    index = NearDuplicateIndex()
+    changed = ARTICLE.replace('section 12 ', 'section twelve ') + ' updated 2026 views 1832'
+
+    assert index.check_text('https://example.com/post/1', ARTICLE)[0] is None
+    original, fingerprint = index.check_text('https://example.com/post/1?ref=feed', changed)
+    assert original == 'https://example.com/post/1', original
+    assert hamming_distance(fingerprint, simhash(ARTICLE)) <= index.max_distance
+    assert index.check_text('https://example.com/post/2', OTHER_ARTICLE)[0] is None
+    assert hamming_distance(simhash(ARTICLE), simhash(OTHER_ARTICLE)) > index.max_distance
+    print("✅ التعديل الصغير مكرر والمقال المختلف فريد")
+
+
+def test_short_pages_not_compared():
+    """الصفحات بنص أقصر من MIN_SHINGLES مقطعاً لا تُفهرس فلا تتطابق الصفحات الفارغة"""
+    print("\n🧪 اختبار الصفحات القصيرة...")
+    index = NearDuplicateIndex()
+    assert simhash('loading please wait') is None
+    assert index.check_text('https://example.com/app/1', 'loading please wait') == (None, None)
+    assert index.check_text('https://example.com/app/2', 'loading please wait') == (None, None)
+    assert index.get_stats()['too_short'] == 2 and index.get_stats()['pages'] == 0, index.get_stats()
+    print("✅ لم تُعد الصفحات القصيرة مكررة")
+
+
+def test_duplicate_patterns_suppressed():
+    """نمط رابط ينتج مكررات غالباً يُتخطى وتنخفض أولويته، والأنماط الأخرى لا تتأثر"""
+    print("\n🧪 اختبار أنماط الروابط المكررة...")
+    index = NearDuplicateIndex(min_pattern_samples=5, suppress_ratio=0.8)
+    index.check_text('https://example.com/tag/1', ARTICLE)
+    for n in range(2, 7):
+        assert index.check_text(f'https://example.com/tag/{n}', ARTICLE)[0] == 'https://example.com/tag/1'
+
+    assert url_pattern('https://example.com/tag/99?page=2&sort=new') == 'example.com/tag/{n}?page&sort'
+    assert index.is_suppressed('https://example.com/tag/99')
+    assert not index.is_suppressed('https://example.com/post/99')
+    assert index.priority('https://example.com/tag/99') < index.priority('https://example.com/post/99') == 0.0
+    assert index.get_stats()['duplicate_patterns'][0]['pattern'] == 'example.com/tag/{n}'
+    print("✅ نمط /tag/{n} مُخطى بعد 5 مكررات")
+
+
+def test_visible_text_ignores_hidden_content():
+    """البصمة من النص الظاهر فقط: script و style والتعليقات و title لا تدخل"""
+    print("\n🧪 اختبار النص الظاهر...")
+    html = ('<html><head><title>Title</title><style>.a{}</style></head><body>'
+            '<p>Hello reader</p><script>var tracking = 1;</script><!-- build 42 --><p>Goodbye</p></body></html>')
+    words = visible_text(html).split()
+    assert words == ['Hello', 'reader', 'Goodbye'], words
+    print("✅ النص الظاهر فقط")
+
+
+def run_all_tests() -> bool:
+    """تشغيل جميع الاختبارات"""
+    tests = [
+        test_lsh_threshold_is_exact,
+        test_near_duplicate_text,
+        test_short_pages_not_compared,
+        test_duplicate_patterns_suppressed,
+        test_visible_text_ignores_hidden_content
+    ]
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ فشل {test.__name__}: {e}")
+    print(f"\n📋 اجتازت: {passed}/{len(tests)}")
+    return passed == len(tests)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_all_tests() else 1)
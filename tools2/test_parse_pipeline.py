@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+اختبار خط الجلب والتحليل على خادم محلي
+Test for the Async Fetch / Parse Pipeline
+"""
+
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from core.parse_pipeline import ParsePipeline, SHARED_MEMORY_THRESHOLD
+
+PAGES = {
+    '/plain': ('text/html', 'صفحة بلا charset'.encode('utf-8')),
+    '/latin': ('text/html; charset=iso-8859-1', 'café'.encode('iso-8859-1')),
+    '/utf8': ('text/html; charset=utf-8', 'مرحبا'.encode('utf-8')),
+    '/bogus': ('text/html; charset=no-such-codec', b'hello'),
+    '/empty': ('text/html', b''),
+}
+# صفحة أكبر من حد الذاكرة المشتركة
+LARGE_PAGE = ('text/html; charset=utf-8', b'<p>large</p>' * (SHARED_MEMORY_THRESHOLD // 8))
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path == '/large':
+            content_type, body = LARGE_PAGE
+        elif self.path not in PAGES:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        else:
+            content_type, body = PAGES[self.path]
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def _start_server() -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _page_text(page) -> dict:
+    """دالة التحليل: النص المفكوك وحالة الاستجابة"""
+    return {'success': page.ok, 'status': page.status_code, 'text': page.text, 'encoding': page.encoding}
+
+
+def test_pages_without_charset():
+    """صفحات text/html بلا charset تُجلب وتُفك بدل أن تُعد أخطاء جلب"""
+    print("🧪 اختبار الصفحات بلا charset...")
+    server = _start_server()
+    base = f"http://127.0.0.1:{server.server_port}"
+    try:
+        pipeline = ParsePipeline(_page_text, parse_workers=2, use_processes=False, timeout=5)
+        results = dict(pipeline.run([base + path for path in PAGES] + [base + '/missing']))
+    finally:
+        server.shutdown()
+
+    assert pipeline.stats['fetch_errors'] == 0, pipeline.stats
+    assert pipeline.stats['fetched'] == len(PAGES) + 1, pipeline.stats
+    assert results[base + '/plain']['text'] == 'صفحة بلا charset'
+    assert results[base + '/plain']['encoding'] is None
+    assert results[base + '/latin']['text'] == 'café'
+    assert results[base + '/utf8']['text'] == 'مرحبا'
+    assert results[base + '/bogus']['text'] == 'hello'
+    assert results[base + '/empty']['text'] == ''
+    assert results[base + '/missing']['status'] == 404
+    print(f"✅ {pipeline.stats['fetched']} صفحات جُلبت دون أخطاء جلب")
+
+
+def test_fetch_errors_reach_parser():
+    """فشل الاتصال يصل لدالة التحليل كصفحة فيها error بدل نتيجة بشكل مختلف"""
+    print("\n🧪 اختبار تمرير أخطاء الجلب لدالة التحليل...")
+    server = _start_server()
+    port = server.server_port
+    server.shutdown()
+    server.server_close()
+
+    pipeline = ParsePipeline(lambda page: {'handled': True, 'error': page.error},
+                             parse_workers=1, use_processes=False, timeout=2)
+    url = f"http://127.0.0.1:{port}/gone"
+    results = dict(pipeline.run([url]))
+
+    assert results[url]['handled'] is True
+    assert results[url]['error']
+    assert pipeline.stats['fetch_errors'] == 1, pipeline.stats
+    print("✅ خطأ الجلب وصل لدالة التحليل")
+
+
+def _shared_blocks() -> set:
+    """كتل الذاكرة المشتركة الموجودة حالياً (Linux)"""
+    return {name for name in os.listdir('/dev/shm') if name.startswith('psm_')} if os.path.isdir('/dev/shm') else set()
+
+
+def test_large_pages_in_processes():
+    """الصفحة الكبيرة تصل لعملية التحليل عبر الذاكرة المشتركة وتُحذف الكتلة بعد التحليل"""
+    print("\n🧪 اختبار التحليل في عمليات مستقلة...")
+    server = _start_server()
+    base = f"http://127.0.0.1:{server.server_port}"
+    blocks_before = _shared_blocks()
+    try:
+        pipeline = ParsePipeline(_page_text, parse_workers=2, timeout=5)
+        results = dict(pipeline.run([base + '/large', base + '/utf8']))
+    finally:
+        server.shutdown()
+
+    assert pipeline._in_processes, "لم تُستخدم العمليات المتعددة"
+    assert results[base + '/large']['text'] == LARGE_PAGE[1].decode(), len(results[base + '/large'].get('text', ''))
+    assert results[base + '/utf8']['text'] == 'مرحبا'
+    assert pipeline.stats['shared_memory_pages'] == 1, pipeline.stats
+    assert _shared_blocks() == blocks_before
+    print("✅ حُللت الصفحة الكبيرة في عملية مستقلة وحُذفت الذاكرة المشتركة")
+
+
+class _RejectingPipeline(ParsePipeline):
+    """منفذ مغلق: submit يرفع بعد حجز الذاكرة المشتركة"""
+
+    def _create_executor(self):
+        executor = ThreadPoolExecutor(max_workers=1)
+        executor.shutdown()
+        self._in_processes = True
+        return executor
+
+
+def test_shared_memory_released_when_submit_fails():
+    """فشل submit بعد حجز الذاكرة المشتركة لا يترك الكتلة في /dev/shm"""
+    print("\n🧪 اختبار تحرير الذاكرة المشتركة عند فشل submit...")
+    server = _start_server()
+    url = f"http://127.0.0.1:{server.server_port}/large"
+    blocks_before = _shared_blocks()
+    try:
+        pipeline = _RejectingPipeline(_page_text, parse_workers=1, timeout=5)
+        results = dict(pipeline.run([url]))
+    finally:
+        server.shutdown()
+
+    assert results[url]['success'] is False and 'خطأ في التحليل' in results[url]['error'], results
+    assert pipeline.stats['shared_memory_pages'] == 1, pipeline.stats
+    assert _shared_blocks() == blocks_before
+    print("✅ حُذفت الكتلة بعد فشل التسليم")
+
+
+def run_all_tests() -> bool:
+    """تشغيل جميع الاختبارات"""
+    tests = [
+        test_pages_without_charset,
+        test_fetch_errors_reach_parser,
+        test_large_pages_in_processes,
+        test_shared_memory_released_when_submit_fails
+    ]
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ فشل {test.__name__}: {e}")
+    print(f"\n📋 اجتازت: {passed}/{len(tests)}")
+    return passed == len(tests)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_all_tests() else 1)
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+اختبار التحميل القابل للاستئناف على خادم Range محلي
+Test for the Resumable Ranged Downloader
+"""
+
+import re
+import sys
+import hashlib
+import tempfile
+import threading
+from pathlib import Path
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import requests
+
+from core.ranged_download import RangedDownloader
+from core.download_budget import DownloadBudget
+
+BODY = hashlib.sha256(b'seed').digest() * 8192  # 256 KB
+BODY_SHA256 = hashlib.sha256(BODY).hexdigest()
+ETAG = '"v1"'
+
+
+class _RangeHandler(BaseHTTPRequestHandler):
+    """/file يدعم Range؛ /drop يقطع أول استجابة في منتصفها؛ /ignore-range يقطعها ثم يتجاهل Range؛ /unsized بلا Content-Length"""
+    requests_seen = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        path = self.path
+        range_header = self.headers.get('Range')
+        type(self).requests_seen.append((path, range_header))
+        first = sum(1 for seen, _ in self.requests_seen if seen == path) == 1
+
+        if path == '/unsized':
+            self.send_response(200)
+            self.end_headers()
+            self.wfile.write(BODY)
+            return
+
+        match = re.match(r'bytes=(\d+)-(\d*)', range_header or '')
+        if match and path != '/ignore-range':
+            start = int(match.group(1))
+            end = int(match.group(2)) if match.group(2) else len(BODY) - 1
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{end}/{len(BODY)}')
+            body = BODY[start:end + 1]
+        else:
+            self.send_response(200)
+            body = BODY
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('ETag', ETAG)
+        self.end_headers()
+
+        if path in ('/drop', '/ignore-range') and first:
+            # انقطاع الاتصال بعد نصف الجسم
+            self.wfile.write(body[:len(body) // 2])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+
+def _start_server() -> ThreadingHTTPServer:
+    _RangeHandler.requests_seen = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _RangeHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _download(path: str, budget: DownloadBudget = None, **options) -> tuple:
+    """تحميل مسار من خادم جديد إلى مجلد مؤقت؛ يعيد (النتيجة، محتوى الملف، ملفات المجلد، الطلبات)"""
+    server = _start_server()
+    options.setdefault('backoff', 0)
+    try:
+        with tempfile.TemporaryDirectory() as folder:
+            dest = Path(folder) / 'asset.bin'
+            result = RangedDownloader(requests.Session(), **options).download(
+                f"http://127.0.0.1:{server.server_port}{path}", dest, budget=budget, category='media')
+            content = dest.read_bytes() if dest.exists() else None
+            leftovers = sorted(p.name for p in Path(folder).iterdir() if p != dest)
+    finally:
+        server.shutdown()
+    return result, content, leftovers, list(_RangeHandler.requests_seen)
+
+
+def test_resume_after_drop():
+    """انقطاع في منتصف الجسم يُستأنف بطلب Range من آخر بايت مكتوب"""
+    print("🧪 اختبار الاستئناف بعد الانقطاع...")
+    result, content, leftovers, seen = _download('/drop', segments=1)
+
+    assert result['success'], result
+    assert content == BODY
+    assert result['sha256'] == BODY_SHA256
+    assert result['resumed_bytes'] == len(BODY) // 2, result
+    assert seen == [('/drop', None), ('/drop', f'bytes={len(BODY) // 2}-')], seen
+    assert leftovers == [], leftovers
+    print(f"✅ استؤنف التحميل من البايت {result['resumed_bytes']}")
+
+
+def test_segmented_download():
+    """ملف أكبر من حد التقسيم يُحمل على أجزاء متوازية ويُجمع بالترتيب الصحيح"""
+    print("\n🧪 اختبار التحميل المقسم...")
+    result, content, leftovers, seen = _download('/file', segments=4, segment_threshold=64 * 1024)
+
+    assert result['success'], result
+    assert content == BODY
+    assert result['segments'] == 4, result
+    assert result['requests'] == 4, result
+    ranges = sorted(header for _, header in seen if header)
+    assert len(ranges) == 3, seen
+    assert leftovers == [], leftovers
+    print(f"✅ {result['segments']} أجزاء، {result['requests']} طلبات")
+
+
+def test_restart_when_range_ignored():
+    """خادم يرد 200 على طلب Range بعد الانقطاع: التحميل يبدأ من جديد بدل إلحاق الملف كاملاً"""
+    print("\n🧪 اختبار إعادة البدء عند تجاهل Range...")
+    result, content, leftovers, seen = _download('/ignore-range', segments=1)
+
+    assert result['success'], result
+    assert content == BODY, (len(content or b''), len(BODY))
+    assert result['resumed_bytes'] == 0, result
+    assert len(seen) == 2 and seen[1][1] == f'bytes={len(BODY) // 2}-', seen
+    assert leftovers == [], leftovers
+    print("✅ أُعيد التحميل كاملاً دون خلط")
+
+
+def test_oversize_rejected():
+    """الملف الأكبر من max_bytes يُرفض من Content-Length أو أثناء التدفق ولا يبقى ملف جزئي"""
+    print("\n🧪 اختبار رفض الملفات الكبيرة...")
+    for path in ('/file', '/unsized'):
+        result, content, leftovers, seen = _download(path, max_bytes=len(BODY) // 4)
+        assert not result['success'], result
+        assert 'maximum size' in result['error'], result
+        assert content is None and leftovers == [], leftovers
+        assert len(seen) == 1, seen
+    print("✅ رُفض الملف قبل تجاوز الحد ولم يبق ملف جزئي")
+
+
+def test_budget_limits_download():
+    """ميزانية الاستخراج تتخطى الملف من حجمه المعلن أو تلغيه أثناء التدفق، وتحتسب الأجزاء المقسمة"""
+    print("\n🧪 اختبار ميزانية التحميل...")
+    for path, key in (('/file', 'skipped'), ('/unsized', 'cancelled')):
+        budget = DownloadBudget(max_bytes=len(BODY) // 4)
+        budget.reserve(path, 'media', 3)
+        result, content, leftovers, seen = _download(path, budget, segments=1)
+        assert not result['success'] and result.get('budget_exceeded'), result
+        assert content is None and leftovers == [], leftovers
+        assert budget.summary()[key], budget.summary()
+
+    budget = DownloadBudget(max_bytes=len(BODY) * 2)
+    result, content, leftovers, seen = _download('/file', budget, segments=4, segment_threshold=64 * 1024)
+    assert result['success'] and content == BODY, result
+    assert budget.used_bytes == len(BODY), budget.used_bytes
+    print("✅ الميزانية تتخطى وتلغي وتحتسب البايتات المكتوبة")
+
+
+def run_all_tests() -> bool:
+    """تشغيل جميع الاختبارات"""
+    tests = [
+        test_resume_after_drop,
+        test_segmented_download,
+        test_restart_when_range_ignored,
+        test_oversize_rejected,
+        test_budget_limits_download
+    ]
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ فشل {test.__name__}: {e}")
+    print(f"\n📋 اجتازت: {passed}/{len(tests)}")
+    return passed == len(tests)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_all_tests() else 1)
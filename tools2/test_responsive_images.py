@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+اختبار اختيار مرشح واحد من srcset/sizes/<picture>
+Test for Responsive Image Candidate Selection
+"""
+
+import sys
+
+from bs4 import BeautifulSoup
+
+from core.responsive_images import ImagePolicy, parse_sizes, parse_srcset, select_page_images
+
+BASE_URL = 'https://example.com/blog/post'
+WIDTH_SRCSET = 'hero-480.jpg 480w, hero-800.jpg 800w, hero-1600.jpg 1600w'
+SIZES = '(max-width: 600px) 100vw, 50vw'
+
+
+def _choose(html: str, **policy) -> list:
+    """روابط الصور المختارة (نسبية للموقع) من مقطع HTML"""
+    soup = BeautifulSoup(html, 'html.parser')
+    return [choice.url.replace('https://example.com', '')
+            for choice in select_page_images(soup, BASE_URL, ImagePolicy(**policy))]
+
+
+def test_parse_srcset():
+    """الفواصل داخل الرابط تبقى جزءاً منه، والواصفات غير الصالحة تُسقط مرشحها"""
+    print("🧪 اختبار تحليل srcset...")
+    candidates = parse_srcset('a.jpg?crop=1,2 1x, b.jpg 2x,c.jpg 640w, bad.jpg 2q, zero.jpg 0w')
+
+    assert [c.url for c in candidates] == ['a.jpg?crop=1,2', 'b.jpg', 'c.jpg'], candidates
+    assert candidates[0].density == 1.0 and candidates[1].density == 2.0
+    assert candidates[2].width == 640
+    print(f"✅ {len(candidates)} مرشحين صالحين")
+
+
+def test_sizes_slot_width():
+    """sizes: أول شرط مطابق يحدد عرض الخانة، والقيمة الأخيرة بلا شرط هي الافتراضية"""
+    print("\n🧪 اختبار sizes...")
+    assert parse_sizes(SIZES, 1366) == 683.0
+    assert parse_sizes(SIZES, 500) == 500.0
+    assert parse_sizes('(min-width: 40em) 320px, 100vw', 1366) == 320.0
+    assert parse_sizes('calc(100vw - 2rem)', 1024) == 1024.0
+    assert parse_sizes(None, 800) == 800.0
+    print("✅ عرض الخانة صحيح لكل حالة")
+
+
+def test_width_descriptors_follow_slot_and_dpr():
+    """أصغر مرشح يغطي عرض الخانة × كثافة البكسل"""
+    print("\n🧪 اختبار اختيار المرشح حسب sizes و DPR...")
+    html = f'<img src="hero-800.jpg" srcset="{WIDTH_SRCSET}" sizes="{SIZES}">'
+
+    assert _choose(html) == ['/blog/hero-800.jpg']                       # خانة 683px
+    assert _choose(html, dpr=2) == ['/blog/hero-1600.jpg']               # 1366px مطلوبة
+    assert _choose(html, viewport_width=400) == ['/blog/hero-480.jpg']   # خانة 400px
+    assert _choose(html, mode='largest') == ['/blog/hero-1600.jpg']
+    assert _choose(html, mode='smallest') == ['/blog/hero-480.jpg']
+    # لا مرشح يكفي: الأكبر
+    assert _choose(html, dpr=3) == ['/blog/hero-1600.jpg']
+    print("✅ المرشح المختار يطابق الخانة وكثافة البكسل")
+
+
+def test_density_descriptors_with_implicit_src():
+    """src هو المرشح 1x الضمني عندما يحتوي srcset على واصفات كثافة فقط"""
+    print("\n🧪 اختبار واصفات الكثافة...")
+    html = '<img src="/logo.png" srcset="/logo@2x.png 2x, /logo@3x.png 3x">'
+
+    assert _choose(html) == ['/logo.png']
+    assert _choose(html, dpr=2) == ['/logo@2x.png']
+    assert _choose(html, dpr=2.5) == ['/logo@3x.png']
+    print("✅ src يُستخدم كمرشح 1x")
+
+
+def test_picture_sources():
+    """<picture>: أول <source> بنوع مدعوم و media مطابق يحسم الاختيار"""
+    print("\n🧪 اختبار <picture>...")
+    html = ('<picture>'
+            '<source type="image/jxl" srcset="/hero.jxl 1x">'
+            '<source media="(min-width: 2000px)" srcset="/hero-wide.webp 1x">'
+            '<source type="image/webp" srcset="/hero-small.webp 600w, /hero-large.webp 1400w" sizes="100vw">'
+            '<img src="/hero.jpg">'
+            '</picture>')
+
+    assert _choose(html) == ['/hero-large.webp']
+    assert _choose(html, viewport_width=500) == ['/hero-small.webp']
+    assert _choose(html, viewport_width=2400) == ['/hero-wide.webp']
+    print("✅ تُخطيت الأنواع غير المدعومة وشروط media غير المطابقة")
+
+
+def test_lazy_images_and_duplicates():
+    """العنصر النائب يُستبدل بسمة التحميل الكسول، والرابط المكرر بين العناصر يُحمل مرة واحدة"""
+    print("\n🧪 اختبار التحميل الكسول وعدم التكرار...")
+    html = ('<img src="data:image/gif;base64,R0lGOD" data-src="/photos/one.jpg">'
+            '<img src="/img/spacer.gif" data-srcset="/photos/two-400.jpg 400w, /photos/two-900.jpg 900w" '
+            'data-sizes="400px">'
+            '<img src="/photos/one.jpg">'
+            '<img src="data:image/png;base64,iVBOR">')
+
+    soup = BeautifulSoup(html, 'html.parser')
+    choices = select_page_images(soup, BASE_URL, ImagePolicy())
+    assert [choice.url for choice in choices] == ['https://example.com/photos/one.jpg',
+                                                  'https://example.com/photos/two-400.jpg'], choices
+    assert [choice.source for choice in choices] == ['lazy', 'lazy'], choices
+    assert choices[1].alternatives == ['https://example.com/photos/two-900.jpg'], choices[1]
+    print(f"✅ {len(choices)} صور من 4 عناصر")
+
+
+def run_all_tests() -> bool:
+    """تشغيل جميع الاختبارات"""
+    tests = [
+        test_parse_srcset,
+        test_sizes_slot_width,
+        test_width_descriptors_follow_slot_and_dpr,
+        test_density_descriptors_with_implicit_src,
+        test_picture_sources,
+        test_lazy_images_and_duplicates
+    ]
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ فشل {test.__name__}: {e}")
+    print(f"\n📋 اجتازت: {passed}/{len(tests)}")
+    return passed == len(tests)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_all_tests() else 1)
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+اختبار عدم تكرار الجلب بين تحميل الأصول والزحف على خادم محلي
+Test for Asset and Crawl Fetch Deduplication
+"""
+
+import sys
+import tempfile
+import threading
+from collections import Counter
+from pathlib import Path
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from bs4 import BeautifulSoup
+
+from advanced_extractor import AdvancedWebsiteExtractor
+
+HOME = b"""<html><head><title>Home</title><link rel="stylesheet" href="/style.css"></head>
+<body><a href="/about">About</a> <a href="/guide.pdf">Guide</a> <a href="/style.css">Styles</a></body></html>"""
+ABOUT = b"""<html><head><title>About</title></head><body><p>About this site and its team</p>
+<a href="/">Home</a></body></html>"""
+FILES = {
+    '/': ('text/html; charset=utf-8', HOME),
+    '/about': ('text/html; charset=utf-8', ABOUT),
+    '/style.css': ('text/css', b'body { color: #333; }'),
+    '/guide.pdf': ('application/pdf', b'%PDF-1.4 guide'),
+}
+
+
+class _SiteHandler(BaseHTTPRequestHandler):
+    """موقع صغير: صفحتان وملف CSS ومستند PDF، ويُعد الطلبات لكل مسار"""
+    hits = Counter()
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        type(self).hits[self.path] += 1
+        if self.path not in FILES:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        content_type, body = FILES[self.path]
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def _start_server() -> ThreadingHTTPServer:
+    _SiteHandler.hits = Counter()
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _SiteHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _download_then_crawl(seed_assets: bool = True) -> tuple:
+    """نفس ترتيب التحميل الشامل: الصفحة، ثم الأصول، ثم الزحف؛ يعيد (الزحف، عدد الطلبات لكل مسار)"""
+    server = _start_server()
+    url = f"http://127.0.0.1:{server.server_port}/"
+    try:
+        with tempfile.TemporaryDirectory() as folder:
+            extractor = AdvancedWebsiteExtractor(output_directory=folder)
+            base_folder = Path(folder) / 'site'
+            extractor._create_comprehensive_folder_structure(base_folder)
+
+            response = extractor.session.get(url, timeout=5)
+            assets = extractor._download_all_website_assets(BeautifulSoup(response.text, 'html.parser'),
+                                                            url, base_folder)
+            fetched_urls = list(extractor._attempted_asset_urls(assets)) if seed_assets else ()
+            site_crawl = extractor._crawl_site(url, base_folder / '08_crawled_pages', max_depth=2, max_pages=10,
+                                               seed_response=response, timeout=5, fetched_urls=fetched_urls)
+            crawled_urls = site_crawl.urls
+    finally:
+        server.shutdown()
+    return crawled_urls, dict(_SiteHandler.hits)
+
+
+def test_assets_not_fetched_twice():
+    """CSS والمستند المحملان في مرحلة الأصول لا يجلبهما الزاحف مرة ثانية"""
+    print("🧪 اختبار عدم إعادة جلب الأصول أثناء الزحف...")
+    crawled_urls, hits = _download_then_crawl()
+
+    for path in FILES:
+        assert hits.get(path) == 1, hits
+    assert sorted(url.rsplit('/', 1)[1] for url in crawled_urls) == ['', 'about'], crawled_urls
+    print(f"✅ كل رابط جُلب مرة واحدة: {hits}")
+
+
+def test_crawler_saves_only_html():
+    """بدون روابط مسبقة الجلب: الملفات غير HTML لا تُحفظ كصفحات مزحوفة"""
+    print("\n🧪 اختبار حفظ صفحات HTML فقط...")
+    crawled_urls, hits = _download_then_crawl(seed_assets=False)
+
+    assert hits.get('/guide.pdf') == 2, hits
+    assert sorted(url.rsplit('/', 1)[1] for url in crawled_urls) == ['', 'about'], crawled_urls
+    print("✅ المستند وملف CSS لم يُحفظا كصفحات")
+
+
+def run_all_tests() -> bool:
+    """تشغيل جميع الاختبارات"""
+    tests = [
+        test_assets_not_fetched_twice,
+        test_crawler_saves_only_html
+    ]
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ فشل {test.__name__}: {e}")
+    print(f"\n📋 اجتازت: {passed}/{len(tests)}")
+    return passed == len(tests)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_all_tests() else 1)